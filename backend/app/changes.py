@@ -0,0 +1,140 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+
+class ChangeEvent(NamedTuple):
+    version: int
+    type: str # 'layout', 'view' or 'module'
+    id: Optional[str] # None for 'clear'
+    op: str # 'upsert', 'delete' or 'clear'
+    etag: Optional[str] # ETag of the new content, as returned by the GET endpoints; None for deletes
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+class ChangeFeed:
+    """In-memory log of config changes that /api/changes streams to clients.
+
+    Every event gets a version number that increases by one per event, so a client that
+    reconnects with since=<last version seen> only receives what it missed. The most recent
+    max_events are kept; a client asking for anything older must re-fetch its lists instead.
+
+    publish() may be called from any thread (the storage thread pool included); waiters
+    are woken on their own event loops.
+    """
+
+    def __init__(self, max_events: int = 1024) -> None:
+        self._lock = threading.Lock()
+        self._events: Deque[ChangeEvent] = deque(maxlen=max_events)
+        self._version = 0
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        # Last published ETag per (type, id), used by reconcile() to spot changes made on disk
+        self._known: Dict[Tuple[str, str], Optional[str]] = {}
+        self._subscribers = 0
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    @property
+    def subscribers(self) -> int:
+        """Number of clients currently streaming or long polling the feed."""
+        with self._lock:
+            return self._subscribers
+
+    @contextmanager
+    def subscription(self) -> Iterator[None]:
+        """Counts a client as listening for the duration of the block."""
+        with self._lock:
+            self._subscribers += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._subscribers -= 1
+
+    def publish(self, type: str, id: Optional[str], op: str, etag: Optional[str] = None) -> ChangeEvent:
+        with self._lock:
+            event = self._append(type, id, op, etag)
+            waiters = list(self._waiters)
+        self._wake(waiters)
+        return event
+
+    def reconcile(self, type: str, current: Mapping[str, str], publish: bool = True) -> List[ChangeEvent]:
+        """Publishes events for differences between current ({id: etag}) and what the feed last saw.
+
+        Changes already published through publish() are not repeated. With publish=False the
+        state is only recorded, which is how the watcher seeds itself at startup.
+        """
+        events = []
+        with self._lock:
+            known_ids = {key[1] for key in self._known if key[0] == type}
+            for data_id in sorted(known_ids - set(current)):
+                del self._known[(type, data_id)]
+                if publish:
+                    events.append(self._append(type, data_id, 'delete', None))
+            for data_id in sorted(current):
+                if self._known.get((type, data_id)) != current[data_id]:
+                    self._known[(type, data_id)] = current[data_id]
+                    if publish:
+                        events.append(self._append(type, data_id, 'upsert', current[data_id]))
+            waiters = list(self._waiters) if events else []
+        self._wake(waiters)
+        return events
+
+    def since(self, version: int) -> Optional[List[ChangeEvent]]:
+        """Returns the events after version, or None if some of them are no longer buffered.
+
+        A version ahead of the feed (from before a server restart) also returns None.
+        """
+        with self._lock:
+            if version > self._version:
+                return None
+            if version == self._version:
+                return []
+            oldest = self._events[0].version if self._events else self._version + 1
+            if version < oldest - 1:
+                return None
+            return [event for event in self._events if event.version > version]
+
+    async def wait(self, version: int, timeout: float) -> bool:
+        """Waits until an event newer than version is published; returns False on timeout."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._version > version:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def _append(self, type: str, id: Optional[str], op: str, etag: Optional[str]) -> ChangeEvent:
+        self._version += 1
+        event = ChangeEvent(self._version, type, id, op, etag)
+        self._events.append(event)
+        if op == 'clear':
+            for key in [key for key in self._known if key[0] == type]:
+                del self._known[key]
+        elif op == 'delete':
+            self._known.pop((type, id), None)
+        else:
+            self._known[(type, id)] = etag
+        return event
+
+    @staticmethod
+    def _wake(waiters) -> None:
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError: # The waiter's loop has been closed
+                pass
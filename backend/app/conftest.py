@@ -0,0 +1,21 @@
+import pytest
+
+from app.io import history, yaml_loader
+
+
+@pytest.fixture(scope="session", autouse=True)
+def data_dir(tmp_path_factory):
+    """Points the store, its locks and sidecars, the SQLite file and the version history at a temporary directory.
+
+    Tests write through the real storage API, so without this a run would leave its configs
+    and history behind in backend/inkstone_data. The version history follows DATA_BASE_PATH.
+    """
+    path = tmp_path_factory.mktemp("inkstone_data")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(yaml_loader, "DATA_BASE_PATH", path)
+        mp.setattr(history, "HISTORY_DIR", None) # Even if INKSTONE_HISTORY_DIR is set
+        yaml_loader.forget_directory_layouts()
+        yaml_loader.clear_cache()
+        yield path
+    yaml_loader.forget_directory_layouts()
+    yaml_loader.clear_cache()
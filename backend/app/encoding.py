@@ -0,0 +1,261 @@
+import json
+import os
+import zlib
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Negotiated response encodings for large payloads (view content can be whole HTML pages or
+# tables). Both are optional (pip install -r requirements-extras.txt): brotli is offered only
+# when the brotli package is installed, and MessagePack only when msgpack is. Each negotiated
+# representation gets its own ETag, the JSON one with a suffix per transformation
+# ("abc" -> "abc-msgpack-br"); the suffixes are removed again from If-None-Match / If-Match
+# before the app compares them with its ETags.
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+MSGPACK_ETAG_SUFFIX = "msgpack"
+_CONTENT_ENCODINGS = ("br", "gzip") # Also the ETag suffixes of the compressed representations
+COMPRESS_MIN_BYTES = int(os.environ.get("INKSTONE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5 # Brotli's default (11) is far too slow for dynamic responses
+
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", MSGPACK_MEDIA_TYPE, "text/")
+_NEVER_COMPRESSED_TYPES = ("text/event-stream",) # SSE is flushed event by event and must not be buffered
+
+
+def parse_qvalues(header: Optional[str]) -> Dict[str, float]:
+    """Parses an Accept or Accept-Encoding header into {token: q}; invalid q values count as 0."""
+    qvalues: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        token, *params = (piece.strip() for piece in part.split(";"))
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[token.lower()] = q
+    return qvalues
+
+
+def choose_content_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Returns 'br', 'gzip' or None (identity) for an Accept-Encoding header."""
+    qvalues = parse_qvalues(accept_encoding)
+    wildcard = qvalues.get("*", 0.0)
+    gzip_q = qvalues.get("gzip", wildcard)
+    br_q = qvalues.get("br", wildcard) if brotli is not None else 0.0
+    if br_q > 0 and br_q >= gzip_q:
+        return "br"
+    if gzip_q > 0:
+        return "gzip"
+    return None
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """True if the client prefers MessagePack at least as much as JSON and it can be produced."""
+    if msgpack is None:
+        return False
+    qvalues = parse_qvalues(accept)
+    msgpack_q = max(qvalues.get(media_type, 0.0) for media_type in _MSGPACK_MEDIA_TYPES)
+    return msgpack_q > 0 and msgpack_q >= qvalues.get("application/json", 0.0)
+
+
+def _media_type(headers: Headers) -> str:
+    return headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+def _has_suffix(tag: str, suffix: str) -> bool:
+    return tag.endswith(f'-{suffix}"')
+
+
+def _strip_suffix(tag: str, suffixes: Tuple[str, ...]) -> str:
+    for suffix in suffixes:
+        if _has_suffix(tag, suffix):
+            return tag[:-len(suffix) - 2] + '"'
+    return tag
+
+
+def _map_validators(scope, suffixes: Tuple[str, ...], negotiated: Optional[str]) -> None:
+    """Maps the entity tags of If-Match / If-None-Match in scope back to the app's ETags.
+
+    The headers are replaced in the scope itself rather than in a copy: the router sets
+    scope["route"] further in, and the metrics middleware outside reads it from this same dict.
+
+    If-Match checks the state of the resource, so any of suffixes is removed. If-None-Match asks
+    whether the client's copy of this representation is current: when a suffix is negotiated only
+    tags carrying it can match, and otherwise the header is left alone (suffixed tags never match).
+    """
+    headers = []
+    changed = False
+    for name, value in scope.get("headers", []):
+        if name == b"if-match" or (name == b"if-none-match" and negotiated is not None):
+            tags = [tag.strip() for tag in value.decode("latin-1").split(",")]
+            if name == b"if-match":
+                tags = [_strip_suffix(tag, suffixes) for tag in tags]
+            else:
+                tags = [_strip_suffix(tag, (negotiated,)) for tag in tags if tag == "*" or _has_suffix(tag, negotiated)]
+            value = ", ".join(tags).encode("latin-1")
+            changed = True
+        headers.append((name, value))
+    if changed:
+        scope["headers"] = headers
+
+
+def _suffix_etag(headers: MutableHeaders, suffix: str) -> None:
+    etag = headers.get("etag")
+    if etag is not None and etag.endswith('"'):
+        headers["etag"] = f'{etag[:-1]}-{suffix}"'
+
+
+class MessagePackMiddleware:
+    """ASGI middleware re-encoding JSON GET responses as MessagePack when the Accept header asks for it.
+
+    Every JSON GET response varies on Accept, converted or not.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or msgpack is None:
+            await self.app(scope, receive, send)
+            return
+        convert = scope["method"] == "GET" and accepts_msgpack(Headers(scope=scope).get("accept"))
+        _map_validators(scope, (MSGPACK_ETAG_SUFFIX,), MSGPACK_ETAG_SUFFIX if convert else None)
+        if scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        start = None
+        chunks = []
+
+        async def send_wrapper(message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                negotiable = message["status"] == 200 and _media_type(headers) == "application/json"
+                if negotiable and convert:
+                    start = message # Held back until the whole JSON body is known
+                    return
+                if negotiable or message["status"] == 304:
+                    headers.add_vary_header("Accept")
+                    if convert:
+                        _suffix_etag(headers, MSGPACK_ETAG_SUFFIX)
+                    message = {**message, "headers": headers.raw}
+            elif message["type"] == "http.response.body" and start is not None:
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                body = b"".join(chunks)
+                payload = msgpack.packb(orjson.loads(body) if orjson is not None else json.loads(body))
+                headers = MutableHeaders(raw=list(start.get("headers", [])))
+                headers["content-type"] = MSGPACK_MEDIA_TYPE
+                headers["content-length"] = str(len(payload))
+                headers.add_vary_header("Accept")
+                _suffix_etag(headers, MSGPACK_ETAG_SUFFIX)
+                await send({**start, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": payload})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class _GzipEncoder:
+    def __init__(self) -> None:
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        # A sync flush after each streamed chunk lets NDJSON lines reach the client as they are produced
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliEncoder:
+    def __init__(self) -> None:
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.process(data) + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with brotli or gzip, as negotiated through Accept-Encoding.
+
+    Complete bodies smaller than minimum_size are sent as they are. Streamed bodies (e.g. NDJSON
+    lists) are compressed chunk by chunk; server-sent events are never compressed. Every
+    compressible response varies on Accept-Encoding, compressed or not.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_content_encoding(Headers(scope=scope).get("accept-encoding"))
+        _map_validators(scope, _CONTENT_ENCODINGS, encoding)
+        start = None
+        encoder = None
+
+        async def send_wrapper(message) -> None:
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                media_type = _media_type(headers)
+                compressible = ("content-encoding" not in headers and media_type.startswith(_COMPRESSIBLE_TYPES)
+                                and not media_type.startswith(_NEVER_COMPRESSED_TYPES))
+                if compressible or message["status"] == 304:
+                    # The ETag names the negotiated encoding even when the body turns out too small to compress
+                    headers.add_vary_header("Accept-Encoding")
+                    if encoding is not None:
+                        _suffix_etag(headers, encoding)
+                    message = {**message, "headers": headers.raw}
+                    if compressible and encoding is not None:
+                        start = message # Held back until the first body chunk shows whether it is worth it
+                        return
+            elif message["type"] == "http.response.body" and start is not None:
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                if encoder is None:
+                    headers = MutableHeaders(raw=list(start.get("headers", [])))
+                    if not more_body and len(body) < self.minimum_size:
+                        await send(start)
+                        await send(message)
+                        start = None
+                        return
+                    encoder = _BrotliEncoder() if encoding == "br" else _GzipEncoder()
+                    headers["content-encoding"] = encoding
+                    if more_body:
+                        del headers["content-length"]
+                        await send({**start, "headers": headers.raw})
+                    else:
+                        body = encoder.encode(body, final=True)
+                        headers["content-length"] = str(len(body))
+                        await send({**start, "headers": headers.raw})
+                        await send({"type": "http.response.body", "body": body})
+                        return
+                await send({"type": "http.response.body", "body": encoder.encode(body, final=not more_body), "more_body": more_body})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
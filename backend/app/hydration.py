@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, NamedTuple, Optional
+
+from app import metrics
+from app.webhooks import WebhookError, WebhookGateway, WebhookResponse, build_request
+
+# A view binds to a backend data source through content.dataSource, which takes the same fields
+# as a webhook_trigger view (webhookUrl, method, requestBody, headers) with GET as the default
+# method, plus an optional per-call timeout in seconds. Hydrating a layout runs every such call
+# concurrently through the webhook gateway, under one server-wide concurrency cap, and hands
+# each result back as soon as it completes.
+HYDRATE_MAX_CONCURRENCY = int(os.environ.get("INKSTONE_HYDRATE_MAX_CONCURRENCY", "32"))
+HYDRATE_DEADLINE_SECONDS = float(os.environ.get("INKSTONE_HYDRATE_DEADLINE_SECONDS", "10"))
+
+_HYDRATE_CALLS = metrics.counter("inkstone_hydrate_calls", "View data-source calls made while hydrating layouts, by outcome.", ("outcome",))
+_HYDRATE_SECONDS = metrics.histogram("inkstone_hydrate_seconds", "Time to hydrate every data source of a layout.")
+
+
+class DataSourceCall(NamedTuple):
+    pane_id: str
+    view_id: str
+    source: Dict[str, Any] # The view's content.dataSource
+
+
+def data_source(content: Any) -> Optional[Dict[str, Any]]:
+    """Returns the dataSource a view's content binds to, or None for a static view."""
+    if isinstance(content, dict) and isinstance(content.get('dataSource'), dict):
+        return content['dataSource']
+    return None
+
+
+def _decode_body(content_type: Optional[str], body: bytes) -> Any:
+    """JSON bodies are inlined as values, anything else as text."""
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    if media_type == 'application/json' or media_type.endswith('+json'):
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode('utf-8', errors='replace')
+
+
+class LayoutHydrator:
+    """Runs the data-source calls of a layout concurrently and yields each result as it completes."""
+
+    def __init__(self, gateway: WebhookGateway, max_concurrency: int = HYDRATE_MAX_CONCURRENCY) -> None:
+        self.gateway = gateway
+        self.max_concurrency = max_concurrency
+        # Shared by every hydration on the loop; recreated if used from another loop (e.g. in tests)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _semaphore_for_loop(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _call_limited(self, request) -> WebhookResponse:
+        async with self._semaphore_for_loop():
+            return await self.gateway.call(request)
+
+    async def _run(self, call: DataSourceCall, deadline_at: float) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"pane_id": call.pane_id, "view_id": call.view_id}
+        started = time.monotonic()
+
+        def finish(outcome: str, status_code: int, **fields: Any) -> Dict[str, Any]:
+            _HYDRATE_CALLS.labels(outcome).inc()
+            result.update(status=outcome, status_code=status_code, elapsed_ms=round(1000 * (time.monotonic() - started), 3), **fields)
+            return result
+
+        try:
+            request = build_request(call.source, default_method='GET', allowed_origins=self.gateway.targets)
+        except ValueError as e:
+            return finish('invalid', 422, error=str(e))
+        # Time spent waiting for a slot under the concurrency cap counts against the deadline
+        timeout = deadline_at - started
+        per_call = call.source.get('timeout')
+        if isinstance(per_call, (int, float)) and not isinstance(per_call, bool) and per_call > 0:
+            timeout = min(timeout, float(per_call))
+        try:
+            response = await asyncio.wait_for(self._call_limited(request), max(timeout, 0.0))
+        except asyncio.TimeoutError:
+            return finish('timeout', 504, error=f"No answer within {timeout:g}s.")
+        except WebhookError as e:
+            return finish('timeout' if e.status_code == 504 else 'error', e.status_code, error=str(e))
+        return finish('ok' if response.status_code < 400 else 'error', response.status_code,
+                      content_type=response.content_type, source=response.source,
+                      data=_decode_body(response.content_type, response.body))
+
+    async def stream(self, calls: Iterable[DataSourceCall], deadline: float = HYDRATE_DEADLINE_SECONDS) -> AsyncIterator[Dict[str, Any]]:
+        """Yields one result dict per call, in completion order; no call runs longer than deadline seconds.
+
+        Each result has pane_id, view_id, status ('ok', 'error', 'timeout' or 'invalid'),
+        status_code and elapsed_ms, plus content_type, source and data on a response or error
+        otherwise. Calls still running when the consumer stops iterating are cancelled.
+        """
+        started = time.monotonic()
+        tasks = [asyncio.ensure_future(self._run(call, started + deadline)) for call in calls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+            _HYDRATE_SECONDS.observe(time.monotonic() - started)
+        finally:
+            for task in tasks:
+                task.cancel()
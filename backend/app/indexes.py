@@ -0,0 +1,344 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class ViewLocation(NamedTuple):
+    layout_id: str
+    pane_id: str
+
+
+class EmbeddedViewIndex:
+    """Reverse index from embedded view id to the (layout id, pane id) that holds it.
+
+    The index is built once from every layout and then kept up to date by the
+    layout endpoints, so resolving an embedded view no longer scans all layouts.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._locations: Dict[str, List[ViewLocation]] = {}
+        self._views_by_layout: Dict[str, List[str]] = {}
+        self.built = False
+        # Storage version of the layouts type the index was last synced with (see main.py)
+        self.source_version: Optional[int] = None
+
+    def build(self, layouts: Iterable, source_version: Optional[int] = None) -> Dict[str, List[ViewLocation]]:
+        """Rebuilds the index from scratch and returns the view ids embedded more than once."""
+        with self._lock:
+            self._locations = {}
+            self._views_by_layout = {}
+            for layout in layouts:
+                self._add(layout)
+            self.built = True
+            self.source_version = source_version
+            duplicates = self._duplicates()
+        for view_id, locations in duplicates.items():
+            where = ", ".join(f"{loc.layout_id}/{loc.pane_id}" for loc in locations)
+            logger.warning("View ID '%s' is embedded in more than one pane: %s", view_id, where, extra={"view_id": view_id})
+        return duplicates
+
+    def add_layout(self, layout) -> None:
+        with self._lock:
+            self._remove(layout.id)
+            self._add(layout)
+
+    def remove_layout(self, layout_id: str) -> None:
+        with self._lock:
+            self._remove(layout_id)
+
+    def clear(self, source_version: Optional[int] = None) -> None:
+        with self._lock:
+            self._locations = {}
+            self._views_by_layout = {}
+            self.built = True
+            self.source_version = source_version
+
+    def lookup(self, view_id: str) -> Optional[ViewLocation]:
+        """Returns the first known location of an embedded view, or None."""
+        with self._lock:
+            locations = self._locations.get(view_id)
+            return locations[0] if locations else None
+
+    def locations(self, view_id: str) -> List[ViewLocation]:
+        """Returns every known location of an embedded view (the layouts that reference it)."""
+        with self._lock:
+            return list(self._locations.get(view_id, ()))
+
+    @property
+    def duplicates(self) -> Dict[str, List[ViewLocation]]:
+        with self._lock:
+            return self._duplicates()
+
+    def _add(self, layout) -> None:
+        view_ids = []
+        for pane in layout.iter_panes():
+            if pane.view is not None:
+                self._locations.setdefault(pane.view.id, []).append(ViewLocation(layout.id, pane.id))
+                view_ids.append(pane.view.id)
+        self._views_by_layout[layout.id] = view_ids
+
+    def _remove(self, layout_id: str) -> None:
+        for view_id in self._views_by_layout.pop(layout_id, []):
+            remaining = [loc for loc in self._locations.get(view_id, []) if loc.layout_id != layout_id]
+            if remaining:
+                self._locations[view_id] = remaining
+            else:
+                self._locations.pop(view_id, None)
+
+    def _duplicates(self) -> Dict[str, List[ViewLocation]]:
+        return {view_id: list(locs) for view_id, locs in self._locations.items() if len(locs) > 1}
+
+
+class LayoutReferenceIndex:
+    """Reverse index from layout id to the ids of the modules whose layout_id points at it.
+
+    Like EmbeddedViewIndex it is built once from every module and then kept up to date by the
+    module endpoints, so finding a layout's dependents costs O(referrers) instead of a scan of
+    every module.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._modules_by_layout: Dict[str, Set[str]] = {}
+        self._layout_by_module: Dict[str, str] = {}
+        self.built = False
+        # Storage version of the modules type the index was last synced with (see main.py)
+        self.source_version: Optional[int] = None
+
+    def build(self, modules: Iterable, source_version: Optional[int] = None) -> None:
+        with self._lock:
+            self._modules_by_layout = {}
+            self._layout_by_module = {}
+            for module in modules:
+                self._add(module)
+            self.built = True
+            self.source_version = source_version
+
+    def add_module(self, module) -> None:
+        with self._lock:
+            self._remove(module.id)
+            self._add(module)
+
+    def remove_module(self, module_id: str) -> None:
+        with self._lock:
+            self._remove(module_id)
+
+    def clear(self, source_version: Optional[int] = None) -> None:
+        with self._lock:
+            self._modules_by_layout = {}
+            self._layout_by_module = {}
+            self.built = True
+            self.source_version = source_version
+
+    def modules_using(self, layout_id: str) -> List[str]:
+        """Returns the sorted ids of the modules that reference a layout."""
+        with self._lock:
+            return sorted(self._modules_by_layout.get(layout_id, ()))
+
+    def referenced_layouts(self) -> Dict[str, List[str]]:
+        """Returns every referenced layout id with the sorted ids of the modules that use it."""
+        with self._lock:
+            return {layout_id: sorted(module_ids) for layout_id, module_ids in self._modules_by_layout.items()}
+
+    def _add(self, module) -> None:
+        self._layout_by_module[module.id] = module.layout_id
+        self._modules_by_layout.setdefault(module.layout_id, set()).add(module.id)
+
+    def _remove(self, module_id: str) -> None:
+        layout_id = self._layout_by_module.pop(module_id, None)
+        if layout_id is None:
+            return
+        module_ids = self._modules_by_layout[layout_id]
+        module_ids.discard(module_id)
+        if not module_ids:
+            del self._modules_by_layout[layout_id]
+
+
+# --- Search ---
+_TOKEN_RE = re.compile(r"[^\W_]+") # Words and numbers; '_' and '-' separate tokens, so ids are searchable by part
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.casefold()) if text else []
+
+
+class SearchDocument(NamedTuple):
+    """What the search index keeps of one config."""
+    text: str # Full-text content, e.g. a module's name and description
+    prefix: str # Matched by prefix searches, e.g. the module name
+    facets: Dict[str, Tuple[str, ...]] # Exact-match filters, e.g. {"layout_id": ("home",)}
+    sort_keys: Dict[str, Any] # Sortable / range-filterable values besides the id, e.g. {"pane_count": 3}
+
+
+def describe_module(module) -> SearchDocument:
+    return SearchDocument(f"{module.name} {module.description or ''}", module.name.casefold(),
+                          {"layout_id": (module.layout_id,)}, {"name": module.name.casefold()})
+
+
+def describe_layout(layout) -> SearchDocument:
+    panes = list(layout.iter_panes())
+    view_types = sorted({pane.view.type for pane in panes if pane.view is not None})
+    return SearchDocument(" ".join([layout.id] + [pane.view.id for pane in panes if pane.view is not None]), layout.id.casefold(),
+                          {"view_type": tuple(view_types), "direction": (layout.direction,)},
+                          {"pane_count": sum(1 for pane in panes if pane.layout is None)}) # Leaf panes, as shown on screen
+
+
+def describe_view(view) -> SearchDocument:
+    return SearchDocument(f"{view.id} {view.type}", view.id.casefold(), {"type": (view.type,)}, {"type": view.type})
+
+
+class SearchIndex:
+    """Inverted index over the configs of one type, for filtering and typeahead without loading them.
+
+    Each config is reduced to a SearchDocument by `describe`. Text tokens and facet values map to
+    the ids that contain them; a sorted token list and a sorted (prefix, id) list serve prefix
+    lookups. Updates are incremental: add()/remove() only touch the postings of one config, and
+    sync() re-indexes only the configs whose digest changed since they were indexed.
+    """
+
+    def __init__(self, describe: Callable[[Any], SearchDocument]) -> None:
+        self._describe = describe
+        self._lock = threading.Lock()
+        self._reset()
+        self.built = False
+        # Storage version of the data type the index was last synced with (see main.py)
+        self.source_version: Optional[int] = None
+
+    def _reset(self) -> None:
+        self._docs: Dict[str, Tuple[str, SearchDocument, frozenset]] = {} # id -> (digest, document, tokens)
+        self._postings: Dict[str, Set[str]] = {}
+        self._tokens: List[str] = []
+        self._prefixes: List[Tuple[str, str]] = []
+        self._facets: Dict[Tuple[str, str], Set[str]] = {}
+
+    def sync(self, entries: Iterable, source_version: Optional[int] = None) -> None:
+        """Brings the index in line with every stored entry (ConfigEntry) of the type."""
+        with self._lock:
+            seen = set()
+            for entry in entries:
+                seen.add(entry.model.id)
+                indexed = self._docs.get(entry.model.id)
+                if indexed is None or indexed[0] != entry.digest:
+                    self._remove(entry.model.id)
+                    self._add(entry.model, entry.digest)
+            for stale_id in [config_id for config_id in self._docs if config_id not in seen]:
+                self._remove(stale_id)
+            self.built = True
+            self.source_version = source_version
+
+    def add(self, model, digest: str) -> None:
+        with self._lock:
+            self._remove(model.id)
+            self._add(model, digest)
+
+    def remove(self, config_id: str) -> None:
+        with self._lock:
+            self._remove(config_id)
+
+    def clear(self, source_version: Optional[int] = None) -> None:
+        with self._lock:
+            self._reset()
+            self.built = True
+            self.source_version = source_version
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._docs)
+
+    def search(self, text: Optional[str] = None, prefix: Optional[str] = None, facets: Optional[Dict[str, str]] = None,
+               ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+               sort: str = 'id', descending: bool = False, limit: Optional[int] = None) -> Tuple[int, List[str]]:
+        """Returns (number of matches, ids of the first `limit` matches in sort order).
+
+        Every term of `text` must match the start of a token of the document ("dai dia" finds
+        "Daily Diary"), `prefix` must match the start of the document's prefix field, each facet
+        must have the given value and each range is an inclusive (min, max) on a sort key.
+        Matches are ordered by the `sort` key (or the id), ties broken by id.
+        """
+        with self._lock:
+            candidate_sets: List[Set[str]] = []
+            for term in tokenize(text):
+                candidate_sets.append(self._token_prefix_ids(term))
+            if prefix:
+                candidate_sets.append(self._prefix_ids(prefix.casefold()))
+            for name, value in (facets or {}).items():
+                candidate_sets.append(self._facets.get((name, value), set()))
+            if candidate_sets:
+                candidate_sets.sort(key=len)
+                matches = set(candidate_sets[0]).intersection(*candidate_sets[1:])
+            else:
+                matches = set(self._docs)
+            for name, (low, high) in (ranges or {}).items():
+                matches = {config_id for config_id in matches
+                           if (low is None or self._docs[config_id][1].sort_keys[name] >= low)
+                           and (high is None or self._docs[config_id][1].sort_keys[name] <= high)}
+
+            if sort == 'id':
+                key = lambda config_id: config_id
+            else:
+                key = lambda config_id: (self._docs[config_id][1].sort_keys[sort], config_id)
+            if limit is None or limit >= len(matches):
+                ordered = sorted(matches, key=key, reverse=descending)
+            elif descending:
+                ordered = heapq.nlargest(limit, matches, key=key)
+            else:
+                ordered = heapq.nsmallest(limit, matches, key=key)
+            return len(matches), ordered
+
+    def _token_prefix_ids(self, term: str) -> Set[str]:
+        ids: Set[str] = set()
+        position = bisect.bisect_left(self._tokens, term)
+        while position < len(self._tokens) and self._tokens[position].startswith(term):
+            ids |= self._postings[self._tokens[position]]
+            position += 1
+        return ids
+
+    def _prefix_ids(self, prefix: str) -> Set[str]:
+        ids: Set[str] = set()
+        position = bisect.bisect_left(self._prefixes, (prefix, ""))
+        while position < len(self._prefixes) and self._prefixes[position][0].startswith(prefix):
+            ids.add(self._prefixes[position][1])
+            position += 1
+        return ids
+
+    def _add(self, model, digest: str) -> None:
+        document = self._describe(model)
+        tokens = frozenset(tokenize(document.text))
+        self._docs[model.id] = (digest, document, tokens)
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                bisect.insort(self._tokens, token)
+            postings.add(model.id)
+        bisect.insort(self._prefixes, (document.prefix, model.id))
+        for name, values in document.facets.items():
+            for value in values:
+                self._facets.setdefault((name, value), set()).add(model.id)
+
+    def _remove(self, config_id: str) -> None:
+        indexed = self._docs.pop(config_id, None)
+        if indexed is None:
+            return
+        _, document, tokens = indexed
+        for token in tokens:
+            postings = self._postings[token]
+            postings.discard(config_id)
+            if not postings:
+                del self._postings[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+        del self._prefixes[bisect.bisect_left(self._prefixes, (document.prefix, config_id))]
+        for name, values in document.facets.items():
+            for value in values:
+                ids = self._facets[(name, value)]
+                ids.discard(config_id)
+                if not ids:
+                    del self._facets[(name, value)]
+
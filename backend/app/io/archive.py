@@ -0,0 +1,274 @@
+"""Streaming workspace archives (tar, gzipped tar or zip) for backups and for moving or seeding an instance.
+
+An archive holds layouts/<id>.yaml, views/<id>.yaml and modules/<id>.yaml, the directory layout
+app.io.transfer exports, so an extracted archive can be imported with it too (and a tarball
+of such a directory with import_archive). Neither direction holds the workspace in memory:
+exporting writes each config to the archive as it is read from the store, and importing reads
+the archive from a file twice, once to validate every config and once to commit them in one
+stream (see commit_yaml_stream).
+"""
+import io
+import os
+import tarfile
+import time
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import IO, Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+from pydantic import BaseModel
+
+from app.io.yaml_loader import (
+    YamlDumper,
+    YamlLoader,
+    commit_yaml_stream,
+    iter_all_yaml_entries,
+    list_yaml_ids,
+    run_io,
+    safe_filename_for,
+)
+from app.models import CONFIG_TYPES
+
+# Media type and file suffix per export format
+ARCHIVE_FORMATS: Dict[str, Tuple[str, str]] = {
+    "tar": ("application/x-tar", ".tar"),
+    "tgz": ("application/gzip", ".tar.gz"),
+    "zip": ("application/zip", ".zip"),
+}
+IMPORT_MODES = ("merge", "replace")
+EXPORT_CHUNK_BYTES = 64 * 1024 # Archive output is handed out in chunks of about this size
+MAX_MEMBER_BYTES = 16 * 1024 * 1024 # Larger archive members are rejected rather than read into memory
+MAX_REPORTED_ERRORS = 50
+
+# POST /api/import: largest accepted upload, and how much of it is buffered in memory before spilling to a temp file
+IMPORT_MAX_BYTES = int(os.environ.get("INKSTONE_IMPORT_MAX_BYTES", str(1024 ** 3)))
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+IMPORT_WRITE_BYTES = 1024 * 1024 # Upload chunks are gathered into writes of about this size
+
+_MODEL_CLASS_BY_DIR = {data_type_name: model_class for data_type_name, model_class in CONFIG_TYPES.values()}
+
+
+class _ChunkSink:
+    """Write-only file object collecting what tarfile/zipfile write, drained by the export generator."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def _dump_config(model: BaseModel) -> bytes:
+    return yaml.dump(model.model_dump(), Dumper=YamlDumper, sort_keys=False, indent=2).encode('utf-8')
+
+
+def iter_export(fmt: str = "tar") -> Iterator[bytes]:
+    """Yields an archive of every config of the active store, in chunks of about EXPORT_CHUNK_BYTES.
+
+    Configs are read one at a time as the archive is written, so the result is not a
+    point-in-time snapshot of a store that is written to meanwhile.
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format '{fmt}' (expected one of: {', '.join(ARCHIVE_FORMATS)})")
+    sink = _ChunkSink()
+    now = time.time()
+    if fmt == "zip":
+        # An unseekable target makes zipfile write sizes in data descriptors after each member
+        archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+
+        def add(name: str, raw: bytes) -> None:
+            info = zipfile.ZipInfo(name, date_time=time.localtime(now)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            archive.writestr(info, raw)
+    else:
+        archive = tarfile.open(fileobj=sink, mode="w|gz" if fmt == "tgz" else "w|", format=tarfile.PAX_FORMAT)
+
+        def add(name: str, raw: bytes) -> None:
+            info = tarfile.TarInfo(name)
+            info.size = len(raw)
+            info.mtime = int(now)
+            info.mode = 0o644
+            archive.addfile(info, io.BytesIO(raw))
+
+    with archive: # Closing writes the end-of-archive records (or the zip central directory)
+        for data_type_name, model_class in CONFIG_TYPES.values():
+            for entry in iter_all_yaml_entries(data_type_name, model_class):
+                add(f"{data_type_name}/{safe_filename_for(entry.model.id)}", _dump_config(entry.model))
+                if sink.size >= EXPORT_CHUNK_BYTES:
+                    yield sink.drain()
+    yield sink.drain()
+
+
+def _next_chunk(chunks: Iterator[bytes]) -> Optional[bytes]:
+    return next(chunks, None)
+
+
+async def aiter_export(fmt: str = "tar") -> AsyncIterator[bytes]:
+    """Async variant of iter_export; each chunk is read and compressed on the storage thread pool."""
+    chunks = iter_export(fmt)
+    try:
+        while (chunk := await run_io(_next_chunk, chunks)) is not None:
+            yield chunk
+    finally:
+        await run_io(chunks.close)
+
+
+@dataclass
+class ImportReport:
+    """Outcome of import_archive(): configs read per data type, what was deleted, and why nothing was applied."""
+    mode: str
+    applied: bool = False
+    imported: Dict[str, int] = field(default_factory=lambda: {name: 0 for name in _MODEL_CLASS_BY_DIR})
+    deleted: Dict[str, int] = field(default_factory=lambda: {name: 0 for name in _MODEL_CLASS_BY_DIR})
+    skipped: List[str] = field(default_factory=list) # Archive members that are not configs (the first MAX_REPORTED_ERRORS)
+    errors: List[Dict[str, str]] = field(default_factory=list) # {"member", "error"}, at most MAX_REPORTED_ERRORS
+    error_count: int = 0
+
+    def add_error(self, member: str, error: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"member": member, "error": error})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "applied": self.applied, "imported": dict(self.imported), "deleted": dict(self.deleted),
+                "skipped": list(self.skipped), "errors": list(self.errors), "error_count": self.error_count}
+
+
+def _iter_members(fileobj: IO[bytes]) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """Yields (name, content) for every regular file of a tar (optionally compressed) or zip archive.
+
+    content is None for members larger than MAX_MEMBER_BYTES. Raises ValueError if fileobj is
+    not a readable archive.
+    """
+    fileobj.seek(0)
+    try:
+        if zipfile.is_zipfile(fileobj):
+            fileobj.seek(0)
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        yield info.filename, archive.read(info) if info.file_size <= MAX_MEMBER_BYTES else None
+            return
+        fileobj.seek(0)
+        with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+            while True:
+                member = archive.next()
+                if member is None:
+                    return
+                archive.members = [] # TarFile remembers every member it has read; a workspace can have 100k
+                if member.isfile():
+                    yield member.name, archive.extractfile(member).read() if member.size <= MAX_MEMBER_BYTES else None
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError, zlib.error) as e:
+        raise ValueError(f"Not a readable tar or zip archive: {e}") from e
+
+
+def _config_type_of(name: str) -> Optional[str]:
+    """Returns the data type of an archive member named <...>/<data type>/<file>.yaml, or None."""
+    parts = PurePosixPath(name).parts
+    if len(parts) < 2 or parts[-2] not in _MODEL_CLASS_BY_DIR or parts[-1].startswith('.'):
+        return None
+    return parts[-2] if parts[-1].lower().endswith(('.yaml', '.yml')) else None
+
+
+def _iter_configs(fileobj: IO[bytes], report: ImportReport,
+                  on_error: Callable[[str, str], None]) -> Iterator[Tuple[str, str, BaseModel]]:
+    """Parses and validates the configs of an archive one member at a time: yields (data_type, member name, model)."""
+    for name, raw in _iter_members(fileobj):
+        data_type_name = _config_type_of(name)
+        if data_type_name is None:
+            if len(report.skipped) < MAX_REPORTED_ERRORS:
+                report.skipped.append(name)
+            continue
+        if raw is None:
+            on_error(name, f"Larger than {MAX_MEMBER_BYTES} bytes.")
+            continue
+        try:
+            content = yaml.load(raw, Loader=YamlLoader)
+            model = _MODEL_CLASS_BY_DIR[data_type_name](**(content or {}))
+        except (yaml.YAMLError, TypeError, ValueError) as e: # ValueError covers pydantic validation
+            on_error(name, f"{type(e).__name__}: {e}")
+            continue
+        yield data_type_name, name, model
+
+
+def import_archive(fileobj: IO[bytes], mode: str = "merge",
+                   on_write: Optional[Callable[[str, str, BaseModel], None]] = None) -> ImportReport:
+    """Validates every config of an archive and, if all are valid, writes them all-or-nothing.
+
+    fileobj must be seekable: it is read once to validate and once to commit, so only the ids
+    of the archive are kept in memory. In "merge" mode configs of the store that are not in the
+    archive are kept; in "replace" mode they are deleted. Modules must reference a layout that
+    exists after the import. If anything is invalid, the report lists it and nothing is written.
+    Raises ValueError if fileobj is not a tar or zip archive and BatchCommitError if the
+    validated configs could not be written (the store is then left unchanged). on_write, if
+    given, is called with (data_type, id, model) for each config as it is staged for the commit.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode '{mode}' (expected 'merge' or 'replace')")
+    report = ImportReport(mode)
+    # Configs are compared by file name: that is what the YAML store lists (list_yaml_ids returns
+    # file stems, e.g. 'my_layout' for the id 'my layout'), and two ids sharing one clash anyway.
+    seen = set() # (data_type, safe_filename_for(id))
+    layout_refs: Dict[str, List[str]] = {} # layout id -> modules referencing it
+    for data_type_name, name, model in _iter_configs(fileobj, report, report.add_error):
+        key = (data_type_name, safe_filename_for(model.id))
+        if key in seen:
+            report.add_error(name, f"Duplicate {data_type_name} id '{model.id}'.")
+            continue
+        seen.add(key)
+        report.imported[data_type_name] += 1
+        if data_type_name == 'modules':
+            layout_refs.setdefault(model.layout_id, []).append(model.id)
+
+    available_layouts = {file_name for data_type_name, file_name in seen if data_type_name == 'layouts'}
+    if mode == "merge":
+        available_layouts.update(safe_filename_for(data_id) for data_id in list_yaml_ids('layouts'))
+    for layout_id, module_ids in sorted(layout_refs.items()):
+        if safe_filename_for(layout_id) not in available_layouts:
+            report.add_error(f"modules/{safe_filename_for(module_ids[0])}",
+                             f"Layout with ID '{layout_id}' referenced by modules {', '.join(module_ids)} not found.")
+    if report.error_count:
+        return report
+
+    deletes = []
+    if mode == "replace":
+        for data_type_name in _MODEL_CLASS_BY_DIR:
+            stale = [(data_type_name, data_id) for data_id in list_yaml_ids(data_type_name)
+                     if (data_type_name, safe_filename_for(data_id)) not in seen]
+            report.deleted[data_type_name] = len(stale)
+            deletes += stale
+
+    def fail(name: str, error: str) -> None:
+        raise ValueError(f"Archive member {name} changed while importing: {error}")
+
+    def writes() -> Iterator[Tuple[str, str, BaseModel]]:
+        for data_type_name, _, model in _iter_configs(fileobj, ImportReport(mode), fail):
+            if on_write is not None:
+                on_write(data_type_name, model.id, model)
+            yield data_type_name, model.id, model
+
+    commit_yaml_stream(writes(), deletes)
+    report.applied = True
+    return report
+
+
+async def aimport_archive(fileobj: IO[bytes], mode: str = "merge",
+                          on_write: Optional[Callable[[str, str, BaseModel], None]] = None) -> ImportReport:
+    """Async variant of import_archive."""
+    return await run_io(import_archive, fileobj, mode, on_write)
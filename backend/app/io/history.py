@@ -0,0 +1,693 @@
+"""Content-addressed version history of configs, with workspace snapshots, structural diffs and rollback.
+
+Recorded configs are stored as trees of immutable objects named by the SHA-256 of their
+canonical JSON (objects/<ab>/<rest>, zlib-compressed). A layout object lists its panes by
+object digest and a pane refers to its view by digest, so identical panes and views (in one
+layout, across layouts and versions, or a standalone view also embedded in a pane) are stored
+once, and a new version only adds the objects that changed.
+
+versions/<data type>/<id>.jsonl lists the versions of one config, oldest first; a version
+without a tree is a delete. Every recorded change is also appended to pending.jsonl until the
+next snapshot folds it in.
+
+A snapshot is a tree too: per data type, ids are spread over bucket objects by hash prefix,
+so taking one only rewrites the buckets holding ids changed since the previous snapshot, and
+comparing two only opens buckets whose digests differ. The first snapshot records the whole
+store.
+
+Only changes made through the storage API are recorded (History.record is a change listener);
+a config edited on disk is recorded the next time it is saved.
+
+Versions are never dropped, so the history grows with every change. Objects nothing refers to
+(e.g. staged by an import that then failed) are only removed by pruning:
+
+Usage (from backend/):
+    python -m app.io.history prune [--grace SECONDS]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from app.io import yaml_loader
+from app.io.yaml_loader import (
+    commit_yaml_batch,
+    delete_yaml,
+    iter_all_yaml_entries,
+    load_yaml_entry,
+    run_io,
+    safe_filename_for,
+    save_yaml,
+)
+from app.models import CONFIG_TYPES, LOAD_CONTEXT
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# History is recorded by the API server for every write made through it (INKSTONE_HISTORY=0 turns it off)
+HISTORY_ENABLED = os.environ.get("INKSTONE_HISTORY", "1") == "1"
+# Where history is kept; by default .history in the data directory the store currently uses
+HISTORY_DIR = os.environ.get("INKSTONE_HISTORY_DIR")
+
+OBJECTS_DIR_NAME = "objects"
+VERSIONS_DIR_NAME = "versions"
+PENDING_FILE_NAME = "pending.jsonl"
+SNAPSHOTS_FILE_NAME = "snapshots.jsonl"
+SNAPSHOT_BUCKET_WIDTH = 2 # Hex digits of the id hash naming a bucket: 256 buckets per data type
+_TAIL_BYTES = 4096 # Read from the end of a version log to find the latest version
+_KNOWN_OBJECTS_MAX = 65536 # Digests remembered as already stored, to skip the existence check
+# Pruning keeps unreferenced objects younger than this: a write stores its objects before the
+# version referring to them is appended, possibly in another process
+PRUNE_GRACE_SECONDS = 3600.0
+
+_MODEL_CLASS_BY_DIR = {data_type_name: model_class for data_type_name, model_class in CONFIG_TYPES.values()}
+
+
+class VersionInfo(NamedTuple):
+    version: int # 1 for the oldest recorded version
+    tree: Optional[str] # Object digest of the config; None if this version is a delete
+    at: float # Unix time it was recorded
+
+    def to_dict(self) -> dict:
+        return {"version": self.version, "tree": self.tree, "at": self.at, "deleted": self.tree is None}
+
+
+class SnapshotInfo(NamedTuple):
+    id: int
+    tree: str # Object digest of {data type: {bucket: {id: config tree}}}
+    label: Optional[str]
+    at: float
+    changed: int # Configs added, changed or deleted since the previous snapshot
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+class SnapshotRollback(NamedTuple):
+    snapshot: int # The snapshot rolled back to
+    backup: SnapshotInfo # Taken right before, so the rollback can itself be rolled back
+    written: List[Tuple[str, str]]
+    deleted: List[Tuple[str, str]]
+
+    def to_dict(self) -> dict:
+        return {"snapshot": self.snapshot, "backup": self.backup.to_dict(),
+                "written": [list(key) for key in self.written], "deleted": [list(key) for key in self.deleted]}
+
+
+def _canonical(node: Any) -> bytes:
+    return json.dumps(node, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _bucket_of(data_id: str) -> str:
+    return hashlib.sha256(data_id.encode('utf-8')).hexdigest()[:SNAPSHOT_BUCKET_WIDTH]
+
+
+def _pointer(path: str, key: Any) -> str:
+    return f"{path}/{str(key).replace('~', '~0').replace('/', '~1')}"
+
+
+def _write_new_file(path: Path, raw: bytes) -> None:
+    """Writes raw to path atomically, through a temp file in the same directory."""
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        f = open(temp_path, 'xb')
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(temp_path, 'xb')
+    try:
+        with f:
+            f.write(raw)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _append_line(path: Path, record: dict) -> None:
+    line = json.dumps(record, separators=(',', ':')).encode('utf-8') + b"\n"
+    try:
+        f = open(path, 'ab')
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(path, 'ab')
+    with f: # One write of a short line with O_APPEND, so lines of concurrent writers do not interleave
+        f.write(line)
+
+
+def _read_records(raw: bytes) -> Iterator[dict]:
+    for line in raw.splitlines():
+        try:
+            yield json.loads(line)
+        except ValueError: # Torn by a crash mid-write
+            continue
+
+
+def default_history_root() -> Path:
+    """Returns INKSTONE_HISTORY_DIR, or .history in the store's data directory as it is right now."""
+    return Path(HISTORY_DIR) if HISTORY_DIR else yaml_loader.DATA_BASE_PATH / ".history"
+
+
+class History:
+    """Version history and snapshots of the configs of one store, kept under root.
+
+    Without a root the history follows the store: it is kept under default_history_root(),
+    worked out on every access, so repointing yaml_loader.DATA_BASE_PATH (tests, benchmarks)
+    also moves the history instead of recording into the previous data directory.
+    """
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self._root = root
+        self._current_root: Optional[Path] = None
+        self._lock = threading.RLock() # Version logs and the pending journal, within this process
+        self._known_objects: set = set()
+        self._read_raw = lru_cache(maxsize=4096)(self._read_raw_uncached)
+        self._staging = threading.local() # Trees handed over by a bulk commit running on this thread
+
+    @property
+    def root(self) -> Path:
+        root = self._root if self._root is not None else default_history_root()
+        if root != self._current_root:
+            with self._lock: # The object caches are only valid for the root they were filled from
+                self._known_objects.clear()
+                self._read_raw.cache_clear()
+                self._current_root = root
+        return root
+
+    # --- Objects ---
+    def _object_path(self, digest: str) -> Path:
+        return self.root / OBJECTS_DIR_NAME / digest[:2] / digest[2:]
+
+    def put_object(self, node: Any) -> str:
+        """Stores a JSON value unless an identical one is already stored; returns its digest."""
+        raw = _canonical(node)
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest not in self._known_objects:
+            path = self._object_path(digest)
+            if not path.exists():
+                _write_new_file(path, zlib.compress(raw))
+            if len(self._known_objects) >= _KNOWN_OBJECTS_MAX:
+                self._known_objects.clear()
+            self._known_objects.add(digest)
+        return digest
+
+    def get_object(self, digest: str) -> Any:
+        """Returns a fresh copy of a stored JSON value; raises LookupError if there is none."""
+        return json.loads(self._read_raw(digest))
+
+    def _read_raw_uncached(self, digest: str) -> bytes:
+        try:
+            return zlib.decompress(self._object_path(digest).read_bytes())
+        except FileNotFoundError:
+            raise LookupError(f"History object {digest} not found.") from None
+
+    # --- Config trees ---
+    def put_config(self, model: BaseModel) -> str:
+        """Stores a config as a tree of objects (layout -> panes -> views); returns the digest of its root."""
+        data = model.model_dump(mode='json')
+        if isinstance(data.get('panes'), list):
+            data['panes'] = [self._put_pane(pane) for pane in data['panes']]
+        return self.put_object(data)
+
+    def _put_pane(self, pane: dict) -> str:
+        if pane.get('view') is not None:
+            pane['view'] = self.put_object(pane['view'])
+        if pane.get('layout') is not None:
+            pane['layout']['panes'] = [self._put_pane(child) for child in pane['layout']['panes']]
+        return self.put_object(pane)
+
+    def load_tree(self, tree: str) -> dict:
+        """Returns the JSON content of a config stored with put_config."""
+        data = self.get_object(tree)
+        if isinstance(data.get('panes'), list):
+            data['panes'] = [self._load_pane(pane) for pane in data['panes']]
+        return data
+
+    def _load_pane(self, digest: str) -> dict:
+        pane = self.get_object(digest)
+        if pane.get('view') is not None:
+            pane['view'] = self.get_object(pane['view'])
+        if pane.get('layout') is not None:
+            pane['layout']['panes'] = [self._load_pane(child) for child in pane['layout']['panes']]
+        return pane
+
+    def load_config(self, data_type_name: str, tree: str) -> BaseModel:
+        return _MODEL_CLASS_BY_DIR[data_type_name].model_validate(self.load_tree(tree), context=LOAD_CONTEXT)
+
+    # --- Versions ---
+    def _versions_path(self, data_type_name: str, data_id: str) -> Path:
+        return self.root / VERSIONS_DIR_NAME / data_type_name / (Path(safe_filename_for(data_id)).stem + ".jsonl")
+
+    def versions(self, data_type_name: str, data_id: str) -> List[VersionInfo]:
+        """Returns the recorded versions of a config, oldest first (empty if it has none)."""
+        try:
+            raw = self._versions_path(data_type_name, data_id).read_bytes()
+        except FileNotFoundError:
+            return []
+        records = [record for record in _read_records(raw) if record.get('id') == data_id] # Other ids may share the file name
+        return [VersionInfo(number, record['tree'], record['at']) for number, record in enumerate(records, start=1)]
+
+    def version(self, data_type_name: str, data_id: str, version: int) -> VersionInfo:
+        versions = self.versions(data_type_name, data_id)
+        if not 1 <= version <= len(versions):
+            raise LookupError(f"{data_type_name} '{data_id}' has no version {version} ({len(versions)} recorded).")
+        return versions[version - 1]
+
+    def _latest_record(self, data_type_name: str, data_id: str) -> Optional[dict]:
+        path = self._versions_path(data_type_name, data_id)
+        try:
+            with open(path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - _TAIL_BYTES))
+                tail = f.read()
+                if size > _TAIL_BYTES:
+                    tail = tail.split(b"\n", 1)[-1] # Drop the partial first line
+                for record in reversed(list(_read_records(tail))):
+                    if record.get('id') == data_id:
+                        return record
+                if size <= _TAIL_BYTES:
+                    return None
+                f.seek(0)
+                matching = [record for record in _read_records(f.read()) if record.get('id') == data_id]
+                return matching[-1] if matching else None
+        except FileNotFoundError:
+            return None
+
+    def _append_version(self, data_type_name: str, data_id: str, tree: Optional[str], digest: Optional[str],
+                        journal: bool = True) -> bool:
+        """Records a new version unless the config is unchanged since the latest one; returns whether it did."""
+        with self._lock:
+            latest = self._latest_record(data_type_name, data_id)
+            if (latest.get('tree') if latest is not None else None) == tree:
+                return False
+            record = {"id": data_id, "tree": tree, "digest": digest, "at": round(time.time(), 3)}
+            _append_line(self._versions_path(data_type_name, data_id), record)
+            if journal:
+                with self._pending() as pending:
+                    pending.write(json.dumps({"type": data_type_name, "id": data_id, "tree": tree}, separators=(',', ':')).encode('utf-8') + b"\n")
+            return True
+
+    def record(self, data_type_name: str, data_id: Optional[str], op: str, digest: Optional[str] = None) -> None:
+        """Records a change to the store; has the signature of a yaml_loader change listener."""
+        if data_type_name not in _MODEL_CLASS_BY_DIR:
+            return
+        if op == 'clear':
+            for live_id in self._live_ids(data_type_name):
+                self._append_version(data_type_name, live_id, None, None)
+        elif op == 'delete':
+            self._append_version(data_type_name, data_id, None, None)
+        else:
+            latest = self._latest_record(data_type_name, data_id)
+            if latest is not None and digest is not None and latest.get('digest') == digest:
+                return # Saved again unchanged
+            staged = getattr(self._staging, 'trees', None)
+            tree = staged.pop((data_type_name, data_id), None) if staged else None
+            if tree is not None:
+                self._append_version(data_type_name, data_id, tree, digest)
+                return
+            # A cache hit after a save, create or batch commit; stream commits hand their trees over instead (see staging)
+            entry = load_yaml_entry(data_type_name, data_id, _MODEL_CLASS_BY_DIR[data_type_name])
+            if entry is not None:
+                self._append_version(data_type_name, data_id, self.put_config(entry.model), entry.digest)
+
+    @contextmanager
+    def staging(self) -> Iterator[Callable[[str, str, BaseModel], None]]:
+        """Lets a bulk commit on this thread hand its configs over as they are staged.
+
+        Yields stage(data_type, id, model), which stores the config's tree right away. record()
+        then uses that tree for the upsert notified after the commit instead of reading the
+        config back: a stream commit (commit_yaml_stream) keeps nothing in the model cache, so
+        that would parse every imported config a second time.
+        """
+        trees: Dict[Tuple[str, str], str] = {}
+
+        def stage(data_type_name: str, data_id: str, model: BaseModel) -> None:
+            if data_type_name in _MODEL_CLASS_BY_DIR:
+                trees[(data_type_name, data_id)] = self.put_config(model)
+
+        self._staging.trees = trees
+        try:
+            yield stage
+        finally:
+            self._staging.trees = None
+
+    def _live_ids(self, data_type_name: str) -> List[str]:
+        """Returns the ids whose latest recorded version is not a delete."""
+        latest: Dict[str, Optional[str]] = {}
+        for path in sorted((self.root / VERSIONS_DIR_NAME / data_type_name).glob("*.jsonl")):
+            for record in _read_records(path.read_bytes()):
+                latest[record['id']] = record['tree']
+        return [data_id for data_id, tree in latest.items() if tree is not None]
+
+    def diff_versions(self, data_type_name: str, data_id: str, from_version: int, to_version: int) -> List[dict]:
+        return self.diff_trees(self.version(data_type_name, data_id, from_version).tree,
+                               self.version(data_type_name, data_id, to_version).tree)
+
+    def rollback(self, data_type_name: str, data_id: str, version: int) -> Optional[BaseModel]:
+        """Makes a recorded version current again (as a new version); returns the config, or None for a delete."""
+        tree = self.version(data_type_name, data_id, version).tree
+        if tree is None:
+            delete_yaml(data_type_name, data_id)
+            return None
+        model = self.load_config(data_type_name, tree)
+        save_yaml(data_type_name, data_id, model)
+        return model
+
+    # --- Structural diffs ---
+    def diff_trees(self, from_tree: Optional[str], to_tree: Optional[str]) -> List[dict]:
+        """Returns the RFC 6902 operations turning one config tree into another.
+
+        Panes and views whose digests are equal are skipped without being read.
+        """
+        if from_tree == to_tree:
+            return []
+        if from_tree is None or to_tree is None:
+            return [{"op": "replace", "path": "", "value": self.load_tree(to_tree) if to_tree is not None else None}]
+        operations: List[dict] = []
+        before, after = self.get_object(from_tree), self.get_object(to_tree)
+        self._diff_fields(before, after, "", operations, skip=('panes',))
+        if 'panes' in before or 'panes' in after:
+            self._diff_panes(before.get('panes') or [], after.get('panes') or [], "/panes", operations)
+        return operations
+
+    def _diff_panes(self, before: List[str], after: List[str], path: str, operations: List[dict]) -> None:
+        for index in range(min(len(before), len(after))):
+            if before[index] != after[index]:
+                self._diff_pane(self.get_object(before[index]), self.get_object(after[index]), _pointer(path, index), operations)
+        for index in range(len(before), len(after)):
+            operations.append({"op": "add", "path": _pointer(path, index), "value": self._load_pane(after[index])})
+        for index in reversed(range(len(after), len(before))):
+            operations.append({"op": "remove", "path": _pointer(path, index)})
+
+    def _diff_pane(self, before: dict, after: dict, path: str, operations: List[dict]) -> None:
+        self._diff_fields(before, after, path, operations, skip=('view', 'layout'))
+        view_before, view_after = before.get('view'), after.get('view')
+        if view_before != view_after:
+            if view_before is None or view_after is None:
+                operations.append({"op": "replace", "path": _pointer(path, 'view'),
+                                   "value": self.get_object(view_after) if view_after is not None else None})
+            else:
+                self._diff_value(self.get_object(view_before), self.get_object(view_after), _pointer(path, 'view'), operations)
+        layout_before, layout_after = before.get('layout'), after.get('layout')
+        if layout_before != layout_after:
+            if layout_before is None or layout_after is None:
+                value = None
+                if layout_after is not None:
+                    value = dict(layout_after, panes=[self._load_pane(child) for child in layout_after['panes']])
+                operations.append({"op": "replace", "path": _pointer(path, 'layout'), "value": value})
+            else:
+                layout_path = _pointer(path, 'layout')
+                self._diff_fields(layout_before, layout_after, layout_path, operations, skip=('panes',))
+                self._diff_panes(layout_before['panes'], layout_after['panes'], _pointer(layout_path, 'panes'), operations)
+
+    def _diff_fields(self, before: dict, after: dict, path: str, operations: List[dict], skip: Tuple[str, ...] = ()) -> None:
+        for key in sorted((before.keys() | after.keys()) - set(skip)):
+            if key not in after:
+                operations.append({"op": "remove", "path": _pointer(path, key)})
+            elif key not in before:
+                operations.append({"op": "add", "path": _pointer(path, key), "value": after[key]})
+            else:
+                self._diff_value(before[key], after[key], _pointer(path, key), operations)
+
+    def _diff_value(self, before: Any, after: Any, path: str, operations: List[dict]) -> None:
+        if before == after:
+            return
+        if isinstance(before, dict) and isinstance(after, dict):
+            self._diff_fields(before, after, path, operations)
+        elif isinstance(before, list) and isinstance(after, list):
+            for index in range(min(len(before), len(after))):
+                self._diff_value(before[index], after[index], _pointer(path, index), operations)
+            for index in range(len(before), len(after)):
+                operations.append({"op": "add", "path": _pointer(path, index), "value": after[index]})
+            for index in reversed(range(len(after), len(before))):
+                operations.append({"op": "remove", "path": _pointer(path, index)})
+        else:
+            operations.append({"op": "replace", "path": path, "value": after})
+
+    # --- Snapshots ---
+    @contextmanager
+    def _pending(self) -> Iterator[Any]:
+        """Holds the pending journal open and exclusively locked (across processes where fcntl exists)."""
+        with self._lock:
+            path = self.root / PENDING_FILE_NAME
+            try:
+                f = open(path, 'a+b')
+            except FileNotFoundError:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                f = open(path, 'a+b')
+            with f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield f
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def snapshots(self) -> List[SnapshotInfo]:
+        try:
+            raw = (self.root / SNAPSHOTS_FILE_NAME).read_bytes()
+        except FileNotFoundError:
+            return []
+        return [SnapshotInfo(**record) for record in _read_records(raw)]
+
+    def snapshot(self, snapshot_id: int) -> SnapshotInfo:
+        for info in self.snapshots():
+            if info.id == snapshot_id:
+                return info
+        raise LookupError(f"Snapshot {snapshot_id} not found.")
+
+    def take_snapshot(self, label: Optional[str] = None) -> SnapshotInfo:
+        """Records the current state of the store as a new snapshot.
+
+        Only the changes recorded since the previous snapshot are written; the first snapshot
+        reads the whole store (and records a version of every config not recorded yet).
+        """
+        with self._pending() as pending:
+            existing = self.snapshots()
+            previous = existing[-1] if existing else None
+            if previous is None:
+                changes = self._scan_store()
+            else:
+                pending.seek(0)
+                changes = {(record['type'], record['id']): record['tree'] for record in _read_records(pending.read())}
+            tree = self._apply_changes(previous.tree if previous is not None else None, changes)
+            info = SnapshotInfo(previous.id + 1 if previous is not None else 1, tree, label, round(time.time(), 3), len(changes))
+            _append_line(self.root / SNAPSHOTS_FILE_NAME, info._asdict())
+            pending.truncate(0)
+        logger.info("Took snapshot %d with %d change(s)", info.id, info.changed)
+        return info
+
+    def _scan_store(self) -> Dict[Tuple[str, str], Optional[str]]:
+        changes: Dict[Tuple[str, str], Optional[str]] = {}
+        for data_type_name, model_class in _MODEL_CLASS_BY_DIR.items():
+            for entry in iter_all_yaml_entries(data_type_name, model_class):
+                tree = self.put_config(entry.model)
+                self._append_version(data_type_name, entry.model.id, tree, entry.digest, journal=False)
+                changes[(data_type_name, entry.model.id)] = tree
+        return changes
+
+    def _apply_changes(self, root_tree: Optional[str], changes: Dict[Tuple[str, str], Optional[str]]) -> str:
+        """Returns the snapshot tree of root_tree with changes applied, rewriting only the affected buckets."""
+        grouped: Dict[str, Dict[str, Dict[str, Optional[str]]]] = {}
+        for (data_type_name, data_id), tree in changes.items():
+            grouped.setdefault(data_type_name, {}).setdefault(_bucket_of(data_id), {})[data_id] = tree
+        root = self.get_object(root_tree) if root_tree is not None else {}
+        for data_type_name, bucket_changes in grouped.items():
+            buckets = self.get_object(root[data_type_name]) if data_type_name in root else {}
+            for bucket, entry_changes in bucket_changes.items():
+                entries = self.get_object(buckets[bucket]) if bucket in buckets else {}
+                for data_id, tree in entry_changes.items():
+                    if tree is None:
+                        entries.pop(data_id, None)
+                    else:
+                        entries[data_id] = tree
+                if entries:
+                    buckets[bucket] = self.put_object(entries)
+                else:
+                    buckets.pop(bucket, None)
+            if buckets:
+                root[data_type_name] = self.put_object(buckets)
+            else:
+                root.pop(data_type_name, None)
+        return self.put_object(root)
+
+    def _changed_entries(self, from_tree: str, to_tree: str) -> Iterator[Tuple[str, str, Optional[str], Optional[str]]]:
+        """Yields (data type, id, tree before, tree after) for every config differing between two snapshot trees."""
+        if from_tree == to_tree:
+            return
+        root_before, root_after = self.get_object(from_tree), self.get_object(to_tree)
+        for data_type_name in sorted(root_before.keys() | root_after.keys()):
+            if root_before.get(data_type_name) == root_after.get(data_type_name):
+                continue
+            buckets_before = self.get_object(root_before[data_type_name]) if data_type_name in root_before else {}
+            buckets_after = self.get_object(root_after[data_type_name]) if data_type_name in root_after else {}
+            for bucket in sorted(buckets_before.keys() | buckets_after.keys()):
+                if buckets_before.get(bucket) == buckets_after.get(bucket):
+                    continue
+                before = self.get_object(buckets_before[bucket]) if bucket in buckets_before else {}
+                after = self.get_object(buckets_after[bucket]) if bucket in buckets_after else {}
+                for data_id in sorted(before.keys() | after.keys()):
+                    if before.get(data_id) != after.get(data_id):
+                        yield data_type_name, data_id, before.get(data_id), after.get(data_id)
+
+    def current_tree(self) -> str:
+        """Returns the snapshot tree of the store as recorded so far, without taking a snapshot."""
+        with self._pending() as pending:
+            existing = self.snapshots()
+            if not existing:
+                raise LookupError("No snapshot has been taken yet.")
+            pending.seek(0)
+            changes = {(record['type'], record['id']): record['tree'] for record in _read_records(pending.read())}
+            return self._apply_changes(existing[-1].tree, changes)
+
+    def diff_snapshots(self, from_id: int, to_id: Optional[int] = None) -> Dict[str, Dict[str, List[str]]]:
+        """Returns the ids added, removed and changed per data type between two snapshots (to_id None: now)."""
+        to_tree = self.snapshot(to_id).tree if to_id is not None else self.current_tree()
+        result = {data_type_name: {"added": [], "removed": [], "changed": []} for data_type_name in _MODEL_CLASS_BY_DIR}
+        for data_type_name, data_id, before, after in self._changed_entries(self.snapshot(from_id).tree, to_tree):
+            kind = "added" if before is None else "removed" if after is None else "changed"
+            result[data_type_name][kind].append(data_id)
+        return result
+
+    def rollback_snapshot(self, snapshot_id: int) -> SnapshotRollback:
+        """Restores the store to a snapshot in one all-or-nothing batch, after snapshotting the current state.
+
+        Only the configs that differ from the snapshot are written or deleted. Raises LookupError
+        for an unknown snapshot and BatchCommitError if the batch could not be applied.
+        """
+        target = self.snapshot(snapshot_id)
+        backup = self.take_snapshot(label=f"Before rolling back to snapshot {snapshot_id}")
+        writes, deletes = [], []
+        for data_type_name, data_id, _, tree in self._changed_entries(backup.tree, target.tree):
+            if tree is None:
+                deletes.append((data_type_name, data_id))
+            else:
+                writes.append((data_type_name, data_id, self.load_config(data_type_name, tree)))
+        commit_yaml_batch(writes, deletes)
+        return SnapshotRollback(snapshot_id, backup, [(t, i) for t, i, _ in writes], deletes)
+
+    # --- Pruning ---
+    def prune_objects(self, grace_seconds: float = PRUNE_GRACE_SECONDS) -> int:
+        """Deletes the objects no version, snapshot or pending change refers to; returns how many.
+
+        Objects younger than grace_seconds are kept, as they may belong to a write in progress.
+        """
+        with self._pending() as pending: # Holds off snapshots and (in this process) new versions
+            pending.seek(0)
+            trees = {record['tree'] for record in _read_records(pending.read()) if record.get('tree')}
+            for path in (self.root / VERSIONS_DIR_NAME).glob("*/*.jsonl"):
+                trees.update(record['tree'] for record in _read_records(path.read_bytes()) if record.get('tree'))
+            reachable: Set[str] = set()
+            for info in self.snapshots():
+                self._mark_snapshot(info.tree, reachable)
+            for tree in trees:
+                self._mark_config(tree, reachable)
+
+            cutoff = time.time() - grace_seconds
+            pruned = 0
+            for path in (self.root / OBJECTS_DIR_NAME).glob("*/*"):
+                if path.name.startswith(".") or path.parent.name + path.name in reachable:
+                    continue
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                        pruned += 1
+                except FileNotFoundError:
+                    continue
+            self._known_objects.clear()
+            self._read_raw.cache_clear()
+        logger.info("Pruned %d unreferenced history object(s)", pruned)
+        return pruned
+
+    def _mark(self, digest: str, reachable: Set[str]) -> Optional[Any]:
+        """Adds digest to reachable; returns the object if it was not marked before and still exists."""
+        if digest in reachable:
+            return None
+        reachable.add(digest)
+        try:
+            return self.get_object(digest)
+        except LookupError:
+            return None
+
+    def _mark_snapshot(self, tree: str, reachable: Set[str]) -> None:
+        root = self._mark(tree, reachable) or {}
+        for buckets_digest in root.values():
+            for entries_digest in (self._mark(buckets_digest, reachable) or {}).values():
+                for config_tree in (self._mark(entries_digest, reachable) or {}).values():
+                    self._mark_config(config_tree, reachable)
+
+    def _mark_config(self, tree: str, reachable: Set[str]) -> None:
+        data = self._mark(tree, reachable)
+        if data is not None and isinstance(data.get('panes'), list):
+            for pane in data['panes']:
+                self._mark_pane(pane, reachable)
+
+    def _mark_pane(self, digest: str, reachable: Set[str]) -> None:
+        pane = self._mark(digest, reachable)
+        if pane is None:
+            return
+        if pane.get('view') is not None:
+            reachable.add(pane['view'])
+        if pane.get('layout') is not None:
+            for child in pane['layout']['panes']:
+                self._mark_pane(child, reachable)
+
+    # --- Async variants ---
+    # History reads and writes files, so the API runs it on the bounded storage thread pool.
+    async def aversions(self, data_type_name: str, data_id: str) -> List[VersionInfo]:
+        return await run_io(self.versions, data_type_name, data_id)
+
+    async def aversion(self, data_type_name: str, data_id: str, version: int) -> VersionInfo:
+        return await run_io(self.version, data_type_name, data_id, version)
+
+    async def aload_tree(self, tree: str) -> dict:
+        return await run_io(self.load_tree, tree)
+
+    async def adiff_versions(self, data_type_name: str, data_id: str, from_version: int, to_version: int) -> List[dict]:
+        return await run_io(self.diff_versions, data_type_name, data_id, from_version, to_version)
+
+    async def arollback(self, data_type_name: str, data_id: str, version: int) -> Optional[BaseModel]:
+        return await run_io(self.rollback, data_type_name, data_id, version)
+
+    async def asnapshots(self) -> List[SnapshotInfo]:
+        return await run_io(self.snapshots)
+
+    async def atake_snapshot(self, label: Optional[str] = None) -> SnapshotInfo:
+        return await run_io(self.take_snapshot, label)
+
+    async def adiff_snapshots(self, from_id: int, to_id: Optional[int] = None) -> Dict[str, Dict[str, List[str]]]:
+        return await run_io(self.diff_snapshots, from_id, to_id)
+
+    async def arollback_snapshot(self, snapshot_id: int) -> SnapshotRollback:
+        return await run_io(self.rollback_snapshot, snapshot_id)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the Inkstone version history.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    prune_parser = subcommands.add_parser("prune", help="delete history objects nothing refers to")
+    prune_parser.add_argument("--grace", type=float, default=PRUNE_GRACE_SECONDS,
+                              help="keep unreferenced objects younger than this many seconds")
+    args = parser.parse_args(argv)
+
+    history = History()
+    print(f"{history.prune_objects(args.grace)} object(s) pruned from {history.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""Hashed-prefix sharding and per-type manifests for large YAML stores.
+
+A flat data type directory keeps every config at <type>/<id>.yaml. A sharded one spreads them
+over <type>/<ab>/<id>.yaml, where "ab" is the start of the SHA-256 of the file name (one level of
+256 directories by default), and keeps a manifest, <type>/.manifest.jsonl, recording the id,
+file, size, mtime and hash of every config. Listing, clearing, preloading and version checks
+read the manifest instead of walking the directory tree.
+
+A directory is sharded when it holds a .sharding.json marker; without one it stays flat and
+behaves exactly as before. New data type directories are created sharded when
+INKSTONE_YAML_SHARD_LEVELS is above 0; existing ones are converted in place with `migrate`.
+
+Configs added to a sharded directory by hand are only seen once `rebuild` re-reads the files.
+
+Usage (from backend/, with the server stopped):
+    python -m app.io.sharding migrate [--levels N] [data types...]
+    python -m app.io.sharding rebuild [data types...]
+    python -m app.io.sharding status
+"""
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+SHARDING_FILE_NAME = ".sharding.json"
+MANIFEST_FILE_NAME = ".manifest.jsonl"
+_SHARDING_FORMAT = 1
+SHARD_WIDTH = 2 # Hex digits per directory level: 256 directories each
+
+# The manifest log is rewritten from the live entries once it holds more than twice as many records
+MANIFEST_COMPACT_MIN_RECORDS = 1024
+
+logger = logging.getLogger(__name__)
+
+
+class ShardScheme(NamedTuple):
+    levels: int
+    width: int = SHARD_WIDTH
+
+    def relative_path(self, file_name: str) -> str:
+        """Returns where file_name is stored, relative to the data type directory."""
+        return _shard_prefix(file_name, self.levels, self.width) + file_name
+
+
+@functools.lru_cache(maxsize=65536)
+def _shard_prefix(file_name: str, levels: int, width: int) -> str:
+    digest = hashlib.sha256(file_name.encode('utf-8')).hexdigest()
+    return "".join(digest[level * width:(level + 1) * width] + "/" for level in range(levels))
+
+
+def read_scheme(type_path: Path) -> Optional[ShardScheme]:
+    """Returns the sharding scheme of a data type directory, or None if it is flat."""
+    try:
+        with open(type_path / SHARDING_FILE_NAME, 'rb') as f:
+            marker = json.load(f)
+    except FileNotFoundError:
+        return None
+    return ShardScheme(int(marker["levels"]), int(marker.get("width", SHARD_WIDTH)))
+
+
+def write_scheme(type_path: Path, scheme: ShardScheme) -> None:
+    marker = {"format": _SHARDING_FORMAT, "scheme": "sha256-prefix", "levels": scheme.levels, "width": scheme.width}
+    _replace_file(type_path / SHARDING_FILE_NAME, (json.dumps(marker) + "\n").encode('utf-8'))
+
+
+def _replace_file(path: Path, raw: bytes) -> None:
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(temp_path, 'wb') as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class ManifestEntry(NamedTuple):
+    id: str # File name without .yaml, like the ids YamlDirectoryBackend.list_ids returns
+    file: str # Path relative to the data type directory
+    size: int
+    mtime_ns: int
+    sha256: str
+
+    def to_record(self) -> Dict:
+        return {"op": "put", **self._asdict()}
+
+
+def _file_name(entry: ManifestEntry) -> str:
+    return entry.file.rsplit("/", 1)[-1]
+
+
+_fallback_locks: Dict[Path, threading.Lock] = {}
+_fallback_locks_guard = threading.Lock()
+
+@contextmanager
+def _manifest_lock(lock_path: Path, exclusive: bool) -> Iterator[None]:
+    """Appenders share the lock, compaction takes it exclusively (in-process lock without fcntl)."""
+    if fcntl is None:
+        with _fallback_locks_guard:
+            lock = _fallback_locks.setdefault(lock_path, threading.Lock())
+        with lock:
+            yield
+        return
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class Manifest:
+    """The manifest of one sharded data type directory.
+
+    On disk it is an append-only log of JSON records: {"op": "put", <ManifestEntry fields>},
+    {"op": "del", "id": ...} and {"op": "clear"}. Every process folds it into memory and on each
+    access reads only what was appended since, so writes made by other worker processes are seen
+    without rescanning; compaction replaces the file, which makes the others reload it once.
+    Appends are not fsynced: the YAML files stay the source of truth and rebuild() recovers a
+    manifest lost in a crash.
+    """
+
+    def __init__(self, type_path: Path, lock_path: Path) -> None:
+        self.type_path = type_path
+        self.path = type_path / MANIFEST_FILE_NAME
+        self.lock_path = lock_path
+        self._entries: Dict[str, ManifestEntry] = {}
+        self._inode: Optional[int] = None
+        self._offset = 0 # Bytes of the log folded so far
+        self._records = 0 # Records in the log, live or superseded
+        self._generation = 0 # Records applied since this process started reading the log
+        self._lock = threading.Lock()
+
+    def _reset(self, inode: Optional[int]) -> None:
+        self._entries = {}
+        self._inode = inode
+        self._offset = 0
+        self._records = 0
+        self._generation += 1
+
+    def _apply(self, record: Dict) -> None:
+        op = record.get("op")
+        if op == "put":
+            self._entries[record["id"]] = ManifestEntry(record["id"], record["file"], record["size"],
+                                                        record["mtime_ns"], record["sha256"])
+        elif op == "del":
+            self._entries.pop(record["id"], None)
+        elif op == "clear":
+            self._entries.clear()
+        self._records += 1
+        self._generation += 1
+
+    def _refresh_locked(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._inode is not None or self._entries:
+                self._reset(None)
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._reset(stat.st_ino)
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        end = data.rfind(b"\n") + 1 # A record still being appended is folded on the next refresh
+        for line in data[:end].splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning("Skipping malformed record in %s: %s", self.path, e, extra={"path": str(self.path)})
+        self._offset += end
+
+    def refresh(self) -> None:
+        """Folds records appended since the last access (by any process)."""
+        with self._lock:
+            self._refresh_locked()
+
+    def entries(self) -> List[ManifestEntry]:
+        """Returns the live entries ordered by file name."""
+        with self._lock:
+            self._refresh_locked()
+            return sorted(self._entries.values(), key=_file_name)
+
+    def get(self, data_id: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            self._refresh_locked()
+            return self._entries.get(data_id)
+
+    def version(self) -> int:
+        """A token that changes with every record appended to (or compaction of) the manifest."""
+        with self._lock:
+            self._refresh_locked()
+            return hash((self._inode, self._generation))
+
+    def append(self, records: List[Dict]) -> None:
+        """Appends records in one write and folds them (with anything other processes appended)."""
+        if not records:
+            return
+        raw = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode('utf-8')
+        with _manifest_lock(self.lock_path, exclusive=False):
+            # Opened under the lock, so never a log that a concurrent compaction is replacing
+            with open(self.path, 'ab') as f:
+                f.write(raw)
+                f.flush()
+                # O_APPEND writes land at the end of the file as it is at write time, so where they went is known only now
+                appended_at = f.tell() - len(raw)
+                inode = os.fstat(f.fileno()).st_ino
+        with self._lock:
+            if inode == self._inode and appended_at == self._offset:
+                # Nothing was appended since the last refresh: fold the records without reading them back
+                for record in records:
+                    self._apply(record)
+                self._offset += len(raw)
+            else:
+                self._refresh_locked()
+            needs_compaction = self._records > max(MANIFEST_COMPACT_MIN_RECORDS, 2 * len(self._entries))
+        if needs_compaction:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrites the log as one put record per live entry."""
+        with _manifest_lock(self.lock_path, exclusive=True):
+            with self._lock:
+                self._refresh_locked()
+                self._write_locked(list(self._entries.values()))
+
+    def replace_all(self, entries: List[ManifestEntry]) -> None:
+        """Replaces the whole manifest, e.g. with entries rebuilt from the files."""
+        with _manifest_lock(self.lock_path, exclusive=True):
+            with self._lock:
+                self._write_locked(entries)
+
+    def _write_locked(self, entries: List[ManifestEntry]) -> None:
+        entries = sorted(entries, key=_file_name)
+        raw = "".join(json.dumps(entry.to_record(), separators=(",", ":")) + "\n" for entry in entries).encode('utf-8')
+        _replace_file(self.path, raw)
+        stat = os.stat(self.path)
+        self._entries = {entry.id: entry for entry in entries}
+        self._inode = stat.st_ino
+        self._offset = stat.st_size
+        self._records = len(entries)
+        self._generation += 1
+
+
+def entry_for_file(type_path: Path, file_path: Path, stat: os.stat_result, digest: str) -> ManifestEntry:
+    return ManifestEntry(file_path.stem, file_path.relative_to(type_path).as_posix(), stat.st_size, stat.st_mtime_ns, digest)
+
+
+def _sharded_files(type_path: Path, scheme: ShardScheme) -> List[Path]:
+    """Walks the shard directories (only those, at the scheme's depth) for YAML files."""
+    directories = [type_path]
+    for _ in range(scheme.levels):
+        directories = [Path(entry.path) for directory in directories for entry in os.scandir(directory)
+                       if entry.is_dir() and len(entry.name) == scheme.width and not entry.name.startswith('.')]
+    return [Path(entry.path) for directory in directories for entry in os.scandir(directory)
+            if entry.is_file() and entry.name.endswith('.yaml') and not entry.name.startswith('.')]
+
+
+def rebuild_manifest(type_path: Path, lock_path: Path, scheme: Optional[ShardScheme] = None) -> int:
+    """Re-reads every file of a sharded directory into a new manifest; returns the number of entries.
+
+    Files sitting in the wrong shard (e.g. copied in by hand) are moved to the right one first.
+    """
+    scheme = scheme or read_scheme(type_path)
+    if scheme is None:
+        raise ValueError(f"{type_path} is not sharded")
+    entries = []
+    for file_path in _sharded_files(type_path, scheme):
+        expected_path = type_path / scheme.relative_path(file_path.name)
+        if file_path != expected_path:
+            expected_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(file_path, expected_path)
+            file_path = expected_path
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        entries.append(entry_for_file(type_path, file_path, os.stat(file_path), hashlib.sha256(raw).hexdigest()))
+    Manifest(type_path, lock_path).replace_all(entries)
+    return len(entries)
+
+
+def migrate_type_dir(type_path: Path, lock_path: Path, levels: int = 1) -> int:
+    """Converts a flat data type directory to a sharded one in place; returns the number of files moved.
+
+    Each <id>.yaml is renamed into its shard directory, then the
+    manifest is rebuilt and the marker written last, so an interrupted migration is simply run again.
+    """
+    if levels < 1:
+        raise ValueError("levels must be at least 1")
+    scheme = read_scheme(type_path)
+    if scheme is not None and scheme.levels != levels:
+        raise ValueError(f"{type_path} is already sharded with {scheme.levels} level(s)")
+    scheme = scheme or ShardScheme(levels)
+    type_path.mkdir(parents=True, exist_ok=True)
+    moved = 0
+    for file_path in sorted(type_path.glob('*.yaml')):
+        target_path = type_path / scheme.relative_path(file_path.name)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(file_path, target_path)
+        moved += 1
+    # Compiled sidecars are only a parse cache: they are rewritten next to the moved files on the next read
+    from app.io.yaml_loader import SIDECAR_DIR_NAME
+    shutil.rmtree(type_path / SIDECAR_DIR_NAME, ignore_errors=True)
+    rebuild_manifest(type_path, lock_path, scheme)
+    write_scheme(type_path, scheme)
+    return moved
+
+
+def main(argv=None) -> None:
+    from app.io import yaml_loader
+    from app.models import CONFIG_TYPES
+
+    parser = argparse.ArgumentParser(description="Shard Inkstone YAML data directories and maintain their manifests.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subcommands.add_parser("migrate", help="move flat data type directories into hashed shards")
+    migrate_parser.add_argument("--levels", type=int, default=1, help="shard directory levels (256 directories each)")
+    migrate_parser.add_argument("types", nargs="*")
+    rebuild_parser = subcommands.add_parser("rebuild", help="rebuild the manifests of sharded directories from their files")
+    rebuild_parser.add_argument("types", nargs="*")
+    subcommands.add_parser("status", help="show the layout of every data type directory")
+    args = parser.parse_args(argv)
+
+    for data_type_name in getattr(args, "types", None) or [name for name, _ in CONFIG_TYPES.values()]:
+        type_path = yaml_loader.DATA_BASE_PATH / data_type_name
+        lock_path = yaml_loader.manifest_lock_path(data_type_name)
+        if args.command == "migrate":
+            moved = migrate_type_dir(type_path, lock_path, args.levels)
+            print(f"{data_type_name}: moved {moved} file(s) into {args.levels} shard level(s)")
+        elif args.command == "rebuild":
+            print(f"{data_type_name}: {rebuild_manifest(type_path, lock_path)} manifest entries")
+        else:
+            scheme = read_scheme(type_path)
+            if scheme is None:
+                print(f"{data_type_name}: flat")
+            else:
+                print(f"{data_type_name}: sharded, {scheme.levels} level(s), "
+                      f"{len(Manifest(type_path, lock_path).entries())} manifest entries")
+
+
+if __name__ == "__main__":
+    main()
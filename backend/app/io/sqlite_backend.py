@@ -0,0 +1,270 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+
+from app.io.storage import BatchCommitError, ConfigEntry, StorageBackend
+from app.io.yaml_loader import STORAGE_BYTES_READ, STORAGE_BYTES_WRITTEN
+from app.models import LOAD_CONTEXT
+
+T = TypeVar('T', bound=BaseModel)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS configs (
+    data_type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (data_type, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS type_versions (
+    data_type TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SqliteBackend(StorageBackend):
+    """Embedded SQLite storage engine (WAL mode), for stores with tens of thousands of configs.
+
+    Each config is one row keyed by (data_type, id) and holding the model's JSON, so lookups and
+    listings use the primary key index instead of scanning a directory. Writes run in
+    IMMEDIATE transactions, which makes create() and commit_batch() atomic across threads and
+    worker processes. Use app.io.transfer to export to (or import from) a YAML directory.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Path | str) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # Validated models keyed by (data_type, id); reused while the stored digest is unchanged.
+        # Models are copied in and out, so callers mutating theirs cannot corrupt the cache.
+        self._models: Dict[tuple[str, str], tuple[str, type, BaseModel]] = {}
+        self._models_lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are managed explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _write(self):
+        return _ImmediateTransaction(self._conn())
+
+    @staticmethod
+    def _encode(data: BaseModel) -> tuple[str, str]:
+        content = data.model_dump_json()
+        STORAGE_BYTES_WRITTEN.labels("sqlite").inc(len(content))
+        return content, hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection, data_type_name: str) -> None:
+        conn.execute(
+            "INSERT INTO type_versions (data_type, version) VALUES (?, 1) "
+            "ON CONFLICT(data_type) DO UPDATE SET version = version + 1",
+            (data_type_name,),
+        )
+
+    def _to_entry(self, data_type_name: str, data_id: str, content: str, digest: str, model_class: Type[T]) -> ConfigEntry | None:
+        key = (data_type_name, data_id)
+        with self._models_lock:
+            cached = self._models.get(key)
+        if cached is not None and cached[0] == digest and cached[1] is model_class:
+            return ConfigEntry(cached[2].model_copy(deep=True), digest)
+        STORAGE_BYTES_READ.labels("sqlite").inc(len(content))
+        try:
+            model = model_class.model_validate_json(content, context=LOAD_CONTEXT)
+        except ValidationError as e:
+            logger.warning("Error validating %s/%s from %s: %s", data_type_name, data_id, self.db_path, e,
+                           extra={"data_type": data_type_name, "id": data_id})
+            return None
+        with self._models_lock:
+            self._models[key] = (digest, model_class, model.model_copy(deep=True))
+        return ConfigEntry(model, digest)
+
+    def _forget(self, data_type_name: str, data_id: str | None = None) -> None:
+        with self._models_lock:
+            if data_id is not None:
+                self._models.pop((data_type_name, data_id), None)
+            else:
+                for key in [key for key in self._models if key[0] == data_type_name]:
+                    del self._models[key]
+
+    def save(self, data_type_name: str, data_id: str, data: BaseModel) -> None:
+        content, digest = self._encode(data)
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO configs (data_type, id, content, digest) VALUES (?, ?, ?, ?)",
+                (data_type_name, data_id, content, digest),
+            )
+            self._bump_version(conn, data_type_name)
+        with self._models_lock:
+            self._models[(data_type_name, data_id)] = (digest, type(data), data.model_copy(deep=True))
+
+    def create(self, data_type_name: str, data_id: str, data: BaseModel) -> bool:
+        content, digest = self._encode(data)
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT content FROM configs WHERE data_type = ? AND id = ?", (data_type_name, data_id)
+            ).fetchone()
+            if row is not None:
+                try:
+                    type(data).model_validate_json(row[0], context=LOAD_CONTEXT)
+                    return False
+                except ValidationError:
+                    pass # Same rule as the YAML backend: an invalid config may be replaced
+            conn.execute(
+                "INSERT OR REPLACE INTO configs (data_type, id, content, digest) VALUES (?, ?, ?, ?)",
+                (data_type_name, data_id, content, digest),
+            )
+            self._bump_version(conn, data_type_name)
+        with self._models_lock:
+            self._models[(data_type_name, data_id)] = (digest, type(data), data.model_copy(deep=True))
+        return True
+
+    def update(self, data_type_name: str, data_id: str, model_class: Type[T],
+               updater: Callable[[ConfigEntry], BaseModel]) -> ConfigEntry | None:
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT content, digest FROM configs WHERE data_type = ? AND id = ?", (data_type_name, data_id)
+            ).fetchone()
+            entry = self._to_entry(data_type_name, data_id, row[0], row[1], model_class) if row is not None else None
+            if entry is None:
+                return None
+            data = updater(entry)
+            content, digest = self._encode(data)
+            conn.execute(
+                "UPDATE configs SET content = ?, digest = ? WHERE data_type = ? AND id = ?",
+                (content, digest, data_type_name, data_id),
+            )
+            self._bump_version(conn, data_type_name)
+        with self._models_lock:
+            self._models[(data_type_name, data_id)] = (digest, type(data), data.model_copy(deep=True))
+        return ConfigEntry(data, digest)
+
+    def load(self, data_type_name: str, data_id: str, model_class: Type[T]) -> ConfigEntry | None:
+        row = self._conn().execute(
+            "SELECT content, digest FROM configs WHERE data_type = ? AND id = ?", (data_type_name, data_id)
+        ).fetchone()
+        if row is None:
+            self._forget(data_type_name, data_id)
+            return None
+        return self._to_entry(data_type_name, data_id, row[0], row[1], model_class)
+
+    def iter_all(self, data_type_name: str, model_class: Type[T]) -> Iterator[ConfigEntry]:
+        rows = self._conn().execute(
+            "SELECT id, content, digest FROM configs WHERE data_type = ? ORDER BY id", (data_type_name,)
+        )
+        for data_id, content, digest in rows:
+            entry = self._to_entry(data_type_name, data_id, content, digest, model_class)
+            if entry is not None:
+                yield entry
+
+    def delete(self, data_type_name: str, data_id: str) -> bool:
+        with self._write() as conn:
+            deleted = conn.execute(
+                "DELETE FROM configs WHERE data_type = ? AND id = ?", (data_type_name, data_id)
+            ).rowcount > 0
+            if deleted:
+                self._bump_version(conn, data_type_name)
+        self._forget(data_type_name, data_id)
+        return deleted
+
+    def clear(self, data_type_name: str) -> None:
+        with self._write() as conn:
+            conn.execute("DELETE FROM configs WHERE data_type = ?", (data_type_name,))
+            self._bump_version(conn, data_type_name)
+        self._forget(data_type_name)
+
+    def list_ids(self, data_type_name: str) -> List[str]:
+        rows = self._conn().execute("SELECT id FROM configs WHERE data_type = ? ORDER BY id", (data_type_name,))
+        return [row[0] for row in rows]
+
+    def commit_batch(self, writes: List[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> None:
+        encoded = [(t, i, data, *self._encode(data)) for t, i, data in writes]
+        try:
+            with self._write() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO configs (data_type, id, content, digest) VALUES (?, ?, ?, ?)",
+                    [(t, i, content, digest) for t, i, _, content, digest in encoded],
+                )
+                conn.executemany("DELETE FROM configs WHERE data_type = ? AND id = ?", deletes)
+                for data_type_name in {t for t, *_ in encoded} | {t for t, _ in deletes}:
+                    self._bump_version(conn, data_type_name)
+        except sqlite3.Error as e:
+            raise BatchCommitError(f"Could not apply batch: {e}") from e
+        with self._models_lock:
+            for t, i, data, _, digest in encoded:
+                self._models[(t, i)] = (digest, type(data), data.model_copy(deep=True))
+        for t, i in deletes:
+            self._forget(t, i)
+
+    def commit_stream(self, writes: Iterable[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> List[tuple[str, str, str]]:
+        written = [] # (data_type, id, digest); the models themselves are not kept
+
+        def rows() -> Iterator[tuple[str, str, str, str]]:
+            for t, i, data in writes:
+                content, digest = self._encode(data)
+                written.append((t, i, digest))
+                yield t, i, content, digest
+
+        try:
+            with self._write() as conn:
+                conn.executemany("INSERT OR REPLACE INTO configs (data_type, id, content, digest) VALUES (?, ?, ?, ?)", rows())
+                conn.executemany("DELETE FROM configs WHERE data_type = ? AND id = ?", deletes)
+                for data_type_name in {t for t, *_ in written} | {t for t, _ in deletes}:
+                    self._bump_version(conn, data_type_name)
+        except sqlite3.Error as e:
+            raise BatchCommitError(f"Could not apply batch: {e}") from e
+        for t, i, _ in written:
+            self._forget(t, i)
+        for t, i in deletes:
+            self._forget(t, i)
+        return written
+
+    def type_version(self, data_type_name: str) -> int | None:
+        row = self._conn().execute(
+            "SELECT version FROM type_versions WHERE data_type = ?", (data_type_name,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back if the block raises."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
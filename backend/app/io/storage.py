@@ -0,0 +1,121 @@
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Type, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar('T', bound=BaseModel)
+
+
+class ConfigEntry(NamedTuple):
+    """A loaded model together with the SHA-256 digest of the stored bytes it was parsed from."""
+    model: BaseModel
+    digest: str
+
+
+@dataclass
+class PreloadReport:
+    """Outcome of StorageBackend.preload(): configs loaded per data type and the files that failed."""
+    engine: str
+    workers: int
+    loaded: Dict[str, int] = field(default_factory=dict)
+    errors: List[Dict[str, str]] = field(default_factory=list) # {"data_type", "path", "error"} per file
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"engine": self.engine, "workers": self.workers, "loaded": dict(self.loaded),
+                "errors": list(self.errors), "seconds": round(self.seconds, 3)}
+
+
+class BatchCommitError(Exception):
+    """Raised when a batch could not be applied; every config has been restored to its previous state."""
+
+
+class StorageBackend(ABC):
+    """Persistence engine behind the yaml_loader API.
+
+    Configs are addressed by (data_type_name, data_id), e.g. ('layouts', 'dashboard'). Loading
+    returns ConfigEntry objects whose digest changes whenever the stored content does (it is
+    used for ETags). Backends must be safe to call from several threads at once.
+    """
+
+    name: str = "abstract"
+
+    @abstractmethod
+    def save(self, data_type_name: str, data_id: str, data: BaseModel) -> None:
+        """Creates or replaces a config."""
+
+    @abstractmethod
+    def create(self, data_type_name: str, data_id: str, data: BaseModel) -> bool:
+        """Saves data only if no valid config with this id exists; returns False if one does."""
+
+    @abstractmethod
+    def load(self, data_type_name: str, data_id: str, model_class: Type[T]) -> ConfigEntry | None:
+        """Returns the config, or None if it is missing or cannot be parsed/validated."""
+
+    @abstractmethod
+    def update(self, data_type_name: str, data_id: str, model_class: Type[T],
+               updater: Callable[[ConfigEntry], BaseModel]) -> ConfigEntry | None:
+        """Read-modify-write of one config under its write lock; returns the new entry, or None if missing.
+
+        updater receives the current entry and returns the model to store. Exceptions it raises
+        abort the update and propagate; nothing is written.
+        """
+
+    @abstractmethod
+    def iter_all(self, data_type_name: str, model_class: Type[T]) -> Iterator[ConfigEntry]:
+        """Yields every valid config of a data type, skipping ones that cannot be parsed."""
+
+    @abstractmethod
+    def delete(self, data_type_name: str, data_id: str) -> bool:
+        """Deletes a config; returns False if it did not exist."""
+
+    @abstractmethod
+    def clear(self, data_type_name: str) -> None:
+        """Deletes every config of a data type."""
+
+    @abstractmethod
+    def list_ids(self, data_type_name: str) -> List[str]:
+        """Returns the ids of every stored config of a data type, sorted, without parsing them."""
+
+    @abstractmethod
+    def commit_batch(self, writes: List[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> None:
+        """Applies writes (data_type, id, model) and deletes (data_type, id) all-or-nothing.
+
+        Raises BatchCommitError if the batch could not be applied.
+        """
+
+    def commit_stream(self, writes: Iterable[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> List[tuple[str, str, str]]:
+        """Like commit_batch, for batches too large to hold every model in memory at once.
+
+        writes is consumed once, as the batch is applied, and the written models are not kept
+        in the backend's cache. Returns (data_type, id, digest) per write.
+
+        The default collects the writes and goes through commit_batch().
+        """
+        writes = list(writes)
+        self.commit_batch(writes, deletes)
+        entries = [(t, i, self.load(t, i, type(data))) for t, i, data in writes]
+        return [(t, i, entry.digest) for t, i, entry in entries if entry is not None]
+
+    @abstractmethod
+    def type_version(self, data_type_name: str) -> int | None:
+        """Returns a token that changes whenever configs of this type are added or removed,
+        including by other processes; used to detect when in-memory indexes are stale."""
+
+    def preload(self, model_classes: Dict[str, Type[BaseModel]], workers: int = 1) -> PreloadReport:
+        """Loads every config of the given data types ({data_type_name: model class}) into the
+        backend's in-memory cache, so that the first requests do not pay for parsing them.
+
+        The default reads everything through iter_all() on the calling thread; backends that can
+        parse in parallel override it and use up to `workers` processes.
+        """
+        started = time.perf_counter()
+        report = PreloadReport(self.name, 1)
+        for data_type_name, model_class in model_classes.items():
+            report.loaded[data_type_name] = sum(1 for _ in self.iter_all(data_type_name, model_class))
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def close(self) -> None:
+        """Releases any resources held by the backend."""
@@ -0,0 +1,128 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from app.io import archive, yaml_loader
+from app.io.archive import import_archive, iter_export
+from app.io.sqlite_backend import SqliteBackend
+from app.models import LayoutConfig, ModuleConfig, ViewConfig
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    backend = SqliteBackend(tmp_path / "store.db")
+    yaml_loader.set_storage_backend(backend)
+    yield backend
+    yaml_loader.set_storage_backend(None)
+    backend.close()
+
+
+def _seed(layout_ids):
+    for layout_id in layout_ids:
+        yaml_loader.save_yaml('layouts', layout_id, LayoutConfig(id=layout_id, direction="vertical", panes=[]))
+    yaml_loader.save_yaml('views', 'notes', ViewConfig(id="notes", type="text", content="Hi"))
+    yaml_loader.save_yaml('modules', 'home', ModuleConfig(id="home", name="Home", layout_id=layout_ids[0]))
+
+
+def _tar(members) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name, text in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(text.encode())
+            tar.addfile(info, io.BytesIO(text.encode()))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("fmt", ["tar", "tgz", "zip"])
+def test_export_import_round_trip(sqlite_store, monkeypatch, fmt):
+    monkeypatch.setattr(archive, "EXPORT_CHUNK_BYTES", 512)
+    _seed([f"layout{n}" for n in range(20)])
+    chunks = list(iter_export(fmt))
+    if fmt != "tgz": # gzip compresses these few configs into a single chunk
+        assert len(chunks) > 2 # Handed out as the archive grows, not at the end
+    data = b"".join(chunks)
+    if fmt == "zip":
+        names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+    else:
+        names = tarfile.open(fileobj=io.BytesIO(data), mode="r:*").getnames()
+    assert len(names) == 22
+    assert "layouts/layout0.yaml" in names and "views/notes.yaml" in names and "modules/home.yaml" in names
+
+    for data_type_name in ("layouts", "views", "modules"):
+        yaml_loader.clear_all_yaml_data(data_type_name)
+    events = []
+    yaml_loader.add_change_listener(lambda *event: events.append(event))
+    try:
+        report = import_archive(io.BytesIO(data))
+    finally:
+        yaml_loader._change_listeners.pop()
+    assert report.applied
+    assert report.imported == {"layouts": 20, "views": 1, "modules": 1}
+    assert len(yaml_loader.list_yaml_ids('layouts')) == 20
+    assert yaml_loader.load_yaml('modules', 'home', ModuleConfig).layout_id == "layout0"
+    assert len(events) == 22 and all(op == 'upsert' and digest for _, _, op, digest in events)
+
+
+def test_import_validates_everything_before_writing(sqlite_store):
+    _seed(["existing"])
+    report = import_archive(_tar([
+        ("backup/layouts/fresh.yaml", "id: fresh\ndirection: horizontal\npanes: []\n"),
+        ("backup/views/broken.yaml", "id: [unclosed\n"),
+        ("backup/views/invalid.yaml", "id: invalid\n"), # No 'type'
+        ("backup/modules/orphan.yaml", "id: orphan\nname: Orphan\nlayout_id: missing\n"),
+        ("backup/modules/copy.yaml", "id: home\nname: Home\nlayout_id: existing\n"),
+        ("backup/modules/home.yaml", "id: home\nname: Home again\nlayout_id: fresh\n"),
+        ("backup/README.txt", "not a config"),
+    ]))
+    assert not report.applied
+    assert report.error_count == 4
+    assert {error["member"] for error in report.errors} == {
+        "backup/views/broken.yaml", "backup/views/invalid.yaml", "backup/modules/home.yaml", "modules/orphan.yaml"}
+    assert report.skipped == ["backup/README.txt"]
+    assert yaml_loader.list_yaml_ids('layouts') == ["existing"] # Nothing was written
+
+    with pytest.raises(ValueError):
+        import_archive(io.BytesIO(b"plain text, not an archive"))
+    with pytest.raises(ValueError):
+        import_archive(io.BytesIO(b""), mode="overwrite")
+
+
+def test_import_merge_and_replace_modes(sqlite_store):
+    _seed(["kept"])
+    members = [("layouts/new.yaml", "id: new\ndirection: vertical\npanes: []\n"),
+               ("modules/home.yaml", "id: home\nname: Home\nlayout_id: new\n")]
+    report = import_archive(_tar(members), mode="merge")
+    assert report.applied and report.deleted == {"layouts": 0, "views": 0, "modules": 0}
+    assert yaml_loader.list_yaml_ids('layouts') == ["kept", "new"]
+
+    report = import_archive(_tar(members), mode="replace")
+    assert report.applied and report.deleted == {"layouts": 1, "views": 1, "modules": 0}
+    assert yaml_loader.list_yaml_ids('layouts') == ["new"]
+    assert yaml_loader.list_yaml_ids('views') == []
+
+    # In replace mode a module may not keep pointing at a layout that only the store has
+    report = import_archive(_tar([("modules/home.yaml", "id: home\nname: Home\nlayout_id: new\n")]), mode="replace")
+    assert not report.applied
+    assert "Layout with ID 'new'" in report.errors[0]["error"]
+
+
+def test_import_replace_keeps_ids_stored_under_sanitized_file_names():
+    # The YAML store lists file stems ('my_layout'), not ids ('my layout')
+    for data_type_name in ("layouts", "views", "modules"):
+        yaml_loader.clear_all_yaml_data(data_type_name)
+    members = [("layouts/my_layout.yaml", "id: my layout\ndirection: vertical\npanes: []\n"),
+               ("modules/my_module.yaml", "id: my module\nname: Mine\nlayout_id: my layout\n")]
+    try:
+        assert import_archive(_tar(members), mode="replace").applied
+        report = import_archive(_tar(members), mode="replace")
+        assert report.applied and report.deleted == {"layouts": 0, "views": 0, "modules": 0}
+        assert yaml_loader.load_yaml('layouts', 'my layout', LayoutConfig) is not None
+        assert yaml_loader.load_yaml('modules', 'my module', ModuleConfig) is not None
+        assert import_archive(_tar(members[1:]), mode="merge").applied # The stored layout is found
+    finally:
+        for data_type_name in ("layouts", "views", "modules"):
+            yaml_loader.clear_all_yaml_data(data_type_name)
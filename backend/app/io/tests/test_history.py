@@ -0,0 +1,154 @@
+import io
+import os
+
+import pytest
+
+from app.io import history as history_module
+from app.io import yaml_loader
+from app.io.archive import import_archive, iter_export
+from app.io.history import OBJECTS_DIR_NAME, History
+from app.io.sqlite_backend import SqliteBackend
+from app.models import LayoutConfig, ViewConfig
+from app.patching import apply_json_patch
+
+
+@pytest.fixture
+def history(tmp_path):
+    backend = SqliteBackend(tmp_path / "store.db")
+    yaml_loader.set_storage_backend(backend)
+    history = History(tmp_path / "history")
+    yaml_loader.add_change_listener(history.record)
+    yield history
+    yaml_loader.remove_change_listener(history.record)
+    yaml_loader.set_storage_backend(None)
+    backend.close()
+
+
+def _layout(layout_id: str, notes: str = "Hi") -> LayoutConfig:
+    return LayoutConfig(id=layout_id, direction="vertical", panes=[
+        {"id": "top", "size": 50, "view": {"id": "notes", "type": "text", "content": notes}},
+        {"id": "bottom", "size": 50, "layout": {"direction": "horizontal", "panes": [
+            {"id": "left", "size": 50, "view": {"id": "clock", "type": "clock"}},
+            {"id": "right", "size": 50, "view": {"id": "todo", "type": "list", "content": ["a", "b"]}}]}},
+    ])
+
+
+def _object_count(history: History) -> int:
+    return sum(1 for path in (history.root / OBJECTS_DIR_NAME).rglob("*") if path.is_file())
+
+
+def test_versions_share_objects_and_roll_back(history):
+    yaml_loader.save_yaml('layouts', 'home', _layout('home'))
+    objects = _object_count(history)
+    assert objects == 8 # Layout, 4 panes (one holding the nested layout) and 3 views
+
+    # A standalone copy of an embedded view and a second layout with the same panes add one object each
+    yaml_loader.save_yaml('views', 'notes', ViewConfig(id="notes", type="text", content="Hi"))
+    yaml_loader.save_yaml('layouts', 'copy', _layout('copy'))
+    assert _object_count(history) == objects + 1
+
+    # Changing one view only adds that view and the objects above it
+    yaml_loader.save_yaml('layouts', 'home', _layout('home', notes="Bye"))
+    assert _object_count(history) == objects + 4
+    yaml_loader.save_yaml('layouts', 'home', _layout('home', notes="Bye")) # Unchanged: no new version
+    assert [version.version for version in history.versions('layouts', 'home')] == [1, 2]
+
+    operations = history.diff_versions('layouts', 'home', 1, 2)
+    assert operations == [{"op": "replace", "path": "/panes/0/view/content", "value": "Bye"}]
+    first = history.load_tree(history.version('layouts', 'home', 1).tree)
+    assert apply_json_patch(first, operations) == history.load_tree(history.version('layouts', 'home', 2).tree)
+    assert history.diff_versions('layouts', 'home', 2, 2) == []
+
+    yaml_loader.delete_yaml('layouts', 'home')
+    assert history.versions('layouts', 'home')[-1].tree is None
+    restored = history.rollback('layouts', 'home', 1)
+    assert yaml_loader.load_yaml('layouts', 'home', LayoutConfig) == restored == _layout('home')
+    assert len(history.versions('layouts', 'home')) == 4
+    with pytest.raises(LookupError):
+        history.version('layouts', 'home', 5)
+
+
+def test_snapshots_are_incremental_and_roll_back(history):
+    for n in range(40):
+        yaml_loader.save_yaml('layouts', f"layout{n}", _layout(f"layout{n}", notes=str(n)))
+    yaml_loader.save_yaml('views', 'notes', ViewConfig(id="notes", type="text", content="Hi"))
+    first = history.take_snapshot("initial")
+    assert first.id == 1 and first.changed == 41
+
+    yaml_loader.save_yaml('layouts', 'layout0', _layout('layout0', notes="changed"))
+    yaml_loader.delete_yaml('layouts', 'layout1')
+    yaml_loader.save_yaml('layouts', 'added', _layout('added'))
+    objects = _object_count(history)
+    assert history.diff_snapshots(1) == {
+        "layouts": {"added": ["added"], "removed": ["layout1"], "changed": ["layout0"]},
+        "views": {"added": [], "removed": [], "changed": []},
+        "modules": {"added": [], "removed": [], "changed": []},
+    }
+    second = history.take_snapshot()
+    assert second.changed == 3
+    assert _object_count(history) - objects <= 5 # At most 3 buckets, the layouts bucket index and the root
+    assert history.diff_snapshots(1, 2) == history.diff_snapshots(1)
+    assert history.diff_snapshots(2)["layouts"] == {"added": [], "removed": [], "changed": []}
+
+    yaml_loader.clear_all_yaml_data('layouts')
+    result = history.rollback_snapshot(1)
+    assert result.backup.id == 3 and result.backup.label == "Before rolling back to snapshot 1"
+    assert len(result.written) == 40 and result.deleted == []
+    assert yaml_loader.list_yaml_ids('layouts') == sorted(f"layout{n}" for n in range(40))
+    assert yaml_loader.load_yaml('layouts', 'layout0', LayoutConfig).panes[0].view.content == "0"
+
+    # The rollback itself is undone by rolling back to the backup
+    history.rollback_snapshot(3)
+    assert yaml_loader.list_yaml_ids('layouts') == []
+    with pytest.raises(LookupError):
+        history.rollback_snapshot(42)
+
+
+def test_default_root_follows_the_store(tmp_path, monkeypatch):
+    history = History()
+    first = history.put_object({"a": 1})
+    monkeypatch.setattr(yaml_loader, "DATA_BASE_PATH", tmp_path / "store")
+    assert history.root == tmp_path / "store" / ".history"
+    with pytest.raises(LookupError): # Objects of the previous store are not visible, nor assumed stored
+        history.get_object(first)
+    assert history.put_object({"a": 1}) == first
+    assert history.get_object(first) == {"a": 1}
+
+
+def test_imports_hand_their_trees_over_instead_of_being_read_back(history, monkeypatch):
+    for n in range(5):
+        yaml_loader.save_yaml('layouts', f"layout{n}", _layout(f"layout{n}", notes=str(n)))
+    data = b"".join(iter_export("tar"))
+    yaml_loader.clear_all_yaml_data('layouts')
+
+    def read_back(*args):
+        raise AssertionError("Imported config read back to record it")
+    monkeypatch.setattr(history_module, "load_yaml_entry", read_back)
+    with history.staging() as stage:
+        assert import_archive(io.BytesIO(data), on_write=stage).applied
+    for n in range(5):
+        versions = history.versions('layouts', f"layout{n}")
+        assert [version.tree is not None for version in versions] == [True, False, True]
+        assert versions[2].tree == versions[0].tree
+        assert history._latest_record('layouts', f"layout{n}")['digest'] == yaml_loader.load_yaml_entry('layouts', f"layout{n}", LayoutConfig).digest
+
+
+def test_prune_removes_only_unreferenced_objects(history):
+    yaml_loader.save_yaml('layouts', 'home', _layout('home'))
+    history.take_snapshot()
+    yaml_loader.save_yaml('layouts', 'home', _layout('home', notes="Bye")) # Pending, not in a snapshot yet
+    orphan = history.put_object({"left": "behind"})
+    objects = _object_count(history)
+
+    assert history.prune_objects() == 0 # The orphan is still within the grace period
+    old = os.path.getmtime(history._object_path(orphan)) - 2 * history_module.PRUNE_GRACE_SECONDS
+    os.utime(history._object_path(orphan), (old, old))
+    assert history.prune_objects() == 1
+    assert _object_count(history) == objects - 1
+    with pytest.raises(LookupError):
+        history.get_object(orphan)
+    assert history.load_tree(history.version('layouts', 'home', 1).tree) == _layout('home').model_dump(mode='json')
+    assert history.diff_snapshots(1)["layouts"]["changed"] == ["home"]
+    assert history.put_object({"left": "behind"}) == orphan # Stored again, not assumed to be there
+    assert history.get_object(orphan) == {"left": "behind"}
+
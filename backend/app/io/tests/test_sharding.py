@@ -0,0 +1,141 @@
+import shutil
+from pathlib import Path
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from app.io import sharding, yaml_loader
+from app.io.sharding import Manifest, ManifestEntry, ShardScheme, migrate_type_dir, read_scheme, rebuild_manifest
+from app.io.yaml_loader import (
+    clear_all_yaml_data,
+    clear_cache,
+    commit_yaml_batch,
+    create_yaml,
+    delete_yaml,
+    get_path_for_type,
+    get_type_version,
+    list_yaml_ids,
+    load_all_yaml,
+    load_yaml,
+    save_yaml,
+)
+
+DATA_TYPE = "sharded_items"
+
+
+class ShardItem(BaseModel):
+    id: str
+    value: str
+    tags: List[str] = []
+
+
+@pytest.fixture(autouse=True)
+def sharded_type_dir():
+    shutil.rmtree(yaml_loader.DATA_BASE_PATH / DATA_TYPE, ignore_errors=True)
+    yaml_loader.forget_directory_layouts()
+    clear_cache()
+    yield yaml_loader.DATA_BASE_PATH / DATA_TYPE
+    shutil.rmtree(yaml_loader.DATA_BASE_PATH / DATA_TYPE, ignore_errors=True)
+    yaml_loader.forget_directory_layouts()
+    clear_cache()
+
+
+def test_shard_scheme_paths():
+    assert ShardScheme(1).relative_path("item.yaml") == ShardScheme(1).relative_path("item.yaml")
+    first, name = ShardScheme(1).relative_path("item.yaml").split("/")
+    assert len(first) == 2 and name == "item.yaml"
+    assert ShardScheme(2).relative_path("item.yaml").startswith(first + "/")
+    assert len({ShardScheme(1).relative_path(f"item{n}.yaml").split("/")[0] for n in range(200)}) > 100
+
+
+def test_new_type_is_sharded_and_listed_from_manifest(monkeypatch, sharded_type_dir):
+    monkeypatch.setattr(yaml_loader, "SHARD_LEVELS", 1)
+    for n in range(5):
+        save_yaml(DATA_TYPE, f"item{n}", ShardItem(id=f"item{n}", value=str(n)))
+    assert read_scheme(sharded_type_dir) == ShardScheme(1)
+    file_path = get_path_for_type(DATA_TYPE, "item0")
+    assert file_path.parent.parent == sharded_type_dir
+    assert file_path.exists()
+    assert not list(sharded_type_dir.glob("*.yaml"))
+
+    assert create_yaml(DATA_TYPE, "item0", ShardItem(id="item0", value="again")) is False
+    assert create_yaml(DATA_TYPE, "item5", ShardItem(id="item5", value="5")) is True
+    commit_yaml_batch([(DATA_TYPE, "item6", ShardItem(id="item6", value="6"))], [(DATA_TYPE, "item1")])
+    assert delete_yaml(DATA_TYPE, "item2") is True
+    version = get_type_version(DATA_TYPE)
+    save_yaml(DATA_TYPE, "item3", ShardItem(id="item3", value="updated"))
+    assert get_type_version(DATA_TYPE) != version
+
+    def no_scans(*args, **kwargs):
+        raise AssertionError("the directory tree was scanned")
+    monkeypatch.setattr(Path, "glob", no_scans)
+    monkeypatch.setattr(Path, "iterdir", no_scans)
+    assert list_yaml_ids(DATA_TYPE) == ["item0", "item3", "item4", "item5", "item6"]
+    assert [item.value for item in load_all_yaml(DATA_TYPE, ShardItem)] == ["0", "updated", "4", "5", "6"]
+    assert load_yaml(DATA_TYPE, "item2", ShardItem) is None
+    assert not get_path_for_type(DATA_TYPE, "item2").exists()
+
+    manifest = Manifest(sharded_type_dir, yaml_loader.manifest_lock_path(DATA_TYPE))
+    entry = manifest.get("item3")
+    assert entry.file == ShardScheme(1).relative_path("item3.yaml")
+    assert entry.size == get_path_for_type(DATA_TYPE, "item3").stat().st_size
+
+    clear_all_yaml_data(DATA_TYPE)
+    assert list_yaml_ids(DATA_TYPE) == []
+    assert not get_path_for_type(DATA_TYPE, "item0").exists()
+    assert manifest.entries() == []
+
+
+def test_manifest_follows_other_writers_and_compacts(monkeypatch, tmp_path):
+    monkeypatch.setattr(sharding, "MANIFEST_COMPACT_MIN_RECORDS", 4)
+    lock_path = tmp_path / "manifest.lock"
+    writer, reader = Manifest(tmp_path, lock_path), Manifest(tmp_path, lock_path)
+
+    def put(data_id: str) -> dict:
+        return ManifestEntry(data_id, f"ab/{data_id}.yaml", 1, 1, "0" * 64).to_record()
+
+    writer.append([put("a"), put("b")])
+    version = reader.version()
+    assert [entry.id for entry in reader.entries()] == ["a", "b"]
+    writer.append([{"op": "del", "id": "a"}])
+    assert reader.version() != version
+    assert [entry.id for entry in reader.entries()] == ["b"]
+
+    # A record still being written is only folded once complete
+    with open(writer.path, "ab") as f:
+        f.write(b'{"op":"del","id":"b"')
+    assert [entry.id for entry in reader.entries()] == ["b"]
+    with open(writer.path, "ab") as f:
+        f.write(b'}\n')
+    assert reader.entries() == []
+
+    writer.append([put("c"), put("d")]) # 6 records for 2 entries: compacted
+    assert len(writer.path.read_bytes().splitlines()) == 2
+    assert [entry.id for entry in reader.entries()] == ["c", "d"]
+
+
+def test_migrate_flat_directory_in_place(sharded_type_dir):
+    for n in range(3):
+        save_yaml(DATA_TYPE, f"item{n}", ShardItem(id=f"item{n}", value=str(n)))
+    (sharded_type_dir / "empty.yaml").write_text("")
+    lock_path = yaml_loader.manifest_lock_path(DATA_TYPE)
+
+    assert migrate_type_dir(sharded_type_dir, lock_path, levels=2) == 4
+    assert migrate_type_dir(sharded_type_dir, lock_path, levels=2) == 0 # Idempotent
+    with pytest.raises(ValueError):
+        migrate_type_dir(sharded_type_dir, lock_path, levels=1)
+    yaml_loader.forget_directory_layouts()
+    assert not list(sharded_type_dir.glob("*.yaml"))
+    assert list_yaml_ids(DATA_TYPE) == ["empty", "item0", "item1", "item2"]
+    assert [item.value for item in load_all_yaml(DATA_TYPE, ShardItem)] == ["0", "1", "2"]
+    assert get_path_for_type(DATA_TYPE, "item1").relative_to(sharded_type_dir).as_posix() == ShardScheme(2).relative_path("item1.yaml")
+
+    # A file dropped in by hand (in the wrong shard) is picked up by a rebuild
+    stray_dir = sharded_type_dir / "zz" / "zz"
+    stray_dir.mkdir(parents=True)
+    (stray_dir / "hand.yaml").write_text("id: hand\nvalue: by hand\n")
+    assert "hand" not in list_yaml_ids(DATA_TYPE)
+    assert rebuild_manifest(sharded_type_dir, lock_path) == 5
+    assert "hand" in list_yaml_ids(DATA_TYPE)
+    assert load_yaml(DATA_TYPE, "hand", ShardItem).value == "by hand"
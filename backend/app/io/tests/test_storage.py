@@ -0,0 +1,184 @@
+import threading
+import pytest
+import yaml
+from pydantic import BaseModel
+from typing import List
+
+from app.io import yaml_loader
+from app.io.sqlite_backend import SqliteBackend
+from app.io.storage import BatchCommitError
+from app.io.transfer import export_to_yaml_dir, import_from_yaml_dir
+from app.models import LayoutConfig, ModuleConfig, PaneConfig, ViewConfig
+
+class StoredItem(BaseModel):
+    id: str
+    value: str
+    tags: List[str] = []
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    backend = SqliteBackend(tmp_path / "store.db")
+    yield backend
+    backend.close()
+
+def test_sqlite_backend_crud(sqlite_backend):
+    assert sqlite_backend.load("items", "a", StoredItem) is None
+    sqlite_backend.save("items", "b", StoredItem(id="b", value="B"))
+    sqlite_backend.save("items", "a", StoredItem(id="a", value="A", tags=["x"]))
+
+    entry = sqlite_backend.load("items", "a", StoredItem)
+    assert entry.model == StoredItem(id="a", value="A", tags=["x"])
+    assert [e.model.id for e in sqlite_backend.iter_all("items", StoredItem)] == ["a", "b"]
+    assert sqlite_backend.list_ids("items") == ["a", "b"]
+
+    sqlite_backend.save("items", "a", StoredItem(id="a", value="A2"))
+    assert sqlite_backend.load("items", "a", StoredItem).digest != entry.digest
+
+    assert sqlite_backend.delete("items", "a") is True
+    assert sqlite_backend.delete("items", "a") is False
+    sqlite_backend.clear("items")
+    assert sqlite_backend.list_ids("items") == []
+
+def test_sqlite_backend_models_are_not_shared_with_callers(sqlite_backend):
+    item = StoredItem(id="a", value="A", tags=["x"])
+    sqlite_backend.save("items", "a", item)
+    item.tags.append("saved")
+
+    sqlite_backend.load("items", "a", StoredItem).model.tags.append("loaded")
+    next(iter(sqlite_backend.iter_all("items", StoredItem))).model.value = "Mutated"
+    assert sqlite_backend.load("items", "a", StoredItem).model == StoredItem(id="a", value="A", tags=["x"])
+
+def test_sqlite_backend_uses_wal(sqlite_backend):
+    mode = sqlite_backend._conn().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+def test_sqlite_backend_create_is_exclusive_across_threads(sqlite_backend):
+    results = []
+    def create(n):
+        results.append(sqlite_backend.create("items", "contested", StoredItem(id="contested", value=str(n))))
+    threads = [threading.Thread(target=create, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+
+def test_sqlite_backend_type_version_tracks_changes(sqlite_backend):
+    assert sqlite_backend.type_version("items") is None
+    sqlite_backend.save("items", "a", StoredItem(id="a", value="A"))
+    first = sqlite_backend.type_version("items")
+    sqlite_backend.delete("items", "a")
+    assert sqlite_backend.type_version("items") != first
+
+def test_sqlite_backend_commit_batch_is_atomic(sqlite_backend):
+    sqlite_backend.save("items", "keep", StoredItem(id="keep", value="K"))
+    sqlite_backend.commit_batch([("items", "new", StoredItem(id="new", value="N"))], [("items", "keep")])
+    assert sqlite_backend.list_ids("items") == ["new"]
+
+    with pytest.raises(BatchCommitError):
+        # A bound parameter SQLite cannot store aborts the whole transaction
+        sqlite_backend.commit_batch([("items", "other", StoredItem(id="other", value="O"))], [("items", object())])
+    assert sqlite_backend.list_ids("items") == ["new"]
+
+def test_yaml_loader_api_delegates_to_configured_backend(sqlite_backend):
+    yaml_loader.set_storage_backend(sqlite_backend)
+    try:
+        yaml_loader.save_yaml("items", "via_api", StoredItem(id="via_api", value="API"))
+        assert yaml_loader.load_yaml("items", "via_api", StoredItem).value == "API"
+        assert yaml_loader.create_yaml("items", "via_api", StoredItem(id="via_api", value="Dup")) is False
+        assert yaml_loader.list_yaml_ids("items") == ["via_api"]
+        assert not (yaml_loader.DATA_BASE_PATH / "items").exists() # Nothing written as YAML files
+    finally:
+        yaml_loader.set_storage_backend(None)
+
+def test_create_storage_backend_by_engine_name(tmp_path, monkeypatch):
+    assert isinstance(yaml_loader.create_storage_backend("yaml"), yaml_loader.YamlDirectoryBackend)
+    monkeypatch.setenv("INKSTONE_SQLITE_PATH", str(tmp_path / "configured.db"))
+    backend = yaml_loader.create_storage_backend("sqlite")
+    assert isinstance(backend, SqliteBackend)
+    assert backend.db_path == tmp_path / "configured.db"
+    backend.close()
+    with pytest.raises(ValueError):
+        yaml_loader.create_storage_backend("nosql")
+
+def test_export_and_import_yaml_round_trip(sqlite_backend, tmp_path):
+    layout = LayoutConfig(id="exported", direction="vertical",
+                          panes=[PaneConfig(id="p", size=100, view=ViewConfig(id="v", type="text", content="Hi"))])
+    sqlite_backend.save("layouts", layout.id, layout)
+    sqlite_backend.save("modules", "mod", ModuleConfig(id="mod", name="Mod", layout_id="exported"))
+
+    counts = export_to_yaml_dir(tmp_path / "export", backend=sqlite_backend)
+    assert counts == {"layouts": 1, "views": 0, "modules": 1}
+    with open(tmp_path / "export" / "layouts" / "exported.yaml") as f:
+        assert yaml.safe_load(f)["panes"][0]["view"]["content"] == "Hi" # Plain, hand-editable YAML
+
+    target = SqliteBackend(tmp_path / "target.db")
+    try:
+        target.save("views", "stale", ViewConfig(id="stale", type="text"))
+        assert import_from_yaml_dir(tmp_path / "export", backend=target, replace=True)["layouts"] == 1
+        assert target.load("layouts", "exported", LayoutConfig).model == layout
+        assert target.list_ids("views") == [] # replace=True removed configs missing from the directory
+    finally:
+        target.close()
+
+def test_import_replace_matches_ids_by_file_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(yaml_loader, "DATA_BASE_PATH", tmp_path / "store")
+    (tmp_path / "source" / "layouts").mkdir(parents=True)
+    (tmp_path / "source" / "layouts" / "my_layout.yaml").write_text("id: my layout\ndirection: vertical\npanes: []\n")
+    backend = yaml_loader.YamlDirectoryBackend()
+    try:
+        import_from_yaml_dir(tmp_path / "source", backend=backend, replace=True)
+        import_from_yaml_dir(tmp_path / "source", backend=backend, replace=True) # 'my_layout' is listed, 'my layout' imported
+        assert backend.load("layouts", "my layout", LayoutConfig) is not None
+    finally:
+        yaml_loader.clear_cache()
+
+def test_import_into_the_active_backend_notifies_listeners(sqlite_backend, tmp_path):
+    (tmp_path / "layouts").mkdir()
+    (tmp_path / "layouts" / "home.yaml").write_text("id: home\ndirection: vertical\npanes: []\n")
+    yaml_loader.set_storage_backend(sqlite_backend)
+    sqlite_backend.save("views", "stale", ViewConfig(id="stale", type="text"))
+    events = []
+    listener = lambda *event: events.append(event)
+    yaml_loader.add_change_listener(listener)
+    try:
+        import_from_yaml_dir(tmp_path, replace=True)
+    finally:
+        yaml_loader.remove_change_listener(listener)
+        yaml_loader.set_storage_backend(None)
+    digest = sqlite_backend.load("layouts", "home", LayoutConfig).digest
+    assert events == [("layouts", "home", "upsert", digest), ("views", "stale", "delete", None)]
+
+def test_import_rejects_modules_without_their_layout(sqlite_backend, tmp_path):
+    (tmp_path / "modules").mkdir()
+    (tmp_path / "modules" / "mod.yaml").write_text("id: mod\nname: Mod\nlayout_id: missing\n")
+    with pytest.raises(ValueError, match="'missing' referenced by modules mod"):
+        import_from_yaml_dir(tmp_path, backend=sqlite_backend)
+    assert sqlite_backend.list_ids("modules") == []
+
+    sqlite_backend.save("layouts", "missing", LayoutConfig(id="missing", direction="vertical", panes=[]))
+    import_from_yaml_dir(tmp_path, backend=sqlite_backend) # Merged into a store that has the layout
+    assert sqlite_backend.list_ids("modules") == ["mod"]
+    with pytest.raises(ValueError): # ...which replace=True would delete
+        import_from_yaml_dir(tmp_path, backend=sqlite_backend, replace=True)
+
+def test_import_rejects_invalid_files_without_writing(sqlite_backend, tmp_path):
+    (tmp_path / "layouts").mkdir()
+    (tmp_path / "layouts" / "good.yaml").write_text("id: good\ndirection: vertical\npanes: []\n")
+    (tmp_path / "layouts" / "bad.yaml").write_text("id: bad\n")
+    with pytest.raises(ValueError):
+        import_from_yaml_dir(tmp_path, backend=sqlite_backend)
+    assert sqlite_backend.list_ids("layouts") == []
+
+def test_sqlite_backend_update_is_read_modify_write(sqlite_backend):
+    assert sqlite_backend.update("items", "missing", StoredItem, lambda entry: entry.model) is None
+    sqlite_backend.save("items", "u", StoredItem(id="u", value="1"))
+    entry = sqlite_backend.update("items", "u", StoredItem, lambda entry: entry.model.model_copy(update={"value": entry.model.value + "2"}))
+    assert entry.model.value == "12"
+    assert sqlite_backend.load("items", "u", StoredItem) == entry
+
+    def refuse(entry):
+        raise ValueError("no")
+    with pytest.raises(ValueError):
+        sqlite_backend.update("items", "u", StoredItem, refuse)
+    assert sqlite_backend.load("items", "u", StoredItem).model.value == "12" # Aborted update wrote nothing
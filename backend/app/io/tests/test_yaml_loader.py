@@ -1,17 +1,32 @@
+import os
+import threading
 import pytest
 import yaml
 from pathlib import Path
 from pydantic import BaseModel
 from typing import List
 
+from app.io import yaml_loader
 from app.io.yaml_loader import (
     save_yaml,
     load_yaml,
     load_all_yaml,
     delete_yaml,
     clear_all_yaml_data,
-    DATA_BASE_PATH,
-    get_path_for_type
+    get_path_for_type,
+    get_cache_stats,
+    clear_cache,
+    asave_yaml,
+    aload_yaml,
+    aload_all_yaml,
+    adelete_yaml,
+    aclear_all_yaml_data,
+    configure_io_pool,
+    load_yaml_entry,
+    load_all_yaml_entries,
+    commit_yaml_batch,
+    BatchCommitError,
+    create_yaml
 )
 
 # Define a simple Pydantic model for testing
@@ -24,19 +39,19 @@ class TestItem(BaseModel):
 @pytest.fixture(autouse=True)
 def manage_test_data_files():
     # Ensure directories exist before tests
-    (DATA_BASE_PATH / 'test_items').mkdir(parents=True, exist_ok=True)
-    (DATA_BASE_PATH / 'empty_items').mkdir(parents=True, exist_ok=True)
+    (yaml_loader.DATA_BASE_PATH / 'test_items').mkdir(parents=True, exist_ok=True)
+    (yaml_loader.DATA_BASE_PATH / 'empty_items').mkdir(parents=True, exist_ok=True)
     yield
     # Teardown: Clean up test files and directories after tests
     clear_all_yaml_data('test_items')
     clear_all_yaml_data('empty_items')
     # Attempt to remove directories if they are empty
     try:
-        (DATA_BASE_PATH / 'test_items').rmdir()
+        (yaml_loader.DATA_BASE_PATH / 'test_items').rmdir()
     except OSError:
         pass # Directory not empty or other issue
     try:
-        (DATA_BASE_PATH / 'empty_items').rmdir()
+        (yaml_loader.DATA_BASE_PATH / 'empty_items').rmdir()
     except OSError:
         pass
 
@@ -127,7 +142,7 @@ def test_clear_all_yaml_data():
     assert len(load_all_yaml(data_type, TestItem)) == 0
 
     # Check if directory still exists (it should, but be empty)
-    type_path = DATA_BASE_PATH / data_type
+    type_path = yaml_loader.DATA_BASE_PATH / data_type
     assert type_path.exists()
     assert not any(type_path.glob('*.yaml'))
 
@@ -152,3 +167,300 @@ def test_load_yaml_with_invalid_content_for_model():
     loaded_item = load_yaml(data_type, item_id, TestItem)
     # Pydantic validation error (TypeError) should be caught by load_yaml and return None
     assert loaded_item is None, "Loading YAML with content not matching model should result in None"
+
+def test_load_yaml_served_from_cache_until_file_changes():
+    data_type = "test_items"
+    item_id = "cached_item"
+    save_yaml(data_type, item_id, TestItem(id=item_id, value="Original"))
+    clear_cache()
+
+    first = load_yaml(data_type, item_id, TestItem)
+    second = load_yaml(data_type, item_id, TestItem)
+    assert first == second and first is not second # Second load is a cache hit, no re-parse, but a copy
+    stats = get_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+    # Edit the file behind the loader's back (e.g. by hand or by an LLM)
+    file_path = get_path_for_type(data_type, item_id)
+    with open(file_path, 'w') as f:
+        yaml.dump({"id": item_id, "value": "Edited on disk", "tags": ["x"]}, f)
+    stat = file_path.stat()
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000)) # Guard against coarse mtime resolution
+
+    reloaded = load_yaml(data_type, item_id, TestItem)
+    assert reloaded.value == "Edited on disk"
+    assert get_cache_stats()["misses"] == 2
+
+def test_mutating_a_loaded_or_saved_model_does_not_change_the_cache():
+    data_type = "test_items"
+    item = TestItem(id="owned", value="Original", tags=["a"])
+    save_yaml(data_type, "owned", item)
+    item.tags.append("saved")
+
+    loaded = load_yaml(data_type, "owned", TestItem) # Cache hit
+    assert loaded.tags == ["a"]
+    loaded.value = "Mutated"
+    loaded.tags.append("loaded")
+    clear_cache()
+    miss = load_yaml(data_type, "owned", TestItem) # Cache miss
+    miss.tags.append("missed")
+
+    assert load_yaml(data_type, "owned", TestItem) == TestItem(id="owned", value="Original", tags=["a"])
+    assert load_all_yaml(data_type, TestItem) == [TestItem(id="owned", value="Original", tags=["a"])]
+
+def test_load_all_yaml_uses_cache_and_drops_removed_files():
+    data_type = "test_items"
+    save_yaml(data_type, "cache_all1", TestItem(id="cache_all1", value="V1"))
+    save_yaml(data_type, "cache_all2", TestItem(id="cache_all2", value="V2"))
+    clear_cache()
+
+    assert len(load_all_yaml(data_type, TestItem)) == 2
+    assert len(load_all_yaml(data_type, TestItem)) == 2
+    stats = get_cache_stats()
+    assert stats["misses"] == 2
+    assert stats["hits"] == 2
+
+    os.remove(get_path_for_type(data_type, "cache_all1")) # Removed outside of delete_yaml
+    assert [item.id for item in load_all_yaml(data_type, TestItem)] == ["cache_all2"]
+    assert get_cache_stats()["entries"][data_type] == 1
+
+@pytest.mark.asyncio
+async def test_async_storage_api_round_trip():
+    data_type = "test_items"
+    item = TestItem(id="async_item", value="Async")
+
+    await asave_yaml(data_type, item.id, item)
+    loaded = await aload_yaml(data_type, item.id, TestItem)
+    assert loaded == item
+    assert [i.id for i in await aload_all_yaml(data_type, TestItem)] == ["async_item"]
+
+    assert await adelete_yaml(data_type, item.id) is True
+    assert await aload_yaml(data_type, item.id, TestItem) is None
+    await asave_yaml(data_type, item.id, item)
+    await aclear_all_yaml_data(data_type)
+    assert await aload_all_yaml(data_type, TestItem) == []
+
+def test_configure_io_pool_rejects_invalid_size():
+    with pytest.raises(ValueError):
+        configure_io_pool(0)
+
+def test_uses_libyaml_when_available():
+    if yaml.__with_libyaml__:
+        assert yaml_loader.YamlLoader is yaml.CSafeLoader
+        assert yaml_loader.YamlDumper is yaml.CSafeDumper
+    else:
+        assert yaml_loader.YamlLoader is yaml.SafeLoader
+        assert yaml_loader.YamlDumper is yaml.SafeDumper
+
+def test_sidecar_skips_yaml_parsing_until_source_changes(monkeypatch):
+    monkeypatch.setattr(yaml_loader, "SIDECAR_CACHE_ENABLED", True)
+    data_type = "test_items"
+    item_id = "sidecar_item"
+    file_path = get_path_for_type(data_type, item_id)
+    with open(file_path, 'w') as f:
+        yaml.dump({"id": item_id, "value": "From YAML"}, f)
+
+    clear_cache()
+    assert load_yaml(data_type, item_id, TestItem).value == "From YAML" # Parses and writes the sidecar
+    assert yaml_loader._sidecar_path(file_path).exists()
+
+    def fail_parse(*args, **kwargs):
+        raise AssertionError("YAML should not be parsed while the sidecar is current")
+    monkeypatch.setattr(yaml_loader.yaml, "load", fail_parse)
+    clear_cache()
+    assert load_yaml(data_type, item_id, TestItem).value == "From YAML"
+    monkeypatch.undo()
+    monkeypatch.setattr(yaml_loader, "SIDECAR_CACHE_ENABLED", True)
+
+    # The YAML file stays the source of truth: a changed file invalidates the sidecar
+    with open(file_path, 'w') as f:
+        yaml.dump({"id": item_id, "value": "Edited YAML"}, f)
+    clear_cache()
+    assert load_yaml(data_type, item_id, TestItem).value == "Edited YAML"
+
+    assert delete_yaml(data_type, item_id) is True
+    assert not yaml_loader._sidecar_path(file_path).exists()
+
+def test_load_yaml_entry_digest_matches_file_content():
+    import hashlib
+    data_type = "test_items"
+    save_yaml(data_type, "digest_item", TestItem(id="digest_item", value="D"))
+    entry = load_yaml_entry(data_type, "digest_item", TestItem)
+    with open(get_path_for_type(data_type, "digest_item"), 'rb') as f:
+        assert entry.digest == hashlib.sha256(f.read()).hexdigest()
+    assert entry.model.value == "D"
+
+    clear_cache() # Digest is the same whether the entry comes from disk or from the cache
+    assert load_yaml_entry(data_type, "digest_item", TestItem).digest == entry.digest
+    assert [e.digest for e in load_all_yaml_entries(data_type, TestItem)] == [entry.digest]
+    assert load_yaml_entry(data_type, "missing_item", TestItem) is None
+
+def test_commit_yaml_batch_writes_and_deletes():
+    data_type = "test_items"
+    save_yaml(data_type, "batch_old", TestItem(id="batch_old", value="Old"))
+    save_yaml(data_type, "batch_gone", TestItem(id="batch_gone", value="Gone"))
+
+    commit_yaml_batch(
+        [(data_type, "batch_old", TestItem(id="batch_old", value="New")),
+         (data_type, "batch_new", TestItem(id="batch_new", value="Added"))],
+        [(data_type, "batch_gone")],
+    )
+    assert load_yaml(data_type, "batch_old", TestItem).value == "New"
+    assert load_yaml(data_type, "batch_new", TestItem).value == "Added"
+    assert load_yaml(data_type, "batch_gone", TestItem) is None
+    leftovers = [p.name for p in (yaml_loader.DATA_BASE_PATH / data_type).iterdir() if p.name.startswith('.batch')]
+    assert leftovers == [] # Temp files and backups are cleaned up
+
+def test_update_yaml_applies_updater_under_lock():
+    data_type = "test_items"
+    assert yaml_loader.update_yaml(data_type, "missing", TestItem, lambda entry: entry.model) is None
+    save_yaml(data_type, "counter", TestItem(id="counter", value="0"))
+
+    def increment(entry):
+        return entry.model.model_copy(update={"value": str(int(entry.model.value) + 1)})
+    threads = [threading.Thread(target=yaml_loader.update_yaml, args=(data_type, "counter", TestItem, increment)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    entry = load_yaml_entry(data_type, "counter", TestItem)
+    assert entry.model.value == "8" # No lost updates
+
+    def refuse(entry):
+        raise ValueError("rejected")
+    with pytest.raises(ValueError):
+        yaml_loader.update_yaml(data_type, "counter", TestItem, refuse)
+    assert load_yaml_entry(data_type, "counter", TestItem) == entry
+
+def test_change_listeners_see_every_write():
+    data_type = "test_items"
+    seen = []
+    listener = lambda *change: seen.append(change)
+    yaml_loader.add_change_listener(listener)
+    try:
+        save_yaml(data_type, "listened", TestItem(id="listened", value="V"))
+        assert create_yaml(data_type, "listened", TestItem(id="listened", value="Dup")) is False # No event
+        delete_yaml(data_type, "listened")
+        commit_yaml_batch([(data_type, "batched", TestItem(id="batched", value="B"))], [])
+        clear_all_yaml_data(data_type)
+    finally:
+        yaml_loader.remove_change_listener(listener)
+
+    digest = seen[0][3]
+    assert seen == [
+        (data_type, "listened", "upsert", digest),
+        (data_type, "listened", "delete", None),
+        (data_type, "batched", "upsert", seen[2][3]),
+        (data_type, None, "clear", None),
+    ]
+    assert len(digest) == 64
+
+def test_commit_yaml_batch_rolls_back_on_failure(monkeypatch):
+    data_type = "test_items"
+    save_yaml(data_type, "rollback_a", TestItem(id="rollback_a", value="A1"))
+
+    real_replace = os.replace
+    calls = []
+    def flaky_replace(src, dst):
+        calls.append(dst)
+        if len(calls) == 2: # Fail while swapping in the second file
+            raise OSError("disk full")
+        return real_replace(src, dst)
+    monkeypatch.setattr(yaml_loader.os, "replace", flaky_replace)
+
+    with pytest.raises(BatchCommitError):
+        commit_yaml_batch(
+            [(data_type, "rollback_a", TestItem(id="rollback_a", value="A2")),
+             (data_type, "rollback_b", TestItem(id="rollback_b", value="B"))],
+            [],
+        )
+    monkeypatch.undo()
+    clear_cache()
+    assert load_yaml(data_type, "rollback_a", TestItem).value == "A1" # Restored from backup
+    assert load_yaml(data_type, "rollback_b", TestItem) is None
+    assert not any(p.name.startswith('.rollback') for p in (yaml_loader.DATA_BASE_PATH / data_type).iterdir())
+
+# --- Multiprocess stress tests (what `uvicorn --workers N` would do to the store) ---
+def _race_create(data_type, item_id, worker, results):
+    results.put((worker, create_yaml(data_type, item_id, TestItem(id=item_id, value=f"worker-{worker}"))))
+
+def _rewrite_loop(data_type, item_id, iterations):
+    for n in range(iterations):
+        save_yaml(data_type, item_id, TestItem(id=item_id, value="v" * (n % 200), tags=[str(i) for i in range(n % 30)]))
+
+def _read_loop(file_path, item_id, iterations, bad_reads):
+    for _ in range(iterations):
+        with open(file_path, 'r') as f:
+            content = yaml.safe_load(f) # Read the file directly, bypassing the cache
+        if not content or content.get('id') != item_id:
+            with bad_reads.get_lock():
+                bad_reads.value += 1
+
+@pytest.fixture
+def fork_context():
+    import multiprocessing
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        pytest.skip("multiprocess stress tests need the fork start method")
+    return multiprocessing.get_context('fork')
+
+def test_concurrent_creates_across_processes_have_one_winner(fork_context):
+    data_type = "test_items"
+    item_id = "raced_item"
+    results = fork_context.Queue()
+    workers = [fork_context.Process(target=_race_create, args=(data_type, item_id, n, results)) for n in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+    outcomes = [results.get(timeout=5) for _ in workers]
+
+    winners = [worker for worker, created in outcomes if created]
+    assert len(winners) == 1
+    clear_cache()
+    assert load_yaml(data_type, item_id, TestItem).value == f"worker-{winners[0]}"
+
+def test_readers_never_see_partial_writes_across_processes(fork_context):
+    data_type = "test_items"
+    item_id = "stressed_item"
+    save_yaml(data_type, item_id, TestItem(id=item_id, value="initial"))
+    file_path = get_path_for_type(data_type, item_id)
+    bad_reads = fork_context.Value('i', 0)
+
+    processes = [fork_context.Process(target=_rewrite_loop, args=(data_type, item_id, 150)) for _ in range(3)]
+    processes += [fork_context.Process(target=_read_loop, args=(file_path, item_id, 300, bad_reads)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    assert bad_reads.value == 0
+    assert not any(p.name.startswith('.stressed_item') for p in file_path.parent.iterdir()) # No temp files left behind
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_preload_all_yaml_warms_cache_and_reports_errors(monkeypatch, workers):
+    from app.models import ViewConfig
+    data_type = "test_items"
+    for n in range(5):
+        save_yaml(data_type, f"view{n}", ViewConfig(id=f"view{n}", type="text", content=f"text {n}"))
+    type_path = yaml_loader.DATA_BASE_PATH / data_type
+    (type_path / "broken.yaml").write_text("id: [unclosed\n")
+    (type_path / "invalid.yaml").write_text("id: invalid\n") # No 'type'
+    (type_path / "empty.yaml").write_text("")
+    monkeypatch.setattr(yaml_loader, "PRELOAD_CHUNK_SIZE", 3) # Several chunks, so the pool is used
+    clear_cache()
+
+    report = yaml_loader.preload_all_yaml({data_type: ViewConfig}, workers=workers)
+    assert report.engine == "yaml"
+    assert report.workers == workers
+    assert report.loaded == {data_type: 5}
+    assert sorted(Path(error["path"]).name for error in report.errors) == ["broken.yaml", "invalid.yaml"]
+    assert all(error["data_type"] == data_type for error in report.errors)
+
+    # Every valid config is now served from the cache without being parsed again
+    assert get_cache_stats()["entries"][data_type] == 5
+    models = load_all_yaml(data_type, ViewConfig)
+    assert [model.content for model in models] == [f"text {n}" for n in range(5)]
+    assert get_cache_stats()["misses"] == 3 # Only the bad and empty files are read again
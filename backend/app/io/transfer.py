@@ -0,0 +1,100 @@
+"""Export/import between the active storage backend and a directory of YAML files.
+
+Keeps "GUI = YAML" true whatever engine is configured: a SQLite store can always be dumped to
+(or seeded from) the same layouts/, views/, modules/ layout the YAML backend uses.
+
+Usage (from backend/):
+    python -m app.io.transfer export <dir>
+    python -m app.io.transfer import <dir> [--replace]
+"""
+import argparse
+import yaml
+from pathlib import Path
+from typing import Dict, List
+
+from app.io.storage import StorageBackend
+from app.io.yaml_loader import YamlDumper, YamlLoader, commit_yaml_batch, get_storage_backend, safe_filename_for
+from app.models import CONFIG_TYPES
+
+
+def export_to_yaml_dir(target_dir: Path | str, backend: StorageBackend | None = None) -> Dict[str, int]:
+    """Writes every config of the backend to target_dir/<data type>/<id>.yaml; returns counts per data type."""
+    backend = backend or get_storage_backend()
+    counts: Dict[str, int] = {}
+    for data_type_name, model_class in CONFIG_TYPES.values():
+        type_dir = Path(target_dir) / data_type_name
+        type_dir.mkdir(parents=True, exist_ok=True)
+        counts[data_type_name] = 0
+        for entry in backend.iter_all(data_type_name, model_class):
+            with open(type_dir / safe_filename_for(entry.model.id), 'w') as f:
+                yaml.dump(entry.model.model_dump(), f, Dumper=YamlDumper, sort_keys=False, indent=2)
+            counts[data_type_name] += 1
+    return counts
+
+
+def import_from_yaml_dir(source_dir: Path | str, backend: StorageBackend | None = None, replace: bool = False) -> Dict[str, int]:
+    """Validates every YAML file under source_dir and saves it to the backend in one batch.
+
+    With replace=True, configs of the backend that are not in source_dir are deleted. Raises
+    ValueError (and writes nothing) if any file cannot be parsed or validated, or if a module
+    references a layout that would not exist after the import. The active backend is written
+    through commit_yaml_batch, so change listeners (change feed, history, indexes) see the import.
+    """
+    active = get_storage_backend()
+    backend = backend or active
+    writes = []
+    deletes = []
+    counts: Dict[str, int] = {}
+    layout_refs: Dict[str, List[str]] = {} # layout id -> modules referencing it
+    for data_type_name, model_class in CONFIG_TYPES.values():
+        type_dir = Path(source_dir) / data_type_name
+        imported_files = set()
+        for file_path in sorted(type_dir.glob('*.yaml')) if type_dir.exists() else []:
+            try:
+                with open(file_path, 'rb') as f:
+                    content = yaml.load(f, Loader=YamlLoader)
+                model = model_class(**(content or {}))
+            except (yaml.YAMLError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid config file {file_path}: {e}") from e
+            writes.append((data_type_name, model.id, model))
+            imported_files.add(safe_filename_for(model.id))
+            if data_type_name == 'modules':
+                layout_refs.setdefault(model.layout_id, []).append(model.id)
+        counts[data_type_name] = len(imported_files)
+        if data_type_name == 'layouts': # CONFIG_TYPES lists layouts before modules
+            available_layouts = set(imported_files)
+            if not replace:
+                available_layouts.update(safe_filename_for(data_id) for data_id in backend.list_ids('layouts'))
+        if replace:
+            # Compared by file name: the YAML backend lists file stems ('my_layout' for the id 'my layout')
+            deletes.extend((data_type_name, data_id) for data_id in backend.list_ids(data_type_name)
+                           if safe_filename_for(data_id) not in imported_files)
+    for layout_id, module_ids in sorted(layout_refs.items()):
+        if safe_filename_for(layout_id) not in available_layouts:
+            raise ValueError(f"Layout with ID '{layout_id}' referenced by modules {', '.join(module_ids)} not found.")
+    if backend is active:
+        commit_yaml_batch(writes, deletes)
+    else:
+        backend.commit_batch(writes, deletes)
+    return counts
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Export or import Inkstone configs as YAML files.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    export_parser = subcommands.add_parser("export", help="write every config to a YAML directory")
+    export_parser.add_argument("directory")
+    import_parser = subcommands.add_parser("import", help="load configs from a YAML directory")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--replace", action="store_true", help="delete configs that are not in the directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        counts = export_to_yaml_dir(args.directory)
+    else:
+        counts = import_from_yaml_dir(args.directory, replace=args.replace)
+    print(", ".join(f"{count} {data_type_name}" for data_type_name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
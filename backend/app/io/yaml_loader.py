@@ -1,9 +1,33 @@
 import yaml
 import os
+import asyncio
+import contextvars
+import functools
+import itertools
+import hashlib
+import logging
+import marshal
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, List, TypeVar, Type
+from typing import Callable, Dict, Any, AsyncIterator, Iterable, Iterator, List, NamedTuple, TypeVar, Type
 from pydantic import BaseModel
 
+from app import metrics
+from app.io.sharding import Manifest, ShardScheme, entry_for_file, read_scheme, write_scheme
+from app.io.storage import BatchCommitError, ConfigEntry, PreloadReport, StorageBackend
+from app.models import LOAD_CONTEXT
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
 # Define a base path for where YAML files will be stored.
 # ../inkstone_data relative to the location of yaml_loader.py (backend/app/io)
 # So, this should point to the project_root/inkstone_data
@@ -11,13 +35,265 @@ DATA_BASE_PATH = Path(__file__).resolve().parent.parent.parent / "inkstone_data"
 
 T = TypeVar('T', bound=BaseModel)
 
+# Use the libyaml C loader/dumper when PyYAML was built against it; fall back to the pure-Python ones.
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+# Optional compiled sidecar cache: the parsed YAML content is stored next to the source file
+# (in a hidden .sidecar/ directory) keyed by the SHA-256 of the YAML bytes, so later reads can
+# skip YAML parsing until the source changes. The YAML file remains the source of truth.
+SIDECAR_CACHE_ENABLED = os.environ.get("INKSTONE_SIDECAR_CACHE", "0") == "1"
+SIDECAR_DIR_NAME = ".sidecar"
+_SIDECAR_FORMAT = 1
+
+# Size of the thread pool used by the async (a*) storage functions.
+IO_POOL_SIZE = int(os.environ.get("INKSTONE_IO_THREADS", "8"))
+
+# Startup preload (see preload_all_yaml): worker processes used to parse the data directory, and
+# files handed to a worker per task. Directories with at most one chunk are parsed in-process.
+PRELOAD_WORKERS = int(os.environ.get("INKSTONE_PRELOAD_WORKERS", str(os.cpu_count() or 1)))
+PRELOAD_CHUNK_SIZE = int(os.environ.get("INKSTONE_PRELOAD_CHUNK_SIZE", "256"))
+
+# Hashed-prefix sharding (see app/io/sharding.py): data type directories created while this is
+# above 0 spread their files over that many levels of shard directories and keep a manifest.
+# Existing directories keep the layout they were created with until migrated.
+SHARD_LEVELS = int(os.environ.get("INKSTONE_YAML_SHARD_LEVELS", "0"))
+
+logger = logging.getLogger(__name__)
+
+# --- Metrics (exposed on /metrics) ---
+_YAML_PARSE_SECONDS = metrics.histogram("inkstone_yaml_parse_seconds", "Time spent parsing YAML files.")
+_YAML_DUMP_SECONDS = metrics.histogram("inkstone_yaml_dump_seconds", "Time spent serializing configs to YAML.")
+STORAGE_BYTES_READ = metrics.counter("inkstone_storage_bytes_read", "Bytes of stored configs read.", ("backend",))
+STORAGE_BYTES_WRITTEN = metrics.counter("inkstone_storage_bytes_written", "Bytes of configs written to storage.", ("backend",))
+_FILES_SCANNED = metrics.histogram("inkstone_storage_files_scanned", "YAML files visited per full listing of a data type.",
+                                   ("data_type",), buckets=(1, 10, 100, 1000, 10000, 100000))
+_STORAGE_CALL_SECONDS = metrics.histogram("inkstone_storage_call_seconds",
+                                          "Time spent in async storage calls, including waiting for a pool thread.", ("operation",))
+_CACHE_HITS = metrics.counter("inkstone_model_cache_hits", "Model cache lookups served from memory.")
+_CACHE_MISSES = metrics.counter("inkstone_model_cache_misses", "Model cache lookups that had to read the file.")
+
+# --- In-process model cache ---
+# Validated models are kept per data type and keyed by file path. An entry is only
+# reused while the file's (mtime_ns, size) signature is unchanged, so edits made to
+# the YAML files by hand (or by an LLM) outside this process are still picked up.
+# The cache owns its models: it stores a copy of what it is given and hands out copies, so a
+# caller mutating a model it loaded (or saved) cannot change what later loads return.
+@dataclass
+class _CacheEntry:
+    mtime_ns: int
+    size: int
+    model_class: type
+    model: BaseModel
+    digest: str
+
+_cache: Dict[str, Dict[Path, _CacheEntry]] = {}
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+def _cache_get(data_type_name: str, file_path: Path, stat: os.stat_result, model_class: Type[T]) -> ConfigEntry | None:
+    """Returns the cached entry for file_path if its on-disk signature still matches."""
+    with _cache_lock:
+        entry = _cache.get(data_type_name, {}).get(file_path)
+        hit = (entry is not None and entry.model_class is model_class
+               and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size)
+        _cache_stats["hits" if hit else "misses"] += 1
+    if not hit:
+        _CACHE_MISSES.inc()
+        return None
+    _CACHE_HITS.inc()
+    return ConfigEntry(entry.model.model_copy(deep=True), entry.digest)
+
+def _cache_put(data_type_name: str, file_path: Path, stat: os.stat_result, model: BaseModel, digest: str,
+               copy: bool = True) -> None:
+    """Caches model for file_path; pass copy=False only for a model no caller holds."""
+    if copy:
+        model = model.model_copy(deep=True)
+    with _cache_lock:
+        _cache.setdefault(data_type_name, {})[file_path] = _CacheEntry(
+            stat.st_mtime_ns, stat.st_size, type(model), model, digest
+        )
+
+def _cache_evict(data_type_name: str, file_path: Path) -> None:
+    with _cache_lock:
+        _cache.get(data_type_name, {}).pop(file_path, None)
+
+def _cache_prune(data_type_name: str, live_paths: set) -> None:
+    """Drops entries for files that disappeared from disk without going through delete_yaml."""
+    with _cache_lock:
+        entries = _cache.get(data_type_name, {})
+        for stale_path in [path for path in entries if path not in live_paths]:
+            del entries[stale_path]
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Returns cache hit/miss counters and the number of cached entries per data type."""
+    with _cache_lock:
+        lookups = _cache_stats["hits"] + _cache_stats["misses"]
+        return {
+            "hits": _cache_stats["hits"],
+            "misses": _cache_stats["misses"],
+            "hit_ratio": _cache_stats["hits"] / lookups if lookups else 0.0,
+            "entries": {name: len(entries) for name, entries in _cache.items()},
+        }
+
+metrics.gauge("inkstone_model_cache_hit_ratio", "Share of model cache lookups served from memory since the last reset.",
+              callback=lambda: get_cache_stats()["hit_ratio"])
+metrics.gauge("inkstone_model_cache_entries", "Models currently held in the cache.",
+              callback=lambda: sum(get_cache_stats()["entries"].values()))
+
+def clear_cache() -> None:
+    """Drops every cached model and resets the hit/miss counters."""
+    with _cache_lock:
+        _cache.clear()
+        _cache_stats["hits"] = 0
+        _cache_stats["misses"] = 0
+
+def _load_entry(data_type_name: str, file_path: Path, model_class: Type[T]) -> ConfigEntry | None:
+    """Loads one YAML file through the cache. Raises on I/O, YAML or validation errors."""
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        _cache_evict(data_type_name, file_path)
+        return None
+    cached = _cache_get(data_type_name, file_path, stat, model_class)
+    if cached is not None:
+        return cached
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    STORAGE_BYTES_READ.labels("yaml").inc(len(raw))
+    digest = hashlib.sha256(raw).hexdigest()
+    content = _parse_yaml_bytes(file_path, raw, digest)
+    if content is None: # File is empty
+        _cache_evict(data_type_name, file_path)
+        return None
+    model = model_class.model_validate(content, context=LOAD_CONTEXT)
+    _cache_put(data_type_name, file_path, stat, model, digest)
+    return ConfigEntry(model, digest)
+
+# --- Compiled sidecar cache ---
+def _sidecar_path(file_path: Path) -> Path:
+    return file_path.parent / SIDECAR_DIR_NAME / (file_path.name + ".bin")
+
+def _read_sidecar(file_path: Path, digest: str) -> tuple[bool, Any]:
+    """Returns (True, content) if a sidecar exists for exactly this version of the YAML file."""
+    try:
+        with open(_sidecar_path(file_path), 'rb') as f:
+            fmt, sidecar_digest, content = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return False, None
+    if fmt != _SIDECAR_FORMAT or sidecar_digest != digest:
+        return False, None
+    return True, content
+
+def _write_sidecar(file_path: Path, digest: str, content: Any) -> None:
+    """Best-effort write of a sidecar; content that marshal cannot encode (e.g. dates) is skipped."""
+    sidecar_path = _sidecar_path(file_path)
+    try:
+        payload = marshal.dumps((_SIDECAR_FORMAT, digest, content))
+        sidecar_path.parent.mkdir(exist_ok=True)
+        tmp_path = sidecar_path.with_name(sidecar_path.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, sidecar_path)
+    except (OSError, ValueError):
+        pass
+
+def _remove_sidecar(file_path: Path) -> None:
+    try:
+        os.remove(_sidecar_path(file_path))
+    except OSError:
+        pass
+
+def _parse_yaml_bytes(file_path: Path, raw: bytes, digest: str) -> Any:
+    """Parses YAML bytes, going through the compiled sidecar when it is enabled."""
+    if SIDECAR_CACHE_ENABLED:
+        found, content = _read_sidecar(file_path, digest)
+        if found:
+            return content
+    started = time.perf_counter()
+    content = yaml.load(raw, Loader=YamlLoader)
+    elapsed = time.perf_counter() - started
+    _YAML_PARSE_SECONDS.observe(elapsed)
+    metrics.record_timing("yaml-parse", elapsed)
+    if SIDECAR_CACHE_ENABLED and content is not None:
+        _write_sidecar(file_path, digest, content)
+    return content
+
+# --- Directory layout ---
+# Whether a data type directory is flat or sharded is read from its marker once per process, and
+# directories are created once: path lookups then cost no filesystem call at all.
+class _ShardedType(NamedTuple):
+    scheme: ShardScheme
+    manifest: Manifest
+
+_type_layouts: Dict[Path, _ShardedType | None] = {}
+_known_dirs: set = set()
+_layouts_lock = threading.Lock()
+
+def forget_directory_layouts() -> None:
+    """Forgets which data type directories are sharded and which directories exist, e.g. after
+    they were migrated or removed by another process."""
+    with _layouts_lock:
+        _type_layouts.clear()
+        _known_dirs.clear()
+
+def manifest_lock_path(data_type_name: str) -> Path:
+    return DATA_BASE_PATH / LOCKS_DIR_NAME / data_type_name / ".manifest.lock"
+
+def _sharded_type(data_type_name: str) -> _ShardedType | None:
+    """Returns the scheme and manifest of a sharded data type, or None for a flat one."""
+    type_path = DATA_BASE_PATH / data_type_name
+    with _layouts_lock:
+        if type_path in _type_layouts:
+            return _type_layouts[type_path]
+        scheme = read_scheme(type_path)
+        if scheme is None and SHARD_LEVELS > 0 and next(type_path.glob('*.yaml'), None) is None:
+            # A new (or empty) directory starts out sharded
+            type_path.mkdir(parents=True, exist_ok=True)
+            scheme = ShardScheme(SHARD_LEVELS)
+            write_scheme(type_path, scheme)
+        layout = _ShardedType(scheme, Manifest(type_path, manifest_lock_path(data_type_name))) if scheme is not None else None
+        _type_layouts[type_path] = layout
+        return layout
+
+def _ensure_dir(path: Path) -> None:
+    if path in _known_dirs:
+        return
+    path.mkdir(parents=True, exist_ok=True)
+    with _layouts_lock:
+        _known_dirs.add(path)
+
 def get_path_for_type(data_type_name: str, data_id: str) -> Path:
     """Constructs a file path for a given data type and ID."""
     # data_type_name will be 'layouts', 'views', 'modules'
     # data_id will be the filename (e.g., 'my_layout.yaml')
     type_path = DATA_BASE_PATH / data_type_name
-    type_path.mkdir(parents=True, exist_ok=True) # Ensure directory exists
+    file_name = safe_filename_for(data_id)
+    sharded = _sharded_type(data_type_name)
+    file_path = type_path / sharded.scheme.relative_path(file_name) if sharded is not None else type_path / file_name
+    _ensure_dir(file_path.parent) # Ensure directory exists
+    return file_path
+
+def _record_put(data_type_name: str, file_path: Path, stat: os.stat_result, digest: str) -> dict | None:
+    """Returns the manifest record of a written file (None for a flat data type)."""
+    sharded = _sharded_type(data_type_name)
+    if sharded is None:
+        return None
+    return entry_for_file(sharded.manifest.type_path, file_path, stat, digest).to_record()
 
+def _record_delete(data_type_name: str, file_path: Path) -> dict | None:
+    return {"op": "del", "id": file_path.stem} if _sharded_type(data_type_name) is not None else None
+
+def _append_manifest(data_type_name: str, records: List[dict | None]) -> None:
+    sharded = _sharded_type(data_type_name)
+    records = [record for record in records if record is not None]
+    if sharded is not None and records:
+        sharded.manifest.append(records)
+
+def safe_filename_for(data_id: str) -> str:
+    """Returns the YAML file name used to store a config id."""
     # Ensure data_id is a safe filename
     # If data_id already ends with .yaml, sanitize the base name part. Otherwise, sanitize the whole data_id.
     if data_id.lower().endswith('.yaml'):
@@ -28,78 +304,737 @@ def get_path_for_type(data_type_name: str, data_id: str) -> Path:
         extension = ".yaml"
 
     sanitized_base_name = "".join(c if c.isalnum() or c in ('_', '-') else '_' for c in base_name_to_sanitize)
-    safe_filename = sanitized_base_name + extension
+    return sanitized_base_name + extension
 
-    return type_path / safe_filename
+def _dump_model(data: BaseModel) -> tuple[Any, bytes]:
+    """Returns the plain content of a model and its YAML encoding."""
+    started = time.perf_counter()
+    content = data.model_dump()
+    raw = yaml.dump(content, Dumper=YamlDumper, sort_keys=False, indent=2).encode('utf-8')
+    elapsed = time.perf_counter() - started
+    _YAML_DUMP_SECONDS.observe(elapsed)
+    metrics.record_timing("yaml-dump", elapsed)
+    return content, raw
 
-def save_yaml(data_type_name: str, data_id: str, data: BaseModel) -> None:
-    """Saves a Pydantic model instance to a YAML file."""
+def _temp_path_for(file_path: Path, suffix: str = "tmp") -> Path:
+    # Hidden (dot-prefixed) and not ending in .yaml, so globbing never picks it up
+    return file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex}.{suffix}")
+
+def _create_file(path: Path):
+    """Opens path for writing, recreating its directory if it was removed since _ensure_dir saw it."""
+    try:
+        return open(path, 'wb')
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(path, 'wb')
+
+def _write_temp(file_path: Path, raw: bytes) -> Path:
+    """Writes raw to a durable temp file next to file_path and returns its path."""
+    temp_path = _temp_path_for(file_path)
+    try:
+        with _create_file(temp_path) as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+    except OSError:
+        _remove_quietly(temp_path)
+        raise
+    STORAGE_BYTES_WRITTEN.labels("yaml").inc(len(raw))
+    return temp_path
+
+def _atomic_write(file_path: Path, raw: bytes) -> None:
+    """Replaces file_path with raw in one rename, so readers never observe a partially written file."""
+    temp_path = _write_temp(file_path, raw)
+    try:
+        os.replace(temp_path, file_path)
+    except OSError:
+        _remove_quietly(temp_path)
+        raise
+
+# --- Per-id advisory locks ---
+# Locks are flock()ed files under DATA_BASE_PATH/.locks/<type>/, so they serialize writers across
+# threads and across worker processes (uvicorn --workers N) alike. Where fcntl is unavailable
+# (Windows) they degrade to in-process locks.
+LOCKS_DIR_NAME = ".locks"
+_fallback_locks: Dict[Path, threading.Lock] = {}
+_fallback_locks_guard = threading.Lock()
+
+def _lock_path_for(data_type_name: str, data_id: str) -> Path:
+    return DATA_BASE_PATH / LOCKS_DIR_NAME / data_type_name / (safe_filename_for(data_id) + ".lock")
+
+@contextmanager
+def config_lock(data_type_name: str, data_id: str) -> Iterator[None]:
+    """Holds an exclusive cross-process lock on one config id for the duration of the block.
+
+    The lock is not re-entrant: do not call the locking storage functions from inside it.
+    """
+    lock_path = _lock_path_for(data_type_name, data_id)
+    if fcntl is None:
+        with _fallback_locks_guard:
+            lock = _fallback_locks.setdefault(lock_path, threading.Lock())
+        with lock:
+            yield
+        return
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def _config_locks(keys: List[tuple[str, str]]) -> Iterator[None]:
+    """Acquires several config locks in a global (sorted, de-duplicated) order to avoid deadlocks."""
+    ordered = sorted({(t, safe_filename_for(i)): (t, i) for t, i in keys}.items())
+    with ExitStack() as stack:
+        for _, (data_type_name, data_id) in ordered:
+            stack.enter_context(config_lock(data_type_name, data_id))
+        yield
+
+# --- YAML directory implementation (used by YamlDirectoryBackend) ---
+def _save_unlocked(data_type_name: str, data_id: str, data: BaseModel) -> str:
+    """Writes data and returns the digest of the written bytes."""
     file_path = get_path_for_type(data_type_name, data_id)
     try:
-        with open(file_path, 'w') as f:
-            yaml.dump(data.model_dump(), f, sort_keys=False, indent=2)
+        content, raw = _dump_model(data)
+        _atomic_write(file_path, raw)
+        digest = hashlib.sha256(raw).hexdigest()
+        if SIDECAR_CACHE_ENABLED:
+            _write_sidecar(file_path, digest, content)
+        stat = file_path.stat()
+        _cache_put(data_type_name, file_path, stat, data, digest)
+        _append_manifest(data_type_name, [_record_put(data_type_name, file_path, stat, digest)])
+        return digest
     except IOError as e:
-        # Handle exceptions (e.g., log them, raise custom exception)
-        print(f"Error saving YAML file {file_path}: {e}") # Replace with proper logging
+        _cache_evict(data_type_name, file_path)
+        logger.error("Error saving YAML file %s: %s", file_path, e, extra={"path": str(file_path), "data_type": data_type_name})
         raise
 
-def load_yaml(data_type_name: str, data_id: str, model_class: Type[T]) -> T | None:
-    """Loads data from a YAML file and parses it into a Pydantic model instance."""
+def _yaml_save(data_type_name: str, data_id: str, data: BaseModel) -> None:
+    """Saves a Pydantic model instance to a YAML file (atomically, under the id's lock)."""
+    with config_lock(data_type_name, data_id):
+        _save_unlocked(data_type_name, data_id, data)
+
+def _yaml_create(data_type_name: str, data_id: str, data: BaseModel) -> bool:
+    """Saves data only if no valid config with this id exists yet; returns False if one does.
+
+    The existence check and the write happen under the same lock, so concurrent creates of the
+    same id (from any thread or worker process) cannot both succeed.
+    """
+    with config_lock(data_type_name, data_id):
+        if _yaml_load_entry(data_type_name, data_id, type(data)) is not None:
+            return False
+        _save_unlocked(data_type_name, data_id, data)
+        return True
+
+def _yaml_update(data_type_name: str, data_id: str, model_class: Type[T],
+                 updater: Callable[[ConfigEntry], BaseModel]) -> ConfigEntry | None:
+    with config_lock(data_type_name, data_id):
+        entry = _yaml_load_entry(data_type_name, data_id, model_class)
+        if entry is None:
+            return None
+        data = updater(entry)
+        return ConfigEntry(data, _save_unlocked(data_type_name, data_id, data))
+
+def _yaml_load_entry(data_type_name: str, data_id: str, model_class: Type[T]) -> ConfigEntry | None:
     file_path = get_path_for_type(data_type_name, data_id)
-    if not file_path.exists():
-        return None
     try:
-        with open(file_path, 'r') as f:
-            content = yaml.safe_load(f)
-            if content is None: # File is empty
-                return None
-            return model_class(**content)
+        return _load_entry(data_type_name, file_path, model_class)
     except (IOError, yaml.YAMLError, TypeError, ValueError) as e: # Added ValueError for Pydantic validation
-        print(f"Error loading or parsing YAML file {file_path}: {e}") # Replace with proper logging
-        # Consider re-raising or returning a specific error indicator
-        return None # Or raise custom exception
+        logger.warning("Error loading or parsing YAML file %s: %s", file_path, e, extra={"path": str(file_path), "data_type": data_type_name})
+        return None
 
-def load_all_yaml(data_type_name: str, model_class: Type[T]) -> List[T]:
-    """Loads all YAML files from a given data type directory."""
+def _list_files(data_type_name: str) -> List[Path]:
+    """Returns the YAML files of a data type in file name order: from the manifest of a sharded
+    directory, or by listing a flat one."""
     type_path = DATA_BASE_PATH / data_type_name
+    sharded = _sharded_type(data_type_name)
+    if sharded is not None:
+        return [type_path / entry.file for entry in sharded.manifest.entries()]
     if not type_path.exists():
         return []
+    return sorted(type_path.glob('*.yaml'))
 
-    items: List[T] = []
-    for file_path in type_path.glob('*.yaml'):
+def _yaml_iter_entries(data_type_name: str, model_class: Type[T]) -> Iterator[ConfigEntry]:
+    """Yields (model, digest) entries for every YAML file of a data type, in file name order, as they are parsed."""
+    seen_paths = set()
+    for file_path in _list_files(data_type_name):
+        seen_paths.add(file_path)
         try:
-            with open(file_path, 'r') as f:
-                content = yaml.safe_load(f)
-                if content: # Ensure content is not None
-                    items.append(model_class(**content))
+            entry = _load_entry(data_type_name, file_path, model_class)
         except (IOError, yaml.YAMLError, TypeError, ValueError) as e: # Added ValueError
-            print(f"Error loading or parsing YAML file {file_path}: {e}") # Replace
-            # Optionally skip problematic files or handle error differently
-    return items
+            logger.warning("Error loading or parsing YAML file %s: %s", file_path, e, extra={"path": str(file_path), "data_type": data_type_name})
+            continue # Skip problematic files
+        if entry is not None: # Ensure content is not None
+            yield entry
+    _FILES_SCANNED.labels(data_type_name).observe(len(seen_paths))
+    _cache_prune(data_type_name, seen_paths)
 
-def delete_yaml(data_type_name: str, data_id: str) -> bool:
-    """Deletes a specific YAML file."""
+def get_type_mtime_ns(data_type_name: str) -> int | None:
+    """Returns the mtime of a data type directory, which changes whenever a file is added, renamed or removed."""
+    sharded = _sharded_type(data_type_name)
+    if sharded is not None:
+        return sharded.manifest.version() # Files live in the shard directories below
+    try:
+        return (DATA_BASE_PATH / data_type_name).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _yaml_delete(data_type_name: str, data_id: str) -> bool:
+    with config_lock(data_type_name, data_id):
+        return _delete_unlocked(data_type_name, data_id)
+
+def _delete_unlocked(data_type_name: str, data_id: str) -> bool:
     file_path = get_path_for_type(data_type_name, data_id)
     if file_path.exists():
         try:
             os.remove(file_path)
+            _cache_evict(data_type_name, file_path)
+            _remove_sidecar(file_path)
+            _append_manifest(data_type_name, [_record_delete(data_type_name, file_path)])
             return True
         except OSError as e:
-            print(f"Error deleting YAML file {file_path}: {e}") # Replace
+            logger.error("Error deleting YAML file %s: %s", file_path, e, extra={"path": str(file_path), "data_type": data_type_name})
             return False
     return False
 
-def clear_all_yaml_data(data_type_name: str) -> None:
-    """Deletes all YAML files in a given data type directory."""
+def _yaml_clear(data_type_name: str) -> None:
     type_path = DATA_BASE_PATH / data_type_name
     if not type_path.exists():
         return
 
-    for file_path in type_path.glob('*.yaml'):
+    file_paths = _list_files(data_type_name)
+    for file_path in file_paths:
         try:
             os.remove(file_path)
+        except FileNotFoundError:
+            pass
         except OSError as e:
-            print(f"Error deleting file {file_path}: {e}")
+            logger.error("Error deleting YAML file %s: %s", file_path, e, extra={"path": str(file_path), "data_type": data_type_name})
+        _cache_evict(data_type_name, file_path)
+        _remove_sidecar(file_path)
+    for sidecar_dir in {file_path.parent / SIDECAR_DIR_NAME for file_path in file_paths} | {type_path / SIDECAR_DIR_NAME}:
+        try:
+            sidecar_dir.rmdir()
+        except OSError:
+            pass # Missing, or still holds sidecars of files that could not be deleted
+    sharded = _sharded_type(data_type_name)
+    if sharded is not None:
+        sharded.manifest.append([{"op": "clear"}])
     # Optionally, remove the directory itself if it's empty
     # if not any(type_path.iterdir()):
     #     os.rmdir(type_path)
+
+# --- Batch commits ---
+def _yaml_commit_batch(writes: List[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> None:
+    """YAML implementation of commit_yaml_batch.
+
+    New content is first staged in temporary files next to the targets and existing targets are
+    backed up with hard links. Targets are then swapped in with os.replace; if any step fails,
+    files already swapped are rolled back from their backups before BatchCommitError is raised.
+    """
+    with _config_locks([(t, i) for t, i, _ in writes] + list(deletes)):
+        _commit_batch_unlocked(writes, deletes)
+
+def _yaml_commit_stream(writes: Iterable[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> List[tuple[str, str, str]]:
+    """YAML implementation of commit_yaml_stream.
+
+    Staged like a batch, but a whole workspace cannot be locked at once (one open lock file per
+    id), so each target is swapped (and, on failure, rolled back) under its own config lock.
+    """
+    return _commit_batch_unlocked(writes, deletes, stream=True)
+
+def _commit_batch_unlocked(writes: Iterable[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]],
+                           stream: bool = False) -> List[tuple[str, str, str]]:
+    """Stages, swaps in and caches a batch; returns (data_type, id, digest) per write.
+
+    With stream=True, writes are consumed as they are staged, written models are dropped from
+    the cache instead of kept, and each target is locked while it is swapped.
+    """
+    staged = [] # (data_type, data_id, file_path, temp_path, model, content, digest)
+    try:
+        for data_type_name, data_id, data in writes:
+            file_path = get_path_for_type(data_type_name, data_id)
+            content, raw = _dump_model(data)
+            temp_path = _write_temp(file_path, raw)
+            digest = hashlib.sha256(raw).hexdigest()
+            staged.append((data_type_name, data_id, file_path, temp_path, None if stream else data,
+                           None if stream else content, digest))
+    except BaseException as e:
+        for _, _, _, temp_path, *_ in staged:
+            _remove_quietly(temp_path)
+        if isinstance(e, OSError):
+            raise BatchCommitError(f"Could not stage batch: {e}") from e
+        raise
+
+    def target_lock(data_type_name: str, file_path: Path):
+        return config_lock(data_type_name, file_path.name) if stream else nullcontext()
+
+    targets = ([(t, p, temp_path) for t, _, p, temp_path, *_ in staged]
+               + [(t, get_path_for_type(t, i), None) for t, i in deletes])
+    backups: Dict[Path, Path | None] = {}
+    applied: List[tuple[str, Path]] = []
+    try:
+        for data_type_name, file_path, temp_path in targets:
+            with target_lock(data_type_name, file_path):
+                if file_path not in backups:
+                    backup_path = None
+                    if file_path.exists():
+                        backup_path = _temp_path_for(file_path, "bak")
+                        os.link(file_path, backup_path)
+                    backups[file_path] = backup_path
+                if temp_path is not None:
+                    os.replace(temp_path, file_path)
+                    applied.append((data_type_name, file_path))
+                elif file_path.exists():
+                    os.remove(file_path)
+                    applied.append((data_type_name, file_path))
+    except OSError as e:
+        for data_type_name, file_path in reversed(applied):
+            backup_path = backups.get(file_path)
+            try:
+                with target_lock(data_type_name, file_path):
+                    if backup_path is not None:
+                        os.replace(backup_path, file_path)
+                    else:
+                        os.remove(file_path)
+            except OSError as rollback_error:
+                logger.error("Error rolling back %s: %s", file_path, rollback_error, extra={"path": str(file_path)})
+        for _, _, _, temp_path, *_ in staged:
+            _remove_quietly(temp_path)
+        for data_type_name, file_path, _ in targets:
+            _cache_evict(data_type_name, file_path)
+        raise BatchCommitError(f"Could not apply batch: {e}") from e
+    finally:
+        for backup_path in backups.values():
+            if backup_path is not None:
+                _remove_quietly(backup_path)
+
+    records: Dict[str, List[dict | None]] = {}
+    for data_type_name, _, file_path, _, data, content, digest in staged:
+        stat = file_path.stat()
+        if data is None:
+            _cache_evict(data_type_name, file_path)
+            _remove_sidecar(file_path)
+        else:
+            if SIDECAR_CACHE_ENABLED:
+                _write_sidecar(file_path, digest, content)
+            _cache_put(data_type_name, file_path, stat, data, digest)
+        records.setdefault(data_type_name, []).append(_record_put(data_type_name, file_path, stat, digest))
+    for data_type_name, data_id in deletes:
+        file_path = get_path_for_type(data_type_name, data_id)
+        _cache_evict(data_type_name, file_path)
+        _remove_sidecar(file_path)
+        records.setdefault(data_type_name, []).append(_record_delete(data_type_name, file_path))
+    for data_type_name, type_records in records.items():
+        _append_manifest(data_type_name, type_records)
+    return [(data_type_name, data_id, digest) for data_type_name, data_id, *_, digest in staged]
+
+def _remove_quietly(path: Path) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _yaml_list_ids(data_type_name: str) -> List[str]:
+    return sorted(file_path.stem for file_path in _list_files(data_type_name))
+
+# --- Parallel preload ---
+_PRELOAD_ERRORS = (OSError, yaml.YAMLError, TypeError, ValueError) # ValueError covers pydantic validation
+
+def _preload_chunk(model_class: Type[T], paths: List[str]) -> List[tuple]:
+    """Runs in a preload worker: reads, parses and validates files.
+
+    Returns (path, stat, digest, model, error) per file; model is None for an empty file and
+    error is set instead of stat/digest/model when the file cannot be loaded.
+    """
+    results = []
+    for path in paths:
+        file_path = Path(path)
+        try:
+            stat = file_path.stat()
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            content = _parse_yaml_bytes(file_path, raw, digest)
+            model = model_class.model_validate(content, context=LOAD_CONTEXT) if content is not None else None
+        except _PRELOAD_ERRORS as e:
+            results.append((path, None, None, None, f"{type(e).__name__}: {e}"))
+            continue
+        results.append((path, stat, digest, model, None))
+    return results
+
+def _yaml_preload(model_classes: Dict[str, Type[BaseModel]], workers: int) -> PreloadReport:
+    """Parses every YAML file of the given data types into the model cache, across worker processes.
+
+    Files are split into chunks of PRELOAD_CHUNK_SIZE and validated in a process pool (spawned, so no
+    lock held by another thread of this process is inherited); the validated models are sent back
+    pickled and put in the cache with the file signature read before parsing, exactly as
+    _load_entry would. Files that fail are listed in the report and logged, not raised.
+    """
+    started = time.perf_counter()
+    chunks = []
+    for data_type_name in model_classes:
+        paths = [str(file_path) for file_path in _list_files(data_type_name)]
+        chunks += [(data_type_name, paths[i:i + PRELOAD_CHUNK_SIZE]) for i in range(0, len(paths), PRELOAD_CHUNK_SIZE)]
+    workers = max(1, min(workers, len(chunks)))
+    report = PreloadReport(YamlDirectoryBackend.name, workers, {data_type_name: 0 for data_type_name in model_classes})
+    seen_paths: Dict[str, set] = {data_type_name: set() for data_type_name in model_classes}
+
+    def collect(data_type_name: str, results: List[tuple]) -> None:
+        for path, stat, digest, model, error in results:
+            file_path = Path(path)
+            seen_paths[data_type_name].add(file_path)
+            if error is not None:
+                report.errors.append({"data_type": data_type_name, "path": path, "error": error})
+                logger.warning("Error preloading YAML file %s: %s", path, error, extra={"path": path, "data_type": data_type_name})
+            elif model is not None:
+                STORAGE_BYTES_READ.labels("yaml").inc(stat.st_size)
+                _cache_put(data_type_name, file_path, stat, model, digest, copy=False) # Nobody else holds it
+                report.loaded[data_type_name] += 1
+
+    if workers == 1:
+        for data_type_name, paths in chunks:
+            collect(data_type_name, _preload_chunk(model_classes[data_type_name], paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [(data_type_name, pool.submit(_preload_chunk, model_classes[data_type_name], paths))
+                       for data_type_name, paths in chunks]
+            for data_type_name, future in futures:
+                collect(data_type_name, future.result())
+    for data_type_name, paths in seen_paths.items():
+        _FILES_SCANNED.labels(data_type_name).observe(len(paths))
+        _cache_prune(data_type_name, paths)
+    report.seconds = time.perf_counter() - started
+    return report
+
+class YamlDirectoryBackend(StorageBackend):
+    """The default engine: one YAML file per config under DATA_BASE_PATH/<data type>/.
+
+    list_ids() returns file names without the .yaml suffix, which equal the config ids for any id
+    made only of letters, digits, '_' and '-'.
+    """
+
+    name = "yaml"
+
+    def save(self, data_type_name: str, data_id: str, data: BaseModel) -> None:
+        _yaml_save(data_type_name, data_id, data)
+
+    def create(self, data_type_name: str, data_id: str, data: BaseModel) -> bool:
+        return _yaml_create(data_type_name, data_id, data)
+
+    def update(self, data_type_name: str, data_id: str, model_class: Type[T],
+               updater: Callable[[ConfigEntry], BaseModel]) -> ConfigEntry | None:
+        return _yaml_update(data_type_name, data_id, model_class, updater)
+
+    def load(self, data_type_name: str, data_id: str, model_class: Type[T]) -> ConfigEntry | None:
+        return _yaml_load_entry(data_type_name, data_id, model_class)
+
+    def iter_all(self, data_type_name: str, model_class: Type[T]) -> Iterator[ConfigEntry]:
+        return _yaml_iter_entries(data_type_name, model_class)
+
+    def delete(self, data_type_name: str, data_id: str) -> bool:
+        return _yaml_delete(data_type_name, data_id)
+
+    def clear(self, data_type_name: str) -> None:
+        _yaml_clear(data_type_name)
+
+    def list_ids(self, data_type_name: str) -> List[str]:
+        return _yaml_list_ids(data_type_name)
+
+    def commit_batch(self, writes: List[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> None:
+        _yaml_commit_batch(writes, deletes)
+
+    def commit_stream(self, writes: Iterable[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> List[tuple[str, str, str]]:
+        return _yaml_commit_stream(writes, deletes)
+
+    def type_version(self, data_type_name: str) -> int | None:
+        return get_type_mtime_ns(data_type_name)
+
+    def preload(self, model_classes: Dict[str, Type[BaseModel]], workers: int = 1) -> PreloadReport:
+        return _yaml_preload(model_classes, workers)
+
+# --- Storage backend selection ---
+# INKSTONE_STORAGE picks the engine behind the functions below: "yaml" (default) or "sqlite".
+# The SQLite database lives at INKSTONE_SQLITE_PATH (default: DATA_BASE_PATH/inkstone.db).
+STORAGE_ENGINE = os.environ.get("INKSTONE_STORAGE", "yaml")
+_storage_backend: StorageBackend | None = None
+_storage_backend_lock = threading.Lock()
+
+def create_storage_backend(engine: str) -> StorageBackend:
+    """Instantiates a storage backend by engine name."""
+    if engine == "yaml":
+        return YamlDirectoryBackend()
+    if engine == "sqlite":
+        from app.io.sqlite_backend import SqliteBackend
+        return SqliteBackend(os.environ.get("INKSTONE_SQLITE_PATH", str(DATA_BASE_PATH / "inkstone.db")))
+    raise ValueError(f"Unknown storage engine '{engine}' (expected 'yaml' or 'sqlite')")
+
+def get_storage_backend() -> StorageBackend:
+    """Returns the active storage backend, creating it from STORAGE_ENGINE on first use."""
+    global _storage_backend
+    with _storage_backend_lock:
+        if _storage_backend is None:
+            _storage_backend = create_storage_backend(STORAGE_ENGINE)
+        return _storage_backend
+
+def set_storage_backend(backend: StorageBackend | None) -> None:
+    """Replaces the active storage backend (None re-selects it from STORAGE_ENGINE on next use)."""
+    global _storage_backend
+    with _storage_backend_lock:
+        _storage_backend = backend
+
+# --- Change listeners ---
+# Called after every successful write through the public API below as
+# listener(data_type_name, data_id, op, digest), where op is 'upsert', 'delete' or 'clear'
+# (data_id is None for 'clear') and digest is the new content digest ('upsert' only).
+# Listeners run on the calling thread, which may be a storage pool thread.
+ChangeListener = Callable[[str, str | None, str, str | None], None]
+_change_listeners: List[ChangeListener] = []
+
+def add_change_listener(listener: ChangeListener) -> None:
+    _change_listeners.append(listener)
+
+def remove_change_listener(listener: ChangeListener) -> None:
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+def _notify_change(data_type_name: str, data_id: str | None, op: str, digest: str | None = None) -> None:
+    for listener in list(_change_listeners):
+        try:
+            listener(data_type_name, data_id, op, digest)
+        except Exception:
+            logger.exception("Error in change listener %r", listener)
+
+def _notify_saved(data_type_name: str, data_id: str, model_class: type) -> None:
+    if not _change_listeners:
+        return
+    entry = get_storage_backend().load(data_type_name, data_id, model_class) # Cache hit right after a save
+    _notify_change(data_type_name, data_id, 'upsert', entry.digest if entry is not None else None)
+
+# --- Public storage API (delegates to the active backend) ---
+def save_yaml(data_type_name: str, data_id: str, data: BaseModel) -> None:
+    """Saves a Pydantic model instance to a YAML file."""
+    get_storage_backend().save(data_type_name, data_id, data)
+    _notify_saved(data_type_name, data_id, type(data))
+
+def create_yaml(data_type_name: str, data_id: str, data: BaseModel) -> bool:
+    """Saves data only if no valid config with this id exists yet; returns False if one does.
+
+    The existence check and the write are atomic with respect to other threads and worker
+    processes, so concurrent creates of the same id cannot both succeed.
+    """
+    created = get_storage_backend().create(data_type_name, data_id, data)
+    if created:
+        _notify_saved(data_type_name, data_id, type(data))
+    return created
+
+def update_yaml(data_type_name: str, data_id: str, model_class: Type[T],
+                updater: Callable[[ConfigEntry], BaseModel]) -> ConfigEntry | None:
+    """Atomically replaces a config with updater(current entry); returns the new entry, or None if it does not exist.
+
+    The read, updater call and write happen under the config's write lock, so concurrent updates
+    (from any thread or worker process) cannot overwrite each other. Exceptions raised by
+    updater abort the update.
+    """
+    entry = get_storage_backend().update(data_type_name, data_id, model_class, updater)
+    if entry is not None:
+        _notify_change(data_type_name, data_id, 'upsert', entry.digest)
+    return entry
+
+def load_yaml_entry(data_type_name: str, data_id: str, model_class: Type[T]) -> ConfigEntry | None:
+    """Like load_yaml, but also returns the content digest of the file (used for ETags)."""
+    return get_storage_backend().load(data_type_name, data_id, model_class)
+
+def load_yaml(data_type_name: str, data_id: str, model_class: Type[T]) -> T | None:
+    """Loads data from a YAML file and parses it into a Pydantic model instance."""
+    entry = load_yaml_entry(data_type_name, data_id, model_class)
+    return entry.model if entry is not None else None
+
+def load_yaml_entries(data_type_name: str, data_ids: List[str], model_class: Type[T]) -> List[ConfigEntry]:
+    """Loads several configs by id, in the given order; missing or invalid ones are left out."""
+    backend = get_storage_backend()
+    entries = (backend.load(data_type_name, data_id, model_class) for data_id in data_ids)
+    return [entry for entry in entries if entry is not None]
+
+def iter_all_yaml_entries(data_type_name: str, model_class: Type[T]) -> Iterator[ConfigEntry]:
+    """Yields (model, digest) entries for every config of a data type, ordered by file name / id, as they are parsed."""
+    return get_storage_backend().iter_all(data_type_name, model_class)
+
+def iter_all_yaml(data_type_name: str, model_class: Type[T]) -> Iterator[T]:
+    """Yields models from every YAML file of a data type, in file name order, as they are parsed."""
+    for entry in iter_all_yaml_entries(data_type_name, model_class):
+        yield entry.model
+
+def load_all_yaml_entries(data_type_name: str, model_class: Type[T]) -> List[ConfigEntry]:
+    """Like load_all_yaml, but returns (model, digest) entries."""
+    return list(iter_all_yaml_entries(data_type_name, model_class))
+
+def load_all_yaml(data_type_name: str, model_class: Type[T]) -> List[T]:
+    """Loads all YAML files from a given data type directory."""
+    return list(iter_all_yaml(data_type_name, model_class))
+
+def list_yaml_ids(data_type_name: str) -> List[str]:
+    """Returns the sorted ids of a data type without parsing any config."""
+    return get_storage_backend().list_ids(data_type_name)
+
+def delete_yaml(data_type_name: str, data_id: str) -> bool:
+    """Deletes a specific YAML file."""
+    deleted = get_storage_backend().delete(data_type_name, data_id)
+    if deleted:
+        _notify_change(data_type_name, data_id, 'delete')
+    return deleted
+
+def clear_all_yaml_data(data_type_name: str) -> None:
+    """Deletes all YAML files in a given data type directory."""
+    get_storage_backend().clear(data_type_name)
+    _notify_change(data_type_name, None, 'clear')
+
+def commit_yaml_batch(writes: List[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> None:
+    """Applies a set of writes (data_type, id, model) and deletes (data_type, id) all-or-nothing.
+
+    Raises BatchCommitError (after restoring the previous state) if the batch cannot be applied.
+    """
+    get_storage_backend().commit_batch(writes, deletes)
+    for data_type_name, data_id, data in writes:
+        _notify_saved(data_type_name, data_id, type(data))
+    for data_type_name, data_id in deletes:
+        _notify_change(data_type_name, data_id, 'delete')
+
+def commit_yaml_stream(writes: Iterable[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> int:
+    """Like commit_yaml_batch, for batches too large to hold in memory (e.g. a workspace import).
+
+    writes is consumed once, while the batch is staged, and the written models are not kept in
+    the model cache. Returns the number of configs written.
+    """
+    written = get_storage_backend().commit_stream(writes, deletes)
+    for data_type_name, data_id, digest in written:
+        _notify_change(data_type_name, data_id, 'upsert', digest)
+    for data_type_name, data_id in deletes:
+        _notify_change(data_type_name, data_id, 'delete')
+    return len(written)
+
+def preload_all_yaml(model_classes: Dict[str, Type[BaseModel]], workers: int = PRELOAD_WORKERS) -> PreloadReport:
+    """Warms the model cache with every config of the given data types ({data_type_name: model class}).
+
+    Returns a PreloadReport with the number of configs loaded per data type and the files that
+    could not be parsed or validated.
+    """
+    report = get_storage_backend().preload(model_classes, workers)
+    logger.info("Preloaded %s in %.2fs with %d worker(s), %d error(s)",
+                ", ".join(f"{count} {name}" for name, count in report.loaded.items()), report.seconds,
+                report.workers, len(report.errors), extra={"preload": report.to_dict()})
+    return report
+
+def get_type_version(data_type_name: str) -> int | None:
+    """Returns a token that changes whenever configs of a data type are added or removed."""
+    return get_storage_backend().type_version(data_type_name)
+
+# --- Async storage API ---
+# File I/O and YAML parsing are blocking, so the async variants run the functions above
+# on a bounded thread pool instead of on the event loop.
+_io_executor: ThreadPoolExecutor | None = None
+_io_executor_lock = threading.Lock()
+
+def configure_io_pool(max_workers: int) -> None:
+    """Replaces the storage thread pool with one of the given size."""
+    global _io_executor, IO_POOL_SIZE
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    with _io_executor_lock:
+        old_executor = _io_executor
+        IO_POOL_SIZE = max_workers
+        _io_executor = None
+    if old_executor is not None:
+        old_executor.shutdown(wait=False)
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix="inkstone-io")
+        return _io_executor
+
+async def run_io(func, *args):
+    """Runs func(*args) on the bounded storage thread pool, timing it as a storage call.
+
+    Used by the async variants below and by other modules' blocking file work (history, archives).
+    """
+    loop = asyncio.get_running_loop()
+    # Run in a copy of the caller's context so per-request timings recorded on the pool thread count
+    context = contextvars.copy_context()
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_get_io_executor(), context.run, functools.partial(func, *args))
+    finally:
+        elapsed = time.perf_counter() - started
+        _STORAGE_CALL_SECONDS.labels(getattr(func, "__name__", "call")).observe(elapsed)
+        metrics.record_timing("storage", elapsed)
+
+async def asave_yaml(data_type_name: str, data_id: str, data: BaseModel) -> None:
+    """Async variant of save_yaml."""
+    await run_io(save_yaml, data_type_name, data_id, data)
+
+async def aload_yaml(data_type_name: str, data_id: str, model_class: Type[T]) -> T | None:
+    """Async variant of load_yaml."""
+    return await run_io(load_yaml, data_type_name, data_id, model_class)
+
+async def aload_yaml_entry(data_type_name: str, data_id: str, model_class: Type[T]) -> ConfigEntry | None:
+    """Async variant of load_yaml_entry."""
+    return await run_io(load_yaml_entry, data_type_name, data_id, model_class)
+
+async def aload_yaml_entries(data_type_name: str, data_ids: List[str], model_class: Type[T]) -> List[ConfigEntry]:
+    """Async variant of load_yaml_entries; the whole batch is loaded in one pool task."""
+    return await run_io(load_yaml_entries, data_type_name, data_ids, model_class)
+
+async def aload_all_yaml_entries(data_type_name: str, model_class: Type[T]) -> List[ConfigEntry]:
+    """Async variant of load_all_yaml_entries."""
+    return await run_io(load_all_yaml_entries, data_type_name, model_class)
+
+async def aload_all_yaml(data_type_name: str, model_class: Type[T]) -> List[T]:
+    """Async variant of load_all_yaml."""
+    return await run_io(load_all_yaml, data_type_name, model_class)
+
+async def aiter_all_yaml(data_type_name: str, model_class: Type[T], batch_size: int = 64) -> AsyncIterator[T]:
+    """Async variant of iter_all_yaml; files are parsed on the thread pool in batches of batch_size."""
+    iterator = iter_all_yaml(data_type_name, model_class)
+    while True:
+        batch = await run_io(list, itertools.islice(iterator, batch_size))
+        for item in batch:
+            yield item
+        if len(batch) < batch_size:
+            return
+
+async def alist_yaml_ids(data_type_name: str) -> List[str]:
+    """Async variant of list_yaml_ids."""
+    return await run_io(list_yaml_ids, data_type_name)
+
+async def acreate_yaml(data_type_name: str, data_id: str, data: BaseModel) -> bool:
+    """Async variant of create_yaml."""
+    return await run_io(create_yaml, data_type_name, data_id, data)
+
+async def aupdate_yaml(data_type_name: str, data_id: str, model_class: Type[T],
+                       updater: Callable[[ConfigEntry], BaseModel]) -> ConfigEntry | None:
+    """Async variant of update_yaml; updater runs on the storage thread pool."""
+    return await run_io(update_yaml, data_type_name, data_id, model_class, updater)
+
+async def adelete_yaml(data_type_name: str, data_id: str) -> bool:
+    """Async variant of delete_yaml."""
+    return await run_io(delete_yaml, data_type_name, data_id)
+
+async def acommit_yaml_batch(writes: List[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> None:
+    """Async variant of commit_yaml_batch."""
+    await run_io(commit_yaml_batch, writes, deletes)
+
+async def acommit_yaml_stream(writes: Iterable[tuple[str, str, BaseModel]], deletes: List[tuple[str, str]]) -> int:
+    """Async variant of commit_yaml_stream; writes is consumed on the storage thread pool."""
+    return await run_io(commit_yaml_stream, writes, deletes)
+
+async def apreload_all_yaml(model_classes: Dict[str, Type[BaseModel]], workers: int = PRELOAD_WORKERS) -> PreloadReport:
+    """Async variant of preload_all_yaml."""
+    return await run_io(preload_all_yaml, model_classes, workers)
+
+async def aclear_all_yaml_data(data_type_name: str) -> None:
+    """Async variant of clear_all_yaml_data."""
+    await run_io(clear_all_yaml_data, data_type_name)
@@ -0,0 +1,42 @@
+import json
+import logging
+import os
+import sys
+
+# INKSTONE_LOG_FORMAT=json writes one JSON object per record (with any `extra` fields) for log
+# shippers; the default is plain text. INKSTONE_LOG_LEVEL sets the level of the "app" loggers.
+LOG_FORMAT = os.environ.get("INKSTONE_LOG_FORMAT", "text")
+LOG_LEVEL = os.environ.get("INKSTONE_LOG_LEVEL", "INFO")
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """Attaches a stderr handler to the "app" logger hierarchy (once)."""
+    logger = logging.getLogger("app")
+    if any(getattr(handler, "_inkstone", False) for handler in logger.handlers):
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler._inkstone = True
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL.upper())
+    logger.propagate = False
@@ -1,141 +1,1220 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import base64
+import bisect
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field # Ensure Field is imported if used
-from typing import List, Any, Optional, Dict
+from typing import List, Any, NamedTuple, Optional, Dict, Literal, Set, Type
 
 # --- Pydantic Models ---
-class ViewConfig(BaseModel):
-    id: str
+# The stored config models live in app.models; they are re-exported here for existing imports.
+from app.models import CONFIG_TYPES, ViewConfig, PaneConfig, LayoutConfig, ModuleConfig
+
+class ResolvedModule(BaseModel):
+    """A module together with its layout and every view its panes reference, for one-round-trip loading."""
+    module: ModuleConfig
+    layout: LayoutConfig
+    views: Dict[str, ViewConfig] # keyed by view ID; standalone views take precedence over embedded copies
+
+class ResolvedModuleBatch(BaseModel):
+    modules: List[ResolvedModule]
+    missing: List[str] # requested IDs whose module or layout could not be found
+
+class BulkItem(BaseModel):
+    op: Literal['create', 'upsert', 'delete']
+    type: Literal['layout', 'view', 'module']
+    id: Optional[str] = None # required for delete; for create/upsert it defaults to data['id']
+    data: Optional[Dict[str, Any]] = None
+
+class BulkRequest(BaseModel):
+    items: List[BulkItem]
+
+class BulkItemResult(BaseModel):
+    index: int
+    op: str
     type: str
-    content: Optional[Any] = None
-    # Potentially add 'data_source_webhook' if a view directly calls a webhook
-    # data_source_webhook: Optional[str] = None
-
-class PaneConfig(BaseModel):
-    id: str
-    size: float
-    view: Optional[ViewConfig] = None
-
-class LayoutConfig(BaseModel):
-    id: str
-    direction: str # 'horizontal' | 'vertical'
-    panes: List[PaneConfig]
-
-class ModuleConfig(BaseModel):
-    id: str # e.g., 'diary_module'
-    name: str # User-friendly name for the menu, e.g., "Daily Diary"
-    layout_id: str # ID of a LayoutConfig stored in layouts/
-    # OR embed the layout directly:
-    # layout: LayoutConfig
-    # For simplicity with RFP's file structure (modules/, layouts/), referencing by ID seems cleaner.
-    # We can resolve the layout when the module is loaded by the client or a specific module endpoint.
-
-    # Placeholder for backend webhook API associated with the module as a whole.
-    # Specific views within the module's layout might also have their own data sources.
-    # backend_webhook_url: Optional[str] = None
-
-    # Additional metadata
-    icon: Optional[str] = None # e.g., for display in the menu
-    description: Optional[str] = None
+    id: Optional[str] = None
+    status: Literal['created', 'updated', 'deleted', 'error', 'skipped']
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    applied: bool
+    results: List[BulkItemResult]
+
+class LayoutDependents(BaseModel):
+    layout_id: str
+    modules: List[str] # modules whose layout_id is this layout
+
+class ViewDependents(BaseModel):
+    view_id: str
+    layouts: List[str] # layouts with a pane embedding this view
+    modules: List[str] # modules using one of those layouts
+
+class IntegrityReport(BaseModel):
+    ok: bool
+    missing_layouts: Dict[str, List[str]] # referenced layout id that does not exist -> modules referencing it
+    duplicate_views: Dict[str, List[str]] # view id embedded more than once -> "layout_id/pane_id" of each pane
 
 # Import YAML loader functions
 from app.io.yaml_loader import (
-    save_yaml,
+    BatchCommitError,
+    acommit_yaml_batch,
+    acreate_yaml,
+    aload_yaml,
+    aload_yaml_entry,
+    aload_yaml_entries,
+    aload_all_yaml,
+    aload_all_yaml_entries,
+    aiter_all_yaml,
+    adelete_yaml,
+    aclear_all_yaml_data as aclear_yaml_type,
+    alist_yaml_ids,
+    aupdate_yaml,
+    run_io,
+    add_change_listener,
+    apreload_all_yaml,
     load_yaml,
-    load_all_yaml,
-    delete_yaml,
-    clear_all_yaml_data as clear_yaml_type
+    load_yaml_entry,
+    get_cache_stats,
+    get_type_version
 )
+from app import metrics, responses
+from app.changes import ChangeFeed
+from app.io.archive import (
+    ARCHIVE_FORMATS,
+    IMPORT_MAX_BYTES,
+    IMPORT_SPOOL_BYTES,
+    IMPORT_WRITE_BYTES,
+    ImportReport,
+    aiter_export,
+    import_archive,
+)
+from app.io.history import HISTORY_ENABLED, History
+from app.encoding import CompressionMiddleware, MessagePackMiddleware
+from app.hydration import HYDRATE_DEADLINE_SECONDS, DataSourceCall, LayoutHydrator, data_source
+from app.indexes import EmbeddedViewIndex, LayoutReferenceIndex, SearchIndex, describe_layout, describe_module, describe_view
+from app.logging_config import configure_logging
+from app.readiness import ReadinessGateMiddleware, StartupState
+from app.webhooks import WebhookError, WebhookGateway, build_request
+from app.patching import (
+    JSON_PATCH_MEDIA_TYPE,
+    MERGE_PATCH_MEDIA_TYPE,
+    PatchError,
+    PatchTestFailed,
+    apply_json_patch,
+    apply_merge_patch,
+    revalidate,
+)
+
+logger = logging.getLogger(__name__)
+
+# Reverse index of views embedded in layout panes, used by get_view's fallback.
+embedded_views = EmbeddedViewIndex()
+
+async def ensure_embedded_view_index() -> None:
+    """Builds the embedded view index, or rebuilds it when layouts were added or removed out of band."""
+    version = get_type_version('layouts')
+    if embedded_views.built and embedded_views.source_version == version:
+        return
+    embedded_views.build(await aload_all_yaml('layouts', LayoutConfig), source_version=version)
+
+def _sync_embedded_view_index() -> None:
+    embedded_views.source_version = get_type_version('layouts')
+
+# Reverse index of module -> layout references, used to find a layout's dependents.
+module_refs = LayoutReferenceIndex()
+
+async def ensure_module_reference_index() -> None:
+    """Builds the module reference index, or rebuilds it when modules were added or removed out of band."""
+    version = get_type_version('modules')
+    if module_refs.built and module_refs.source_version == version:
+        return
+    module_refs.build(await aload_all_yaml('modules', ModuleConfig), source_version=version)
+
+def _sync_module_reference_index() -> None:
+    module_refs.source_version = get_type_version('modules')
+
+# Inverted indexes behind the search parameters of the list endpoints, one per data type. They
+# follow every write made through the storage API (change listener below) and are re-synced
+# with out-of-band edits by the change feed's store polling.
+search_indexes: Dict[str, SearchIndex] = {
+    'layouts': SearchIndex(describe_layout),
+    'views': SearchIndex(describe_view),
+    'modules': SearchIndex(describe_module),
+}
+_MODEL_CLASS_BY_DIR = {data_type_name: model_class for data_type_name, model_class in CONFIG_TYPES.values()}
+
+async def ensure_search_index(data_type_name: str) -> SearchIndex:
+    """Builds a search index, or re-syncs it when configs were added or removed out of band."""
+    index = search_indexes[data_type_name]
+    version = get_type_version(data_type_name)
+    if not index.built or index.source_version != version:
+        index.sync(await aload_all_yaml_entries(data_type_name, _MODEL_CLASS_BY_DIR[data_type_name]), source_version=version)
+    return index
+
+def _update_search_index(data_type_name: str, data_id: Optional[str], op: str, digest: Optional[str]) -> None:
+    index = search_indexes.get(data_type_name)
+    if index is None or not index.built:
+        return # Built in full on first use
+    if op == 'clear':
+        index.clear()
+    elif op == 'delete':
+        index.remove(data_id)
+    else:
+        entry = load_yaml_entry(data_type_name, data_id, _MODEL_CLASS_BY_DIR[data_type_name]) # Cache hit right after the write
+        if entry is not None:
+            index.add(entry.model, entry.digest)
+    index.source_version = get_type_version(data_type_name)
+
+add_change_listener(_update_search_index)
+
+async def _modules_using_layout(layout_id: str) -> List[str]:
+    """Returns the modules referencing a layout, from the index.
+
+    Only the indexed referrers are re-read (O(referrers), from the cache when unchanged), so a
+    module re-pointed or deleted out of band is not reported.
+    """
+    await ensure_module_reference_index()
+    candidates = module_refs.modules_using(layout_id)
+    modules = await asyncio.gather(*(aload_yaml('modules', module_id, ModuleConfig) for module_id in candidates))
+    referrers = []
+    for module_id, module in zip(candidates, modules):
+        if module is None:
+            module_refs.remove_module(module_id)
+        elif module.layout_id != layout_id:
+            module_refs.add_module(module)
+        else:
+            referrers.append(module_id)
+    return referrers
+
+async def _lookup_embedded_view(view_id: str) -> Optional[tuple]:
+    """Like _find_embedded_view, resyncing the index once if its entry turned out to be stale."""
+    # Check embedded views through the reverse index instead of scanning every layout
+    await ensure_embedded_view_index()
+    found = await _find_embedded_view(view_id)
+    if found is None and embedded_views.lookup(view_id) is not None:
+        # The indexed layout was edited on disk since the index was built; resync once
+        embedded_views.built = False
+        await ensure_embedded_view_index()
+        found = await _find_embedded_view(view_id)
+    return found
+
+async def _find_embedded_view(view_id: str) -> Optional[tuple]:
+    """Returns (view, ETag) for an indexed embedded view, or None if the index entry is stale."""
+    location = embedded_views.lookup(view_id)
+    if location is None:
+        return None
+    entry = await aload_yaml_entry('layouts', location.layout_id, LayoutConfig)
+    if entry is not None:
+        pane = entry.model.find_pane(location.pane_id)
+        if pane is not None and pane.view and pane.view.id == view_id:
+            return pane.view.model_copy(deep=True), _make_etag(entry.digest, view_id)
+    return None
+
+# --- Conditional GET helpers (ETag / If-None-Match) ---
+def _make_etag(*parts: str) -> str:
+    """Builds a strong ETag from a content digest, or from several parts hashed together."""
+    if len(parts) == 1:
+        return f'"{parts[0]}"'
+    return '"' + hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest() + '"'
+
+def _if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in (tag.strip().removeprefix('W/') for tag in header.split(','))
+
+def _conditional_get(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Returns a 304 response if the client already has this version, otherwise sets the ETag header."""
+    if _if_none_match(request, etag):
+        return Response(status_code=304, headers={'ETag': etag})
+    response.headers['ETag'] = etag
+    return None
+
+def _config_response(entry, response: Response):
+    """Returns a stored config, as its cached JSON bytes unless fast JSON is disabled."""
+    if not responses.FAST_JSON_ENABLED:
+        return entry.model
+    return responses.FastJSONResponse(responses.entry_json(entry), headers=dict(response.headers))
+
+def _if_match(if_match: Optional[str], etag: str) -> bool:
+    """If-Match uses strong comparison: weak validators never match. A missing header always matches."""
+    if if_match is None:
+        return True
+    if if_match.strip() == '*':
+        return True
+    return etag in (tag.strip() for tag in if_match.split(','))
+
+# --- Partial update helpers (PATCH) ---
+class _PreconditionFailed(Exception):
+    pass
 
-app = FastAPI()
+class _MissingReference(Exception):
+    pass
+
+async def _read_patch(request: Request) -> tuple:
+    """Returns (apply_function, patch document) from the request's Content-Type and body."""
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type == JSON_PATCH_MEDIA_TYPE:
+        apply_patch = apply_json_patch
+    elif content_type in (MERGE_PATCH_MEDIA_TYPE, 'application/json'):
+        apply_patch = apply_merge_patch
+    else:
+        raise HTTPException(status_code=415, detail=f"Use {JSON_PATCH_MEDIA_TYPE} (RFC 6902) or {MERGE_PATCH_MEDIA_TYPE} (RFC 7396).")
+    try:
+        return apply_patch, json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON.")
+
+async def _patch_config(type_name: str, data_id: str, request: Request, response: Response, check=None):
+    """Applies a JSON Patch or merge patch to a stored config and writes it back atomically.
+
+    The patch is applied to the current model under the config's write lock, so concurrent
+    PATCHes cannot lose each other's changes; If-Match additionally guards against changes the
+    client has not seen. check(old, new) may raise _MissingReference for invalid references.
+    """
+    data_type_name, model_class = CONFIG_TYPES[type_name]
+    apply_patch, patch = await _read_patch(request)
+    if_match = request.headers.get('if-match')
+
+    def updater(entry):
+        if not _if_match(if_match, _make_etag(entry.digest)):
+            raise _PreconditionFailed()
+        patched = apply_patch(entry.model.model_dump(), patch)
+        if isinstance(patched, dict) and patched.get('id') != entry.model.id:
+            raise ValueError("'id' cannot be changed.")
+        model = revalidate(entry.model, patched)
+        if check is not None:
+            check(entry.model, model)
+        return model
+
+    try:
+        entry = await aupdate_yaml(data_type_name, data_id, model_class, updater)
+    except _PreconditionFailed:
+        raise HTTPException(status_code=412, detail=f"{type_name.capitalize()} '{data_id}' was modified since it was fetched (If-Match failed).")
+    except _MissingReference as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PatchTestFailed as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except PatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e: # Includes pydantic.ValidationError
+        raise HTTPException(status_code=422, detail=str(e))
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"{type_name.capitalize()} with ID '{data_id}' not found.")
+    response.headers['ETag'] = _make_etag(entry.digest)
+    return entry.model
+
+# --- List endpoint helpers (pagination, projection, NDJSON streaming) ---
+MAX_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _encode_cursor(last_id: str) -> str:
+    return base64.urlsafe_b64encode(last_id.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + '=' * (-len(cursor) % 4), altchars=b'-_', validate=True).decode('utf-8')
+    except ValueError: # Covers binascii.Error and UnicodeDecodeError
+        raise HTTPException(status_code=400, detail=f"Invalid cursor '{cursor}'.")
+
+def _parse_fields(fields: Optional[str], model_class: Type[BaseModel]) -> Optional[Set[str]]:
+    """Turns ?fields=a,b into a set of model fields to include; 'id' is always kept."""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = requested - set(model_class.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s) for {model_class.__name__}: {', '.join(sorted(unknown))}.")
+    return requested | {'id'}
+
+class _Search(NamedTuple):
+    """Search parameters of a list request, passed on to SearchIndex.search()."""
+    text: Optional[str] = None
+    prefix: Optional[str] = None
+    facets: Dict[str, str] = {}
+    ranges: Dict[str, tuple] = {}
+    sort: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.text or self.prefix or self.facets or self.ranges or self.sort)
+
+async def _search_entries(data_type_name: str, model_class: Type[BaseModel], search: _Search,
+                          limit: Optional[int], response: Response) -> list:
+    """Runs a search on the index and loads only the configs on the requested page."""
+    index = await ensure_search_index(data_type_name)
+    sort = search.sort or 'id'
+    total, ids = index.search(search.text, search.prefix, search.facets, search.ranges,
+                              sort=sort.lstrip('-'), descending=sort.startswith('-'), limit=limit)
+    response.headers["X-Total-Count"] = str(total)
+    return await aload_yaml_entries(data_type_name, ids, model_class)
+
+async def _list_configs(data_type_name: str, model_class: Type[BaseModel], request: Request, response: Response,
+                        limit: Optional[int], cursor: Optional[str], fields: Optional[str], format: Optional[str],
+                        search: Optional[_Search] = None):
+    """Shared implementation of the list endpoints.
+
+    Items are ordered by id and the response carries a collection-level ETag. With limit/cursor only one page is returned and the cursor for the
+    next page is sent in the X-Next-Cursor header; the page is cut from the sorted list of ids, so only its configs are loaded. With format=ndjson (or Accept: application/x-ndjson)
+    the whole collection is streamed one JSON object per line, in file order, as files are parsed.
+    With search parameters the matches come from the type's search index, in the requested sort
+    order, and only the first `limit` of them are loaded; X-Total-Count gives the number of matches.
+    """
+    include = _parse_fields(fields, model_class)
+    ndjson = format == 'ndjson' or (format is None and NDJSON_MEDIA_TYPE in request.headers.get('accept', ''))
+    if search is not None and search.active:
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="cursor cannot be combined with search parameters; use limit.")
+        entries = await _search_entries(data_type_name, model_class, search, limit, response)
+        if ndjson:
+            lines = [entry.model.model_dump_json(include=include) + "\n" for entry in entries]
+            return StreamingResponse(iter(lines), media_type=NDJSON_MEDIA_TYPE, headers=dict(response.headers))
+        limit = None # Already applied by the index
+    elif ndjson:
+        async def stream_items():
+            async for item in aiter_all_yaml(data_type_name, model_class):
+                yield item.model_dump_json(include=include) + "\n"
+        return StreamingResponse(stream_items(), media_type=NDJSON_MEDIA_TYPE)
+    elif cursor is not None or limit is not None:
+        # One page: sliced from the sorted ids (no config is parsed for that), then only its configs are loaded
+        ids = await alist_yaml_ids(data_type_name)
+        if cursor is not None:
+            ids = ids[bisect.bisect_right(ids, _decode_cursor(cursor)):]
+        if limit is not None and len(ids) > limit:
+            ids = ids[:limit]
+            response.headers["X-Next-Cursor"] = _encode_cursor(ids[-1])
+        entries = await aload_yaml_entries(data_type_name, ids, model_class)
+    else:
+        entries = sorted(await aload_all_yaml_entries(data_type_name, model_class), key=lambda entry: entry.model.id)
+    # Collection-level ETag: covers every returned item's digest, whether more pages follow and the query that shaped the response
+    collection_etag = _make_etag('collection', data_type_name, str(request.query_params), response.headers.get("X-Next-Cursor", ""),
+                                 *(f"{entry.model.id}:{entry.digest}" for entry in entries))
+    not_modified = _conditional_get(request, response, collection_etag)
+    if not_modified is not None:
+        return not_modified
+
+    if include is not None:
+        response_class = responses.FastJSONResponse if responses.FAST_JSON_ENABLED else JSONResponse
+        return response_class([entry.model.model_dump(mode='json', include=include) for entry in entries], headers=dict(response.headers))
+    if responses.FAST_JSON_ENABLED:
+        return responses.FastJSONResponse(responses.json_array(responses.entry_json(entry) for entry in entries), headers=dict(response.headers))
+    return [entry.model for entry in entries]
+
+# --- Change feed ---
+# Writes made through the storage API are published as they happen; edits made directly to the
+# store (by hand, by the AI, or by another worker process) are found by polling it every
+# CHANGES_POLL_SECONDS (0 disables polling). The poll reads every config, so it only runs while
+# at least one client is listening on /api/changes.
+CHANGES_POLL_SECONDS = float(os.environ.get("INKSTONE_CHANGES_POLL_SECONDS", "2"))
+CHANGES_HEARTBEAT_SECONDS = 15.0
+change_feed = ChangeFeed()
+_CONFIG_TYPE_BY_DIR = {data_type_name: type_name for type_name, (data_type_name, _) in CONFIG_TYPES.items()}
+
+def _publish_change(data_type_name: str, data_id: Optional[str], op: str, digest: Optional[str]) -> None:
+    type_name = _CONFIG_TYPE_BY_DIR.get(data_type_name)
+    if type_name is not None:
+        change_feed.publish(type_name, data_id, op, _make_etag(digest) if digest else None)
+
+add_change_listener(_publish_change)
+
+# --- Version history ---
+# Every write made through the storage API is recorded in a content-addressed history
+# (app/io/history.py), from which single configs and whole snapshots can be rolled back.
+history = History() # Follows the store's data directory, wherever it is pointed
+
+def _record_history(data_type_name: str, data_id: Optional[str], op: str, digest: Optional[str]) -> None:
+    history.record(data_type_name, data_id, op, digest)
+
+def _import_archive(fileobj, mode: str) -> ImportReport:
+    """Runs import_archive, handing each imported config to the history as it is staged (see History.staging)."""
+    if not HISTORY_ENABLED:
+        return import_archive(fileobj, mode)
+    with history.staging() as stage:
+        return import_archive(fileobj, mode, on_write=stage)
+
+if HISTORY_ENABLED:
+    add_change_listener(_record_history)
+
+async def reconcile_change_feed(publish: bool = True) -> None:
+    """Compares the store with what the change feed last saw and publishes the differences."""
+    for type_name, (data_type_name, model_class) in CONFIG_TYPES.items():
+        version = change_feed.version
+        entries = await aload_all_yaml_entries(data_type_name, model_class)
+        if change_feed.version != version:
+            continue # Written through the API while loading; the snapshot may be stale, try next round
+        change_feed.reconcile(type_name, {entry.model.id: _make_etag(entry.digest) for entry in entries}, publish=publish)
+        # Only configs whose digest changed are re-indexed
+        search_indexes[data_type_name].sync(entries, source_version=get_type_version(data_type_name))
+        if type_name == 'module':
+            # Every module was just read anyway; refresh the reference index with out-of-band edits
+            module_refs.build((entry.model for entry in entries), source_version=get_type_version('modules'))
+
+async def _watch_store(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        if not change_feed.subscribers:
+            continue # Edits made meanwhile are published by the first poll after a client connects
+        try:
+            await reconcile_change_feed()
+        except Exception:
+            logger.exception("Error while polling the store for changes")
+
+def _format_sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return "\n".join(lines) + "\n\n"
+
+async def _change_stream(since: int, heartbeat: float = CHANGES_HEARTBEAT_SECONDS):
+    """Yields SSE messages for every change after since, then waits for new ones."""
+    yield "retry: 3000\n\n"
+    version = since
+    with change_feed.subscription():
+        while True:
+            events = change_feed.since(version)
+            if events is None:
+                # The client was away longer than the feed remembers; it has to re-fetch its lists
+                version = change_feed.version
+                yield _format_sse('reset', {'version': version}, version)
+                continue
+            for event in events:
+                yield _format_sse('change', event.to_dict(), event.version)
+                version = event.version
+            if not events and not await change_feed.wait(version, heartbeat):
+                yield ": keep-alive\n\n"
+
+# --- Startup ---
+# With INKSTONE_PRELOAD=1 every config is parsed and validated into the model cache at startup,
+# across INKSTONE_PRELOAD_WORKERS processes, before the worker reports ready on /api/ready.
+PRELOAD_ENABLED = os.environ.get("INKSTONE_PRELOAD", "0") == "1"
+startup_state = StartupState()
+
+async def _warm_up() -> None:
+    if PRELOAD_ENABLED:
+        startup_state.preload = await apreload_all_yaml(dict(CONFIG_TYPES.values()))
+    await ensure_embedded_view_index()
+    await ensure_module_reference_index()
+    for data_type_name in search_indexes:
+        await ensure_search_index(data_type_name)
+    if CHANGES_POLL_SECONDS > 0:
+        await reconcile_change_feed(publish=False)
+
+async def _watch_store_when_ready(interval: float) -> None:
+    await startup_state.wait()
+    await _watch_store(interval)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    startup_state.start(_warm_up())
+    watcher = None
+    if CHANGES_POLL_SECONDS > 0:
+        watcher = asyncio.create_task(_watch_store_when_ready(CHANGES_POLL_SECONDS))
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await startup_state.stop()
+    await webhook_gateway.aclose()
+
+app = FastAPI(lifespan=lifespan)
+# Added innermost first: the readiness gate, MessagePack re-encoding, then compression, with metrics timing everything
+app.add_middleware(ReadinessGateMiddleware, state=startup_state)
+app.add_middleware(MessagePackMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 # --- Layout API Endpoints ---
 @app.post("/api/layout", response_model=LayoutConfig, status_code=201)
 async def create_layout(layout: LayoutConfig):
-    if load_yaml('layouts', layout.id, LayoutConfig) is not None:
+    await ensure_embedded_view_index()
+    if not await acreate_yaml('layouts', layout.id, layout):
         raise HTTPException(status_code=400, detail=f"Layout with ID '{layout.id}' already exists.")
-    save_yaml('layouts', layout.id, layout)
+    embedded_views.add_layout(layout)
+    _sync_embedded_view_index()
     return layout
 
 @app.get("/api/layout/{layout_id}", response_model=LayoutConfig)
-async def get_layout(layout_id: str):
-    layout = load_yaml('layouts', layout_id, LayoutConfig)
-    if layout is None:
+async def get_layout(layout_id: str, request: Request, response: Response):
+    entry = await aload_yaml_entry('layouts', layout_id, LayoutConfig)
+    if entry is None:
         raise HTTPException(status_code=404, detail=f"Layout with ID '{layout_id}' not found.")
-    return layout
+    not_modified = _conditional_get(request, response, _make_etag(entry.digest))
+    if not_modified is not None:
+        return not_modified
+    return _config_response(entry, response)
+
+@app.get("/api/layout/{layout_id}/pane/{pane_id}", response_model=PaneConfig)
+async def get_layout_pane(layout_id: str, pane_id: str, request: Request, response: Response):
+    """Returns one pane from anywhere in the layout's pane tree, looked up through the path index.
+
+    The X-Pane-Pointer header holds the pane's JSON pointer within the layout, for use in a PATCH.
+    """
+    entry = await aload_yaml_entry('layouts', layout_id, LayoutConfig)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Layout with ID '{layout_id}' not found.")
+    path = entry.model.pane_path(pane_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Pane with ID '{pane_id}' not found in layout '{layout_id}'.")
+    response.headers["X-Pane-Pointer"] = "/panes/" + "/layout/panes/".join(map(str, path))
+    not_modified = _conditional_get(request, response, _make_etag(entry.digest, pane_id))
+    if not_modified is not None:
+        return not_modified
+    return entry.model.find_pane(pane_id)
 
 @app.get("/api/layouts", response_model=List[LayoutConfig])
-async def get_all_layouts():
-    return load_all_yaml('layouts', LayoutConfig)
+async def get_all_layouts(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[Literal['json', 'ndjson']] = None,
+    q: Optional[str] = Query(None, description="Words matching the start of words in the id or the ids of embedded views"),
+    prefix: Optional[str] = Query(None, description="Start of the layout id"),
+    view_type: Optional[str] = Query(None, description="Only layouts with a view of this type"),
+    min_panes: Optional[int] = Query(None, ge=0),
+    max_panes: Optional[int] = Query(None, ge=0),
+    sort: Optional[Literal['id', '-id', 'pane_count', '-pane_count']] = None,
+):
+    search = _Search(q, prefix, {'view_type': view_type} if view_type else {},
+                     {'pane_count': (min_panes, max_panes)} if min_panes is not None or max_panes is not None else {}, sort)
+    return await _list_configs('layouts', LayoutConfig, request, response, limit, cursor, fields, format, search)
 
-@app.delete("/api/layout/{layout_id}", status_code=204)
-async def remove_layout(layout_id: str):
-    if not delete_yaml('layouts', layout_id):
+@app.patch("/api/layout/{layout_id}", response_model=LayoutConfig)
+async def patch_layout(layout_id: str, request: Request, response: Response):
+    """Partially updates a layout with a JSON Patch or JSON Merge Patch body; supports If-Match."""
+    await ensure_embedded_view_index()
+    layout = await _patch_config('layout', layout_id, request, response)
+    embedded_views.add_layout(layout)
+    _sync_embedded_view_index()
+    return layout
+
+@app.get("/api/layout/{layout_id}/dependents", response_model=LayoutDependents)
+async def get_layout_dependents(layout_id: str):
+    if await aload_yaml('layouts', layout_id, LayoutConfig) is None:
         raise HTTPException(status_code=404, detail=f"Layout with ID '{layout_id}' not found.")
+    return LayoutDependents(layout_id=layout_id, modules=await _modules_using_layout(layout_id))
+
+@app.delete("/api/layout/{layout_id}", status_code=204)
+async def remove_layout(layout_id: str, cascade: bool = False):
+    """Deletes a layout. It is refused (409) while modules use it, unless cascade=true deletes them with it."""
+    await ensure_embedded_view_index()
+    dependents = await _modules_using_layout(layout_id)
+    if not dependents:
+        if not await adelete_yaml('layouts', layout_id):
+            raise HTTPException(status_code=404, detail=f"Layout with ID '{layout_id}' not found.")
+    else:
+        if await aload_yaml('layouts', layout_id, LayoutConfig) is None:
+            raise HTTPException(status_code=404, detail=f"Layout with ID '{layout_id}' not found.")
+        if not cascade:
+            raise HTTPException(status_code=409, detail=f"Layout with ID '{layout_id}' is used by modules: {', '.join(dependents)}. "
+                                                        "Delete them first or pass cascade=true.")
+        try:
+            await acommit_yaml_batch([], [('layouts', layout_id)] + [('modules', module_id) for module_id in dependents])
+        except BatchCommitError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        for module_id in dependents:
+            module_refs.remove_module(module_id)
+        _sync_module_reference_index()
+    embedded_views.remove_layout(layout_id)
+    _sync_embedded_view_index()
     return None
 
 # --- View API Endpoints (for standalone/reusable views) ---
 @app.post("/api/view", response_model=ViewConfig, status_code=201)
 async def create_view(view: ViewConfig):
-    if load_yaml('views', view.id, ViewConfig) is not None:
+    if not await acreate_yaml('views', view.id, view):
         raise HTTPException(status_code=400, detail=f"View with ID '{view.id}' already exists.")
-    save_yaml('views', view.id, view)
     return view
 
 @app.get("/api/view/{view_id}", response_model=ViewConfig)
-async def get_view(view_id: str):
-    view = load_yaml('views', view_id, ViewConfig)
-    if view is not None:
-        return view
-    # Check embedded views (as before)
-    all_layouts = load_all_yaml('layouts', LayoutConfig)
-    for layout_config in all_layouts: # Renamed to avoid conflict
-        for pane in layout_config.panes:
-            if pane.view and pane.view.id == view_id:
-                return pane.view.model_copy(deep=True)
+async def get_view(view_id: str, request: Request, response: Response):
+    entry = await aload_yaml_entry('views', view_id, ViewConfig)
+    if entry is not None:
+        not_modified = _conditional_get(request, response, _make_etag(entry.digest))
+        if not_modified is not None:
+            return not_modified
+        return _config_response(entry, response)
+    found = await _lookup_embedded_view(view_id)
+    if found is not None:
+        embedded_view, etag = found
+        not_modified = _conditional_get(request, response, etag)
+        if not_modified is not None:
+            return not_modified
+        return embedded_view
     raise HTTPException(status_code=404, detail=f"View with ID '{view_id}' not found as standalone or embedded.")
 
+@app.get("/api/views", response_model=List[ViewConfig])
+async def get_all_views(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[Literal['json', 'ndjson']] = None,
+    q: Optional[str] = Query(None, description="Words matching the start of words in the id or type"),
+    prefix: Optional[str] = Query(None, description="Start of the view id"),
+    type: Optional[str] = None,
+    sort: Optional[Literal['id', '-id', 'type', '-type']] = None,
+):
+    """Lists the standalone views (views embedded in layout panes are not included)."""
+    search = _Search(q, prefix, {'type': type} if type else {}, {}, sort)
+    return await _list_configs('views', ViewConfig, request, response, limit, cursor, fields, format, search)
+
+@app.get("/api/view/{view_id}/dependents", response_model=ViewDependents)
+async def get_view_dependents(view_id: str):
+    await ensure_embedded_view_index()
+    layout_ids = sorted({location.layout_id for location in embedded_views.locations(view_id)})
+    if not layout_ids and await aload_yaml('views', view_id, ViewConfig) is None:
+        raise HTTPException(status_code=404, detail=f"View with ID '{view_id}' not found as standalone or embedded.")
+    module_lists = await asyncio.gather(*(_modules_using_layout(layout_id) for layout_id in layout_ids))
+    return ViewDependents(view_id=view_id, layouts=layout_ids, modules=sorted({m for modules in module_lists for m in modules}))
+
 @app.delete("/api/view/{view_id}", status_code=204)
 async def remove_view(view_id: str):
-    if not delete_yaml('views', view_id):
+    if not await adelete_yaml('views', view_id):
         raise HTTPException(status_code=404, detail=f"Standalone view with ID '{view_id}' not found.")
     return None
 
+# --- Module resolution helpers ---
+async def _resolve_view(embedded: ViewConfig) -> ViewConfig:
+    """Same precedence as get_view: a standalone view file wins over the copy embedded in the pane."""
+    standalone = await aload_yaml('views', embedded.id, ViewConfig)
+    return standalone if standalone is not None else embedded
+
+async def _resolve_module(module_id: str) -> ResolvedModule:
+    module = await aload_yaml('modules', module_id, ModuleConfig)
+    if module is None:
+        raise HTTPException(status_code=404, detail=f"Module with ID '{module_id}' not found.")
+    layout = await aload_yaml('layouts', module.layout_id, LayoutConfig)
+    if layout is None:
+        raise HTTPException(status_code=404, detail=f"Layout with ID '{module.layout_id}' referenced by module '{module_id}' not found.")
+    embedded = [pane.view for pane in layout.iter_panes() if pane.view is not None]
+    views = await asyncio.gather(*(_resolve_view(view) for view in embedded))
+    return ResolvedModule(module=module, layout=layout, views={view.id: view for view in views})
+
 # --- Module API Endpoints ---
 @app.post("/api/module", response_model=ModuleConfig, status_code=201)
 async def create_module(module: ModuleConfig):
     # Check if the referenced layout exists
-    if load_yaml('layouts', module.layout_id, LayoutConfig) is None:
+    if await aload_yaml('layouts', module.layout_id, LayoutConfig) is None:
         raise HTTPException(status_code=404, detail=f"Layout with ID '{module.layout_id}' referenced by module '{module.id}' not found.")
-    if load_yaml('modules', module.id, ModuleConfig) is not None:
+    await ensure_module_reference_index()
+    if not await acreate_yaml('modules', module.id, module):
         raise HTTPException(status_code=400, detail=f"Module with ID '{module.id}' already exists.")
-    save_yaml('modules', module.id, module)
+    module_refs.add_module(module)
+    _sync_module_reference_index()
     return module
 
 @app.get("/api/module/{module_id}", response_model=ModuleConfig)
-async def get_module(module_id: str):
-    module = load_yaml('modules', module_id, ModuleConfig)
-    if module is None:
+async def get_module(module_id: str, request: Request, response: Response):
+    entry = await aload_yaml_entry('modules', module_id, ModuleConfig)
+    if entry is None:
         raise HTTPException(status_code=404, detail=f"Module with ID '{module_id}' not found.")
+    not_modified = _conditional_get(request, response, _make_etag(entry.digest))
+    if not_modified is not None:
+        return not_modified
+    return _config_response(entry, response)
+
+def _check_module_layout(old: ModuleConfig, new: ModuleConfig) -> None:
+    # Runs on the storage thread pool, inside the module's write lock
+    if new.layout_id != old.layout_id and load_yaml('layouts', new.layout_id, LayoutConfig) is None:
+        raise _MissingReference(f"Layout with ID '{new.layout_id}' referenced by module '{new.id}' not found.")
+
+@app.patch("/api/module/{module_id}", response_model=ModuleConfig)
+async def patch_module(module_id: str, request: Request, response: Response):
+    """Partially updates a module with a JSON Patch or JSON Merge Patch body; supports If-Match."""
+    await ensure_module_reference_index()
+    module = await _patch_config('module', module_id, request, response, check=_check_module_layout)
+    module_refs.add_module(module)
+    _sync_module_reference_index()
     return module
 
+@app.get("/api/module/{module_id}/resolved", response_model=ResolvedModule)
+async def get_resolved_module(module_id: str):
+    return await _resolve_module(module_id)
+
+@app.get("/api/modules/resolved", response_model=ResolvedModuleBatch)
+async def get_resolved_modules(ids: List[str] = Query(..., min_length=1, max_length=MAX_PAGE_SIZE)):
+    results = await asyncio.gather(*(_resolve_module(module_id) for module_id in ids), return_exceptions=True)
+    batch = ResolvedModuleBatch(modules=[], missing=[])
+    for module_id, result in zip(ids, results):
+        if isinstance(result, HTTPException):
+            batch.missing.append(module_id)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            batch.modules.append(result)
+    return batch
+
 @app.get("/api/modules", response_model=List[ModuleConfig])
-async def get_all_modules():
-    return load_all_yaml('modules', ModuleConfig)
+async def get_all_modules(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[Literal['json', 'ndjson']] = None,
+    q: Optional[str] = Query(None, description="Words matching the start of words in the name or description"),
+    prefix: Optional[str] = Query(None, description="Start of the module name, case-insensitive (menu typeahead)"),
+    layout_id: Optional[str] = None,
+    sort: Optional[Literal['id', '-id', 'name', '-name']] = None,
+):
+    search = _Search(q, prefix, {'layout_id': layout_id} if layout_id else {}, {}, sort)
+    return await _list_configs('modules', ModuleConfig, request, response, limit, cursor, fields, format, search)
 
 @app.delete("/api/module/{module_id}", status_code=204)
 async def remove_module(module_id: str):
-    if not delete_yaml('modules', module_id):
+    await ensure_module_reference_index()
+    if not await adelete_yaml('modules', module_id):
         raise HTTPException(status_code=404, detail=f"Module with ID '{module_id}' not found.")
+    module_refs.remove_module(module_id)
+    _sync_module_reference_index()
     return None
 
+# --- Webhook gateway ---
+# Webhook views are triggered through the backend by view id, so only URLs that are part of a
+# stored config are ever called, and only on the origins allowed by INKSTONE_WEBHOOK_TARGETS
+# (the gateway is not an open proxy).
+webhook_gateway = WebhookGateway()
+
+async def _trigger_webhook(view: ViewConfig) -> Response:
+    if view.type != 'webhook_trigger':
+        raise HTTPException(status_code=400, detail=f"View '{view.id}' is not a webhook_trigger view.")
+    try:
+        webhook_request = build_request(view.content, allowed_origins=webhook_gateway.targets)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        result = await webhook_gateway.call(webhook_request)
+    except WebhookError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return Response(content=result.body, status_code=result.status_code, media_type=result.content_type,
+                    headers={"X-Webhook-Source": result.source})
+
+@app.post("/api/view/{view_id}/webhook")
+async def trigger_view_webhook(view_id: str):
+    """Calls the webhook configured in a webhook_trigger view and relays its status and body."""
+    view = await aload_yaml('views', view_id, ViewConfig)
+    if view is None:
+        found = await _lookup_embedded_view(view_id)
+        if found is None:
+            raise HTTPException(status_code=404, detail=f"View with ID '{view_id}' not found as standalone or embedded.")
+        view = found[0]
+    return await _trigger_webhook(view)
+
+@app.post("/api/module/{module_id}/view/{view_id}/webhook")
+async def trigger_module_webhook(module_id: str, view_id: str):
+    """Like the view route, for a view that must belong to the module's layout."""
+    module = await aload_yaml('modules', module_id, ModuleConfig)
+    if module is None:
+        raise HTTPException(status_code=404, detail=f"Module with ID '{module_id}' not found.")
+    layout = await aload_yaml('layouts', module.layout_id, LayoutConfig)
+    pane = layout.find_view_pane(view_id) if layout is not None else None
+    if pane is None:
+        raise HTTPException(status_code=404, detail=f"View with ID '{view_id}' is not part of module '{module_id}'.")
+    return await _trigger_webhook(await _resolve_view(pane.view))
+
+# --- Layout hydration ---
+layout_hydrator = LayoutHydrator(webhook_gateway)
+
+@app.post("/api/layout/{layout_id}/hydrate")
+async def hydrate_layout(
+    layout_id: str,
+    request: Request,
+    format: Optional[Literal['ndjson', 'sse']] = None,
+    deadline: float = Query(HYDRATE_DEADLINE_SECONDS, gt=0, le=300),
+):
+    """Calls the data source of every view in the layout concurrently and streams each result as it completes.
+
+    Views bind to a data source through content.dataSource (standalone views take precedence over
+    embedded copies, as in get_view). Streams NDJSON by default, or Server-Sent Events with
+    format=sse (or Accept: text/event-stream): one 'result' per data source, in completion order,
+    then a 'done' summary. No call runs longer than `deadline` seconds, so the whole response takes
+    about as long as the slowest call.
+    """
+    layout = await aload_yaml('layouts', layout_id, LayoutConfig)
+    if layout is None:
+        raise HTTPException(status_code=404, detail=f"Layout with ID '{layout_id}' not found.")
+    panes = [pane for pane in layout.iter_panes() if pane.view is not None]
+    views = await asyncio.gather(*(_resolve_view(pane.view) for pane in panes))
+    calls = []
+    for pane, view in zip(panes, views):
+        source = data_source(view.content)
+        if source is not None:
+            calls.append(DataSourceCall(pane.id, view.id, source))
+    use_sse = format == 'sse' or (format is None and 'text/event-stream' in request.headers.get('accept', ''))
+    started = time.perf_counter()
+
+    async def stream_results():
+        count = 0
+        async for result in layout_hydrator.stream(calls, deadline):
+            count += 1
+            yield _format_sse('result', result) if use_sse else json.dumps(result, separators=(',', ':')) + "\n"
+        summary = {"done": True, "layout_id": layout_id, "count": count,
+                   "elapsed_ms": round(1000 * (time.perf_counter() - started), 3)}
+        yield _format_sse('done', summary) if use_sse else json.dumps(summary, separators=(',', ':')) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="text/event-stream" if use_sse else NDJSON_MEDIA_TYPE,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/webhooks/stats")
+async def webhook_stats():
+    """Per-target call counts by outcome and latency percentiles of recent upstream calls."""
+    return {"targets": webhook_gateway.stats(), "cache_entries": len(webhook_gateway.cache)}
+
+# --- Bulk API Endpoints ---
+
+async def _validate_bulk_item(item: BulkItem, batch_keys: Set[tuple], deleted_keys: Set[tuple]) -> tuple:
+    """Validates one bulk item against the store and the rest of the batch.
+
+    Returns (key, model, existed) where key is (type, id); raises ValueError with a message on failure.
+    """
+    data_type_name, model_class = CONFIG_TYPES[item.type]
+    model = None
+    if item.op == 'delete':
+        if item.id is None:
+            raise ValueError("'id' is required for delete.")
+        item_id = item.id
+    else:
+        if item.data is None:
+            raise ValueError(f"'data' is required for {item.op}.")
+        model = model_class(**item.data) # pydantic.ValidationError is a ValueError
+        if item.id is not None and item.id != model.id:
+            raise ValueError(f"'id' ({item.id}) does not match data.id ({model.id}).")
+        item_id = model.id
+    key = (item.type, item_id)
+    if key in batch_keys:
+        raise ValueError(f"{item.type} '{item_id}' appears more than once in the batch.")
+    batch_keys.add(key)
+
+    existed = await aload_yaml(data_type_name, item_id, model_class) is not None
+    if item.op == 'create' and existed:
+        raise ValueError(f"{item.type.capitalize()} with ID '{item_id}' already exists.")
+    if item.op == 'delete':
+        if not existed:
+            raise ValueError(f"{item.type.capitalize()} with ID '{item_id}' not found.")
+        deleted_keys.add(key)
+    return key, model, existed
+
+@app.post("/api/bulk", response_model=BulkResponse)
+async def bulk_apply(request: BulkRequest):
+    """Creates, upserts and deletes many configs in one all-or-nothing commit.
+
+    Every item and every cross-reference (module -> layout_id) is validated in memory first;
+    if anything fails, nothing is written and the per-item results explain why (HTTP 400).
+    """
+    results: List[BulkItemResult] = []
+    validated = [] # (index, item, key, model, existed)
+    batch_keys: Set[tuple] = set()
+    deleted_keys: Set[tuple] = set()
+    for index, item in enumerate(request.items):
+        result = BulkItemResult(index=index, op=item.op, type=item.type, id=item.id, status='skipped')
+        try:
+            key, model, existed = await _validate_bulk_item(item, batch_keys, deleted_keys)
+            result.id = key[1]
+            validated.append((index, item, key, model, existed))
+        except ValueError as e:
+            result.status = 'error'
+            result.error = str(e)
+        results.append(result)
+
+    # Cross-reference check: modules must point at a layout that exists after the batch is applied
+    written_layouts = {key[1] for _, item, key, _, _ in validated if item.type == 'layout' and item.op != 'delete'}
+    for index, item, key, model, _ in validated:
+        if item.type != 'module' or model is None:
+            continue
+        layout_id = model.layout_id
+        available = layout_id in written_layouts or (
+            ('layout', layout_id) not in deleted_keys and await aload_yaml('layouts', layout_id, LayoutConfig) is not None
+        )
+        if not available:
+            results[index].status = 'error'
+            results[index].error = f"Layout with ID '{layout_id}' referenced by module '{model.id}' not found."
+    # ...and a deleted layout must not be left with modules that still point at it
+    for index, item, key, model, _ in validated:
+        if item.type != 'layout' or model is not None:
+            continue
+        remaining = [module_id for module_id in await _modules_using_layout(key[1]) if ('module', module_id) not in batch_keys]
+        if remaining:
+            results[index].status = 'error'
+            results[index].error = f"Layout with ID '{key[1]}' is used by modules: {', '.join(remaining)}."
+
+    if any(result.status == 'error' for result in results):
+        return JSONResponse(status_code=400, content=BulkResponse(applied=False, results=results).model_dump())
+
+    writes = [(CONFIG_TYPES[item.type][0], key[1], model) for _, item, key, model, _ in validated if model is not None]
+    deletes = [(CONFIG_TYPES[item.type][0], key[1]) for _, item, key, model, _ in validated if model is None]
+    await ensure_embedded_view_index()
+    await ensure_module_reference_index()
+    try:
+        await acommit_yaml_batch(writes, deletes)
+    except BatchCommitError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for index, item, key, model, existed in validated:
+        if item.type == 'layout':
+            if model is None:
+                embedded_views.remove_layout(key[1])
+            else:
+                embedded_views.add_layout(model)
+        elif item.type == 'module':
+            if model is None:
+                module_refs.remove_module(key[1])
+            else:
+                module_refs.add_module(model)
+        results[index].status = 'deleted' if model is None else ('updated' if existed else 'created')
+    _sync_embedded_view_index()
+    _sync_module_reference_index()
+    return BulkResponse(applied=True, results=results)
+
 # --- Utility Endpoints ---
 @app.get("/")
 async def root():
     return {"message": "Welcome to Ink-UI Backend (YAML Edition with Modules). See /docs for API documentation."}
 
+@app.get("/api/changes")
+async def get_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    format: Optional[Literal['sse', 'json']] = None,
+    wait: float = Query(0, ge=0, le=60),
+):
+    """Change feed: one event (type, id, op, etag, version) per created, updated or deleted config.
+
+    Streams Server-Sent Events by default. Resume with since=<last version seen> (or the standard
+    Last-Event-ID header); without either, only changes from now on are sent. A 'reset' event means
+    the requested changes are no longer buffered and the client should re-fetch its lists.
+    format=json instead returns {version, events, reset} once, optionally waiting up to `wait`
+    seconds for the first event (long polling). Event ETags are those of the plain JSON
+    representation; compressed and MessagePack responses add a suffix to them (see app.encoding).
+    """
+    if since is None:
+        last_event_id = request.headers.get('last-event-id', '')
+        since = int(last_event_id) if last_event_id.isdigit() else change_feed.version
+    if format == 'json':
+        if wait and change_feed.since(since) == []:
+            with change_feed.subscription():
+                await change_feed.wait(since, wait)
+        events = change_feed.since(since)
+        if events is None:
+            return {"version": change_feed.version, "events": [], "reset": True}
+        return {"version": events[-1].version if events else since, "events": [e.to_dict() for e in events], "reset": False}
+    return StreamingResponse(_change_stream(since), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/ready")
+async def get_readiness():
+    """Readiness probe: 200 once the startup preload and index builds are done, 503 before.
+
+    The body carries the preload summary (configs loaded per data type, files that failed to
+    parse or validate, duration).
+    """
+    return JSONResponse(startup_state.to_dict(), status_code=200 if startup_state.ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics: per-route latency, in-flight requests, YAML parse/dump time, storage I/O and cache hit ratio."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/api/integrity", response_model=IntegrityReport)
+async def check_integrity():
+    """Reports dangling module -> layout references and views embedded in more than one pane.
+
+    Works from the reverse indexes and the list of layout ids, so the cost grows with the number
+    of references rather than with files x files.
+    """
+    await ensure_embedded_view_index()
+    await ensure_module_reference_index()
+    layout_ids = set(await alist_yaml_ids('layouts'))
+    missing = {layout_id: module_ids for layout_id, module_ids in module_refs.referenced_layouts().items() if layout_id not in layout_ids}
+    duplicates = {view_id: [f"{loc.layout_id}/{loc.pane_id}" for loc in locations]
+                  for view_id, locations in embedded_views.duplicates.items()}
+    return IntegrityReport(ok=not missing and not duplicates, missing_layouts=missing, duplicate_views=duplicates)
+
+@app.get("/api/cache_stats")
+async def cache_stats():
+    return get_cache_stats()
+
+# --- History Endpoints ---
+ConfigTypeName = Literal['layout', 'view', 'module']
+
+async def _history_version(config_type: str, config_id: str, version: int):
+    try:
+        return await history.aversion(CONFIG_TYPES[config_type][0], config_id, version)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/history/{config_type}/{config_id}")
+async def list_config_versions(config_type: ConfigTypeName, config_id: str):
+    """Lists the recorded versions of a config, oldest first; a version that deleted it has no tree."""
+    versions = await history.aversions(CONFIG_TYPES[config_type][0], config_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail=f"No history recorded for {config_type} '{config_id}'.")
+    return {"type": config_type, "id": config_id, "versions": [version.to_dict() for version in versions]}
+
+@app.get("/api/history/{config_type}/{config_id}/versions/{version}")
+async def get_config_version(config_type: ConfigTypeName, config_id: str, version: int):
+    """Returns a config as it was at a recorded version."""
+    info = await _history_version(config_type, config_id, version)
+    if info.tree is None:
+        raise HTTPException(status_code=404, detail=f"{config_type.capitalize()} '{config_id}' was deleted in version {version}.")
+    return await history.aload_tree(info.tree)
+
+@app.get("/api/history/{config_type}/{config_id}/diff")
+async def diff_config_versions(config_type: ConfigTypeName, config_id: str,
+                               from_version: int = Query(..., alias="from"), to_version: Optional[int] = Query(None, alias="to")):
+    """Returns the JSON Patch (RFC 6902) operations turning version `from` into version `to` (default: the latest).
+
+    Panes and views that are identical in both versions are skipped without being read.
+    """
+    data_type_name = CONFIG_TYPES[config_type][0]
+    if to_version is None:
+        to_version = len(await history.aversions(data_type_name, config_id))
+    try:
+        operations = await history.adiff_versions(data_type_name, config_id, from_version, to_version)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"from": from_version, "to": to_version, "operations": operations}
+
+@app.post("/api/history/{config_type}/{config_id}/rollback")
+async def rollback_config(config_type: ConfigTypeName, config_id: str, version: int):
+    """Makes a recorded version of a config current again; the rollback is recorded as a new version.
+
+    Refused (409) if it would leave a module pointing at a missing layout.
+    """
+    data_type_name = CONFIG_TYPES[config_type][0]
+    info = await _history_version(config_type, config_id, version)
+    if config_type == 'module' and info.tree is not None:
+        layout_id = (await history.aload_tree(info.tree))['layout_id']
+        if await aload_yaml('layouts', layout_id, LayoutConfig) is None:
+            raise HTTPException(status_code=409, detail=f"Layout with ID '{layout_id}' referenced by module '{config_id}' "
+                                                        f"in version {version} not found.")
+    if config_type == 'layout':
+        await ensure_embedded_view_index()
+        if info.tree is None:
+            dependents = await _modules_using_layout(config_id)
+            if dependents:
+                raise HTTPException(status_code=409, detail=f"Layout with ID '{config_id}' is used by modules: {', '.join(dependents)}.")
+    elif config_type == 'module':
+        await ensure_module_reference_index()
+    model = await history.arollback(data_type_name, config_id, version)
+    if config_type == 'layout':
+        if model is None:
+            embedded_views.remove_layout(config_id)
+        else:
+            embedded_views.add_layout(model)
+        _sync_embedded_view_index()
+    elif config_type == 'module':
+        if model is None:
+            module_refs.remove_module(config_id)
+        else:
+            module_refs.add_module(model)
+        _sync_module_reference_index()
+    return {"type": config_type, "id": config_id, "restored": version, "config": model.model_dump(mode='json') if model is not None else None}
+
+@app.get("/api/snapshots")
+async def list_snapshots():
+    return {"snapshots": [snapshot.to_dict() for snapshot in await history.asnapshots()]}
+
+@app.post("/api/snapshots", status_code=201)
+async def take_snapshot(label: Optional[str] = None):
+    """Snapshots the whole workspace; only what changed since the previous snapshot is written."""
+    return (await history.atake_snapshot(label)).to_dict()
+
+@app.get("/api/snapshots/{snapshot_id}/diff")
+async def diff_snapshots(snapshot_id: int, to: Optional[int] = None):
+    """Lists the configs added, removed and changed per data type from a snapshot to another (default: now)."""
+    try:
+        changes = await history.adiff_snapshots(snapshot_id, to)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"from": snapshot_id, "to": to, "changes": changes}
+
+@app.post("/api/snapshots/{snapshot_id}/rollback")
+async def rollback_snapshot(snapshot_id: int):
+    """Restores every layout, view and module to a snapshot in one all-or-nothing batch.
+
+    The current state is snapshotted first, so the rollback can be undone by rolling back to
+    that snapshot (returned as 'backup').
+    """
+    try:
+        result = await history.arollback_snapshot(snapshot_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BatchCommitError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Rebuilt from the store on next use
+        embedded_views.built = False
+        module_refs.built = False
+    return result.to_dict()
+
+@app.get("/api/export")
+async def export_workspace(format: Literal['tar', 'tgz', 'zip'] = 'tar'):
+    """Downloads every layout, view and module as an archive of layouts/<id>.yaml, views/<id>.yaml and modules/<id>.yaml.
+
+    The archive is written while it is sent (chunked), one config at a time, so memory use does
+    not grow with the workspace; configs written meanwhile may or may not be included.
+    """
+    media_type, suffix = ARCHIVE_FORMATS[format]
+    file_name = f"inkstone-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}{suffix}"
+    return StreamingResponse(aiter_export(format), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+@app.post("/api/import")
+async def import_workspace(request: Request, mode: Literal['merge', 'replace'] = 'merge'):
+    """Imports an archive as produced by GET /api/export (tar, gzipped tar or zip), sent as the raw request body.
+
+    The upload is spooled to a temporary file as it arrives; every config in it is then validated
+    and, only if all are valid, written in one all-or-nothing commit. "merge" keeps the configs
+    that are not in the archive, "replace" deletes them. Returns the import report, with HTTP 400
+    (and nothing written) if any config is invalid or a module references a missing layout.
+    """
+    declared = request.headers.get('content-length', '')
+    if declared.isdigit() and int(declared) > IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Archives are limited to {IMPORT_MAX_BYTES} bytes.")
+    # Past IMPORT_SPOOL_BYTES the spool is a file on disk, so writing to it and closing it are done on the storage pool
+    spool = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+    try:
+        received = 0
+        pending = bytearray()
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > IMPORT_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Archives are limited to {IMPORT_MAX_BYTES} bytes.")
+            pending += chunk
+            if len(pending) >= IMPORT_WRITE_BYTES:
+                await run_io(spool.write, bytes(pending))
+                pending.clear()
+        await run_io(spool.write, bytes(pending))
+        # Rebuilt from the store on next use, rather than updated config by config while importing
+        for index in (*search_indexes.values(), embedded_views, module_refs):
+            index.built = False
+        try:
+            report = await run_io(_import_archive, spool, mode) # Staging, commit and notifications on one pool thread
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except BatchCommitError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await run_io(spool.close)
+    return JSONResponse(report.to_dict(), status_code=200 if report.applied else 400)
+
 @app.delete("/api/clear_all_data", status_code=204)
 async def clear_all_data_endpoint():
-    clear_yaml_type('layouts')
-    clear_yaml_type('views')
-    clear_yaml_type('modules')
+    await aclear_yaml_type('layouts')
+    await aclear_yaml_type('views')
+    await aclear_yaml_type('modules')
+    embedded_views.clear(source_version=get_type_version('layouts'))
+    module_refs.clear(source_version=get_type_version('modules'))
     return None
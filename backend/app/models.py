@@ -0,0 +1,149 @@
+import logging
+from pydantic import BaseModel, Field, PrivateAttr, ValidationInfo, model_validator
+from typing import List, Any, Optional, Dict, Iterator, Type
+
+logger = logging.getLogger(__name__)
+
+class ViewConfig(BaseModel):
+    id: str
+    type: str
+    content: Optional[Any] = None
+    # Potentially add 'data_source_webhook' if a view directly calls a webhook
+    # data_source_webhook: Optional[str] = None
+
+class PaneConfig(BaseModel):
+    id: str
+    size: float # Percentage of the parent; sibling sizes sum to 100
+    view: Optional[ViewConfig] = None
+    # Splits the pane further; a pane has a view or a layout, not both. Left out of the output
+    # when unset, so leaf panes serialize as they did before nested layouts existed.
+    layout: Optional['NestedLayoutConfig'] = Field(default=None, exclude_if=lambda layout: layout is None)
+
+class NestedLayoutConfig(BaseModel):
+    direction: str # 'horizontal' | 'vertical'
+    panes: List[PaneConfig]
+
+PaneConfig.model_rebuild()
+
+# Sibling pane sizes must add up to 100 (percent), give or take rounding by the GUI.
+PANE_SIZE_TOTAL = 100.0
+PANE_SIZE_TOLERANCE = 0.5
+
+# Validation context for configs read back from storage. Layouts stored before the size rule
+# (or edited by hand) have their sibling sizes rescaled to 100 with a warning instead of being
+# rejected; writes validate without it and still reject sizes that do not add up.
+NORMALIZE_PANE_SIZES = 'normalize_pane_sizes'
+LOAD_CONTEXT = {NORMALIZE_PANE_SIZES: True}
+
+PanePath = tuple # Indexes into the nested panes lists, e.g. (0, 2) is panes[0].layout.panes[2]
+
+class LayoutConfig(BaseModel):
+    id: str
+    direction: str # 'horizontal' | 'vertical'
+    panes: List[PaneConfig]
+
+    # Pane id / embedded view id -> PanePath, filled in by _validate_pane_tree
+    _pane_paths: Optional[Dict[str, PanePath]] = PrivateAttr(default=None)
+    _view_paths: Optional[Dict[str, PanePath]] = PrivateAttr(default=None)
+
+    @model_validator(mode='after')
+    def _validate_pane_tree(self, info: ValidationInfo) -> 'LayoutConfig':
+        return self._check_pane_tree(normalize=bool(info.context and info.context.get(NORMALIZE_PANE_SIZES)))
+
+    def _check_pane_tree(self, normalize: bool = False) -> 'LayoutConfig':
+        """Checks the whole pane tree in one iterative pass and builds the pane/view path index.
+
+        Only the root layout validates, so the cost stays linear in the number of panes however
+        deep the tree is (validating at every level would re-walk each subtree). With `normalize`,
+        sibling sizes that do not add up to 100 are rescaled instead of rejected.
+        """
+        pane_paths: Dict[str, PanePath] = {}
+        view_paths: Dict[str, PanePath] = {}
+        stack = [((), self.panes)]
+        while stack:
+            prefix, panes = stack.pop()
+            if panes:
+                total = sum(pane.size for pane in panes)
+                if abs(total - PANE_SIZE_TOTAL) > PANE_SIZE_TOLERANCE:
+                    where = f"pane '{self._pane_at(prefix).id}'" if prefix else f"layout '{self.id}'"
+                    if not normalize or any(pane.size < 0 for pane in panes):
+                        raise ValueError(f"Sizes of the panes in {where} sum to {total:g}, expected {PANE_SIZE_TOTAL:g}.")
+                    logger.warning("Sizes of the panes in %s sum to %g; rescaling them to %g", where, total, PANE_SIZE_TOTAL,
+                                   extra={"layout_id": self.id})
+                    for pane in panes:
+                        pane.size = pane.size * PANE_SIZE_TOTAL / total if total else PANE_SIZE_TOTAL / len(panes)
+            for index, pane in enumerate(panes):
+                path = prefix + (index,)
+                if pane.size < 0:
+                    raise ValueError(f"Pane '{pane.id}' has a negative size.")
+                if pane.id in pane_paths:
+                    raise ValueError(f"Pane ID '{pane.id}' is used more than once in layout '{self.id}'.")
+                pane_paths[pane.id] = path
+                if pane.view is not None:
+                    if pane.layout is not None:
+                        raise ValueError(f"Pane '{pane.id}' has both a view and a nested layout.")
+                    if pane.view.id in view_paths:
+                        raise ValueError(f"View ID '{pane.view.id}' is embedded more than once in layout '{self.id}'.")
+                    view_paths[pane.view.id] = path
+                elif pane.layout is not None:
+                    stack.append((path, pane.layout.panes))
+        self._pane_paths = pane_paths
+        self._view_paths = view_paths
+        return self
+
+    def _pane_at(self, path: PanePath) -> PaneConfig:
+        panes = self.panes
+        for index in path[:-1]:
+            panes = panes[index].layout.panes
+        return panes[path[-1]]
+
+    def _paths(self) -> tuple[Dict[str, PanePath], Dict[str, PanePath]]:
+        if self._pane_paths is None: # Built with model_construct(); validate to index it
+            self._check_pane_tree()
+        return self._pane_paths, self._view_paths
+
+    def pane_path(self, pane_id: str) -> Optional[PanePath]:
+        return self._paths()[0].get(pane_id)
+
+    def find_pane(self, pane_id: str) -> Optional[PaneConfig]:
+        """Returns the pane with this id anywhere in the tree, via the path index (no tree scan)."""
+        path = self.pane_path(pane_id)
+        return self._pane_at(path) if path is not None else None
+
+    def find_view_pane(self, view_id: str) -> Optional[PaneConfig]:
+        """Returns the pane that embeds the view with this id, anywhere in the tree."""
+        path = self._paths()[1].get(view_id)
+        return self._pane_at(path) if path is not None else None
+
+    def iter_panes(self) -> Iterator[PaneConfig]:
+        """Yields every pane of the tree, depth first, parents before their children."""
+        stack = list(reversed(self.panes))
+        while stack:
+            pane = stack.pop()
+            yield pane
+            if pane.layout is not None:
+                stack.extend(reversed(pane.layout.panes))
+
+class ModuleConfig(BaseModel):
+    id: str # e.g., 'diary_module'
+    name: str # User-friendly name for the menu, e.g., "Daily Diary"
+    layout_id: str # ID of a LayoutConfig stored in layouts/
+    # OR embed the layout directly:
+    # layout: LayoutConfig
+    # For simplicity with RFP's file structure (modules/, layouts/), referencing by ID seems cleaner.
+    # We can resolve the layout when the module is loaded by the client or a specific module endpoint.
+
+    # Placeholder for backend webhook API associated with the module as a whole.
+    # Specific views within the module's layout might also have their own data sources.
+    # backend_webhook_url: Optional[str] = None
+
+    # Additional metadata
+    icon: Optional[str] = None # e.g., for display in the menu
+    description: Optional[str] = None
+
+# Maps each config type to its storage directory (data type name) and model class.
+CONFIG_TYPES: Dict[str, tuple[str, Type[BaseModel]]] = {
+    'layout': ('layouts', LayoutConfig),
+    'view': ('views', ViewConfig),
+    'module': ('modules', ModuleConfig),
+}
@@ -0,0 +1,204 @@
+import copy
+import inspect
+import typing
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Dict, List, Type, TypeVar
+
+from pydantic import BaseModel, TypeAdapter
+
+T = TypeVar('T', bound=BaseModel)
+
+JSON_PATCH_MEDIA_TYPE = "application/json-patch+json" # RFC 6902
+MERGE_PATCH_MEDIA_TYPE = "application/merge-patch+json" # RFC 7396
+
+
+class PatchError(ValueError):
+    """The patch document is malformed or cannot be applied to the target."""
+
+
+class PatchTestFailed(PatchError):
+    """A JSON Patch 'test' operation did not match; the target was left unchanged."""
+
+
+# --- RFC 7396 JSON Merge Patch ---
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """Returns a new document; null values in the patch remove members, objects are merged recursively."""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+# --- RFC 6902 JSON Patch ---
+def _parse_pointer(pointer: Any) -> List[str]:
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith('/')):
+        raise PatchError(f"Invalid JSON pointer {pointer!r}.")
+    if pointer == "":
+        return []
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _array_index(container: list, token: str, allow_end: bool) -> int:
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise PatchError(f"Invalid array index '{token}'.")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index {index} is out of range.")
+    return index
+
+
+def _resolve(document: Any, tokens: List[str]) -> Any:
+    current = document
+    for token in tokens:
+        if isinstance(current, dict):
+            if token not in current:
+                raise PatchError(f"Path member '{token}' does not exist.")
+            current = current[token]
+        elif isinstance(current, list):
+            current = current[_array_index(current, token, allow_end=False)]
+        else:
+            raise PatchError(f"Cannot traverse into a scalar at '{token}'.")
+    return current
+
+
+def _add(document: Any, tokens: List[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1])
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent.insert(_array_index(parent, tokens[-1], allow_end=True), value)
+    else:
+        raise PatchError("Cannot add a member to a scalar.")
+    return document
+
+
+def _remove(document: Any, tokens: List[str]) -> Any:
+    if not tokens:
+        raise PatchError("Cannot remove the whole document.")
+    parent = _resolve(document, tokens[:-1])
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise PatchError(f"Path member '{tokens[-1]}' does not exist.")
+        return parent.pop(tokens[-1])
+    if isinstance(parent, list):
+        return parent.pop(_array_index(parent, tokens[-1], allow_end=False))
+    raise PatchError("Cannot remove a member of a scalar.")
+
+
+def apply_json_patch(document: Any, operations: Any) -> Any:
+    """Applies a list of RFC 6902 operations to a copy of document and returns it.
+
+    The operations are applied all-or-nothing: on any error the original document is untouched.
+    """
+    if not isinstance(operations, list):
+        raise PatchError("A JSON Patch document must be an array of operations.")
+    document = copy.deepcopy(document)
+    for number, operation in enumerate(operations):
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise PatchError(f"Operation {number} must be an object with 'op' and 'path'.")
+        op = operation['op']
+        tokens = _parse_pointer(operation['path'])
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise PatchError(f"Operation {number} ({op}) requires 'value'.")
+        if op == 'add':
+            document = _add(document, tokens, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _remove(document, tokens)
+        elif op == 'replace':
+            if not tokens:
+                document = copy.deepcopy(operation['value'])
+                continue
+            _resolve(document, tokens) # Target must exist
+            _remove(document, tokens)
+            document = _add(document, tokens, copy.deepcopy(operation['value']))
+        elif op in ('move', 'copy'):
+            from_tokens = _parse_pointer(operation.get('from'))
+            if op == 'move' and tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+                raise PatchError(f"Operation {number} cannot move a value into one of its children.")
+            value = _remove(document, from_tokens) if op == 'move' else copy.deepcopy(_resolve(document, from_tokens))
+            document = _add(document, tokens, value)
+        elif op == 'test':
+            if _resolve(document, tokens) != operation['value']:
+                raise PatchTestFailed(f"Test failed at '{operation['path']}'.")
+        else:
+            raise PatchError(f"Unknown operation '{op}'.")
+    return document
+
+
+# --- Incremental re-validation ---
+@lru_cache(maxsize=None)
+def _field_adapter(model_class: Type[BaseModel], field_name: str) -> TypeAdapter:
+    return TypeAdapter(model_class.model_fields[field_name].annotation)
+
+
+@lru_cache(maxsize=None)
+def _takes_info(validator_func) -> bool:
+    return len(inspect.signature(validator_func).parameters) > 1
+
+
+# Stands in for pydantic's ValidationInfo when 'after' validators are run by hand below. A PATCH is
+# a write, so there is no validation context (e.g. pane sizes are checked, not normalized).
+_WRITE_INFO = SimpleNamespace(context=None, config=None, mode='python', data=None, field_name=None)
+
+
+def _list_item_model(annotation: Any) -> Type[BaseModel] | None:
+    """Returns M for List[M] / list[M] annotations where M is a model, else None."""
+    if typing.get_origin(annotation) is list:
+        (item_type,) = typing.get_args(annotation) or (None,)
+        if isinstance(item_type, type) and issubclass(item_type, BaseModel):
+            return item_type
+    return None
+
+
+def revalidate(model: T, data: Dict[str, Any]) -> T:
+    """Builds a new instance of type(model) from the patched data, validating only what changed.
+
+    Fields equal to the current model's dump are reused as-is; for lists of models (e.g. panes)
+    only the items that changed are validated. Model-level 'after' validators (e.g. the pane tree
+    check on LayoutConfig) are run on the result; models with other model validators are validated
+    in full. Raises ValueError (pydantic.ValidationError included) if the data is not a valid model.
+    """
+    model_class = type(model)
+    if not isinstance(data, dict):
+        raise ValueError(f"The patched {model_class.__name__} must be a JSON object.")
+    model_validators = list(model_class.__pydantic_decorators__.model_validators.values())
+    if any(validator.info.mode != 'after' for validator in model_validators):
+        return model_class.model_validate(data)
+
+    current = model.model_dump()
+    values: Dict[str, Any] = {}
+    for name, field in model_class.model_fields.items():
+        if name not in data:
+            if field.is_required():
+                raise ValueError(f"'{name}' is required.")
+            values[name] = field.get_default(call_default_factory=True)
+            continue
+        new_value = data[name]
+        if new_value == current.get(name):
+            values[name] = getattr(model, name)
+            continue
+        item_model = _list_item_model(field.annotation)
+        old_items = getattr(model, name)
+        if item_model is not None and isinstance(new_value, list) and isinstance(old_items, list):
+            old_dumps = current[name]
+            values[name] = [
+                old_items[index] if index < len(old_dumps) and old_dumps[index] == item else item_model.model_validate(item)
+                for index, item in enumerate(new_value)
+            ]
+        else:
+            values[name] = _field_adapter(model_class, name).validate_python(new_value)
+    fields_set = {name for name in data if name in model_class.model_fields}
+    instance = model_class.model_construct(_fields_set=fields_set, **values)
+    for validator in model_validators:
+        instance = validator.func(instance, _WRITE_INFO) if _takes_info(validator.func) else validator.func(instance)
+    return instance
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Optional
+
+from app.io.storage import PreloadReport
+
+logger = logging.getLogger(__name__)
+
+# /api/ready answers 503 until the startup work (preload of the store, index builds) is done, so a
+# load balancer only routes traffic to warm workers. API requests that reach a worker before that
+# wait for it instead of parsing the store themselves.
+_UNGATED_PATHS = ("/api/ready",)
+
+
+class StartupState:
+    """Tracks the startup work run in the background after the server starts accepting connections."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.preload: Optional[PreloadReport] = None
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, startup: Awaitable[None]) -> None:
+        """Runs startup in the background; the worker becomes ready when it finishes, even if it fails."""
+        self.ready = False
+        self.error = None
+
+        async def run() -> None:
+            try:
+                await startup
+            except Exception as e:
+                # Preloading is an optimization: configs are still loaded on demand without it
+                self.error = f"{type(e).__name__}: {e}"
+                logger.exception("Startup preload failed")
+            finally:
+                self.ready = True
+
+        self._task = asyncio.ensure_future(run())
+
+    async def wait(self) -> None:
+        if self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "preload": self.preload.to_dict() if self.preload is not None else None, "error": self.error}
+
+
+class ReadinessGateMiddleware:
+    """ASGI middleware holding /api requests until the startup work is done."""
+
+    def __init__(self, app, state: StartupState) -> None:
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (scope["type"] == "http" and not self.state.ready and scope["path"].startswith("/api/")
+                and scope["path"] not in _UNGATED_PATHS):
+            await self.state.wait()
+        await self.app(scope, receive, send)
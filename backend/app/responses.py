@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Tuple
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app import metrics
+from app.io.storage import ConfigEntry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Stored configs were validated when they were loaded, so the endpoints that return them hand
+# FastAPI ready-made JSON bytes instead of models: no response_model re-validation, no
+# jsonable_encoder pass. Each config's JSON is cached by content digest, so a config is
+# serialized once per version however often it is served. INKSTONE_FAST_JSON=0 restores the
+# plain FastAPI path (e.g. to compare in benchmarks); response bodies are identical either way.
+FAST_JSON_ENABLED = os.environ.get("INKSTONE_FAST_JSON", "1") == "1"
+JSON_CACHE_SIZE = int(os.environ.get("INKSTONE_JSON_CACHE_SIZE", "4096"))
+
+_JSON_CACHE_HITS = metrics.counter("inkstone_json_cache_hits", "Config JSON served from the serialized-bytes cache.")
+_JSON_CACHE_MISSES = metrics.counter("inkstone_json_cache_misses", "Configs serialized to JSON because they were not cached.")
+
+_json_cache: "OrderedDict[Tuple[type, str], bytes]" = OrderedDict()
+_json_cache_lock = threading.Lock()
+
+
+def model_json(model: BaseModel) -> bytes:
+    """Serializes an already validated model with pydantic's compiled serializer (no validation)."""
+    return type(model).__pydantic_serializer__.to_json(model)
+
+
+def entry_json(entry: ConfigEntry) -> bytes:
+    """Returns the JSON bytes of a stored config, cached by (model class, content digest)."""
+    key = (type(entry.model), entry.digest)
+    with _json_cache_lock:
+        cached = _json_cache.get(key)
+        if cached is not None:
+            _json_cache.move_to_end(key)
+    if cached is not None:
+        _JSON_CACHE_HITS.inc()
+        return cached
+    _JSON_CACHE_MISSES.inc()
+    encoded = model_json(entry.model)
+    with _json_cache_lock:
+        _json_cache[key] = encoded
+        while len(_json_cache) > JSON_CACHE_SIZE:
+            _json_cache.popitem(last=False)
+    return encoded
+
+
+def json_array(items: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(items) + b"]"
+
+
+def clear_json_cache() -> None:
+    with _json_cache_lock:
+        _json_cache.clear()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that sends pre-encoded bytes as-is and encodes other content with orjson when installed."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
@@ -1,4 +1,75 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
 import pytest
 
+from app import webhooks
+
 # You can define global fixtures here if needed.
 # For example, setting up a test database connection.
+
+
+class _StubState:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Webhook target echoing the request; ?delay=s sleeps first and /nostore responses must not be cached."""
+    protocol_version = "HTTP/1.1" # Keep-alive, so connection reuse is exercised
+
+    def _handle(self) -> None:
+        state = self.server.state
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else None
+        url = urlsplit(self.path)
+        with state.lock:
+            state.requests.append((self.command, url.path))
+            state.active += 1
+            state.max_active = max(state.max_active, state.active)
+        try:
+            time.sleep(float(parse_qs(url.query).get("delay", ["0"])[0]))
+            payload = json.dumps({"method": self.command, "path": url.path, "body": body,
+                                  "content_type": self.headers.get("Content-Type")}).encode("utf-8")
+            self.send_response(201 if self.command == "POST" else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("Set-Cookie", "stub=1")
+            if url.path == "/nostore":
+                self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with state.lock:
+                state.active -= 1
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    request_queue_size = 64 # Fan-out tests open many connections at once
+
+    def handle_error(self, request, client_address) -> None:
+        pass # The timeout test hangs up on purpose
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = _StubServer(("127.0.0.1", 0), _StubHandler)
+    server.state = _StubState()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setitem(webhooks.WEBHOOK_TARGETS, base, {}) # Allowed as a webhook origin
+    yield base, server.state
+    server.shutdown()
+    server.server_close()
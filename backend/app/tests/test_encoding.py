@@ -0,0 +1,28 @@
+import pytest
+
+from app import encoding
+from app.encoding import choose_content_encoding, parse_qvalues
+
+
+def test_parse_qvalues():
+    assert parse_qvalues("gzip, br;q=0.5, *;q=0") == {"gzip": 1.0, "br": 0.5, "*": 0.0}
+    assert parse_qvalues("application/json;q=oops, ") == {"application/json": 0.0}
+    assert parse_qvalues(None) == {}
+
+
+def test_choose_content_encoding():
+    best = "br" if encoding.brotli is not None else "gzip"
+    assert choose_content_encoding("gzip, deflate, br") == best
+    assert choose_content_encoding("*") == best
+    assert choose_content_encoding("gzip, br;q=0.1") == "gzip"
+    assert choose_content_encoding("gzip;q=0, br;q=0") is None
+    assert choose_content_encoding("identity") is None
+    assert choose_content_encoding(None) is None
+
+
+def test_accepts_msgpack():
+    pytest.importorskip("msgpack")
+    assert encoding.accepts_msgpack("application/msgpack")
+    assert encoding.accepts_msgpack("application/x-msgpack, application/json;q=0.9")
+    assert not encoding.accepts_msgpack("application/json, application/msgpack;q=0.5")
+    assert not encoding.accepts_msgpack("*/*")
@@ -0,0 +1,126 @@
+import json
+import time
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from app.hydration import DataSourceCall, LayoutHydrator, data_source
+from app.main import app, webhook_gateway
+from app.webhooks import WebhookGateway
+
+
+def test_data_source():
+    assert data_source({"dataSource": {"webhookUrl": "http://h/a"}}) == {"webhookUrl": "http://h/a"}
+    for content in [None, "text", {"webhookUrl": "http://h/a"}, {"dataSource": "http://h/a"}]:
+        assert data_source(content) is None
+
+
+@pytest.mark.asyncio
+async def test_hydrator_streams_results_as_they_complete(stub):
+    base, state = stub
+    gateway = WebhookGateway(targets={base: {"max_concurrency": 32}})
+    hydrator = LayoutHydrator(gateway, max_concurrency=32)
+    delays = [0.05 + 0.25 * (n % 5) / 4 for n in range(20)] # 20 panes, 0.05s to 0.3s each
+    calls = [DataSourceCall(f"pane{n}", f"view{n}", {"webhookUrl": f"{base}/data{n}?delay={delay}"})
+             for n, delay in enumerate(delays)]
+    calls.append(DataSourceCall("slowPane", "slowView", {"webhookUrl": f"{base}/slow?delay=2", "timeout": 0.5}))
+    calls.append(DataSourceCall("badPane", "badView", {"webhookUrl": "not a url"}))
+
+    started = time.monotonic()
+    results = []
+    async for result in hydrator.stream(calls, deadline=5):
+        results.append((time.monotonic() - started, result))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0 # About the slowest call (0.5s timeout), not the 3.5s sum of all of them
+    assert results[0][1]["view_id"] == "badView"
+    assert results[0][1]["status"] == "invalid"
+    assert results[-1][1]["view_id"] == "slowView"
+    assert results[-1][1]["status"] == "timeout"
+    assert results[-1][1]["status_code"] == 504
+    ok = [result for _, result in results if result["status"] == "ok"]
+    assert len(ok) == 20
+    assert results[1][0] < 0.2 # The fast panes arrive without waiting for the slow ones
+    first = ok[0]
+    assert first["status_code"] == 200
+    assert first["content_type"] == "application/json"
+    assert first["data"]["method"] == "GET"
+    assert first["source"] == "upstream"
+    await gateway.aclose()
+
+
+@pytest.mark.asyncio
+async def test_hydrator_caps_concurrency_and_enforces_deadline(stub):
+    base, state = stub
+    gateway = WebhookGateway(targets={base: {"max_concurrency": 32}})
+    hydrator = LayoutHydrator(gateway, max_concurrency=3)
+    calls = [DataSourceCall(f"pane{n}", f"view{n}", {"webhookUrl": f"{base}/data{n}?delay=0.1"}) for n in range(9)]
+    results = [result async for result in hydrator.stream(calls, deadline=5)]
+    assert [result["status"] for result in results] == ["ok"] * 9
+    assert state.max_active == 3
+
+    # Queued calls that cannot start before the deadline time out instead of waiting for a slot
+    calls = [DataSourceCall(f"pane{n}", f"view{n}", {"webhookUrl": f"{base}/late{n}?delay=0.3"}) for n in range(6)]
+    results = [result async for result in hydrator.stream(calls, deadline=0.45)]
+    assert sorted(result["status"] for result in results) == ["ok"] * 3 + ["timeout"] * 3
+    await gateway.aclose()
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://127.0.0.1:8000") as ac:
+        await ac.delete("/api/clear_all_data")
+        yield ac
+        await ac.delete("/api/clear_all_data")
+    webhook_gateway.cache.clear()
+
+
+def _parse_sse(text: str):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_hydrate_layout_endpoint(client: AsyncClient, stub):
+    base, state = stub
+    await client.post("/api/layout", json={"id": "dash", "direction": "horizontal", "panes": [
+        {"id": "static", "size": 25, "view": {"id": "notes", "type": "text", "content": "Hi"}},
+        {"id": "left", "size": 25, "view": {"id": "sales", "type": "html",
+                                            "content": {"dataSource": {"webhookUrl": f"{base}/sales?delay=0.2"}}}},
+        {"id": "right", "size": 50, "layout": {"direction": "vertical", "panes": [
+            {"id": "top", "size": 50, "view": {"id": "stock", "type": "html",
+                                               "content": {"dataSource": {"webhookUrl": f"{base}/embedded"}}}},
+            {"id": "bottom", "size": 50, "view": {"id": "report", "type": "text", "content": {"dataSource": {
+                "webhookUrl": f"{base}/report", "method": "POST", "requestBody": {"range": "week"}}}}},
+        ]}},
+    ]})
+    # The standalone view wins over the copy embedded in the pane
+    await client.post("/api/view", json={"id": "stock", "type": "html",
+                                         "content": {"dataSource": {"webhookUrl": f"{base}/standalone"}}})
+
+    response = await client.post("/api/layout/dash/hydrate")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results, summary = lines[:-1], lines[-1]
+    assert summary["done"] is True
+    assert summary["count"] == 3
+    assert results[-1]["view_id"] == "sales" # The slowest call comes last
+    by_view = {result["view_id"]: result for result in results}
+    assert by_view["stock"]["pane_id"] == "top"
+    assert by_view["stock"]["data"]["path"] == "/standalone"
+    assert by_view["report"]["status_code"] == 201
+    assert by_view["report"]["data"]["body"] == '{"range": "week"}'
+
+    response = await client.post("/api/layout/dash/hydrate", headers={"Accept": "text/event-stream"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    assert [name for name, _ in events] == ["result"] * 3 + ["done"]
+    assert {data["view_id"] for _, data in events[:-1]} == {"sales", "stock", "report"}
+
+    assert (await client.post("/api/layout/dash/hydrate?deadline=0")).status_code == 422
+    assert (await client.post("/api/layout/missing/hydrate")).status_code == 404
@@ -0,0 +1,65 @@
+from app.indexes import SearchIndex, describe_layout, describe_module, tokenize
+from app.io.storage import ConfigEntry
+from app.models import LayoutConfig, ModuleConfig
+
+
+def _module(module_id: str, name: str, layout_id: str = "home", description: str = None) -> ModuleConfig:
+    return ModuleConfig(id=module_id, name=name, layout_id=layout_id, description=description)
+
+
+def test_tokenize():
+    assert tokenize("Daily_Diary 2024-Notes, Café") == ["daily", "diary", "2024", "notes", "café"]
+    assert tokenize(None) == []
+
+
+def test_module_search_text_prefix_facets_and_sort():
+    index = SearchIndex(describe_module)
+    index.sync([ConfigEntry(module, module.id) for module in [
+        _module("diary", "Daily Diary", description="Write every day"),
+        _module("dash", "Dashboard", layout_id="board"),
+        _module("notes", "Notes", description="Daily scratch pad"),
+        _module("tasks", "Tasks", layout_id="board"),
+    ]])
+    assert index.search("dai") == (2, ["diary", "notes"]) # Name or description, by word prefix
+    assert index.search("dai dia") == (1, ["diary"]) # Every term must match
+    assert index.search(prefix="DA", sort="name") == (2, ["diary", "dash"]) # "daily diary" < "dashboard"
+    assert index.search(facets={"layout_id": "board"}) == (2, ["dash", "tasks"])
+    assert index.search(sort="name", descending=True, limit=2) == (4, ["tasks", "notes"])
+    assert index.search("nothing") == (0, [])
+
+
+def test_search_index_updates_incrementally():
+    index = SearchIndex(describe_module)
+    index.sync([ConfigEntry(_module("diary", "Daily Diary"), "d1")])
+    index.add(_module("diary", "Journal"), "d2")
+    assert index.search("daily") == (0, [])
+    assert index.search("jour") == (1, ["diary"])
+    index.remove("diary")
+    assert len(index) == 0
+    assert index.search(prefix="j") == (0, [])
+    assert index._tokens == [] and index._prefixes == [] and index._facets == {} # No stale postings left
+
+    entries = [ConfigEntry(_module("a", "Alpha"), "a1"), ConfigEntry(_module("b", "Beta"), "b1")]
+    index.sync(entries)
+    index.sync([entries[0], ConfigEntry(_module("b", "Gamma"), "b2")]) # Only b changed
+    assert index.search("gam") == (1, ["b"])
+    index.sync([entries[0]])
+    assert index.search() == (1, ["a"])
+
+
+def test_layout_search_by_view_type_and_pane_count():
+    nested = LayoutConfig(id="nested_board", direction="horizontal", panes=[
+        {"id": "left", "size": 50, "view": {"id": "chart", "type": "html"}},
+        {"id": "right", "size": 50, "layout": {"direction": "vertical", "panes": [
+            {"id": "top", "size": 50, "view": {"id": "memo", "type": "text"}},
+            {"id": "bottom", "size": 50},
+        ]}},
+    ])
+    single = LayoutConfig(id="single", direction="vertical", panes=[{"id": "only", "size": 100, "view": {"id": "note", "type": "text"}}])
+    index = SearchIndex(describe_layout)
+    index.sync([ConfigEntry(nested, "n"), ConfigEntry(single, "s")])
+    assert index.search(facets={"view_type": "html"}) == (1, ["nested_board"])
+    assert index.search(facets={"view_type": "text"}, sort="pane_count") == (2, ["single", "nested_board"])
+    assert index.search(ranges={"pane_count": (2, None)}) == (1, ["nested_board"]) # Three leaf panes
+    assert index.search("board") == (1, ["nested_board"])
+    assert index.search("memo") == (1, ["nested_board"]) # Embedded view ids are searchable
@@ -1,3 +1,5 @@
+import asyncio
+import threading
 import pytest
 from httpx import AsyncClient
 from fastapi import FastAPI
@@ -229,3 +231,853 @@ async def test_remove_module(client: AsyncClient):
     # Try to delete non-existent module
     response_delete_nonexistent = await client.delete("/api/module/nonexistentModuleForDelete")
     assert response_delete_nonexistent.status_code == 404
+
+@pytest.mark.asyncio
+async def test_cache_stats_endpoint(client: AsyncClient):
+    layout_data = {"id": "cachedLayout", "direction": "horizontal", "panes": []}
+    await client.post("/api/layout", json=layout_data)
+
+    before = (await client.get("/api/cache_stats")).json()
+    await client.get("/api/layout/cachedLayout")
+    await client.get("/api/layout/cachedLayout")
+    after = (await client.get("/api/cache_stats")).json()
+
+    assert after["hits"] - before["hits"] == 2 # Saved model is served without re-reading the file
+    assert after["misses"] == before["misses"]
+
+@pytest.mark.asyncio
+async def test_get_embedded_view_uses_index(client: AsyncClient, monkeypatch):
+    from app import main
+    layout_data = {
+        "id": "indexedLayout",
+        "direction": "vertical",
+        "panes": [{"id": "paneIdx", "size": 100, "view": {"id": "indexedView", "type": "text", "content": "Indexed"}}]
+    }
+    await client.post("/api/layout", json=layout_data)
+    assert main.embedded_views.lookup("indexedView") == ("indexedLayout", "paneIdx")
+
+    # Embedded lookups must not fall back to scanning every layout
+    async def fail_scan(*args, **kwargs):
+        raise AssertionError("load_all_yaml should not be called for an indexed view")
+    monkeypatch.setattr(main, "aload_all_yaml", fail_scan)
+    response = await client.get("/api/view/indexedView")
+    assert response.status_code == 200
+    assert response.json()["content"] == "Indexed"
+    assert (await client.get("/api/view/unknownView")).status_code == 404
+    monkeypatch.undo()
+
+    await client.delete("/api/layout/indexedLayout")
+    assert main.embedded_views.lookup("indexedView") is None
+    assert (await client.get("/api/view/indexedView")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_embedded_view_index_reports_duplicates(client: AsyncClient):
+    from app import main
+    for layout_id in ("dupLayout1", "dupLayout2"):
+        await client.post("/api/layout", json={
+            "id": layout_id,
+            "direction": "horizontal",
+            "panes": [{"id": f"{layout_id}Pane", "size": 100, "view": {"id": "sharedView", "type": "text"}}]
+        })
+
+    main.embedded_views.built = False
+    await main.ensure_embedded_view_index()
+    duplicates = main.embedded_views.duplicates
+    assert set(duplicates) == {"sharedView"}
+    assert {loc.layout_id for loc in duplicates["sharedView"]} == {"dupLayout1", "dupLayout2"}
+
+@pytest.mark.asyncio
+async def test_slow_listing_does_not_block_other_requests(client: AsyncClient, monkeypatch):
+    from app.io import yaml_loader
+    await client.post("/api/layout", json={"id": "quickLayout", "direction": "vertical", "panes": []})
+
+    # Simulate a large listing on a slow disk: the listing blocks until released
+    listing_started = threading.Event()
+    release_listing = threading.Event()
+    original_load_all = yaml_loader.load_all_yaml_entries
+    def slow_load_all(*args, **kwargs):
+        listing_started.set()
+        release_listing.wait(timeout=5)
+        return original_load_all(*args, **kwargs)
+    monkeypatch.setattr(yaml_loader, "load_all_yaml_entries", slow_load_all)
+
+    listing = asyncio.create_task(client.get("/api/layouts"))
+    assert await asyncio.to_thread(listing_started.wait, 5)
+    try:
+        # Other requests keep making progress while the listing is still running
+        for _ in range(3):
+            response = await asyncio.wait_for(client.get("/api/layout/quickLayout"), timeout=2)
+            assert response.status_code == 200
+        assert not listing.done()
+    finally:
+        release_listing.set()
+    response = await listing
+    assert response.status_code == 200
+    assert [layout["id"] for layout in response.json()] == ["quickLayout"]
+
+@pytest.mark.asyncio
+async def test_list_layouts_cursor_pagination(client: AsyncClient, monkeypatch):
+    for layout_id in ("pageC", "pageA", "pageE", "pageB", "pageD"):
+        await client.post("/api/layout", json={"id": layout_id, "direction": "vertical", "panes": []})
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/layouts", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(layout["id"] for layout in page)
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert seen == ["pageA", "pageB", "pageC", "pageD", "pageE"] # Stable ordering by id
+
+    # Only the configs of the requested page are loaded
+    import app.main as main_module
+    loaded = []
+    real_load = main_module.aload_yaml_entries
+    async def counting_load(data_type_name, data_ids, model_class):
+        loaded.extend(data_ids)
+        return await real_load(data_type_name, data_ids, model_class)
+    monkeypatch.setattr(main_module, "aload_yaml_entries", counting_load)
+    monkeypatch.setattr(main_module, "aload_all_yaml_entries", None)
+    page = await client.get("/api/layouts", params={"limit": 2, "cursor": response.request.url.params.get("cursor")})
+    assert [layout["id"] for layout in page.json()] == ["pageE"] and loaded == ["pageE"]
+
+    assert (await client.get("/api/layouts", params={"cursor": "!!"})).status_code == 400
+    assert (await client.get("/api/layouts", params={"limit": 0})).status_code == 422
+
+@pytest.mark.asyncio
+async def test_list_modules_field_projection(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "projLayout", "direction": "vertical", "panes": []})
+    await client.post("/api/module", json={
+        "id": "projModule", "name": "Projected", "layout_id": "projLayout", "icon": "P", "description": "Long text"
+    })
+
+    response = await client.get("/api/modules", params={"fields": "name,icon"})
+    assert response.status_code == 200
+    assert response.json() == [{"id": "projModule", "name": "Projected", "icon": "P"}]
+
+    response_unknown = await client.get("/api/modules", params={"fields": "name,nope"})
+    assert response_unknown.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_search_parameters(client: AsyncClient, monkeypatch):
+    import app.main as main_module
+    await client.post("/api/layout", json={"id": "board", "direction": "horizontal", "panes": [
+        {"id": "p1", "size": 50, "view": {"id": "chartView", "type": "html"}},
+        {"id": "p2", "size": 50, "view": {"id": "memoView", "type": "text"}}]})
+    await client.post("/api/layout", json={"id": "plain", "direction": "vertical", "panes": []})
+    for module_id, name, layout_id in [("diary", "Daily Diary", "plain"), ("dash", "Dashboard", "board"),
+                                       ("notes", "Notes", "plain"), ("sales", "Sales Dashboard", "board")]:
+        await client.post("/api/module", json={"id": module_id, "name": name, "layout_id": layout_id})
+
+    response = await client.get("/api/modules", params={"prefix": "da", "sort": "name", "fields": "name"})
+    assert response.json() == [{"id": "diary", "name": "Daily Diary"}, {"id": "dash", "name": "Dashboard"}]
+    assert response.headers["x-total-count"] == "2"
+    response = await client.get("/api/modules", params={"q": "dash", "limit": 1, "sort": "-name"})
+    assert [module["id"] for module in response.json()] == ["sales"]
+    assert response.headers["x-total-count"] == "2"
+    assert "x-next-cursor" not in response.headers
+    response = await client.get("/api/modules", params={"layout_id": "plain"})
+    assert [module["id"] for module in response.json()] == ["diary", "notes"]
+
+    response = await client.get("/api/layouts", params={"view_type": "text", "min_panes": 2})
+    assert [layout["id"] for layout in response.json()] == ["board"]
+    response = await client.get("/api/layouts", params={"sort": "-pane_count", "format": "ndjson", "fields": "id"})
+    assert response.text.splitlines() == ['{"id":"board"}', '{"id":"plain"}']
+
+    await client.post("/api/view", json={"id": "hookView", "type": "webhook_trigger", "content": {}})
+    await client.post("/api/view", json={"id": "textView", "type": "text", "content": "x"})
+    assert [view["id"] for view in (await client.get("/api/views")).json()] == ["hookView", "textView"]
+    assert [view["id"] for view in (await client.get("/api/views", params={"type": "text"})).json()] == ["textView"]
+
+    # Writes and deletes update the index without reloading every config
+    async def fail_scan(*args, **kwargs):
+        raise AssertionError("search should not reload every config")
+    monkeypatch.setattr(main_module, "aload_all_yaml_entries", fail_scan)
+    await client.patch("/api/module/notes", json={"name": "Daybook"}, headers={"Content-Type": "application/merge-patch+json"})
+    await client.delete("/api/module/diary")
+    response = await client.get("/api/modules", params={"prefix": "da", "sort": "name"})
+    assert [module["id"] for module in response.json()] == ["dash", "notes"]
+
+    assert (await client.get("/api/modules", params={"q": "d", "cursor": "x"})).status_code == 400
+    assert (await client.get("/api/modules", params={"sort": "pane_count"})).status_code == 422
+
+@pytest.mark.asyncio
+async def test_list_layouts_ndjson_stream(client: AsyncClient):
+    import json
+    for layout_id in ("streamA", "streamB"):
+        await client.post("/api/layout", json={"id": layout_id, "direction": "horizontal", "panes": []})
+
+    response = await client.get("/api/layouts", params={"format": "ndjson", "fields": "direction"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"id": "streamA", "direction": "horizontal"}, {"id": "streamB", "direction": "horizontal"}]
+
+    response_accept = await client.get("/api/modules", headers={"Accept": "application/x-ndjson"})
+    assert response_accept.status_code == 200
+    assert response_accept.text == ""
+
+@pytest.mark.asyncio
+async def test_etag_and_not_modified_on_reads(client: AsyncClient):
+    layout_data = {
+        "id": "etagLayout",
+        "direction": "horizontal",
+        "panes": [{"id": "etagPane", "size": 100, "view": {"id": "etagView", "type": "text", "content": "E"}}]
+    }
+    await client.post("/api/layout", json=layout_data)
+    await client.post("/api/module", json={"id": "etagModule", "name": "ETag", "layout_id": "etagLayout"})
+
+    for url in ("/api/layout/etagLayout", "/api/view/etagView", "/api/module/etagModule", "/api/layouts", "/api/modules"):
+        first = await client.get(url)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert etag.startswith('"') and etag.endswith('"') # Strong ETag
+
+        cached = await client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+        stale = await client.get(url, headers={"If-None-Match": '"something-else"'})
+        assert stale.status_code == 200
+
+@pytest.mark.asyncio
+async def test_etag_changes_with_content(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "etagA", "direction": "horizontal", "panes": []})
+    layout_etag = (await client.get("/api/layout/etagA")).headers["etag"]
+    list_etag = (await client.get("/api/layouts")).headers["etag"]
+    page_etag = (await client.get("/api/layouts", params={"limit": 1})).headers["etag"]
+    assert page_etag != list_etag # Different representation, different ETag
+
+    await client.delete("/api/layout/etagA")
+    await client.post("/api/layout", json={"id": "etagA", "direction": "vertical", "panes": []})
+    assert (await client.get("/api/layout/etagA", headers={"If-None-Match": layout_etag})).status_code == 200
+    assert (await client.get("/api/layouts", headers={"If-None-Match": list_etag})).status_code == 200
+
+@pytest.mark.asyncio
+async def test_get_resolved_module(client: AsyncClient):
+    layout_data = {
+        "id": "resolvedLayout",
+        "direction": "horizontal",
+        "panes": [
+            {"id": "rp1", "size": 50, "view": {"id": "rv1", "type": "text", "content": "Embedded only"}},
+            {"id": "rp2", "size": 50, "view": {"id": "rv2", "type": "text", "content": "Embedded copy"}},
+        ]
+    }
+    await client.post("/api/layout", json=layout_data)
+    await client.post("/api/view", json={"id": "rv2", "type": "html", "content": "<b>Standalone</b>"})
+    await client.post("/api/module", json={"id": "resolvedModule", "name": "Resolved", "layout_id": "resolvedLayout"})
+
+    response = await client.get("/api/module/resolvedModule/resolved")
+    assert response.status_code == 200
+    resolved = response.json()
+    assert resolved["module"]["id"] == "resolvedModule"
+    assert resolved["layout"] == (await client.get("/api/layout/resolvedLayout")).json()
+    assert resolved["views"]["rv1"]["content"] == "Embedded only"
+    assert resolved["views"]["rv2"] == (await client.get("/api/view/rv2")).json() # Same precedence as get_view
+
+    assert (await client.get("/api/module/nonexistentModule/resolved")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_get_resolved_modules_batch(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "batchLayout", "direction": "vertical", "panes": []})
+    for module_id in ("batchA", "batchB"):
+        await client.post("/api/module", json={"id": module_id, "name": module_id, "layout_id": "batchLayout"})
+
+    response = await client.get("/api/modules/resolved", params=[("ids", "batchA"), ("ids", "missingModule"), ("ids", "batchB")])
+    assert response.status_code == 200
+    batch = response.json()
+    assert [item["module"]["id"] for item in batch["modules"]] == ["batchA", "batchB"]
+    assert all(item["layout"]["id"] == "batchLayout" for item in batch["modules"])
+    assert batch["missing"] == ["missingModule"]
+
+    assert (await client.get("/api/modules/resolved")).status_code == 422
+
+@pytest.mark.asyncio
+async def test_bulk_mixed_batch_applies_all(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "bulkExisting", "direction": "vertical", "panes": []})
+    await client.post("/api/view", json={"id": "bulkOldView", "type": "text"})
+
+    batch = {"items": [
+        {"op": "create", "type": "module", "data": {"id": "bulkModule", "name": "Bulk", "layout_id": "bulkLayout"}},
+        {"op": "create", "type": "layout", "data": {
+            "id": "bulkLayout", "direction": "horizontal",
+            "panes": [{"id": "bp1", "size": 100, "view": {"id": "bulkEmbedded", "type": "text"}}]}},
+        {"op": "upsert", "type": "layout", "data": {"id": "bulkExisting", "direction": "horizontal", "panes": []}},
+        {"op": "create", "type": "view", "data": {"id": "bulkView", "type": "html", "content": "<i>x</i>"}},
+        {"op": "delete", "type": "view", "id": "bulkOldView"},
+    ]}
+    response = await client.post("/api/bulk", json=batch)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["applied"] is True
+    assert [r["status"] for r in body["results"]] == ["created", "created", "updated", "created", "deleted"]
+    assert body["results"][0]["id"] == "bulkModule"
+
+    assert (await client.get("/api/module/bulkModule")).json()["layout_id"] == "bulkLayout"
+    assert (await client.get("/api/layout/bulkExisting")).json()["direction"] == "horizontal"
+    assert (await client.get("/api/view/bulkView")).status_code == 200
+    assert (await client.get("/api/view/bulkEmbedded")).status_code == 200 # Embedded view index updated
+    assert (await client.get("/api/view/bulkOldView")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_bulk_invalid_item_applies_nothing(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "bulkTaken", "direction": "vertical", "panes": []})
+
+    batch = {"items": [
+        {"op": "create", "type": "layout", "data": {"id": "bulkNew", "direction": "vertical", "panes": []}},
+        {"op": "create", "type": "layout", "data": {"id": "bulkTaken", "direction": "vertical", "panes": []}},
+        {"op": "create", "type": "module", "data": {"id": "bulkOrphan", "name": "Orphan", "layout_id": "noSuchLayout"}},
+        {"op": "create", "type": "view", "data": {"id": "bulkBadView"}},
+        {"op": "delete", "type": "module", "id": "noSuchModule"},
+        {"op": "upsert", "type": "layout", "data": {"id": "bulkNew", "direction": "vertical", "panes": []}},
+    ]}
+    response = await client.post("/api/bulk", json=batch)
+    assert response.status_code == 400
+    body = response.json()
+    assert body["applied"] is False
+    assert [r["status"] for r in body["results"]] == ["skipped", "error", "error", "error", "error", "error"]
+    assert "already exists" in body["results"][1]["error"]
+    assert "noSuchLayout" in body["results"][2]["error"]
+    assert "more than once" in body["results"][5]["error"]
+
+    assert (await client.get("/api/layout/bulkNew")).status_code == 404 # Nothing was written
+
+@pytest.mark.asyncio
+async def test_bulk_module_cannot_reference_layout_deleted_in_same_batch(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "bulkDoomed", "direction": "vertical", "panes": []})
+    batch = {"items": [
+        {"op": "delete", "type": "layout", "id": "bulkDoomed"},
+        {"op": "create", "type": "module", "data": {"id": "bulkDangling", "name": "D", "layout_id": "bulkDoomed"}},
+    ]}
+    response = await client.post("/api/bulk", json=batch)
+    assert response.status_code == 400
+    assert (await client.get("/api/layout/bulkDoomed")).status_code == 200
+
+@pytest.mark.asyncio
+async def test_change_feed_reports_api_writes(client: AsyncClient):
+    since = (await client.get("/api/changes", params={"format": "json"})).json()["version"]
+    await client.post("/api/layout", json={"id": "feedLayout", "direction": "vertical", "panes": []})
+    etag = (await client.get("/api/layout/feedLayout", headers=IDENTITY)).headers["etag"]
+    await client.delete("/api/layout/feedLayout")
+
+    body = (await client.get("/api/changes", params={"format": "json", "since": since})).json()
+    assert body["reset"] is False
+    assert [(e["type"], e["id"], e["op"]) for e in body["events"]] == [("layout", "feedLayout", "upsert"), ("layout", "feedLayout", "delete")]
+    assert body["events"][0]["etag"] == etag # Same ETag as the GET endpoint
+    assert body["version"] == body["events"][-1]["version"]
+
+    caught_up = (await client.get("/api/changes", params={"format": "json", "since": body["version"]})).json()
+    assert caught_up["events"] == []
+    ahead = (await client.get("/api/changes", params={"format": "json", "since": body["version"] + 100})).json()
+    assert ahead["reset"] is True # e.g. a cursor from before a server restart
+
+@pytest.mark.asyncio
+async def test_change_feed_long_poll_wakes_on_write(client: AsyncClient):
+    since = (await client.get("/api/changes", params={"format": "json"})).json()["version"]
+    poll = asyncio.create_task(client.get("/api/changes", params={"format": "json", "since": since, "wait": 5}))
+    await asyncio.sleep(0.05)
+    assert not poll.done()
+    await client.post("/api/view", json={"id": "feedView", "type": "text"})
+    body = (await asyncio.wait_for(poll, 2)).json()
+    assert [(e["type"], e["id"]) for e in body["events"]] == [("view", "feedView")]
+
+@pytest.mark.asyncio
+async def test_change_feed_detects_edits_made_on_disk(client: AsyncClient):
+    from app.main import reconcile_change_feed
+    from app.io.yaml_loader import get_path_for_type
+    await client.post("/api/layout", json={"id": "diskLayout", "direction": "vertical", "panes": []})
+    await reconcile_change_feed(publish=False)
+    since = (await client.get("/api/changes", params={"format": "json"})).json()["version"]
+
+    get_path_for_type('layouts', 'diskLayout').write_text("id: diskLayout\ndirection: horizontal\npanes: []\n")
+    await reconcile_change_feed()
+    body = (await client.get("/api/changes", params={"format": "json", "since": since})).json()
+    assert [(e["id"], e["op"]) for e in body["events"]] == [("diskLayout", "upsert")]
+    assert body["events"][0]["etag"] == (await client.get("/api/layout/diskLayout", headers=IDENTITY)).headers["etag"]
+
+    await reconcile_change_feed() # Nothing changed since; no repeated events
+    assert (await client.get("/api/changes", params={"format": "json", "since": body["version"]})).json()["events"] == []
+
+@pytest.mark.asyncio
+async def test_change_stream_emits_sse_and_resets_on_gap(monkeypatch):
+    import app.main as main_module
+    from app.changes import ChangeFeed
+    feed = ChangeFeed(max_events=2)
+    monkeypatch.setattr(main_module, "change_feed", feed)
+    for n in range(3):
+        feed.publish('module', f"m{n}", 'upsert', f'"etag{n}"')
+
+    stream = main_module._change_stream(since=1)
+    assert await anext(stream) == "retry: 3000\n\n"
+    first = await anext(stream)
+    assert first.startswith("id: 2\nevent: change\ndata: ")
+    assert '"id":"m1"' in first
+
+    gap = main_module._change_stream(since=0) # Event 1 is no longer buffered
+    await anext(gap)
+    assert (await anext(gap)).startswith("id: 3\nevent: reset")
+
+    idle = main_module._change_stream(since=3, heartbeat=0.01)
+    await anext(idle)
+    assert await asyncio.wait_for(anext(idle), 1) == ": keep-alive\n\n"
+
+    # Open streams are what keeps the store watcher polling
+    assert feed.subscribers == 3
+    for open_stream in (stream, gap, idle):
+        await open_stream.aclose()
+    assert feed.subscribers == 0
+
+@pytest.mark.asyncio
+async def test_store_watcher_polls_only_while_clients_listen(monkeypatch):
+    import app.main as main_module
+    from app.changes import ChangeFeed
+    feed = ChangeFeed()
+    polls = []
+    async def reconcile():
+        polls.append(feed.subscribers)
+    monkeypatch.setattr(main_module, "change_feed", feed)
+    monkeypatch.setattr(main_module, "reconcile_change_feed", reconcile)
+
+    watcher = asyncio.create_task(main_module._watch_store(0.01))
+    try:
+        await asyncio.sleep(0.05)
+        assert polls == []
+        with feed.subscription():
+            await asyncio.sleep(0.05)
+        assert polls and set(polls) == {1}
+    finally:
+        watcher.cancel()
+
+@pytest.mark.asyncio
+async def test_readiness_waits_for_startup_preload(client: AsyncClient, monkeypatch):
+    import app.main as main_module
+    await client.post("/api/view", json={"id": "warmView", "type": "text", "content": "warm"})
+    release = asyncio.Event()
+    real_preload = main_module.apreload_all_yaml
+
+    async def slow_preload(model_classes):
+        await release.wait()
+        return await real_preload(model_classes, workers=1)
+
+    monkeypatch.setattr(main_module, "PRELOAD_ENABLED", True)
+    monkeypatch.setattr(main_module, "CHANGES_POLL_SECONDS", 0)
+    monkeypatch.setattr(main_module, "apreload_all_yaml", slow_preload)
+    monkeypatch.setattr(main_module, "configure_logging", lambda: None)
+    async with main_module.lifespan(app):
+        not_ready = await client.get("/api/ready")
+        assert not_ready.status_code == 503
+        assert not_ready.json()["ready"] is False
+        assert (await client.get("/")).status_code == 200 # Only /api requests are held back
+        pending = asyncio.ensure_future(client.get("/api/view/warmView"))
+        await asyncio.sleep(0.05)
+        assert not pending.done() # Waits for the preload instead of parsing the store itself
+        release.set()
+        assert (await pending).status_code == 200
+        ready = await client.get("/api/ready")
+        assert ready.status_code == 200
+        preload = ready.json()["preload"]
+        assert preload["loaded"]["views"] == 1
+        assert preload["errors"] == []
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routes_and_storage(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "metricsLayout", "direction": "vertical", "panes": []})
+    await client.get("/api/layout/metricsLayout")
+    await client.get("/api/layouts")
+    not_modified = 'inkstone_http_request_duration_seconds_count{method="GET",route="/api/layout/{layout_id}",status="304"}'
+    def not_modified_count(text: str) -> float:
+        return next((float(line.split()[-1]) for line in text.splitlines() if line.startswith(not_modified + " ")), 0.0)
+    before = not_modified_count((await client.get("/metrics")).text)
+    # Negotiated conditional GETs rewrite If-None-Match on the way in; the route must still be labelled
+    for headers in ({"Accept-Encoding": "gzip"}, {"Accept": "application/msgpack", "Accept-Encoding": "identity"}):
+        etag = (await client.get("/api/layout/metricsLayout", headers=headers)).headers["etag"]
+        revalidated = await client.get("/api/layout/metricsLayout", headers={**headers, "If-None-Match": etag})
+        assert revalidated.status_code == 304
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'inkstone_http_request_duration_seconds_count{method="GET",route="/api/layout/{layout_id}",status="200"}' in text
+    assert not_modified_count(text) == before + 2
+    assert 'route="unmatched",status="304"' not in text
+    assert "# TYPE inkstone_http_requests_in_flight gauge" in text
+    assert "inkstone_yaml_dump_seconds_count" in text
+    assert 'inkstone_storage_bytes_written_total{backend="yaml"}' in text
+    assert 'inkstone_storage_files_scanned_count{data_type="layouts"}' in text
+    assert "inkstone_model_cache_hit_ratio " in text
+
+@pytest.mark.asyncio
+async def test_server_timing_header_on_request(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "timedLayout", "direction": "vertical", "panes": []})
+    plain = await client.get("/api/layout/timedLayout")
+    assert "server-timing" not in plain.headers # Opt-in unless INKSTONE_SERVER_TIMING=1
+
+    timed = await client.get("/api/layout/timedLayout", headers={"Server-Timing": "1"})
+    phases = {part.split(";")[0].strip() for part in timed.headers["server-timing"].split(",")}
+    assert {"app", "storage"} <= phases
+
+JSON_PATCH = {"Content-Type": "application/json-patch+json"}
+MERGE_PATCH = {"Content-Type": "application/merge-patch+json"}
+IDENTITY = {"Accept-Encoding": "identity"}
+
+@pytest.mark.asyncio
+async def test_patch_layout_with_json_patch(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "patchLayout", "direction": "horizontal", "panes": [
+        {"id": "left", "size": 50, "view": {"id": "patchView", "type": "text", "content": "Hi"}},
+        {"id": "right", "size": 50},
+    ]})
+    etag = (await client.get("/api/layout/patchLayout")).headers["etag"]
+
+    ops = [{"op": "test", "path": "/panes/1/id", "value": "right"},
+           {"op": "replace", "path": "/panes/0/size", "value": 30},
+           {"op": "replace", "path": "/panes/1/size", "value": 70}]
+    response = await client.patch("/api/layout/patchLayout", json=ops, headers={**JSON_PATCH, "If-Match": etag})
+    assert response.status_code == 200
+    assert [pane["size"] for pane in response.json()["panes"]] == [30, 70]
+    assert response.headers["etag"] != etag
+
+    fetched = await client.get("/api/layout/patchLayout")
+    assert fetched.json() == response.json()
+    assert fetched.headers["etag"] == response.headers["etag"]
+    assert (await client.get("/api/view/patchView")).json()["content"] == "Hi"
+
+    # The old ETag is now stale: the update is refused instead of overwriting the newer version
+    stale = await client.patch("/api/layout/patchLayout", json=ops, headers={**JSON_PATCH, "If-Match": etag})
+    assert stale.status_code == 412
+
+@pytest.mark.asyncio
+async def test_patch_layout_updates_embedded_view_index(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "patchIndexLayout", "direction": "vertical", "panes": [{"id": "p", "size": 100}]})
+    ops = [{"op": "add", "path": "/panes/0/view", "value": {"id": "patchAddedView", "type": "text"}}]
+    assert (await client.patch("/api/layout/patchIndexLayout", json=ops, headers=JSON_PATCH)).status_code == 200
+    assert (await client.get("/api/view/patchAddedView")).status_code == 200
+
+@pytest.mark.asyncio
+async def test_patch_module_with_merge_patch(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "patchModLayout", "direction": "vertical", "panes": []})
+    await client.post("/api/module", json={"id": "patchModule", "name": "Old", "layout_id": "patchModLayout", "icon": "X"})
+
+    response = await client.patch("/api/module/patchModule", json={"name": "New", "icon": None}, headers=MERGE_PATCH)
+    assert response.status_code == 200
+    assert response.json() == {"id": "patchModule", "name": "New", "layout_id": "patchModLayout", "icon": None, "description": None}
+
+    missing_layout = await client.patch("/api/module/patchModule", json={"layout_id": "noSuchLayout"}, headers=MERGE_PATCH)
+    assert missing_layout.status_code == 404
+    assert (await client.get("/api/module/patchModule")).json()["layout_id"] == "patchModLayout"
+
+@pytest.mark.asyncio
+async def test_patch_errors(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "patchErrLayout", "direction": "vertical", "panes": [{"id": "p", "size": 100}]})
+    url = "/api/layout/patchErrLayout"
+    assert (await client.patch("/api/layout/noSuchLayout", json={"direction": "horizontal"}, headers=MERGE_PATCH)).status_code == 404
+    assert (await client.patch(url, json=[{"op": "test", "path": "/direction", "value": "horizontal"}], headers=JSON_PATCH)).status_code == 409
+    assert (await client.patch(url, json=[{"op": "replace", "path": "/panes/5/size", "value": 1}], headers=JSON_PATCH)).status_code == 400
+    assert (await client.patch(url, json={"panes": [{"id": "p", "size": "wide"}]}, headers=MERGE_PATCH)).status_code == 422
+    assert (await client.patch(url, json={"id": "renamed"}, headers=MERGE_PATCH)).status_code == 422
+    assert (await client.patch(url, content="direction=horizontal", headers={"Content-Type": "text/plain"})).status_code == 415
+    assert (await client.get(url)).json()["panes"] == [{"id": "p", "size": 100.0, "view": None}] # Unchanged
+
+NESTED_LAYOUT = {"id": "nestedLayout", "direction": "horizontal", "panes": [
+    {"id": "sidebar", "size": 25, "view": {"id": "nestedSidebarView", "type": "text", "content": "Nav"}},
+    {"id": "main", "size": 75, "layout": {"direction": "vertical", "panes": [
+        {"id": "editor", "size": 70, "view": {"id": "nestedEditorView", "type": "text", "content": "Deep"}},
+        {"id": "bottom", "size": 30, "layout": {"direction": "horizontal", "panes": [
+            {"id": "console", "size": 50, "view": {"id": "nestedConsoleView", "type": "text", "content": "$"}},
+            {"id": "output", "size": 50},
+        ]}},
+    ]}},
+]}
+
+@pytest.mark.asyncio
+async def test_nested_layout_panes_and_views(client: AsyncClient):
+    assert (await client.post("/api/layout", json=NESTED_LAYOUT)).status_code == 201
+
+    response = await client.get("/api/layout/nestedLayout/pane/console")
+    assert response.status_code == 200
+    assert response.json()["view"]["id"] == "nestedConsoleView"
+    assert response.headers["x-pane-pointer"] == "/panes/1/layout/panes/1/layout/panes/0"
+    assert (await client.get("/api/layout/nestedLayout/pane/console", headers={"If-None-Match": response.headers["etag"]})).status_code == 304
+    assert (await client.get("/api/layout/nestedLayout/pane/missing")).status_code == 404
+    assert (await client.get("/api/layout/noSuchLayout/pane/console")).status_code == 404
+
+    # Views embedded at any depth are found by get_view and included when resolving a module
+    assert (await client.get("/api/view/nestedConsoleView")).json()["content"] == "$"
+    await client.post("/api/module", json={"id": "nestedModule", "name": "Nested", "layout_id": "nestedLayout"})
+    resolved = (await client.get("/api/module/nestedModule/resolved")).json()
+    assert set(resolved["views"]) == {"nestedSidebarView", "nestedEditorView", "nestedConsoleView"}
+
+    # The pointer from the pane endpoint addresses the pane in a PATCH
+    pointer = response.headers["x-pane-pointer"]
+    ops = [{"op": "replace", "path": f"{pointer}/size", "value": 60},
+           {"op": "replace", "path": "/panes/1/layout/panes/1/layout/panes/1/size", "value": 40}]
+    patched = await client.patch("/api/layout/nestedLayout", json=ops, headers=JSON_PATCH)
+    assert patched.status_code == 200
+    assert (await client.get("/api/layout/nestedLayout/pane/console")).json()["size"] == 60
+
+    # Sizes under the nested split must still add up to 100
+    bad = [{"op": "replace", "path": f"{pointer}/size", "value": 10}]
+    assert (await client.patch("/api/layout/nestedLayout", json=bad, headers=JSON_PATCH)).status_code == 422
+
+@pytest.mark.asyncio
+async def test_nested_layout_validation(client: AsyncClient):
+    def layout(inner_panes):
+        return {"id": "badNested", "direction": "vertical", "panes": [
+            {"id": "outer", "size": 100, "layout": {"direction": "horizontal", "panes": inner_panes}}]}
+
+    assert (await client.post("/api/layout", json=layout([{"id": "a", "size": 40}, {"id": "b", "size": 40}]))).status_code == 422
+    assert (await client.post("/api/layout", json=layout([{"id": "outer", "size": 100}]))).status_code == 422
+    assert (await client.post("/api/layout", json=layout([
+        {"id": "a", "size": 100, "view": {"id": "v", "type": "text"}, "layout": {"direction": "vertical", "panes": []}}]))).status_code == 422
+    assert (await client.get("/api/layout/badNested")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_stored_layout_with_bad_pane_sizes_is_normalized_on_load(client: AsyncClient):
+    from app.io.yaml_loader import get_path_for_type
+    get_path_for_type('layouts', 'oldLayout').write_text(
+        "id: oldLayout\ndirection: horizontal\npanes:\n- {id: a, size: 30}\n- {id: b, size: 30}\n")
+
+    response = await client.get("/api/layout/oldLayout")
+    assert response.status_code == 200
+    assert response.json()["panes"] == [{"id": "a", "size": 50.0, "view": None}, {"id": "b", "size": 50.0, "view": None}]
+    assert "oldLayout" in [layout["id"] for layout in (await client.get("/api/layouts")).json()]
+
+    # Writing the same sizes back is still rejected
+    bad = {"panes": [{"id": "a", "size": 30}, {"id": "b", "size": 30}]}
+    assert (await client.patch("/api/layout/oldLayout", json=bad, headers=MERGE_PATCH)).status_code == 422
+
+@pytest.mark.asyncio
+async def test_layout_dependents_and_guarded_delete(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "depLayout", "direction": "vertical", "panes": [
+        {"id": "depPane", "size": 100, "view": {"id": "depView", "type": "text"}}]})
+    await client.post("/api/layout", json={"id": "otherLayout", "direction": "vertical", "panes": []})
+    for module_id in ("depModuleB", "depModuleA"):
+        await client.post("/api/module", json={"id": module_id, "name": module_id, "layout_id": "depLayout"})
+
+    response = await client.get("/api/layout/depLayout/dependents")
+    assert response.json() == {"layout_id": "depLayout", "modules": ["depModuleA", "depModuleB"]}
+    assert (await client.get("/api/view/depView/dependents")).json() == {
+        "view_id": "depView", "layouts": ["depLayout"], "modules": ["depModuleA", "depModuleB"]}
+    assert (await client.get("/api/layout/noSuchLayout/dependents")).status_code == 404
+    assert (await client.get("/api/view/noSuchView/dependents")).status_code == 404
+
+    # The index follows module updates and deletes
+    await client.patch("/api/module/depModuleB", json={"layout_id": "otherLayout"}, headers=MERGE_PATCH)
+    from app.main import module_refs
+    from app.io.yaml_loader import get_type_version
+    assert module_refs.source_version == get_type_version('modules') # Updated in place, not due for a rebuild
+    assert (await client.get("/api/layout/depLayout/dependents")).json()["modules"] == ["depModuleA"]
+    await client.post("/api/module", json={"id": "depModuleC", "name": "C", "layout_id": "depLayout"})
+
+    refused = await client.delete("/api/layout/depLayout")
+    assert refused.status_code == 409
+    assert "depModuleA, depModuleC" in refused.json()["detail"]
+    assert (await client.get("/api/layout/depLayout")).status_code == 200
+
+    assert (await client.delete("/api/layout/depLayout", params={"cascade": "true"})).status_code == 204
+    assert (await client.get("/api/layout/depLayout")).status_code == 404
+    assert (await client.get("/api/module/depModuleA")).status_code == 404
+    assert (await client.get("/api/module/depModuleC")).status_code == 404
+    assert (await client.get("/api/module/depModuleB")).status_code == 200
+    assert (await client.delete("/api/layout/depLayout", params={"cascade": "true"})).status_code == 404
+
+@pytest.mark.asyncio
+async def test_bulk_delete_of_used_layout_is_refused(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "bulkDepLayout", "direction": "vertical", "panes": []})
+    await client.post("/api/module", json={"id": "bulkDepModule", "name": "M", "layout_id": "bulkDepLayout"})
+
+    response = await client.post("/api/bulk", json={"items": [{"op": "delete", "type": "layout", "id": "bulkDepLayout"}]})
+    assert response.status_code == 400
+    assert "bulkDepModule" in response.json()["results"][0]["error"]
+
+    # Deleting the module in the same batch is fine
+    response = await client.post("/api/bulk", json={"items": [
+        {"op": "delete", "type": "layout", "id": "bulkDepLayout"},
+        {"op": "delete", "type": "module", "id": "bulkDepModule"},
+    ]})
+    assert response.json()["applied"] is True
+    assert (await client.get("/api/integrity")).json()["ok"] is True
+
+@pytest.mark.asyncio
+async def test_integrity_report(client: AsyncClient):
+    from app.io.yaml_loader import save_yaml
+    from app.models import ModuleConfig
+
+    assert (await client.get("/api/integrity")).json() == {"ok": True, "missing_layouts": {}, "duplicate_views": {}}
+    for layout_id in ("intLayoutA", "intLayoutB"):
+        await client.post("/api/layout", json={"id": layout_id, "direction": "vertical", "panes": [
+            {"id": f"{layout_id}Pane", "size": 100, "view": {"id": "intSharedView", "type": "text"}}]})
+    # Written straight to the store, bypassing the API's reference check
+    save_yaml('modules', 'intDangling', ModuleConfig(id="intDangling", name="D", layout_id="intGone"))
+
+    report = (await client.get("/api/integrity")).json()
+    assert report["ok"] is False
+    assert report["missing_layouts"] == {"intGone": ["intDangling"]}
+    assert sorted(report["duplicate_views"]["intSharedView"]) == ["intLayoutA/intLayoutAPane", "intLayoutB/intLayoutBPane"]
+
+@pytest.mark.asyncio
+async def test_fast_json_matches_model_responses(client: AsyncClient, monkeypatch):
+    from app import responses
+
+    await client.post("/api/layout", json={"id": "fastLayout", "direction": "vertical", "panes": [
+        {"id": "fastPane", "size": 100, "view": {"id": "fastView", "type": "text", "content": {"text": "Grüße", "n": 1.5}}}]})
+    await client.post("/api/layout", json={"id": "fastLayout2", "direction": "horizontal", "panes": []})
+    await client.post("/api/module", json={"id": "fastModule", "name": "Fast", "layout_id": "fastLayout"})
+    await client.post("/api/view", json={"id": "fastStandalone", "type": "text", "content": None})
+    urls = ["/api/layout/fastLayout", "/api/layouts", "/api/layouts?limit=1", "/api/layouts?fields=id,direction",
+            "/api/module/fastModule", "/api/modules", "/api/view/fastStandalone"]
+
+    monkeypatch.setattr(responses, "FAST_JSON_ENABLED", True)
+    fast = [await client.get(url) for url in urls]
+    monkeypatch.setattr(responses, "FAST_JSON_ENABLED", False)
+    slow = [await client.get(url) for url in urls]
+    for url, fast_response, slow_response in zip(urls, fast, slow):
+        assert fast_response.status_code == slow_response.status_code == 200, url
+        assert fast_response.json() == slow_response.json(), url
+        assert fast_response.headers["content-type"] == slow_response.headers["content-type"], url
+        assert fast_response.headers["etag"] == slow_response.headers["etag"], url
+    assert fast[2].headers["x-next-cursor"] == slow[2].headers["x-next-cursor"]
+
+    # The response models are still documented
+    schema = (await client.get("/openapi.json")).json()
+    layout_schema = schema["paths"]["/api/layout/{layout_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert layout_schema["$ref"].startswith("#/components/schemas/LayoutConfig")
+
+async def _create_big_layouts(client: AsyncClient, count: int) -> None:
+    for n in range(count):
+        await client.post("/api/layout", json={"id": f"bigLayout{n}", "direction": "vertical", "panes": [
+            {"id": f"bigPane{n}", "size": 100, "view": {"id": f"bigView{n}", "type": "html", "content": "<p>Row</p>" * 200}}]})
+
+@pytest.mark.asyncio
+async def test_response_compression(client: AsyncClient):
+    await _create_big_layouts(client, 3)
+
+    response = await client.get("/api/layouts", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content) / 5
+    assert [layout["id"] for layout in response.json()] == ["bigLayout0", "bigLayout1", "bigLayout2"]
+
+    plain = await client.get("/api/layouts", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["vary"]
+    assert plain.json() == response.json()
+
+    # Each encoding has its own ETag; it validates that encoding only, and still works for If-Match
+    assert response.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert (await client.get("/api/layouts", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})).status_code == 304
+    assert (await client.get("/api/layouts", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["etag"]})).status_code == 200
+    assert (await client.get("/api/layouts", headers={**IDENTITY, "If-None-Match": response.headers["etag"]})).status_code == 200
+    layout = await client.get("/api/layout/bigLayout0", headers={"Accept-Encoding": "gzip"})
+    not_modified = await client.get("/api/layout/bigLayout0", headers={"Accept-Encoding": "gzip", "If-None-Match": layout.headers["etag"]})
+    assert not_modified.status_code == 304 and not_modified.headers["etag"] == layout.headers["etag"]
+    patched = await client.patch("/api/layout/bigLayout0", json={"direction": "horizontal"},
+                                 headers={**MERGE_PATCH, "If-Match": layout.headers["etag"]})
+    assert patched.status_code == 200
+
+    # Below the size threshold the body is sent as is
+    small = await client.get("/api/modules", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    # Streamed NDJSON is compressed chunk by chunk
+    streamed = await client.get("/api/layouts", params={"format": "ndjson"}, headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers["content-encoding"] == "gzip"
+    assert len(streamed.text.strip().split("\n")) == 3
+
+@pytest.mark.asyncio
+async def test_msgpack_negotiation(client: AsyncClient):
+    msgpack = pytest.importorskip("msgpack")
+    await _create_big_layouts(client, 2)
+    await client.post("/api/module", json={"id": "packModule", "name": "Pack", "layout_id": "bigLayout0"})
+
+    for url in ["/api/layouts", "/api/layout/bigLayout1", "/api/module/packModule/resolved", "/api/layout/bigLayout0/dependents"]:
+        packed = await client.get(url, headers={"Accept": "application/msgpack", **IDENTITY})
+        assert packed.headers["content-type"] == "application/msgpack", url
+        assert "Accept" in packed.headers["vary"]
+        plain = await client.get(url, headers=IDENTITY)
+        assert "Accept" in plain.headers["vary"], url
+        assert msgpack.unpackb(packed.content) == plain.json(), url
+        if "etag" in plain.headers:
+            assert packed.headers["etag"] == plain.headers["etag"][:-1] + '-msgpack"', url
+
+    # A MessagePack ETag only validates the MessagePack representation
+    packed = await client.get("/api/layout/bigLayout1", headers={"Accept": "application/msgpack"})
+    assert packed.headers["etag"].endswith('-msgpack-gzip"') or packed.headers["etag"].endswith('-msgpack-br"')
+    revalidated = await client.get("/api/layout/bigLayout1", headers={"Accept": "application/msgpack", "If-None-Match": packed.headers["etag"]})
+    assert revalidated.status_code == 304 and revalidated.headers["etag"] == packed.headers["etag"]
+    assert (await client.get("/api/layout/bigLayout1", headers={"If-None-Match": packed.headers["etag"]})).status_code == 200
+
+    missing = await client.get("/api/layout/noSuchLayout", headers={"Accept": "application/msgpack"})
+    assert missing.status_code == 404
+    assert missing.headers["content-type"] == "application/json"
+
+@pytest.mark.asyncio
+async def test_workspace_export_and_import(client: AsyncClient):
+    await client.post("/api/layout", json={"id": "archLayout", "direction": "vertical", "panes": []})
+    await client.post("/api/module", json={"id": "archModule", "name": "Archived", "layout_id": "archLayout"})
+
+    export = await client.get("/api/export", params={"format": "tgz"})
+    assert export.status_code == 200
+    assert export.headers["content-type"] == "application/gzip"
+    assert export.headers["content-disposition"].endswith('.tar.gz"')
+    assert (await client.get("/api/export", params={"format": "rar"})).status_code == 422
+
+    await client.delete("/api/clear_all_data")
+    assert (await client.get("/api/module/archModule")).status_code == 404
+    imported = await client.post("/api/import", content=export.content, params={"mode": "replace"})
+    assert imported.status_code == 200
+    assert imported.json()["applied"] is True
+    assert imported.json()["imported"]["modules"] == 1
+    assert (await client.get("/api/module/archModule")).json()["layout_id"] == "archLayout"
+    assert [module["id"] for module in (await client.get("/api/modules", params={"q": "archived"})).json()] == ["archModule"]
+    assert (await client.get("/api/layout/archLayout/dependents")).json()["modules"] == ["archModule"]
+
+    assert (await client.post("/api/import", content=b"not an archive")).status_code == 400
+
+@pytest.mark.asyncio
+async def test_history_and_snapshot_endpoints(client: AsyncClient, monkeypatch, tmp_path):
+    from app import main
+    from app.io.history import History
+    monkeypatch.setattr(main, "history", History(tmp_path / "history"))
+    await client.post("/api/layout", json={"id": "histLayout", "direction": "vertical", "panes": []})
+    await client.post("/api/bulk", json={"items": [
+        {"op": "upsert", "type": "layout", "data": {"id": "histLayout", "direction": "horizontal", "panes": []}}]})
+
+    versions = (await client.get("/api/history/layout/histLayout")).json()["versions"]
+    assert [(version["version"], version["deleted"]) for version in versions] == [(1, False), (2, False)]
+    diff = (await client.get("/api/history/layout/histLayout/diff", params={"from": 1})).json()
+    assert diff == {"from": 1, "to": 2, "operations": [{"op": "replace", "path": "/direction", "value": "horizontal"}]}
+    assert (await client.get("/api/history/layout/histLayout/versions/1")).json()["direction"] == "vertical"
+    assert (await client.get("/api/history/layout/histLayout/versions/9")).status_code == 404
+    assert (await client.get("/api/history/view/noSuchView")).status_code == 404
+
+    rolled_back = await client.post("/api/history/layout/histLayout/rollback", params={"version": 1})
+    assert rolled_back.json()["config"]["direction"] == "vertical"
+    assert (await client.get("/api/layout/histLayout")).json()["direction"] == "vertical"
+    assert len((await client.get("/api/history/layout/histLayout")).json()["versions"]) == 3
+
+    await client.post("/api/module", json={"id": "histModule", "name": "History", "layout_id": "histLayout"})
+    snapshot = await client.post("/api/snapshots", params={"label": "before cleanup"})
+    assert snapshot.status_code == 201
+    assert snapshot.json()["label"] == "before cleanup"
+    await client.delete("/api/module/histModule")
+    await client.delete("/api/layout/histLayout")
+    changes = (await client.get(f"/api/snapshots/{snapshot.json()['id']}/diff")).json()["changes"]
+    assert changes["layouts"]["removed"] == ["histLayout"] and changes["modules"]["removed"] == ["histModule"]
+
+    # A module cannot come back on its own while its layout is gone
+    assert (await client.post("/api/history/module/histModule/rollback", params={"version": 1})).status_code == 409
+    restored = await client.post(f"/api/snapshots/{snapshot.json()['id']}/rollback")
+    assert restored.status_code == 200
+    assert sorted(restored.json()["written"]) == [["layouts", "histLayout"], ["modules", "histModule"]]
+    assert (await client.get("/api/layout/histLayout/dependents")).json()["modules"] == ["histModule"]
+    assert [s["id"] for s in (await client.get("/api/snapshots")).json()["snapshots"]] == [1, 2]
+    assert (await client.post("/api/snapshots/42/rollback")).status_code == 404
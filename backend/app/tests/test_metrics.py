@@ -0,0 +1,44 @@
+import json
+import logging
+
+from app.logging_config import JsonFormatter
+from app.metrics import Counter, Gauge, Histogram, Registry, RequestTimings
+
+
+def test_registry_renders_prometheus_text_format():
+    registry = Registry()
+    requests = registry.register(Counter("demo_requests", "Requests served.", ("route",)))
+    in_flight = registry.register(Gauge("demo_in_flight", "Requests in flight."))
+    latency = registry.register(Histogram("demo_latency_seconds", "Latency.", buckets=(0.1, 1.0)))
+
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    in_flight.inc()
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_requests counter" in lines
+    assert 'demo_requests_total{route="/a\\"b"} 3' in lines
+    assert "demo_in_flight 1" in lines
+    assert 'demo_latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'demo_latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'demo_latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "demo_latency_seconds_sum 5.55" in lines
+    assert "demo_latency_seconds_count 3" in lines
+
+
+def test_request_timings_header_value():
+    timings = RequestTimings()
+    timings.add("yaml-parse", 0.001)
+    timings.add("yaml-parse", 0.002)
+    assert timings.header_value(0.01) == "app;dur=10.00, yaml-parse;dur=3.00"
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.LogRecord("app.io.yaml_loader", logging.WARNING, __file__, 1, "Bad file %s", ("x.yaml",), None)
+    record.data_type = "layouts"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Bad file x.yaml"
+    assert entry["level"] == "WARNING"
+    assert entry["data_type"] == "layouts"
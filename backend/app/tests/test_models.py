@@ -0,0 +1,81 @@
+import gc
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from app.models import LOAD_CONTEXT, LayoutConfig
+
+
+def _tree(depth: int, fanout: int, prefix: str = "p") -> list:
+    """Panes of a full tree with `fanout` children per split; leaves embed a view."""
+    size = 100 / fanout
+    if depth == 0:
+        return [{"id": f"{prefix}.{n}", "size": size, "view": {"id": f"v{prefix}.{n}", "type": "text"}} for n in range(fanout)]
+    return [{"id": f"{prefix}.{n}", "size": size, "layout": {"direction": "vertical", "panes": _tree(depth - 1, fanout, f"{prefix}.{n}")}}
+            for n in range(fanout)]
+
+
+def test_nested_layout_addressing():
+    layout = LayoutConfig.model_validate({"id": "l", "direction": "horizontal", "panes": _tree(2, 3)})
+    assert len(list(layout.iter_panes())) == 3 + 9 + 27
+    assert layout.pane_path("p.2.0.1") == (2, 0, 1)
+    assert layout.find_pane("p.2.0.1").id == "p.2.0.1"
+    assert layout.find_view_pane("vp.1.1.2").id == "p.1.1.2"
+    assert layout.find_pane("missing") is None
+    assert [pane.id for pane in layout.iter_panes()][:4] == ["p.0", "p.0.0", "p.0.0.0", "p.0.0.1"]
+
+    # Layouts built without validation are indexed on first lookup
+    constructed = LayoutConfig.model_construct(id="l", direction="horizontal", panes=layout.panes)
+    assert constructed.pane_path("p.2.0.1") == (2, 0, 1)
+
+
+@pytest.mark.parametrize("panes, message", [
+    ([{"id": "a", "size": 60}, {"id": "b", "size": 60}], "sum to 120"),
+    ([{"id": "a", "size": 100, "layout": {"direction": "vertical", "panes": [{"id": "b", "size": 99}]}}], "pane 'a'"),
+    ([{"id": "a", "size": 50}, {"id": "b", "size": 50, "layout": {"direction": "vertical", "panes": [{"id": "a", "size": 100}]}}],
+     "Pane ID 'a'"),
+    ([{"id": "a", "size": 50, "view": {"id": "v", "type": "text"}}, {"id": "b", "size": 50, "view": {"id": "v", "type": "text"}}],
+     "View ID 'v'"),
+    ([{"id": "a", "size": 100, "view": {"id": "v", "type": "text"}, "layout": {"direction": "vertical", "panes": []}}],
+     "both a view and a nested layout"),
+    ([{"id": "a", "size": 120}, {"id": "b", "size": -20}], "negative size"),
+])
+def test_nested_layout_validation_errors(panes, message):
+    with pytest.raises(ValidationError, match=message):
+        LayoutConfig.model_validate({"id": "l", "direction": "horizontal", "panes": panes})
+
+
+def test_pane_sizes_allow_rounding():
+    third = round(100 / 3, 2)
+    LayoutConfig.model_validate({"id": "l", "direction": "horizontal", "panes": [{"id": str(n), "size": third} for n in range(3)]})
+
+
+def test_pane_sizes_are_normalized_on_load():
+    panes = [{"id": "a", "size": 100, "layout": {"direction": "vertical", "panes": [{"id": "b", "size": 10}, {"id": "c", "size": 30}]}},
+             {"id": "d", "size": 0, "layout": {"direction": "vertical", "panes": [{"id": "e", "size": 0}, {"id": "f", "size": 0}]}}]
+    layout = LayoutConfig.model_validate({"id": "l", "direction": "horizontal", "panes": panes}, context=LOAD_CONTEXT)
+    assert [pane.size for pane in layout.iter_panes()] == [100, 25, 75, 0, 50, 50]
+    with pytest.raises(ValidationError, match="sum to -10"): # Negative sizes are never rescaled
+        LayoutConfig.model_validate({"id": "l", "direction": "horizontal", "panes": [{"id": "a", "size": -10}]}, context=LOAD_CONTEXT)
+
+
+def test_nested_layout_validation_scales_linearly():
+    def best_of(runs: int, data: dict) -> float:
+        timings = []
+        for _ in range(runs):
+            gc.collect()
+            gc.disable() # A collection triggered by the rest of the suite would be timed too
+            try:
+                started = time.perf_counter()
+                LayoutConfig.model_validate(data)
+                timings.append(time.perf_counter() - started)
+            finally:
+                gc.enable()
+        return min(timings)
+
+    small = {"id": "l", "direction": "horizontal", "panes": _tree(3, 4)} # 340 panes
+    large = {"id": "l", "direction": "horizontal", "panes": _tree(5, 4)} # 5460 panes, 16x as many
+    small_time, large_time = best_of(5, small), best_of(5, large)
+    assert small_time < 0.05
+    assert large_time < small_time * 16 * 3 # Quadratic behaviour would be ~256x
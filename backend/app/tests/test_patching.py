@@ -0,0 +1,59 @@
+import pytest
+
+from app.models import LayoutConfig, PaneConfig, ViewConfig
+from app.patching import PatchError, PatchTestFailed, apply_json_patch, apply_merge_patch, revalidate
+
+
+def test_json_patch_operations():
+    document = {"a": {"b~c": 1, "d/e": 2}, "list": [1, 2]}
+    patched = apply_json_patch(document, [
+        {"op": "add", "path": "/list/-", "value": 3},
+        {"op": "add", "path": "/list/0", "value": 0},
+        {"op": "replace", "path": "/a/b~0c", "value": 10},
+        {"op": "remove", "path": "/a/d~1e"},
+        {"op": "copy", "from": "/list", "path": "/copied"},
+        {"op": "move", "from": "/a", "path": "/moved"},
+        {"op": "test", "path": "/moved/b~0c", "value": 10},
+    ])
+    assert patched == {"list": [0, 1, 2, 3], "copied": [0, 1, 2, 3], "moved": {"b~c": 10}}
+    assert document == {"a": {"b~c": 1, "d/e": 2}, "list": [1, 2]} # Original untouched
+
+
+def test_json_patch_rejects_invalid_operations():
+    with pytest.raises(PatchTestFailed):
+        apply_json_patch({"a": 1}, [{"op": "test", "path": "/a", "value": 2}])
+    for operations in ({"op": "add"}, [{"op": "add", "path": "/a"}], [{"op": "remove", "path": "/missing"}],
+                       [{"op": "replace", "path": "/list/01", "value": 0}], [{"op": "frobnicate", "path": "/a"}],
+                       [{"op": "move", "from": "/list", "path": "/list/0"}]):
+        with pytest.raises(PatchError):
+            apply_json_patch({"a": 1, "list": [1]}, operations)
+
+
+def test_merge_patch():
+    target = {"title": "Goodbye!", "author": {"givenName": "John", "familyName": "Doe"}, "tags": ["example", "sample"]}
+    patch = {"title": "Hello!", "author": {"familyName": None}, "tags": ["example"], "phoneNumber": "+01-123-456-7890"}
+    assert apply_merge_patch(target, patch) == {
+        "title": "Hello!", "author": {"givenName": "John"}, "tags": ["example"], "phoneNumber": "+01-123-456-7890",
+    }
+
+
+def test_revalidate_reuses_unchanged_parts():
+    layout = LayoutConfig(id="l", direction="vertical", panes=[
+        PaneConfig(id="a", size=50, view=ViewConfig(id="v", type="text", content="big")),
+        PaneConfig(id="b", size=25),
+        PaneConfig(id="c", size=25),
+    ])
+    data = layout.model_dump()
+    data["panes"][1]["size"], data["panes"][2]["size"] = 10, 40
+
+    updated = revalidate(layout, data)
+    assert updated == LayoutConfig(**data)
+    assert updated.panes[0] is layout.panes[0] # Unchanged pane reused, not re-validated
+    assert updated.panes[1] is not layout.panes[1]
+
+    data["panes"][1]["size"] = "wide"
+    with pytest.raises(ValueError):
+        revalidate(layout, data)
+    del data["direction"]
+    with pytest.raises(ValueError):
+        revalidate(layout, data)
@@ -0,0 +1,21 @@
+import json
+
+from app.io.storage import ConfigEntry
+from app.models import LayoutConfig, PaneConfig, ViewConfig
+from app.responses import FastJSONResponse, clear_json_cache, entry_json, json_array
+
+
+def test_entry_json_is_cached_by_digest():
+    clear_json_cache()
+    layout = LayoutConfig(id="l", direction="vertical", panes=[
+        PaneConfig(id="p", size=100, view=ViewConfig(id="v", type="text", content="é"))])
+    first = entry_json(ConfigEntry(layout, "digest-1"))
+    assert json.loads(first) == layout.model_dump(mode='json')
+    assert entry_json(ConfigEntry(layout, "digest-1")) is first
+    assert entry_json(ConfigEntry(layout, "digest-2")) is not first
+    assert json.loads(json_array([first, first])) == [layout.model_dump(mode='json')] * 2
+
+
+def test_fast_json_response_render():
+    assert FastJSONResponse(b'{"a":1}').body == b'{"a":1}'
+    assert json.loads(FastJSONResponse({"text": "Grüße", "n": [1, 2.5, None]}).body) == {"text": "Grüße", "n": [1, 2.5, None]}
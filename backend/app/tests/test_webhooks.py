@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app, webhook_gateway
+from app.webhooks import WebhookError, WebhookGateway, build_request
+
+
+def test_build_request():
+    allowed = {"http://hooks.local": {}}
+    request = build_request({"webhookUrl": "http://hooks.local/a", "requestBody": "not json", "headers": {"X-Key": "k"}},
+                            allowed_origins=allowed)
+    assert request.method == "POST"
+    assert dict(request.headers) == {"Content-Type": "text/plain", "X-Key": "k"}
+    assert request.body == b"not json"
+    assert build_request({"webhookUrl": "http://hooks.local/a", "method": "get"}, allowed_origins=allowed).body is None
+    assert build_request({"webhookUrl": "http://hooks.local/a", "requestBody": {"a": 1}}, allowed_origins=allowed).body == b'{"a": 1}'
+    for content in [None, {}, {"webhookUrl": "file:///etc/passwd"}, {"webhookUrl": "http://hooks.local/a", "method": "TRACE"}]:
+        with pytest.raises(ValueError):
+            build_request(content, allowed_origins=allowed)
+
+    # Only allowed origins can be called
+    with pytest.raises(ValueError, match="not allowed"):
+        build_request({"webhookUrl": "http://169.254.169.254/latest/meta-data"}, allowed_origins=allowed)
+    with pytest.raises(ValueError, match="not allowed"):
+        build_request({"webhookUrl": "https://hooks.local/a"}, allowed_origins=allowed)
+    with pytest.raises(ValueError, match="not allowed"):
+        build_request({"webhookUrl": "http://hooks.local/a"}) # INKSTONE_WEBHOOK_TARGETS is empty
+    assert build_request({"webhookUrl": "http://anywhere.local/a"}, allowed_origins={"*": {}}).url == "http://anywhere.local/a"
+
+
+@pytest.mark.asyncio
+async def test_gateway_coalesces_and_caches_gets(stub):
+    base, state = stub
+    gateway = WebhookGateway(cache_ttl=60)
+    request = build_request({"webhookUrl": f"{base}/echo?delay=0.2", "method": "GET"})
+
+    results = await asyncio.gather(gateway.call(request), gateway.call(request), gateway.call(request))
+    assert sorted(result.source for result in results) == ["coalesced", "coalesced", "upstream"]
+    assert len(state.requests) == 1
+    assert (await gateway.call(request)).source == "cache"
+    assert len(state.requests) == 1
+    assert json.loads(results[0].body)["method"] == "GET"
+    assert results[0].content_type == "application/json"
+
+    # no-store responses and non-GET calls always go upstream
+    no_store = build_request({"webhookUrl": f"{base}/nostore", "method": "GET"})
+    await gateway.call(no_store)
+    assert (await gateway.call(no_store)).source == "upstream"
+    post = build_request({"webhookUrl": f"{base}/echo", "requestBody": {"x": 1}})
+    assert [(await gateway.call(post)).status_code for _ in range(2)] == [201, 201]
+    assert len(state.requests) == 5
+
+    stats = gateway.stats()[base]
+    assert stats["counts"] == {"upstream": 5, "coalesced": 2, "cache_hit": 1}
+    assert 0 < stats["p50_ms"] <= stats["p99_ms"]
+    await gateway.aclose()
+
+
+@pytest.mark.asyncio
+async def test_gateway_cache_is_lru_with_ttl(stub):
+    base, state = stub
+    gateway = WebhookGateway(cache_ttl=0.2, cache_size=2)
+    requests = [build_request({"webhookUrl": f"{base}/echo?n={n}", "method": "GET"}) for n in range(3)]
+    for request in requests:
+        await gateway.call(request)
+    assert len(gateway.cache) == 2
+    assert (await gateway.call(requests[0])).source == "upstream" # Evicted as least recently used
+    assert (await gateway.call(requests[2])).source == "cache"
+    await asyncio.sleep(0.25)
+    assert (await gateway.call(requests[2])).source == "upstream" # Expired
+    await gateway.aclose()
+
+
+@pytest.mark.asyncio
+async def test_gateway_limits_concurrency_and_times_out(stub):
+    base, state = stub
+    gateway = WebhookGateway(targets={base: {"max_concurrency": 1, "timeout": 1.0}})
+    slow = build_request({"webhookUrl": f"{base}/echo?delay=0.4", "requestBody": {}})
+    results = await asyncio.gather(*(gateway.call(slow) for _ in range(3)), return_exceptions=True)
+    assert state.max_active == 1
+    assert [r.status_code for r in results if not isinstance(r, Exception)] == [201, 201]
+    # Waiting for a slot and the request share one deadline: the third call waited 0.8s for its
+    # slot, which leaves too little of its 1s for a 0.4s request
+    timed_out = [r for r in results if isinstance(r, WebhookError)]
+    assert [e.status_code for e in timed_out] == [504]
+
+    too_slow = build_request({"webhookUrl": f"{base}/echo?delay=1.5", "method": "GET"})
+    with pytest.raises(WebhookError) as info:
+        await gateway.call(too_slow)
+    assert info.value.status_code == 504
+    unreachable = build_request({"webhookUrl": "http://127.0.0.1:1/hook", "method": "GET"}, allowed_origins={"*": {}})
+    with pytest.raises(WebhookError) as info:
+        await gateway.call(unreachable)
+    assert info.value.status_code == 502
+    assert gateway.stats()[base]["counts"]["timeout"] == 2
+    await gateway.aclose()
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://127.0.0.1:8000") as ac:
+        await ac.delete("/api/clear_all_data")
+        yield ac
+        await ac.delete("/api/clear_all_data")
+    webhook_gateway.cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_webhook_endpoints(client: AsyncClient, stub):
+    base, state = stub
+    webhook = {"id": "hookView", "type": "webhook_trigger",
+               "content": {"webhookUrl": f"{base}/echo", "method": "POST", "requestBody": {"run": True}}}
+    await client.post("/api/view", json=webhook)
+    await client.post("/api/layout", json={"id": "hookLayout", "direction": "vertical", "panes": [
+        {"id": "hookPane", "size": 100, "view": {**webhook, "id": "embeddedHook"}}]})
+    await client.post("/api/module", json={"id": "hookModule", "name": "Hooks", "layout_id": "hookLayout"})
+
+    response = await client.post("/api/view/hookView/webhook")
+    assert response.status_code == 201
+    assert response.json() == {"method": "POST", "path": "/echo", "body": '{"run": true}', "content_type": "application/json"}
+    assert response.headers["x-webhook-source"] == "upstream"
+    assert "set-cookie" not in response.headers # Only the content type is relayed
+
+    assert (await client.post("/api/view/embeddedHook/webhook")).status_code == 201
+    assert (await client.post("/api/module/hookModule/view/embeddedHook/webhook")).status_code == 201
+    assert (await client.post("/api/module/hookModule/view/hookView/webhook")).status_code == 404
+    assert (await client.post("/api/view/noSuchView/webhook")).status_code == 404
+
+    await client.post("/api/view", json={"id": "plainView", "type": "text", "content": "x"})
+    assert (await client.post("/api/view/plainView/webhook")).status_code == 400
+    await client.post("/api/view", json={"id": "badHook", "type": "webhook_trigger", "content": {"webhookUrl": "ftp://x"}})
+    assert (await client.post("/api/view/badHook/webhook")).status_code == 422
+
+    stats = (await client.get("/api/webhooks/stats")).json()
+    assert stats["targets"][base]["counts"]["upstream"] == 3
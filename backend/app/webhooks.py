@@ -0,0 +1,298 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Container, Deque, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# Webhook views (type 'webhook_trigger') are called through this gateway instead of straight from
+# the browser: one pooled keep-alive client for every target, a concurrency limit and timeout per
+# target (origin), coalescing of identical in-flight GETs and a TTL/LRU cache of GET responses.
+# INKSTONE_WEBHOOK_TARGETS lists the origins views may call and overrides the defaults per
+# origin, e.g.
+#   {"http://n8n:5678": {"max_concurrency": 2, "timeout": 60}}
+# A view pointing anywhere else is refused, so a stored config cannot make the server fetch
+# arbitrary URLs. A "*" key allows every origin (e.g. for local development).
+WEBHOOK_TIMEOUT_SECONDS = float(os.environ.get("INKSTONE_WEBHOOK_TIMEOUT_SECONDS", "10"))
+WEBHOOK_MAX_CONCURRENCY = int(os.environ.get("INKSTONE_WEBHOOK_MAX_CONCURRENCY", "8"))
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("INKSTONE_WEBHOOK_MAX_CONNECTIONS", "100"))
+WEBHOOK_CACHE_TTL_SECONDS = float(os.environ.get("INKSTONE_WEBHOOK_CACHE_TTL_SECONDS", "30"))
+WEBHOOK_CACHE_SIZE = int(os.environ.get("INKSTONE_WEBHOOK_CACHE_SIZE", "256"))
+WEBHOOK_TARGETS: Dict[str, Dict[str, float]] = json.loads(os.environ.get("INKSTONE_WEBHOOK_TARGETS", "{}"))
+LATENCY_WINDOW = 1000 # Latencies kept per target for the percentiles in stats()
+
+_ALLOWED_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+ANY_ORIGIN = '*'
+
+_WEBHOOK_SECONDS = metrics.histogram("inkstone_webhook_request_seconds", "Time to call a webhook target, by origin.", ("target",))
+_WEBHOOK_RESULTS = metrics.counter("inkstone_webhook_requests", "Webhook gateway calls by origin and outcome.", ("target", "outcome"))
+
+
+class WebhookError(Exception):
+    """The webhook could not be called; status_code is the HTTP status to answer with (502/503/504)."""
+
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class WebhookRequest(NamedTuple):
+    method: str
+    url: str
+    headers: Tuple[Tuple[str, str], ...]
+    body: Optional[bytes]
+
+    @property
+    def target(self) -> str:
+        parts = urlsplit(self.url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+
+class WebhookResponse(NamedTuple):
+    status_code: int
+    content_type: Optional[str] # The only upstream header passed on (no cookies from third-party targets)
+    body: bytes
+    source: str # 'upstream', 'cache' or 'coalesced'
+
+
+def build_request(content: Any, default_method: str = 'POST', allowed_origins: Optional[Container[str]] = None) -> WebhookRequest:
+    """Builds the outgoing request from a webhook_trigger view's content, as the GUI used to.
+
+    Data sources (content.dataSource, see app.hydration) use the same fields with GET as the
+    default method. requestBody may be an object (sent as JSON) or a string (sent as JSON if it parses, otherwise
+    as text/plain unless a Content-Type header is configured). The URL's origin must be one of
+    allowed_origins (default: the INKSTONE_WEBHOOK_TARGETS keys) unless those include "*".
+    Raises ValueError if the view is not a usable webhook.
+    """
+    if not isinstance(content, dict) or not content.get('webhookUrl'):
+        raise ValueError("The view has no webhookUrl configured.")
+    url = str(content['webhookUrl'])
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        raise ValueError(f"Webhook URL '{url}' must be an absolute http(s) URL.")
+    if allowed_origins is None:
+        allowed_origins = WEBHOOK_TARGETS
+    origin = f"{parts.scheme}://{parts.netloc}"
+    if ANY_ORIGIN not in allowed_origins and origin not in allowed_origins:
+        raise ValueError(f"Webhook origin '{origin}' is not allowed; add it to INKSTONE_WEBHOOK_TARGETS.")
+    method = str(content.get('method') or default_method).upper()
+    if method not in _ALLOWED_METHODS:
+        raise ValueError(f"Unsupported webhook method '{method}'.")
+    headers = {'Content-Type': 'application/json'}
+    headers.update({str(name): str(value) for name, value in (content.get('headers') or {}).items()})
+    body = None
+    if method in ('POST', 'PUT'):
+        request_body = content.get('requestBody', {})
+        if isinstance(request_body, str):
+            body = request_body.encode('utf-8')
+            try:
+                json.loads(request_body)
+            except ValueError:
+                if not any(name.lower() == 'content-type' for name in (content.get('headers') or {})):
+                    headers['Content-Type'] = 'text/plain'
+        else:
+            body = json.dumps(request_body).encode('utf-8')
+    return WebhookRequest(method, url, tuple(sorted(headers.items())), body)
+
+
+class ResponseCache:
+    """LRU cache of webhook responses whose entries expire after a per-entry TTL."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[WebhookRequest, Tuple[float, WebhookResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: WebhookRequest) -> Optional[WebhookResponse]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def put(self, key: WebhookRequest, response: WebhookResponse, ttl: float) -> None:
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def _cache_ttl(response: httpx.Response, default_ttl: float) -> float:
+    """TTL for a GET response: Cache-Control max-age if present, 0 for no-store/no-cache/private."""
+    directives = {part.strip().lower() for part in response.headers.get('cache-control', '').split(',') if part.strip()}
+    if directives & {'no-store', 'no-cache', 'private'}:
+        return 0.0
+    for directive in directives:
+        name, _, value = directive.partition('=')
+        if name == 'max-age':
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return 0.0
+    return default_ttl
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))]
+
+
+class _TargetStats:
+    def __init__(self) -> None:
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.counts: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "counts": dict(self.counts), # by outcome: upstream, cache_hit, coalesced, timeout, error, rejected
+            "p50_ms": 1000 * _percentile(ordered, 0.50),
+            "p90_ms": 1000 * _percentile(ordered, 0.90),
+            "p99_ms": 1000 * _percentile(ordered, 0.99),
+            "mean_ms": 1000 * sum(ordered) / len(ordered) if ordered else 0.0,
+        }
+
+
+class WebhookGateway:
+    """Forwards webhook calls through one shared, pooled httpx.AsyncClient."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None, cache_ttl: float = WEBHOOK_CACHE_TTL_SECONDS,
+                 cache_size: int = WEBHOOK_CACHE_SIZE, targets: Optional[Dict[str, Dict[str, float]]] = None) -> None:
+        self._transport = transport
+        self.cache_ttl = cache_ttl
+        self.cache = ResponseCache(cache_size)
+        self.targets = targets if targets is not None else WEBHOOK_TARGETS
+        self._stats: Dict[str, _TargetStats] = {}
+        self._stats_lock = threading.Lock()
+        # Event-loop bound state, recreated if the gateway is used from another loop (e.g. in tests)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[WebhookRequest, asyncio.Future] = {}
+
+    def _target_setting(self, target: str, name: str, default: float) -> float:
+        return float(self.targets.get(target, {}).get(name, default))
+
+    def _client_for_loop(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                limits=httpx.Limits(max_connections=WEBHOOK_MAX_CONNECTIONS, max_keepalive_connections=WEBHOOK_MAX_CONNECTIONS),
+                timeout=WEBHOOK_TIMEOUT_SECONDS,
+                follow_redirects=False,
+            )
+            self._semaphores = {}
+            self._inflight = {}
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+    def _count(self, target: str, outcome: str, latency: Optional[float] = None) -> None:
+        _WEBHOOK_RESULTS.labels(target, outcome).inc()
+        with self._stats_lock:
+            stats = self._stats.setdefault(target, _TargetStats())
+            stats.counts[outcome] = stats.counts.get(outcome, 0) + 1
+            if latency is not None:
+                stats.latencies.append(latency)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-target counters by outcome and latency percentiles of recent upstream calls."""
+        with self._stats_lock:
+            return {target: stats.to_dict() for target, stats in sorted(self._stats.items())}
+
+    async def call(self, request: WebhookRequest) -> WebhookResponse:
+        """Calls the webhook, or answers from the cache / an identical in-flight GET. Raises WebhookError."""
+        client = self._client_for_loop()
+        target = request.target
+        if request.method != 'GET':
+            return await self._send(client, request)
+        cached = self.cache.get(request)
+        if cached is not None:
+            self._count(target, 'cache_hit')
+            return cached._replace(source='cache')
+        inflight = self._inflight.get(request)
+        if inflight is not None:
+            self._count(target, 'coalesced')
+            return (await asyncio.shield(inflight))._replace(source='coalesced')
+        future = asyncio.ensure_future(self._send(client, request))
+        self._inflight[request] = future
+        inflight = self._inflight
+
+        def done(_) -> None:
+            if inflight.get(request) is future:
+                del inflight[request]
+
+        future.add_done_callback(done)
+        # Shielded so that a caller giving up does not cancel the call for the others waiting on it
+        return await asyncio.shield(future)
+
+    async def _send(self, client: httpx.AsyncClient, request: WebhookRequest) -> WebhookResponse:
+        target = request.target
+        timeout = self._target_setting(target, 'timeout', WEBHOOK_TIMEOUT_SECONDS)
+        semaphore = self._semaphores.get(target)
+        if semaphore is None:
+            semaphore = self._semaphores[target] = asyncio.Semaphore(
+                int(self._target_setting(target, 'max_concurrency', WEBHOOK_MAX_CONCURRENCY)))
+        # One deadline for the whole call: time spent waiting for a slot is taken off the request's timeout
+        deadline = time.monotonic() + timeout
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._count(target, 'rejected')
+            raise WebhookError(503, f"Too many concurrent calls to {target}.")
+        started = time.perf_counter()
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise httpx.TimeoutException("No time left after waiting for a slot.")
+            # httpx applies its timeout to each phase (connect, every read...), the outer one bounds the whole request
+            upstream = await asyncio.wait_for(client.request(request.method, request.url, headers=list(request.headers),
+                                                             content=request.body, timeout=remaining), remaining)
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            self._count(target, 'timeout', time.perf_counter() - started)
+            raise WebhookError(504, f"Webhook at {target} did not answer within {timeout:g}s.")
+        except httpx.HTTPError as e:
+            self._count(target, 'error', time.perf_counter() - started)
+            logger.warning("Webhook call to %s failed: %s", target, e, extra={"target": target})
+            raise WebhookError(502, f"Webhook at {target} could not be reached: {e}")
+        finally:
+            semaphore.release()
+        elapsed = time.perf_counter() - started
+        _WEBHOOK_SECONDS.labels(target).observe(elapsed)
+        self._count(target, 'upstream', elapsed)
+        response = WebhookResponse(upstream.status_code, upstream.headers.get('content-type'), upstream.content, 'upstream')
+        if request.method == 'GET' and upstream.status_code == 200:
+            self.cache.put(request, response, _cache_ttl(upstream, self.cache_ttl))
+        return response
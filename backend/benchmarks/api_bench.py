@@ -0,0 +1,50 @@
+import random
+from typing import Callable, Dict, List
+
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from benchmarks.harness import run_concurrent
+
+
+def _scenarios(manifest: Dict, rng: random.Random) -> List[tuple[str, Callable[[int], str], bool]]:
+    """(name, request number -> URL, is_full_scan) for every measured endpoint."""
+    layout_ids = manifest["layout_ids"]
+    embedded_view_ids = manifest["embedded_view_ids"] or manifest["standalone_view_ids"]
+    standalone_view_ids = manifest["standalone_view_ids"]
+    module_ids = manifest["module_ids"]
+    return [
+        ("GET /api/layout/{id}", lambda n: f"/api/layout/{rng.choice(layout_ids)}", False),
+        ("GET /api/view/{id} standalone", lambda n: f"/api/view/{rng.choice(standalone_view_ids)}", False),
+        ("GET /api/view/{id} embedded", lambda n: f"/api/view/{rng.choice(embedded_view_ids)}", False),
+        ("GET /api/module/{id}", lambda n: f"/api/module/{rng.choice(module_ids)}", False),
+        ("GET /api/module/{id}/resolved", lambda n: f"/api/module/{rng.choice(module_ids)}/resolved", False),
+        ("GET /api/layouts?limit=100", lambda n: "/api/layouts?limit=100", True),
+        ("GET /api/modules?fields=id,name", lambda n: "/api/modules?fields=id,name", True),
+        ("GET /api/layouts", lambda n: "/api/layouts", True),
+    ]
+
+
+async def run_api_benchmarks(manifest: Dict, requests: int, concurrency: int, seed: int = 0) -> List[Dict]:
+    """Measures endpoint latency and throughput through the ASGI app (no network, no server process).
+
+    Each scenario gets one untimed warm-up request, so the numbers describe the steady state
+    (model cache and embedded view index populated). Full-collection endpoints are sent fewer
+    requests on large datasets to keep run times reasonable.
+    """
+    rng = random.Random(seed)
+    results = []
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, make_url, full_scan in _scenarios(manifest, rng):
+            total = max(5, min(requests, 50_000 // max(1, len(manifest["layout_ids"])))) if full_scan else requests
+
+            async def make_request(n: int) -> None:
+                response = await client.get(make_url(n))
+                if response.status_code != 200:
+                    raise RuntimeError(f"{name}: HTTP {response.status_code} for {response.request.url}")
+
+            await make_request(-1)
+            stats = await run_concurrent(make_request, total, concurrency)
+            results.append({"suite": "api", "name": name, "concurrency": concurrency, **stats})
+    return results
@@ -0,0 +1,53 @@
+"""Compares two benchmark result files (e.g. the last release against the current branch).
+
+Usage (from backend/):
+    python -m benchmarks.compare baseline.json candidate.json [--metric p50_ms] [--threshold 1.10]
+
+Exits with status 1 if any scenario got slower than the threshold ratio, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+
+def _index(report: Dict) -> Dict[Tuple[str, str, int], Dict]:
+    return {(r["suite"], r["name"], r["dataset"]["layouts"]): r for r in report["results"]}
+
+
+def compare(baseline: Dict, candidate: Dict, metric: str, threshold: float) -> bool:
+    """Prints one line per scenario present in both reports; returns False if any regressed."""
+    old, new = _index(baseline), _index(candidate)
+    ok = True
+    print(f"{'scenario':<52} {'layouts':>8} {'baseline':>12} {'candidate':>12} {'ratio':>7}")
+    for key in sorted(old.keys() & new.keys(), key=lambda key: (key[2], key[0], key[1])):
+        before, after = old[key][metric], new[key][metric]
+        ratio = after / before if before else float('inf')
+        # For throughput, higher is better; for latencies, lower is better
+        regressed = ratio < 1 / threshold if metric == "throughput_per_s" else ratio > threshold
+        ok = ok and not regressed
+        marker = "  REGRESSION" if regressed else ""
+        print(f"{key[0] + ' ' + key[1]:<52} {key[2]:>8} {before:>12.3f} {after:>12.3f} {ratio:>7.2f}{marker}")
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0] + ' ' + key[1]:<52} {key[2]:>8}  only in {'baseline' if key in old else 'candidate'}")
+    return ok
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--metric", default="p50_ms", help="p50_ms, p90_ms, p99_ms, mean_ms, cpu_ms_per_request or throughput_per_s")
+    parser.add_argument("--threshold", type=float, default=1.10, help="ratio above which a scenario counts as slower")
+    args = parser.parse_args(argv)
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)
+    if not compare(baseline, candidate, args.metric, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
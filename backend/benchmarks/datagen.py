@@ -0,0 +1,143 @@
+import json
+import random
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import yaml
+
+from app.io import yaml_loader
+from app.io.history import History
+from app.io.sharding import migrate_type_dir
+from app.io.sqlite_backend import SqliteBackend
+from app.io.transfer import import_from_yaml_dir
+
+VIEW_TYPES = ['text', 'html', 'webhook_trigger']
+MANIFEST_NAME = "dataset.json"
+GENERATOR_VERSION = 1 # Bump when the generated content changes, so cached datasets are rebuilt
+
+
+def _view(rng: random.Random, view_id: str) -> dict:
+    view_type = rng.choice(VIEW_TYPES)
+    if view_type == 'webhook_trigger':
+        content = {"webhookUrl": f"https://example.invalid/hooks/{view_id}", "buttonText": "Run", "method": "POST",
+                   "requestBody": {"source": view_id, "n": rng.randint(0, 1000)}}
+    elif view_type == 'html':
+        content = "<p>" + " ".join(rng.choice(["lorem", "ipsum", "dolor", "sit", "amet"]) for _ in range(rng.randint(5, 60))) + "</p>"
+    else:
+        content = "x" * rng.randint(10, 400)
+    return {"id": view_id, "type": view_type, "content": content}
+
+
+def _write_yaml(path: Path, content: dict) -> None:
+    # Written directly rather than through save_yaml: generation does not need fsync per file
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.dump(content, f, Dumper=yaml_loader.YamlDumper, sort_keys=False, allow_unicode=True)
+
+
+def generate_dataset(target_dir: Path, layouts: int, max_panes: int = 8, seed: int = 0) -> Dict:
+    """Writes a synthetic YAML data directory and returns its manifest.
+
+    The content depends only on (layouts, max_panes, seed), so runs on different machines or
+    releases measure the same data. Each layout has 1..max_panes panes with embedded views;
+    there is one standalone view per 10 layouts and one module per 10 layouts.
+    """
+    rng = random.Random(seed)
+    for data_type_name in ('layouts', 'views', 'modules'):
+        (target_dir / data_type_name).mkdir(parents=True, exist_ok=True)
+
+    layout_ids: List[str] = []
+    embedded_view_ids: List[str] = []
+    for n in range(layouts):
+        layout_id = f"layout-{n:06d}"
+        pane_count = rng.randint(1, max_panes)
+        panes = []
+        for p in range(pane_count):
+            pane = {"id": f"{layout_id}-pane-{p}", "size": round(100 / pane_count, 2)}
+            if rng.random() < 0.9:
+                pane["view"] = _view(rng, f"{layout_id}-view-{p}")
+                embedded_view_ids.append(pane["view"]["id"])
+            panes.append(pane)
+        _write_yaml(target_dir / "layouts" / f"{layout_id}.yaml",
+                    {"id": layout_id, "direction": rng.choice(['horizontal', 'vertical']), "panes": panes})
+        layout_ids.append(layout_id)
+
+    standalone_view_ids = [f"view-{n:06d}" for n in range(max(1, layouts // 10))]
+    for view_id in standalone_view_ids:
+        _write_yaml(target_dir / "views" / f"{view_id}.yaml", _view(rng, view_id))
+
+    module_ids = [f"module-{n:06d}" for n in range(max(1, layouts // 10))]
+    for module_id in module_ids:
+        _write_yaml(target_dir / "modules" / f"{module_id}.yaml",
+                    {"id": module_id, "name": f"Module {module_id}", "layout_id": rng.choice(layout_ids),
+                     "icon": "📊", "description": "Synthetic benchmark module"})
+
+    manifest = {
+        "generator_version": GENERATOR_VERSION,
+        "layouts": layouts,
+        "max_panes": max_panes,
+        "seed": seed,
+        "layout_ids": layout_ids,
+        "embedded_view_ids": embedded_view_ids,
+        "standalone_view_ids": standalone_view_ids,
+        "module_ids": module_ids,
+    }
+    with open(target_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def ensure_dataset(cache_dir: Path, layouts: int, max_panes: int = 8, seed: int = 0) -> tuple[Path, Dict]:
+    """Returns (data_dir, manifest) for a dataset, generating it only if it is not cached yet."""
+    data_dir = cache_dir / f"layouts-{layouts}-panes-{max_panes}-seed-{seed}"
+    manifest_path = data_dir / MANIFEST_NAME
+    if manifest_path.exists():
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("generator_version") == GENERATOR_VERSION:
+            return data_dir, manifest
+    return data_dir, generate_dataset(data_dir, layouts, max_panes, seed)
+
+
+@contextmanager
+def use_dataset(data_dir: Path, storage: str = "yaml") -> Iterator[None]:
+    """Points the storage layer (and the app's in-memory indexes) at a dataset for the duration of the block.
+
+    With storage="sqlite" the YAML files are imported once into data_dir/inkstone.db. With YAML
+    storage and INKSTONE_YAML_SHARD_LEVELS set, the dataset is converted to sharded directories
+    in place (once). Version history is recorded into a temporary directory that is removed
+    afterwards, so benchmark writes pay its cost without adding to any real history.
+    """
+    from app import main
+
+    previous_path = yaml_loader.DATA_BASE_PATH
+    previous_history = main.history
+    history_dir = tempfile.TemporaryDirectory(prefix="inkstone-bench-history-")
+    main.history = History(Path(history_dir.name))
+    yaml_loader.DATA_BASE_PATH = data_dir
+    if storage == "sqlite":
+        db_path = data_dir / "inkstone.db"
+        needs_import = not db_path.exists()
+        backend = SqliteBackend(db_path)
+        if needs_import:
+            import_from_yaml_dir(data_dir, backend=backend)
+    else:
+        if storage == "yaml" and yaml_loader.SHARD_LEVELS > 0:
+            for data_type_name in ('layouts', 'views', 'modules'):
+                migrate_type_dir(data_dir / data_type_name, yaml_loader.manifest_lock_path(data_type_name),
+                                 yaml_loader.SHARD_LEVELS)
+        backend = yaml_loader.create_storage_backend(storage)
+    yaml_loader.set_storage_backend(backend)
+    yaml_loader.clear_cache()
+    main.embedded_views.built = False
+    try:
+        yield
+    finally:
+        backend.close()
+        yaml_loader.set_storage_backend(None)
+        yaml_loader.DATA_BASE_PATH = previous_path
+        yaml_loader.clear_cache()
+        main.embedded_views.built = False
+        main.history = previous_history
+        history_dir.cleanup()
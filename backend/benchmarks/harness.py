@@ -0,0 +1,60 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], wall_seconds: float, cpu_seconds: float = 0.0) -> Dict[str, float]:
+    """Latency percentiles in milliseconds plus throughput and process CPU time for one measured scenario."""
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "mean_ms": 1000 * sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50_ms": 1000 * percentile(ordered, 0.50),
+        "p90_ms": 1000 * percentile(ordered, 0.90),
+        "p99_ms": 1000 * percentile(ordered, 0.99),
+        "max_ms": 1000 * ordered[-1] if ordered else 0.0,
+        "throughput_per_s": len(ordered) / wall_seconds if wall_seconds > 0 else 0.0,
+        # CPU of the whole process (event loop and I/O threads) divided by the requests served
+        "cpu_ms_per_request": 1000 * cpu_seconds / len(ordered) if ordered else 0.0,
+    }
+
+
+def time_sync(func: Callable[[], object], repeat: int, setup: Callable[[], object] | None = None) -> Dict[str, float]:
+    """Runs func repeat times (calling setup, untimed, before each run) and summarizes the timings."""
+    latencies = []
+    cpu_seconds = 0.0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        cpu0 = time.process_time()
+        t0 = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t0)
+        cpu_seconds += time.process_time() - cpu0
+    return summarize(latencies, sum(latencies) or (time.perf_counter() - started), cpu_seconds)
+
+
+async def run_concurrent(make_request: Callable[[int], Awaitable[object]], total: int, concurrency: int) -> Dict[str, float]:
+    """Issues total requests with at most concurrency in flight; make_request receives the request number."""
+    latencies: List[float] = []
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for n in counter:
+            t0 = time.perf_counter()
+            await make_request(n)
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    return summarize(latencies, time.perf_counter() - started, time.process_time() - cpu_started)
@@ -0,0 +1,51 @@
+import random
+from typing import Dict, List
+
+from app.indexes import EmbeddedViewIndex
+from app.io import yaml_loader
+from app.models import CONFIG_TYPES, LayoutConfig, PaneConfig, ViewConfig
+
+from benchmarks.harness import time_sync
+
+SCRATCH_LAYOUT_ID = "bench-scratch-layout"
+
+
+def run_loader_benchmarks(manifest: Dict, repeat: int, seed: int = 0) -> List[Dict]:
+    """Microbenchmarks of the storage functions against the active dataset."""
+    rng = random.Random(seed)
+    layout_ids = manifest["layout_ids"]
+    full_scan_repeat = max(2, min(repeat, 20_000 // max(1, len(layout_ids))))
+    results = []
+
+    def record(name: str, stats: Dict) -> None:
+        results.append({"suite": "loader", "name": name, **stats})
+
+    record("load_all_yaml[layouts] cold", time_sync(
+        lambda: yaml_loader.load_all_yaml('layouts', LayoutConfig), full_scan_repeat, setup=yaml_loader.clear_cache))
+    record("load_all_yaml[layouts] warm", time_sync(
+        lambda: yaml_loader.load_all_yaml('layouts', LayoutConfig), full_scan_repeat))
+    record("list_yaml_ids[layouts]", time_sync(lambda: yaml_loader.list_yaml_ids('layouts'), full_scan_repeat))
+    record("EmbeddedViewIndex.build", time_sync(
+        lambda: EmbeddedViewIndex().build(yaml_loader.iter_all_yaml('layouts', LayoutConfig)), full_scan_repeat))
+
+    # Startup preload of the whole store (cold start to ready), serial and across every core
+    model_classes = dict(CONFIG_TYPES.values())
+    for workers in sorted({1, yaml_loader.PRELOAD_WORKERS}):
+        record(f"preload_all_yaml workers={workers}", time_sync(
+            lambda workers=workers: yaml_loader.preload_all_yaml(model_classes, workers), 2, setup=yaml_loader.clear_cache))
+
+    record("load_yaml[layout] cold", time_sync(
+        lambda: yaml_loader.load_yaml('layouts', rng.choice(layout_ids), LayoutConfig), repeat, setup=yaml_loader.clear_cache))
+    yaml_loader.load_all_yaml('layouts', LayoutConfig) # Warm every entry, not only the ones drawn above
+    record("load_yaml[layout] warm", time_sync(
+        lambda: yaml_loader.load_yaml('layouts', rng.choice(layout_ids), LayoutConfig), repeat))
+
+    scratch = LayoutConfig(id=SCRATCH_LAYOUT_ID, direction='vertical', panes=[
+        PaneConfig(id=f"scratch-pane-{n}", size=25, view=ViewConfig(id=f"scratch-view-{n}", type='text', content="x" * 200))
+        for n in range(4)
+    ])
+    try:
+        record("save_yaml[layout]", time_sync(lambda: yaml_loader.save_yaml('layouts', SCRATCH_LAYOUT_ID, scratch), repeat))
+    finally:
+        yaml_loader.delete_yaml('layouts', SCRATCH_LAYOUT_ID) # Leave the dataset as generated
+    return results
@@ -0,0 +1,107 @@
+"""Runs the loader and API benchmarks against synthetic datasets and saves the results as JSON.
+
+Usage (from backend/):
+    python -m benchmarks.run                          # 10, 1k and 50k layouts
+    python -m benchmarks.run --sizes 10,1000 --storage sqlite --concurrency 32
+    python -m benchmarks.compare old.json new.json    # compare two runs
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from app import responses
+from app.io import yaml_loader
+from benchmarks.api_bench import run_api_benchmarks
+from benchmarks.datagen import ensure_dataset, use_dataset
+from benchmarks.loader_bench import run_loader_benchmarks
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_CACHE_DIR = BENCHMARKS_DIR / ".data"
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment(args: argparse.Namespace) -> Dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "storage": args.storage,
+        "libyaml": yaml_loader.YamlLoader.__name__.startswith("C"),
+        "sidecar_cache": yaml_loader.SIDECAR_CACHE_ENABLED,
+        "io_threads": yaml_loader.IO_POOL_SIZE,
+        "preload_workers": yaml_loader.PRELOAD_WORKERS,
+        "yaml_shard_levels": yaml_loader.SHARD_LEVELS,
+        "fast_json": responses.FAST_JSON_ENABLED,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "repeat": args.repeat,
+        "seed": args.seed,
+    }
+
+
+def run(args: argparse.Namespace) -> Dict:
+    results: List[Dict] = []
+    for size in args.sizes:
+        started = time.perf_counter()
+        data_dir, manifest = ensure_dataset(args.data_dir, size, args.max_panes, args.seed)
+        print(f"dataset: {size} layouts in {data_dir} ({time.perf_counter() - started:.1f}s)", flush=True)
+        dataset = {"layouts": size, "max_panes": args.max_panes,
+                   "embedded_views": len(manifest["embedded_view_ids"]), "modules": len(manifest["module_ids"])}
+        with use_dataset(data_dir, args.storage):
+            suite_results = []
+            if "loader" in args.suites:
+                suite_results += run_loader_benchmarks(manifest, args.repeat, args.seed)
+            if "api" in args.suites:
+                suite_results += asyncio.run(run_api_benchmarks(manifest, args.requests, args.concurrency, args.seed))
+        for result in suite_results:
+            result["dataset"] = dataset
+            print(f"  {result['suite']:<6} {result['name']:<36} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms"
+                  f"  {result['throughput_per_s']:10.1f}/s", flush=True)
+        results += suite_results
+    return {"environment": _environment(args), "results": results}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Inkstone storage layer and config API.")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=[10, 1000, 50000],
+                        help="comma-separated numbers of layouts to generate (default: 10,1000,50000)")
+    parser.add_argument("--max-panes", type=int, default=8, help="maximum panes per generated layout")
+    parser.add_argument("--suites", type=lambda value: value.split(","), default=["loader", "api"],
+                        help="comma-separated suites to run: loader, api")
+    parser.add_argument("--storage", choices=["yaml", "sqlite"], default="yaml")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight in the API suite")
+    parser.add_argument("--requests", type=int, default=500, help="requests per API scenario")
+    parser.add_argument("--repeat", type=int, default=200, help="iterations per loader microbenchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_CACHE_DIR, help="where generated datasets are cached")
+    parser.add_argument("--output", type=Path, help="results file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    output = args.output or DEFAULT_RESULTS_DIR / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
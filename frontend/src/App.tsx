@@ -3,6 +3,7 @@ import Layout from './components/LayoutSystem/Layout';
 import ModuleList from './components/Modules/ModuleList';
 import { useLayoutStore } from './store/layoutStore';
 import { useModuleStore } from './store/moduleStore';
+import { subscribeToChanges } from './services/apiService';
 import { LayoutConfig as GlobalLayoutConfig } from './types'; // For handleCreateDefaultLayout
 import './App.css';
 
@@ -22,6 +23,18 @@ function App() {
     // error: moduleError, // moduleError is handled within ModuleList for now
   } = useModuleStore();
 
+  // Push updates made by the AI or other tabs into the stores instead of polling the list endpoints
+  useEffect(() => subscribeToChanges(
+    (event) => {
+      useModuleStore.getState().applyChange(event);
+      useLayoutStore.getState().applyChange(event);
+    },
+    () => {
+      useModuleStore.getState().fetchAllModules();
+      useLayoutStore.getState().fetchAllLayoutsFromServer();
+    },
+  ), []);
+
   useEffect(() => {
     // This effect might be simplified or removed if module selection
     // is the sole driver for layout changes and initial loading.
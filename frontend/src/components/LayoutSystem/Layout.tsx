@@ -1,29 +1,35 @@
 import React from 'react';
 import { PanelGroup, PanelResizeHandle } from 'react-resizable-panels';
 import Pane from './Pane';
-import { useLayoutStore, LayoutConfig as StoreLayoutConfig } from '../../store/layoutStore';
+import { useLayoutStore, LayoutConfig as StoreLayoutConfig, PaneConfig } from '../../store/layoutStore';
 
 interface LayoutProps {
   layoutConfig: StoreLayoutConfig; // Using the store's LayoutConfig type
 }
 
-const Layout: React.FC<LayoutProps> = ({ layoutConfig }) => {
-  const { updatePaneSize } = useLayoutStore();
-
-  if (!layoutConfig) {
-    return <div>Loading layout...</div>;
-  }
+interface PaneGroupProps {
+  layoutId: string;
+  direction: 'horizontal' | 'vertical';
+  panes: PaneConfig[];
+}
 
-  const { id: layoutId, direction, panes } = layoutConfig;
+// One PanelGroup per split; panes with a nested layout render another PaneGroup inside their Panel.
+const PaneGroup: React.FC<PaneGroupProps> = ({ layoutId, direction, panes }) => {
+  const { updatePaneSize, persistPaneSizes } = useLayoutStore();
 
   const handleResize = (sizes: number[]) => {
     // Assuming sizes array corresponds to panes array in order
     // react-resizable-panels gives sizes in percentage
+    let changed = false;
     panes.forEach((pane, index) => {
-      if (sizes[index] !== undefined) {
+      if (sizes[index] !== undefined && Math.abs(sizes[index] - pane.size) > 0.01) {
         updatePaneSize(layoutId, pane.id, sizes[index]);
+        changed = true;
       }
     });
+    if (changed) {
+      persistPaneSizes(layoutId); // onLayout also fires on mount with unchanged sizes; only real drags are saved
+    }
   };
 
   return (
@@ -31,9 +37,7 @@ const Layout: React.FC<LayoutProps> = ({ layoutConfig }) => {
       {panes.map((pane, index) => (
         <React.Fragment key={pane.id}>
           <Pane id={pane.id} initialSize={pane.size} minSize={10} view={pane.view}>
-            {/* Original content for {pane.id} is now replaced by ViewFactory in Pane.tsx */}
-            {/* If you still want to pass children, the Pane component needs to handle both view prop and children prop */}
-            {/* <span>{`Content for ${pane.id}`}</span> */}
+            {pane.layout && <PaneGroup layoutId={layoutId} direction={pane.layout.direction} panes={pane.layout.panes} />}
           </Pane>
           {index < panes.length - 1 && (
             <PanelResizeHandle className="w-2 bg-gray-500 hover:bg-blue-600 transition-colors" />
@@ -44,4 +48,13 @@ const Layout: React.FC<LayoutProps> = ({ layoutConfig }) => {
   );
 };
 
+const Layout: React.FC<LayoutProps> = ({ layoutConfig }) => {
+  if (!layoutConfig) {
+    return <div>Loading layout...</div>;
+  }
+
+  const { id: layoutId, direction, panes } = layoutConfig;
+  return <PaneGroup layoutId={layoutId} direction={direction} panes={panes} />;
+};
+
 export default Layout;
@@ -7,12 +7,21 @@ interface PaneProps {
   initialSize?: number; // default size in percentage
   minSize?: number; // min size in percentage
   view?: ViewConfig; // Changed from children to specific view config
+  children?: React.ReactNode; // A nested pane group; takes the place of the view
 }
 
-const Pane: React.FC<PaneProps> = ({ id, initialSize, minSize, view }) => {
+const Pane: React.FC<PaneProps> = ({ id, initialSize, minSize, view, children }) => {
+  let content: React.ReactNode;
+  if (children) {
+    content = children;
+  } else if (view) {
+    content = <ViewFactory viewConfig={view} />;
+  } else {
+    content = <div className="p-4">Pane: {id} (No view assigned)</div>;
+  }
   return (
     <Panel id={id} defaultSize={initialSize} minSize={minSize} className="bg-gray-200 border border-gray-400 flex items-center justify-center">
-      {view ? <ViewFactory viewConfig={view} /> : <div className="p-4">Pane: {id} (No view assigned)</div>}
+      {content}
     </Panel>
   );
 };
@@ -39,6 +39,29 @@ describe('Layout Component', () => {
     expect(screen.getByText('Content for p2')).toBeInTheDocument();
   });
 
+  it('renders nested pane groups', () => {
+    const mockLayout: LayoutConfig = {
+      id: 'nestedLayout',
+      direction: 'horizontal',
+      panes: [
+        { id: 'left', size: 30 },
+        { id: 'right', size: 70, layout: { direction: 'vertical', panes: [
+          { id: 'top', size: 50 },
+          { id: 'bottom', size: 50 },
+        ] } },
+      ],
+    };
+    mockUseLayoutStore.mockReturnValue({
+        updatePaneSize: vi.fn(),
+        persistPaneSizes: vi.fn(),
+    });
+
+    render(<Layout layoutConfig={mockLayout} />);
+    expect(screen.getByText('Pane: left (No view assigned)')).toBeInTheDocument();
+    expect(screen.getByText('Pane: bottom (No view assigned)')).toBeInTheDocument();
+    expect(screen.queryByText('Pane: right (No view assigned)')).not.toBeInTheDocument();
+  });
+
   it('shows loading when layoutConfig is not provided', () => {
      mockUseLayoutStore.mockReturnValue({
         layouts: {},
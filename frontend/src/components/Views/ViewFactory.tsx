@@ -26,6 +26,7 @@ const ViewFactory: React.FC<ViewFactoryProps> = ({ viewConfig }) => {
         method={viewConfig.content?.method}
         requestBody={viewConfig.content?.requestBody}
         headers={viewConfig.content?.headers}
+        gatewayUrl={viewConfig.content?.direct ? undefined : `/api/view/${viewConfig.id}/webhook`}
       />;
     default:
       return <div className="p-2 text-orange-500">Unsupported view type: {viewConfig.type} (ID: {viewConfig.id})</div>;
@@ -8,6 +8,7 @@ interface WebhookTriggerViewProps {
   method?: 'GET' | 'POST' | 'PUT' | 'DELETE'; // Common HTTP methods
   requestBody?: Record<string, any> | string; // JSON object or string for POST/PUT
   headers?: Record<string, string>; // Optional custom headers
+  gatewayUrl?: string; // Backend endpoint that calls the webhook on our behalf (pooled, cached, rate-limited)
 }
 
 const WebhookTriggerView: React.FC<WebhookTriggerViewProps> = ({
@@ -17,6 +18,7 @@ const WebhookTriggerView: React.FC<WebhookTriggerViewProps> = ({
   method = 'POST',
   requestBody = {},
   headers = {},
+  gatewayUrl,
 }) => {
   const [isLoading, setIsLoading] = useState(false);
   const [response, setResponse] = useState<any>(null);
@@ -34,6 +36,12 @@ const WebhookTriggerView: React.FC<WebhookTriggerViewProps> = ({
     }
 
     try {
+      if (gatewayUrl) {
+        // The backend builds the request from the stored view config and relays the answer
+        const result = await axios({ method: 'POST', url: gatewayUrl });
+        setResponse(result.data);
+        return;
+      }
       const config: AxiosRequestConfig = {
         method: method as Method, // Cast because Axios Method type is more specific
         url: webhookUrl,
@@ -161,4 +161,26 @@ describe('WebhookTriggerView Component', () => {
       expect(screen.getByText(\`Error: \${errorResponse.status} - \${JSON.stringify(errorResponse.data)}\`)).toBeInTheDocument();
     });
   });
+
+  it('calls the backend gateway instead of the webhook when gatewayUrl is set', async () => {
+    const mockResponseData = { message: 'relayed' };
+    (mockedAxios as any).mockResolvedValueOnce({ data: mockResponseData, status: 201, headers: {}, config: {} as any, statusText: "Created" });
+
+    render(
+      <WebhookTriggerView
+        id="wh_gw"
+        webhookUrl="https://test.com/direct"
+        method="PUT"
+        requestBody={{ key: 'value' }}
+        gatewayUrl="/api/view/wh_gw/webhook"
+      />
+    );
+    await userEvent.click(screen.getByRole('button', { name: 'Trigger Webhook' }));
+
+    expect(mockedAxios).toHaveBeenCalledTimes(1);
+    expect(mockedAxios).toHaveBeenCalledWith({ method: 'POST', url: '/api/view/wh_gw/webhook' });
+    await waitFor(() => {
+      expect(screen.getByText(JSON.stringify(mockResponseData, null, 2))).toBeInTheDocument();
+    });
+  });
 });
@@ -2,6 +2,12 @@ import React from 'react'
 import ReactDOM from 'react-dom/client'
 import App from './App.tsx'
 import './index.css'
+import { setMessagePackEnabled } from './services/apiService'
+
+// Opt in to MessagePack API responses (smaller than JSON for large view content) with VITE_API_MSGPACK=1
+if (import.meta.env.VITE_API_MSGPACK === '1') {
+  setMessagePackEnabled(true);
+}
 
 async function enableMocking() {
   // Start MSW only in development.
@@ -49,6 +49,32 @@ export const handlers = [
     return HttpResponse.json(newLayout, { status: 201 });
   }),
 
+  // Only the 'replace' operations the GUI sends (pane sizes) are supported by the mock
+  http.patch('/api/layout/:layoutId', async ({ params, request }) => {
+    const { layoutId } = params;
+    if (typeof layoutId !== 'string' || !mockLayouts[layoutId]) {
+      return new HttpResponse(null, { status: 404 });
+    }
+    const operations = await request.json() as { op: string; path: string; value?: unknown }[];
+    const layout = structuredClone(mockLayouts[layoutId]);
+    for (const { op, path, value } of operations) {
+      // e.g. /panes/1/size or, for nested splits, /panes/1/layout/panes/0/size
+      if (op !== 'replace' || !/^(\/panes\/\d+)(\/layout\/panes\/\d+)*\/size$/.test(path)) continue;
+      const indexes = (path.match(/\d+/g) ?? []).map(Number);
+      let panes = layout.panes;
+      let pane = panes[indexes[0]];
+      for (const index of indexes.slice(1)) {
+        panes = pane?.layout?.panes ?? [];
+        pane = panes[index];
+      }
+      if (pane) {
+        pane.size = value as number;
+      }
+    }
+    mockLayouts[layoutId] = layout;
+    return HttpResponse.json(layout);
+  }),
+
   // Module Handlers
   http.get('/api/modules', (_res) => {
     return HttpResponse.json(Object.values(mockModulesDb));
@@ -62,6 +88,23 @@ export const handlers = [
     return new HttpResponse(null, { status: 404 });
   }),
 
+  http.get('/api/module/:moduleId/resolved', ({ params }) => {
+    const { moduleId } = params;
+    const module = typeof moduleId === 'string' ? mockModulesDb[moduleId] : undefined;
+    const layout = module ? mockLayouts[module.layout_id] : undefined;
+    if (!module || !layout) {
+      return new HttpResponse(null, { status: 404 });
+    }
+    const views: Record<string, ViewDTO> = {};
+    const stack = [...layout.panes];
+    while (stack.length) {
+      const pane = stack.pop()!;
+      if (pane.view) { views[pane.view.id] = pane.view; }
+      if (pane.layout) { stack.push(...pane.layout.panes); }
+    }
+    return HttpResponse.json({ module, layout, views });
+  }),
+
   http.post('/api/module', async ({ request }) => {
     const newModule = await request.json() as ModuleDTO;
     if (!newModule || !newModule.id || !newModule.name || !newModule.layout_id) {
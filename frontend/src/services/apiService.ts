@@ -1,4 +1,5 @@
-import axios from 'axios';
+import axios, { AxiosResponse } from 'axios';
+import { decodeMessagePack } from './msgpack';
 // Use central types
 import { LayoutConfig as LayoutDTO, ViewConfig as ViewDTO, PaneConfig as PaneDTO, ModuleConfig as ModuleDTO } from '../types';
 
@@ -19,9 +20,43 @@ export const createLayout = async (layoutData: LayoutDTO): Promise<LayoutDTO> =>
   return response.data;
 };
 
+// RFC 6902 JSON Patch operation, e.g. { op: 'replace', path: '/panes/0/size', value: 30 }
+export interface JsonPatchOperation {
+  op: 'add' | 'remove' | 'replace' | 'move' | 'copy' | 'test';
+  path: string;
+  value?: unknown;
+  from?: string;
+}
+
+// Partially updates a layout. Pass the ETag of the version being edited to have the server
+// refuse the write (HTTP 412) if someone else changed the layout in the meantime.
+export const patchLayout = async (layoutId: string, operations: JsonPatchOperation[], etag?: string): Promise<LayoutDTO> => {
+  const headers: Record<string, string> = { 'Content-Type': 'application/json-patch+json' };
+  if (etag) {
+    headers['If-Match'] = etag;
+  }
+  const response = await axios.patch<LayoutDTO>(`${API_BASE_URL}/layout/${layoutId}`, operations, { headers });
+  return response.data;
+};
+
 // --- Module API Functions ---
-export const fetchAllModules = async (): Promise<ModuleDTO[]> => {
-  const response = await axios.get<ModuleDTO[]>(`${API_BASE_URL}/modules`);
+// Fields the menu needs; layout_id is kept so setActiveModule can open a module without re-fetching it.
+export const MODULE_MENU_FIELDS = ['id', 'name', 'icon', 'layout_id'];
+
+// Server-side search over modules, answered from the backend's search index (e.g. menu typeahead:
+// { prefix: 'da', sort: 'name', limit: 10 }).
+export interface ModuleSearchParams {
+  q?: string; // Words matching the start of words in the name or description
+  prefix?: string; // Start of the name, case-insensitive
+  layout_id?: string;
+  sort?: 'id' | '-id' | 'name' | '-name';
+  limit?: number;
+}
+
+// Pass `fields` to ask the backend for a projection (?fields=...) instead of full module payloads.
+export const fetchAllModules = async (fields?: string[], search?: ModuleSearchParams): Promise<ModuleDTO[]> => {
+  const params = fields || search ? { ...search, ...(fields ? { fields: fields.join(',') } : {}) } : undefined;
+  const response = await axios.get<ModuleDTO[]>(`${API_BASE_URL}/modules`, { params });
   return response.data;
 };
 
@@ -34,3 +69,254 @@ export const createModule = async (moduleData: ModuleDTO): Promise<ModuleDTO> =>
   const response = await axios.post<ModuleDTO>(`${API_BASE_URL}/module`, moduleData);
   return response.data;
 };
+
+// A module with its layout and every referenced view, fetched in a single round trip.
+export interface ResolvedModuleDTO {
+  module: ModuleDTO;
+  layout: LayoutDTO;
+  views: Record<string, ViewDTO>;
+}
+
+export const fetchResolvedModule = async (moduleId: string): Promise<ResolvedModuleDTO> => {
+  const response = await axios.get<ResolvedModuleDTO>(`${API_BASE_URL}/module/${moduleId}/resolved`);
+  return response.data;
+};
+
+// --- Layout hydration ---
+// Result of one view's data source (content.dataSource), as streamed by POST /api/layout/{id}/hydrate.
+export interface HydrationResultDTO {
+  pane_id: string;
+  view_id: string;
+  status: 'ok' | 'error' | 'timeout' | 'invalid';
+  status_code: number;
+  elapsed_ms: number;
+  content_type?: string | null;
+  source?: 'upstream' | 'cache' | 'coalesced';
+  data?: unknown; // Parsed JSON, or text for other content types
+  error?: string;
+}
+
+// Returns a function to feed text chunks of an NDJSON stream to; onItem gets each parsed line.
+// A line may be split across chunks, so the incomplete tail is kept until the next chunk.
+export const createNdjsonParser = (onItem: (item: any) => void) => {
+  let pending = '';
+  return (chunk: string, final = false): void => {
+    pending += chunk;
+    const lines = pending.split('\n');
+    pending = final ? '' : lines.pop() ?? '';
+    for (const line of lines) {
+      if (line.trim()) {
+        onItem(JSON.parse(line));
+      }
+    }
+  };
+};
+
+// Fetches every data source of a layout in one request. The server runs them concurrently and
+// streams each result as soon as it is ready, so onResult fires per pane in completion order.
+// Resolves with the number of results once the stream ends; abort through `signal`.
+export const hydrateLayout = async (
+  layoutId: string,
+  onResult: (result: HydrationResultDTO) => void,
+  signal?: AbortSignal,
+): Promise<number> => {
+  const response = await fetch(`${API_BASE_URL}/layout/${layoutId}/hydrate`, {
+    method: 'POST',
+    headers: { Accept: 'application/x-ndjson' },
+    signal,
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Hydrating layout '${layoutId}' failed with HTTP ${response.status}`);
+  }
+  let count = 0;
+  const feed = createNdjsonParser((item) => {
+    if (item.done) {
+      count = item.count;
+    } else {
+      onResult(item as HydrationResultDTO);
+    }
+  });
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) {
+      feed(decoder.decode(), true);
+      return count;
+    }
+    feed(decoder.decode(value, { stream: true }));
+  }
+};
+
+// --- MessagePack transport ---
+// gzip/brotli compression is negotiated by the browser on its own. MessagePack is opt-in: GET
+// requests then ask for application/msgpack (JSON stays acceptable, e.g. when the server has no
+// msgpack support) and responses are decoded back to the same objects the JSON API returns.
+const MSGPACK_ACCEPT = 'application/msgpack, application/json;q=0.9';
+let messagePackInterceptors: { request: number; response: number } | null = null;
+
+const decodeBinaryResponse = (response: AxiosResponse): AxiosResponse => {
+  if (response.config.responseType === 'arraybuffer' && response.data instanceof ArrayBuffer) {
+    const contentType = String(response.headers['content-type'] ?? '');
+    if (contentType.includes('msgpack')) {
+      response.data = decodeMessagePack(response.data);
+    } else if (response.data.byteLength > 0) {
+      const body = new TextDecoder().decode(response.data);
+      response.data = contentType.includes('json') ? JSON.parse(body) : body;
+    }
+  }
+  return response;
+};
+
+export const setMessagePackEnabled = (enabled: boolean): void => {
+  if (messagePackInterceptors) {
+    axios.interceptors.request.eject(messagePackInterceptors.request);
+    axios.interceptors.response.eject(messagePackInterceptors.response);
+    messagePackInterceptors = null;
+  }
+  if (!enabled) return;
+  messagePackInterceptors = {
+    request: axios.interceptors.request.use((config) => {
+      if ((config.method ?? 'get').toLowerCase() === 'get') {
+        config.headers.set('Accept', MSGPACK_ACCEPT);
+        config.responseType = 'arraybuffer';
+      }
+      return config;
+    }),
+    response: axios.interceptors.response.use(decodeBinaryResponse, (error) => {
+      if (axios.isAxiosError(error) && error.response) {
+        decodeBinaryResponse(error.response); // So callers still see the JSON error detail
+      }
+      return Promise.reject(error);
+    }),
+  };
+};
+
+// --- Change feed ---
+export interface ChangeEventDTO {
+  version: number;
+  type: 'layout' | 'view' | 'module';
+  id: string | null; // null for 'clear'
+  op: 'upsert' | 'delete' | 'clear';
+  etag: string | null;
+}
+
+// Opens the server-sent change feed instead of polling the list endpoints. onReset is called when
+// the server could not replay the changes missed while disconnected, so lists must be re-fetched.
+// EventSource reconnects by itself and resumes through the Last-Event-ID header.
+// Returns a function that closes the stream.
+export const subscribeToChanges = (
+  onChange: (event: ChangeEventDTO) => void,
+  onReset: () => void,
+): (() => void) => {
+  if (typeof EventSource === 'undefined') {
+    return () => {}; // e.g. jsdom in tests
+  }
+  const source = new EventSource(`${API_BASE_URL}/changes`);
+  source.addEventListener('change', (e) => onChange(JSON.parse((e as MessageEvent).data)));
+  source.addEventListener('reset', () => onReset());
+  return () => source.close();
+};
+
+// --- Workspace archives ---
+export type WorkspaceArchiveFormat = 'tar' | 'tgz' | 'zip';
+
+export interface ImportReportDTO {
+  mode: 'merge' | 'replace';
+  applied: boolean; // false: something was invalid and nothing was written
+  imported: Record<string, number>; // per data type ('layouts', 'views', 'modules')
+  deleted: Record<string, number>;
+  skipped: string[];
+  errors: { member: string; error: string }[];
+  error_count: number;
+}
+
+// URL to download the whole workspace from (e.g. as an <a download> href); the server streams the archive.
+export const workspaceExportUrl = (format: WorkspaceArchiveFormat = 'tgz'): string =>
+  `${API_BASE_URL}/export?format=${format}`;
+
+// Uploads an archive from workspaceExportUrl(). Resolves with the report also when it was rejected
+// as invalid (HTTP 400 with applied: false), so the per-file errors can be shown.
+export const importWorkspace = async (archive: Blob, mode: 'merge' | 'replace' = 'merge'): Promise<ImportReportDTO> => {
+  try {
+    const response = await axios.post<ImportReportDTO>(`${API_BASE_URL}/import`, archive, {
+      params: { mode },
+      headers: { 'Content-Type': 'application/octet-stream' },
+    });
+    return response.data;
+  } catch (error) {
+    if (axios.isAxiosError(error) && error.response?.status === 400 && error.response.data?.applied === false) {
+      return error.response.data as ImportReportDTO;
+    }
+    throw error; // Not an archive, too large, or the write failed: { detail }
+  }
+};
+
+// --- Version history and snapshots ---
+export type ConfigType = 'layout' | 'view' | 'module';
+
+export interface ConfigVersionDTO {
+  version: number; // 1 for the oldest recorded version
+  tree: string | null; // content digest; null when this version deleted the config
+  at: number; // Unix time
+  deleted: boolean;
+}
+
+export interface SnapshotDTO {
+  id: number;
+  tree: string;
+  label: string | null;
+  at: number;
+  changed: number; // configs added, changed or deleted since the previous snapshot
+}
+
+export interface SnapshotChangesDTO {
+  added: string[];
+  removed: string[];
+  changed: string[];
+}
+
+export const fetchConfigVersions = async (type: ConfigType, id: string): Promise<ConfigVersionDTO[]> => {
+  const response = await axios.get<{ versions: ConfigVersionDTO[] }>(`${API_BASE_URL}/history/${type}/${id}`);
+  return response.data.versions;
+};
+
+// JSON Patch operations turning version `from` into version `to` (default: the latest version).
+export const diffConfigVersions = async (type: ConfigType, id: string, from: number, to?: number): Promise<JsonPatchOperation[]> => {
+  const response = await axios.get<{ operations: JsonPatchOperation[] }>(`${API_BASE_URL}/history/${type}/${id}/diff`, {
+    params: { from, to },
+  });
+  return response.data.operations;
+};
+
+// Makes a recorded version current again; resolves with the restored config (null if that version was a delete).
+export const rollbackConfig = async (type: ConfigType, id: string, version: number): Promise<any | null> => {
+  const response = await axios.post<{ config: any | null }>(`${API_BASE_URL}/history/${type}/${id}/rollback`, null, {
+    params: { version },
+  });
+  return response.data.config;
+};
+
+export const fetchSnapshots = async (): Promise<SnapshotDTO[]> => {
+  const response = await axios.get<{ snapshots: SnapshotDTO[] }>(`${API_BASE_URL}/snapshots`);
+  return response.data.snapshots;
+};
+
+export const takeSnapshot = async (label?: string): Promise<SnapshotDTO> => {
+  const response = await axios.post<SnapshotDTO>(`${API_BASE_URL}/snapshots`, null, { params: { label } });
+  return response.data;
+};
+
+// Changes per data type ('layouts', 'views', 'modules') from a snapshot to another, or to now.
+export const diffSnapshots = async (from: number, to?: number): Promise<Record<string, SnapshotChangesDTO>> => {
+  const response = await axios.get<{ changes: Record<string, SnapshotChangesDTO> }>(`${API_BASE_URL}/snapshots/${from}/diff`, {
+    params: { to },
+  });
+  return response.data.changes;
+};
+
+// Restores the whole workspace to a snapshot; the state before is kept as a new snapshot (returned as backup).
+export const rollbackSnapshot = async (id: number): Promise<{ backup: SnapshotDTO }> => {
+  const response = await axios.post<{ backup: SnapshotDTO }>(`${API_BASE_URL}/snapshots/${id}/rollback`);
+  return response.data;
+};
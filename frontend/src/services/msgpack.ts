@@ -0,0 +1,82 @@
+// Minimal MessagePack decoder for the API's binary responses (only the types the backend
+// produces from JSON: nil, booleans, numbers, strings, arrays and maps, plus bin as Uint8Array).
+export const decodeMessagePack = (buffer: ArrayBuffer | Uint8Array): unknown => {
+  const bytes = buffer instanceof Uint8Array ? buffer : new Uint8Array(buffer);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const text = new TextDecoder();
+  let offset = 0;
+
+  const str = (length: number): string => {
+    const value = text.decode(bytes.subarray(offset, offset + length));
+    offset += length;
+    return value;
+  };
+  const array = (length: number): unknown[] => {
+    const items = new Array(length);
+    for (let i = 0; i < length; i++) items[i] = read();
+    return items;
+  };
+  const map = (length: number): Record<string, unknown> => {
+    const result: Record<string, unknown> = {};
+    for (let i = 0; i < length; i++) {
+      const key = String(read());
+      result[key] = read();
+    }
+    return result;
+  };
+  const uint = (size: 1 | 2 | 4 | 8): number => {
+    const value = size === 1 ? view.getUint8(offset) : size === 2 ? view.getUint16(offset)
+      : size === 4 ? view.getUint32(offset) : Number(view.getBigUint64(offset));
+    offset += size;
+    return value;
+  };
+  const int = (size: 1 | 2 | 4 | 8): number => {
+    const value = size === 1 ? view.getInt8(offset) : size === 2 ? view.getInt16(offset)
+      : size === 4 ? view.getInt32(offset) : Number(view.getBigInt64(offset));
+    offset += size;
+    return value;
+  };
+
+  const read = (): unknown => {
+    const type = bytes[offset++];
+    if (type <= 0x7f) return type;
+    if (type <= 0x8f) return map(type & 0x0f);
+    if (type <= 0x9f) return array(type & 0x0f);
+    if (type <= 0xbf) return str(type & 0x1f);
+    if (type >= 0xe0) return type - 0x100;
+    switch (type) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: case 0xc5: case 0xc6: {
+        const length = uint(type === 0xc4 ? 1 : type === 0xc5 ? 2 : 4);
+        offset += length;
+        return bytes.slice(offset - length, offset);
+      }
+      case 0xca: { const value = view.getFloat32(offset); offset += 4; return value; }
+      case 0xcb: { const value = view.getFloat64(offset); offset += 8; return value; }
+      case 0xcc: return uint(1);
+      case 0xcd: return uint(2);
+      case 0xce: return uint(4);
+      case 0xcf: return uint(8);
+      case 0xd0: return int(1);
+      case 0xd1: return int(2);
+      case 0xd2: return int(4);
+      case 0xd3: return int(8);
+      case 0xd9: return str(uint(1));
+      case 0xda: return str(uint(2));
+      case 0xdb: return str(uint(4));
+      case 0xdc: return array(uint(2));
+      case 0xdd: return array(uint(4));
+      case 0xde: return map(uint(2));
+      case 0xdf: return map(uint(4));
+      default: throw new Error(`Unsupported MessagePack type 0x${type.toString(16)} at offset ${offset - 1}`);
+    }
+  };
+
+  const value = read();
+  if (offset !== bytes.length) {
+    throw new Error(`Trailing bytes after MessagePack value (${bytes.length - offset})`);
+  }
+  return value;
+};
@@ -0,0 +1,18 @@
+import { describe, it, expect } from 'vitest';
+import { createNdjsonParser } from '../apiService';
+
+describe('createNdjsonParser', () => {
+  it('parses lines split across chunks', () => {
+    const items: unknown[] = [];
+    const feed = createNdjsonParser((item) => items.push(item));
+    feed('{"view_id":"a","status":"ok"}\n{"view_');
+    expect(items).toEqual([{ view_id: 'a', status: 'ok' }]);
+    feed('id":"b","status":"timeout"}\n\n');
+    feed('{"done":true,"count":2}', true);
+    expect(items).toEqual([
+      { view_id: 'a', status: 'ok' },
+      { view_id: 'b', status: 'timeout' },
+      { done: true, count: 2 },
+    ]);
+  });
+});
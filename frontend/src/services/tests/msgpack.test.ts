@@ -0,0 +1,19 @@
+import { describe, it, expect } from 'vitest';
+import { decodeMessagePack } from '../msgpack';
+
+describe('decodeMessagePack', () => {
+  it('decodes the types produced from JSON', () => {
+    // {"a": [1, -1, 1.5, null, true, "é", 300, -200]}
+    const bytes = new Uint8Array([
+      0x81, 0xa1, 0x61, 0x98, 0x01, 0xff,
+      0xcb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+      0xc0, 0xc3, 0xa2, 0xc3, 0xa9,
+      0xcd, 0x01, 0x2c, 0xd1, 0xff, 0x38,
+    ]);
+    expect(decodeMessagePack(bytes)).toEqual({ a: [1, -1, 1.5, null, true, 'é', 300, -200] });
+  });
+
+  it('rejects trailing bytes', () => {
+    expect(() => decodeMessagePack(new Uint8Array([0xc0, 0xc0]))).toThrow();
+  });
+});
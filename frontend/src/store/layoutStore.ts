@@ -3,7 +3,7 @@ import { create } from 'zustand';
 // If they are used for store's internal representation and are compatible, this is fine.
 // The types file was created in this subtask.
 import { ViewConfig as GlobalViewConfig, PaneConfig as GlobalPaneConfig, LayoutConfig as GlobalLayoutConfig } from '../types';
-import { fetchAllLayouts, createLayout as apiCreateLayout, fetchLayout, LayoutDTO } from '../services/apiService';
+import { fetchAllLayouts, createLayout as apiCreateLayout, fetchLayout, patchLayout, LayoutDTO, ChangeEventDTO, JsonPatchOperation } from '../services/apiService';
 
 // Store-specific types can extend or use global types
 export interface PaneConfig extends GlobalPaneConfig {}
@@ -19,11 +19,40 @@ interface LayoutState {
   addLayout: (layout: LayoutConfig) => void;
   setActiveLayout: (layoutId: string | null) => void;
   updatePaneSize: (layoutId: string, paneId: string, newSize: number) => void;
+  persistPaneSizes: (layoutId: string) => void; // Debounced PATCH of the current pane sizes
   fetchAllLayoutsFromServer: () => Promise<void>;
   saveLayoutToServer: (layout: LayoutConfig) => Promise<void>;
   fetchLayoutAndSetActive: (layoutId: string) => Promise<void>;
+  applyChange: (event: ChangeEventDTO) => Promise<void>; // Refreshes loaded layouts from the server's change feed
 }
 
+// Returns a copy of the pane tree with one pane (at any depth) resized; untouched subtrees are shared.
+const resizePaneInTree = (panes: PaneConfig[], paneId: string, newSize: number): PaneConfig[] =>
+  panes.map((pane) => {
+    if (pane.id === paneId) return { ...pane, size: newSize };
+    if (!pane.layout) return pane;
+    const nestedPanes = resizePaneInTree(pane.layout.panes, paneId, newSize);
+    return nestedPanes.some((nested, index) => nested !== pane.layout!.panes[index])
+      ? { ...pane, layout: { ...pane.layout, panes: nestedPanes } }
+      : pane;
+  });
+
+// JSON Patch operations writing every pane size in the tree, e.g. /panes/1/layout/panes/0/size.
+const paneSizeOperations = (panes: PaneConfig[], prefix = ''): JsonPatchOperation[] =>
+  panes.flatMap((pane, index) => {
+    const path = `${prefix}/panes/${index}`;
+    // 'test' guards against the pane order having changed on the server since this layout was loaded
+    const operations: JsonPatchOperation[] = [
+      { op: 'test', path: `${path}/id`, value: pane.id },
+      { op: 'replace', path: `${path}/size`, value: pane.size },
+    ];
+    return pane.layout ? operations.concat(paneSizeOperations(pane.layout.panes, `${path}/layout`)) : operations;
+  });
+
+// Resizing fires many updates per second; only the sizes at the end of a drag are sent.
+const PERSIST_PANE_SIZES_DELAY_MS = 300;
+const pendingPaneSizeWrites: Record<string, ReturnType<typeof setTimeout>> = {};
+
 export const useLayoutStore = create<LayoutState>((set, get) => ({
   layouts: {},
   activeLayoutId: null,
@@ -38,9 +67,7 @@ export const useLayoutStore = create<LayoutState>((set, get) => ({
     set((state) => {
       const layout = state.layouts[layoutId];
       if (!layout) return state;
-      const updatedPanes = layout.panes.map((pane) =>
-        pane.id === paneId ? { ...pane, size: newSize } : pane
-      );
+      const updatedPanes = resizePaneInTree(layout.panes, paneId, newSize);
       return {
         layouts: {
           ...state.layouts,
@@ -48,6 +75,19 @@ export const useLayoutStore = create<LayoutState>((set, get) => ({
         },
       };
     }),
+  persistPaneSizes: (layoutId) => {
+    clearTimeout(pendingPaneSizeWrites[layoutId]);
+    pendingPaneSizeWrites[layoutId] = setTimeout(async () => {
+      delete pendingPaneSizeWrites[layoutId];
+      const layout = get().layouts[layoutId];
+      if (!layout) return;
+      try {
+        await patchLayout(layoutId, paneSizeOperations(layout.panes));
+      } catch (err) {
+        console.error(`Failed to save pane sizes of layout ${layoutId}:`, err instanceof Error ? err.message : String(err));
+      }
+    }, PERSIST_PANE_SIZES_DELAY_MS);
+  },
   fetchAllLayoutsFromServer: async () => {
     set({ isLoading: true, error: null });
     try {
@@ -94,4 +134,21 @@ export const useLayoutStore = create<LayoutState>((set, get) => ({
       console.error(`Error fetching layout ${layoutId}:`, errorMsg);
     }
   },
+  applyChange: async (event) => {
+    if (event.type !== 'layout') return;
+    if (event.op === 'clear') {
+      set({ layouts: {}, activeLayoutId: null });
+    } else if (event.op === 'delete' && event.id) {
+      const { [event.id]: _removed, ...layouts } = get().layouts;
+      set(state => ({ layouts, activeLayoutId: state.activeLayoutId === event.id ? null : state.activeLayoutId }));
+    } else if (event.op === 'upsert' && event.id && get().layouts[event.id]) {
+      // Only layouts this client has loaded are refreshed; others are fetched when opened
+      try {
+        const layout = await fetchLayout(event.id);
+        set(state => ({ layouts: { ...state.layouts, [layout.id]: layout as LayoutConfig } }));
+      } catch (err) {
+        console.error(`Failed to refresh layout ${event.id}:`, err instanceof Error ? err.message : String(err));
+      }
+    }
+  },
 }));
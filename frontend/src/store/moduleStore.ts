@@ -1,6 +1,6 @@
 import { create } from 'zustand';
 import { ModuleConfig } from '../types';
-import { fetchAllModules as apiFetchAllModules, createModule as apiCreateModule, fetchModule as apiFetchModule } from '../services/apiService';
+import { fetchAllModules as apiFetchAllModules, fetchModule as apiFetchModule, createModule as apiCreateModule, fetchResolvedModule as apiFetchResolvedModule, MODULE_MENU_FIELDS, ChangeEventDTO } from '../services/apiService';
 import { useLayoutStore } from './layoutStore'; // To fetch and set active layout for a module
 
 interface ModuleState {
@@ -11,6 +11,7 @@ interface ModuleState {
   fetchAllModules: () => Promise<void>;
   createModule: (moduleData: ModuleConfig) => Promise<ModuleConfig | null>;
   setActiveModule: (moduleId: string | null) => Promise<void>; // Making it async to load layout
+  applyChange: (event: ChangeEventDTO) => Promise<void>; // Keeps the menu in sync with the server's change feed
 }
 
 export const useModuleStore = create<ModuleState>((set, get) => ({
@@ -22,7 +23,7 @@ export const useModuleStore = create<ModuleState>((set, get) => ({
   fetchAllModules: async () => {
     set({ isLoading: true, error: null });
     try {
-      const serverModules = await apiFetchAllModules();
+      const serverModules = await apiFetchAllModules(MODULE_MENU_FIELDS);
       const modulesMap: Record<string, ModuleConfig> = {};
       serverModules.forEach(mod => { modulesMap[mod.id] = mod; });
       set({ modules: modulesMap, isLoading: false });
@@ -72,16 +73,13 @@ export const useModuleStore = create<ModuleState>((set, get) => ({
     set({ isLoading: true, error: null, activeModuleId: moduleId });
     if (moduleId) {
       try {
-        const currentModule = get().modules[moduleId] ?? await apiFetchModule(moduleId);
-        if (!currentModule) {
-            throw new Error (\`Module with ID \${moduleId} not found.\`);
-        }
-        if (!get().modules[moduleId]) { // if it was fetched, add to store
-            set(state => ({ modules: { ...state.modules, [moduleId]: currentModule }}));
-        }
+        // One request returns the module, its layout and referenced views
+        const { module: currentModule, layout } = await apiFetchResolvedModule(moduleId);
+        set(state => ({ modules: { ...state.modules, [moduleId]: currentModule }}));
 
         const layoutStore = useLayoutStore.getState();
-        await layoutStore.fetchLayoutAndSetActive(currentModule.layout_id);
+        layoutStore.addLayout(layout);
+        layoutStore.setActiveLayout(layout.id);
 
         set({ isLoading: false });
       } catch (err) {
@@ -95,4 +93,21 @@ export const useModuleStore = create<ModuleState>((set, get) => ({
       set({ isLoading: false });
     }
   },
+
+  applyChange: async (event) => {
+    if (event.type !== 'module') return;
+    if (event.op === 'clear') {
+      set({ modules: {} });
+    } else if (event.op === 'delete' && event.id) {
+      const { [event.id]: _removed, ...modules } = get().modules;
+      set({ modules });
+    } else if (event.op === 'upsert' && event.id) {
+      try {
+        const updated = await apiFetchModule(event.id);
+        set(state => ({ modules: { ...state.modules, [updated.id]: updated } }));
+      } catch (err) {
+        console.error(`Failed to refresh module ${event.id}:`, err instanceof Error ? err.message : String(err));
+      }
+    }
+  },
 }));
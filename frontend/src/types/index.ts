@@ -9,8 +9,14 @@ export interface ViewConfig {
 
 export interface PaneConfig {
   id: string;
-  size: number;
+  size: number; // Percentage of the parent; sibling sizes sum to 100
   view?: ViewConfig;
+  layout?: NestedLayoutConfig; // Splits the pane further instead of showing a view
+}
+
+export interface NestedLayoutConfig {
+  direction: 'horizontal' | 'vertical';
+  panes: PaneConfig[];
 }
 
 export interface LayoutConfig {